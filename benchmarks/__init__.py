@@ -0,0 +1 @@
+"""基准测试，用法见 benchmarks/__main__.py"""
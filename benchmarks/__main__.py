@@ -0,0 +1,156 @@
+"""运行基准测试并与基线比较
+
+    python -m benchmarks                          # 默认大小，与基线比较
+    python -m benchmarks --save-baseline          # 把本次结果保存为基线
+    python -m benchmarks --sizes 1MB,500MB --cases format,stream_format
+    python -m benchmarks --max-regression 10 -o results.json
+
+在无显示环境下以 offscreen 平台运行。基线文件存在时，任一用例的吞吐量比
+基线下降超过允许的百分比即判为性能回退，退出码为 1。允许的百分比依次取
+--max-regression、基线文件中保存的值和 MAX_REGRESSION。基线与机器相关，
+应在同一台机器（或同规格的CI环境）上生成和比较。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from loguru import logger
+
+from benchmarks import cases, corpus
+from src.utils import json_backend
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+# 默认允许的吞吐量下降百分比
+MAX_REGRESSION = 20.0
+
+
+def _split(value, choices, option):
+    if value == 'all':
+        return list(choices)
+    items = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = [item for item in items if item not in choices]
+    if unknown:
+        raise SystemExit(f'{option} 中有未知的值: {", ".join(unknown)}（可选: {", ".join(choices)}）')
+    return items
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='JSON工具的基准测试')
+    parser.add_argument('--sizes', default=','.join(corpus.DEFAULT_SIZES),
+                        help=f'语料大小，逗号分隔或 all（{", ".join(corpus.SIZES)}）')
+    parser.add_argument('--shapes', default='all', help=f'语料形状（{", ".join(corpus.SHAPES)}）')
+    parser.add_argument('--cases', default='all', help=f'用例（{", ".join(c.name for c in cases.CASES)}）')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果写入基线文件')
+    parser.add_argument('--max-regression', type=float, help='允许的吞吐量下降百分比')
+    parser.add_argument('-o', '--output', type=Path, help='另存本次结果')
+    return parser
+
+
+def run(sizes, shapes, case_names, out=sys.stdout):
+    """运行所选用例，返回 {'用例/形状/大小': 结果}"""
+    selected = [case for case in cases.CASES if case.name in case_names]
+    gui = app = None
+    if any(case.needs_gui for case in selected):
+        from PyQt5.QtWidgets import QApplication
+
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+        gui = cases.Gui()
+    results = {}
+    for size_name in sizes:
+        for shape in shapes:
+            sample = cases.Sample(shape, size_name)
+            for case in selected:
+                if not case.applies_to(sample):
+                    continue
+                key = f'{case.name}/{shape}/{size_name}'
+                try:
+                    result = cases.run_case(case, sample, gui)
+                except cases.OutputMismatch:
+                    raise
+                except Exception as e:
+                    # 如缺少可选依赖，或依赖与当前 Python 版本不兼容
+                    print(f'{key:<40} 跳过（{type(e).__name__}: {e}）', file=out, flush=True)
+                    continue
+                results[key] = result
+                print(f'{key:<40} {result["seconds"] * 1000:>10.2f} ms '
+                      f'{result["throughput"]:>10.2f} {result["unit"]}', file=out, flush=True)
+                if app is not None:
+                    app.processEvents()
+            sample.release()
+    return results
+
+
+def compare(results, baseline, max_regression, out=sys.stdout):
+    """与基线比较，返回吞吐量下降超过 max_regression% 的 [(用例, 基线, 本次, 下降百分比)]"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None or base['throughput'] <= 0:
+            continue
+        change = (result['throughput'] / base['throughput'] - 1) * 100
+        if -change > max_regression:
+            regressions.append((key, base['throughput'], result['throughput'], -change))
+    missing = len([key for key in results if key not in baseline])
+    print(f'\n与基线比较（允许下降 {max_regression:g}%）：{len(results) - missing} 项可比较，'
+          f'{missing} 项基线中没有', file=out)
+    for key, base, current, drop in regressions:
+        unit = results[key]['unit']
+        print(f'  回退 {key}: {base:.2f} → {current:.2f} {unit}（下降 {drop:.1f}%）', file=out)
+    return regressions
+
+
+def _meta(max_regression):
+    return {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'json_backends': json_backend.describe_selection(),
+        'max_regression': max_regression,
+    }
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sizes = _split(args.sizes, list(corpus.SIZES), '--sizes')
+    shapes = _split(args.shapes, list(corpus.SHAPES), '--shapes')
+    case_names = _split(args.cases, [case.name for case in cases.CASES], '--cases')
+
+    # 只保留警告，后端选择与界面中后台测速的结果一致
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    json_backend.select()
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    max_regression = args.max_regression
+    if max_regression is None:
+        max_regression = baseline['meta'].get('max_regression', MAX_REGRESSION) if baseline else MAX_REGRESSION
+
+    results = run(sizes, shapes, case_names)
+    document = {'meta': _meta(max_regression), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+        print(f'\n基线已保存: {args.baseline}')
+        return 0
+    if baseline is None:
+        print(f'\n没有基线文件 {args.baseline}，用 --save-baseline 生成')
+        return 0
+    return 1 if compare(results, baseline['results'], max_regression) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
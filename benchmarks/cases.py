@@ -0,0 +1,331 @@
+"""基准测试用例
+
+每个用例在一份语料上准备好输入后，返回一个无参函数用于计时。吞吐量按用例
+处理的数据量计算：解析、格式化、压缩和转换按输入字节数，高亮和搜索按格式化后
+的字节数；绘制类用例（可见区域高亮、行号栏）按每秒完成的重绘次数。
+
+格式化、压缩和转换走与界面相同的路径（document_cache.render，每次新建
+Document，包含解析）；超过 DOCUMENT_LIMIT 的语料在界面中也是通过“打开文件”
+流式处理的，因此只跑 stream_* 用例。
+
+legacy_* 用例运行改写前的转换实现（pprint、纯 Python 的 yaml.Dumper 和
+dicttoxml）作为对照，准备时先确认与当前实现的输出逐字节相同，不同时抛出
+OutputMismatch 中止运行。
+
+diff 用例对比语料与改动了 DIFF_EDITS 处字段的副本（两份各自解析，互不共享
+对象），只计对比本身，数据量按两侧输入字节数之和计算。
+
+query_* 用例对文件流式查询并把结果写入 LineStore：query_key 为 $..name 形式，
+在原始字节中查找键名；query_path 为逐层的简单路径，走 json_stream.stream_select。
+"""
+import time
+
+from benchmarks import corpus
+from src.utils import (converters, document_cache, json_diff, json_ops, json_query, json_stream,
+                       relaxed_json, search_index)
+from src.utils.line_store import LineStore
+
+MB_PER_S = 'MB/s'
+FRAMES_PER_S = '帧/秒'
+
+# 每个用例至少计时的秒数和最多重复次数，取最快一次
+MIN_TIME = 0.5
+MAX_REPEAT = 20
+
+# 需要构建完整对象树的用例的语料上限
+DOCUMENT_LIMIT = 16 * corpus.MB
+# 转换和整篇高亮较慢，只在较小的语料上运行
+CONVERT_LIMIT = corpus.MB
+# 对比用例同时持有两份解析结果
+DIFF_LIMIT = 256 * corpus.MB
+DIFF_EDITS = 5
+HIGHLIGHT_FULL_LIMIT = corpus.MB
+# 流式查询用例的查询（各形状的语料顶层都是数组）
+QUERY_KEY = '$..id'
+QUERY_PATH = '$[*].id'
+# 重绘测试滚动到的位置（占总行数的比例）
+SCROLL_POSITIONS = (0.0, 0.25, 0.5, 0.75, 1.0)
+# 搜索一个很少出现的词，测的是整篇扫描的速度
+SEARCH_TEXT = 'gamma-99'
+VIEWER_SIZE = (1200, 800)
+
+
+class OutputMismatch(Exception):
+    """改写前后的实现输出不同"""
+
+
+class Sample:
+    """一份语料及其按需生成的格式化结果"""
+
+    def __init__(self, shape, size_name):
+        self.shape = shape
+        self.size_name = size_name
+        self.path = corpus.path(shape, size_name)
+        self.size = self.path.stat().st_size
+        self._text = None
+        self._formatted = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = corpus.load(self.shape, self.size_name)
+        return self._text
+
+    @property
+    def formatted(self):
+        """格式化后的 LineStore，用流式格式化生成，不构建对象树"""
+        if self._formatted is None:
+            self._formatted = json_stream.format_file(str(self.path), sink=LineStore()).finish()
+        return self._formatted
+
+    def release(self):
+        self._text = None
+        self._formatted = None
+
+
+class Case:
+    """一个基准测试用例
+
+    prepare(sample, gui) 返回 (计时函数, 每次调用处理的数据量)；数据量为字节数，
+    unit 为 FRAMES_PER_S 时为每次调用的重绘次数。
+    """
+
+    def __init__(self, name, prepare, max_size=None, unit=MB_PER_S, needs_gui=False):
+        self.name = name
+        self.prepare = prepare
+        self.max_size = max_size
+        self.unit = unit
+        self.needs_gui = needs_gui
+
+    def applies_to(self, sample):
+        return self.max_size is None or sample.size <= self.max_size
+
+
+def _render(name):
+    def prepare(sample, gui):
+        text = sample.text
+
+        def run():
+            document_cache.render(document_cache.Document(text), name, sink=LineStore())
+        return run, sample.size
+    return prepare
+
+
+def _legacy_python(data):
+    import pprint
+    return f"# Python字典\n{pprint.pformat(data, indent=4, width=80)}"
+
+
+def _legacy_yaml(data):
+    import yaml
+    return yaml.dump(data, Dumper=yaml.Dumper, indent=4, allow_unicode=True)
+
+
+def _legacy_xml(data):
+    from dicttoxml import dicttoxml
+    return dicttoxml(data, attr_type=False).decode('utf-8')
+
+
+def _legacy(name, convert):
+    """改写前的转换实现，与 convert_* 一样包含解析"""
+    def prepare(sample, gui):
+        text = sample.text
+        data = json_ops.parse_json(text)
+        expected = convert(data)
+        actual = converters.to_string(converters.WRITERS[name], data)
+        if actual != expected:
+            raise OutputMismatch(f'{name} 的输出与改写前的实现不同（{sample.shape}/{sample.size_name}）')
+
+        def run():
+            convert(json_ops.parse_json(text))
+        return run, sample.size
+    return prepare
+
+
+def _json5(sample, gui):
+    """JSON5 转写和解析（标准JSON输入在界面中不走这条路径，这里测的是转写器本身）"""
+    text = sample.text
+
+    def run():
+        relaxed_json.parse(text)
+    return run, sample.size
+
+
+def _stream(indent):
+    def prepare(sample, gui):
+        def run():
+            json_stream.process_file(str(sample.path), indent, sink=LineStore()).finish()
+        return run, sample.size
+    return prepare
+
+
+def _highlight_full(sample, gui):
+    """QSyntaxHighlighter 方式：挂到整份文档上，对全部文本块着色"""
+    from PyQt5.QtGui import QTextDocument
+    from src.ui.json_formatter import JsonHighlighter
+
+    store = sample.formatted
+    text = store.text_range(0, store.line_count)
+
+    def run():
+        document = QTextDocument()
+        document.setPlainText(text)
+        highlighter = JsonHighlighter(document)
+        highlighter.rehighlight()
+    return run, store.nbytes
+
+
+def _scroll_positions(viewer):
+    bar = viewer.verticalScrollBar()
+    return [round(bar.maximum() * fraction) for fraction in SCROLL_POSITIONS]
+
+
+def _viewer(sample, gui):
+    viewer = gui.viewer
+    viewer.set_store(sample.formatted)
+    return viewer
+
+
+def _highlight_viewport(sample, gui):
+    """ChunkedTextViewer 方式：只对可见行分词，每个位置清空格式缓存后重绘"""
+    viewer = _viewer(sample, gui)
+    positions = _scroll_positions(viewer)
+
+    def run():
+        for value in positions:
+            viewer.verticalScrollBar().setValue(value)
+            viewer._format_cache = {}
+            viewer.viewport().repaint()
+    return run, len(positions)
+
+
+def _gutter_paint(sample, gui):
+    """LineNumberWidget.paintEvent：带折叠标记的行号栏"""
+    viewer = _viewer(sample, gui)
+    positions = _scroll_positions(viewer)
+    gutter = gui.gutter
+
+    def run():
+        for value in positions:
+            viewer.verticalScrollBar().setValue(value)
+            gutter.repaint()
+    return run, len(positions)
+
+
+def _edit(data, count):
+    """在 count 个分散的位置把叶子值改为字符串，返回修改后的 data"""
+    for k in range(1, count + 1):
+        parent, key = None, None
+        node = data
+        while isinstance(node, (dict, list)) and node:
+            keys = list(node) if isinstance(node, dict) else range(len(node))
+            parent, key = node, keys[len(keys) * k // (count + 1)]
+            node = node[key]
+        if parent is None:
+            return 'edited'
+        parent[key] = f'edited-{k}'
+    return data
+
+
+def _diff(sample, gui):
+    text = sample.text
+    old = json_ops.parse_json(text)
+    new = _edit(json_ops.parse_json(text), DIFF_EDITS)
+
+    def run():
+        json_diff.diff(old, new)
+    return run, 2 * sample.size
+
+
+def _query(text):
+    def prepare(sample, gui):
+        query = json_query.compile_query(text)
+
+        def run():
+            sink = LineStore()
+            json_query.write_results(query.stream_file(str(sample.path)), sink)
+            sink.finish()
+        return run, sample.size
+    return prepare
+
+
+def _search(indexed):
+    def prepare(sample, gui):
+        store = sample.formatted
+        query = search_index.SearchQuery(SEARCH_TEXT)
+        index = search_index.NgramIndex(store).build() if indexed else None
+
+        def run():
+            search_index.search(store, query, index=index)
+        return run, store.nbytes
+    return prepare
+
+
+CASES = [
+    Case('format', _render('format'), DOCUMENT_LIMIT),
+    Case('minify', _render('minify'), DOCUMENT_LIMIT),
+    Case('parse_json5', _json5, DOCUMENT_LIMIT),
+    Case('stream_format', _stream(json_stream.INDENT)),
+    Case('stream_minify', _stream(None)),
+    Case('convert_yaml', _render('YAML'), CONVERT_LIMIT),
+    Case('convert_xml', _render('XML'), CONVERT_LIMIT),
+    Case('convert_python', _render('Python字典'), CONVERT_LIMIT),
+    Case('legacy_yaml', _legacy('YAML', _legacy_yaml), CONVERT_LIMIT),
+    Case('legacy_xml', _legacy('XML', _legacy_xml), CONVERT_LIMIT),
+    Case('legacy_python', _legacy('Python字典', _legacy_python), CONVERT_LIMIT),
+    Case('diff', _diff, DIFF_LIMIT),
+    Case('query_key', _query(QUERY_KEY)),
+    Case('query_path', _query(QUERY_PATH)),
+    Case('highlight_full', _highlight_full, HIGHLIGHT_FULL_LIMIT, needs_gui=True),
+    Case('highlight_viewport', _highlight_viewport, unit=FRAMES_PER_S, needs_gui=True),
+    Case('search', _search(False)),
+    Case('search_indexed', _search(True)),
+    Case('gutter_paint', _gutter_paint, unit=FRAMES_PER_S, needs_gui=True),
+]
+
+
+class Gui:
+    """绘制类用例共用的查看器窗口（需在创建 QApplication 之后构造）"""
+
+    def __init__(self):
+        from src.ui.chunked_viewer import ChunkedTextViewer
+        from src.ui.json_formatter import JsonHighlighter, LineNumberWidget
+
+        self.viewer = ChunkedTextViewer()
+        self.gutter = LineNumberWidget(self.viewer)
+        self.viewer.set_gutter(self.gutter)
+        self.viewer.set_highlighter(JsonHighlighter())
+        self.viewer.resize(*VIEWER_SIZE)
+        self.viewer.show()
+
+
+def measure(run):
+    """重复调用直到累计 MIN_TIME 秒或 MAX_REPEAT 次，返回最快一次的秒数"""
+    best = float('inf')
+    total = 0.0
+    repeats = 0
+    while repeats < MAX_REPEAT and (repeats == 0 or total < MIN_TIME):
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        best = min(best, seconds)
+        total += seconds
+        repeats += 1
+    return best, repeats
+
+
+def run_case(case, sample, gui=None):
+    """运行一个用例，返回结果字典"""
+    run, amount = case.prepare(sample, gui)
+    seconds, repeats = measure(run)
+    if case.unit == MB_PER_S:
+        throughput = amount / corpus.MB / max(seconds, 1e-9)
+    else:
+        throughput = amount / max(seconds, 1e-9)
+    return {
+        'seconds': seconds,
+        'throughput': throughput,
+        'unit': case.unit,
+        'bytes': sample.size,
+        'repeats': repeats,
+    }
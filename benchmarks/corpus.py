@@ -0,0 +1,126 @@
+"""合成测试语料
+
+每种形状生成一个顶层数组，元素由固定种子的随机数生成，同一形状和大小每次
+生成的内容相同。语料写入 CORPUS_DIR 缓存，生成一次后重复使用；大文件逐块
+写出，生成 500MB 语料也不需要在内存中拼出完整文本。
+
+形状：
+- records: 常见的业务记录，字段类型混合
+- deep:    深层嵌套的对象和数组
+- wide:    元素很多的扁平数组
+- strings: 含转义字符的长字符串
+- unicode: 中文、日文、表情符号等非ASCII文本
+"""
+import json
+import os
+import random
+from pathlib import Path
+
+CORPUS_DIR = Path(__file__).resolve().parent / '.corpus'
+
+KB = 1024
+MB = 1024 * KB
+
+SIZES = {
+    '1KB': KB,
+    '64KB': 64 * KB,
+    '1MB': MB,
+    '16MB': 16 * MB,
+    '128MB': 128 * MB,
+    '500MB': 500 * MB,
+}
+# 不指定 --sizes 时运行的大小，更大的语料生成和运行都需要数分钟
+DEFAULT_SIZES = ('1KB', '64KB', '1MB', '16MB')
+
+_WORDS = ['alpha', 'beta', 'gamma', 'delta', 'status', 'order', 'user', 'item', 'price', 'tags']
+_UNICODE = ['测试数据', '工具箱', '格式化', 'データ', '변환', 'Ελληνικά', 'кириллица', '😀🚀', 'naïve café']
+_ESCAPES = ['\\', '"', '\n', '\t', '/', 'é', ' ']
+_DEEP_LEVELS = 64
+
+
+def _record(rng, i):
+    return {
+        'id': i,
+        'name': f'{rng.choice(_WORDS)}-{rng.randrange(10 ** 6)}',
+        'price': round(rng.uniform(0, 10000), 2),
+        'ratio': rng.random(),
+        'active': rng.random() < 0.5,
+        'parent': None if rng.random() < 0.3 else rng.randrange(i + 1),
+        'tags': rng.sample(_WORDS, 3),
+        'meta': {'created': 1700000000 + rng.randrange(10 ** 7), 'score': rng.randrange(-500, 500)},
+    }
+
+
+def _deep(rng, i):
+    node = {'leaf': i, 'value': rng.random()}
+    for level in range(_DEEP_LEVELS):
+        node = {'level': level, 'child': node} if level % 2 else [level, node]
+    return node
+
+
+def _wide(rng, i):
+    return [rng.randrange(-10 ** 9, 10 ** 9) if j % 3 else rng.choice(_WORDS) for j in range(256)]
+
+
+def _strings(rng, i):
+    length = rng.randrange(1024, 16 * KB)
+    chunks = []
+    while length > 0:
+        word = rng.choice(_WORDS + _ESCAPES)
+        chunks.append(word)
+        length -= len(word) + 1
+    return {'id': i, 'text': ' '.join(chunks)}
+
+
+def _unicode(rng, i):
+    return {
+        rng.choice(_UNICODE): rng.choice(_UNICODE) * rng.randrange(1, 8),
+        '名称': f'{rng.choice(_UNICODE)}{i}',
+        'emoji': '🎉' * rng.randrange(1, 5),
+        'mixed': [rng.choice(_UNICODE), i, rng.random()],
+    }
+
+
+SHAPES = {
+    'records': _record,
+    'deep': _deep,
+    'wide': _wide,
+    'strings': _strings,
+    'unicode': _unicode,
+}
+
+
+def generate(shape, size, write):
+    """把约 size 字节的语料写入 write，返回实际字节数"""
+    make = SHAPES[shape]
+    rng = random.Random(f'{shape}:{size}')
+    write('[')
+    written = 1
+    i = 0
+    while True:
+        item = json.dumps(make(rng, i), ensure_ascii=False)
+        item_size = len(item.encode('utf-8')) + 1
+        if i and written + item_size + 1 > size:
+            break
+        write((',' if i else '') + item)
+        written += item_size if i else item_size - 1
+        i += 1
+    write(']')
+    return written + 1
+
+
+def path(shape, size_name):
+    """返回语料文件路径，不存在时生成"""
+    target = CORPUS_DIR / f'{shape}_{size_name}.json'
+    if not target.exists():
+        CORPUS_DIR.mkdir(parents=True, exist_ok=True)
+        partial = target.with_suffix('.tmp')
+        with open(partial, 'w', encoding='utf-8', newline='') as f:
+            generate(shape, SIZES[size_name], f.write)
+        os.replace(partial, target)
+    return target
+
+
+def load(shape, size_name):
+    with open(path(shape, size_name), encoding='utf-8') as f:
+        return f.read()
@@ -1,17 +1,38 @@
 import sys
 import os
-from PyQt5 import QtWidgets
 
-from src.app import TestToolBoxApp
+from src.utils import startup
 from src.logger import setup_logger
 
-# 自动获取PyQt5安装路径
-os.environ['QT_QPA_PLATFORM_PLUGIN_PATH'] = os.path.join(
-    os.path.dirname(QtWidgets.__file__), 'Qt5', 'plugins'
-)
+
+def run_gui():
+    with startup.measure('PyQt5', startup.IMPORT):
+        from PyQt5 import QtCore, QtWidgets
+
+    with startup.measure('src.app', startup.IMPORT):
+        from src.app import TestToolBoxApp
+
+    # 自动获取PyQt5安装路径
+    os.environ['QT_QPA_PLATFORM_PLUGIN_PATH'] = os.path.join(
+        os.path.dirname(QtWidgets.__file__), 'Qt5', 'plugins'
+    )
+
+    with startup.measure('QApplication'):
+        app = QtWidgets.QApplication(sys.argv)
+    with startup.measure('主窗口'):
+        window = TestToolBoxApp()
+    with startup.measure('显示窗口'):
+        window.show()
+    # 事件循环开始后窗口已完成首次绘制，此时写出启动耗时报告
+    QtCore.QTimer.singleShot(0, startup.report)
+    return app.exec_()
+
 
 if __name__ == "__main__":
-    app = QtWidgets.QApplication(sys.argv)
-    window = TestToolBoxApp()
-    window.show()
-    sys.exit(app.exec_())
+    with startup.measure('日志'):
+        setup_logger()
+    # 批处理模式不创建界面，也不导入PyQt5，可在没有显示环境的CI中运行
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from src.batch import main
+        sys.exit(main(sys.argv[2:]))
+    sys.exit(run_gui())
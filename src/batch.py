@@ -0,0 +1,244 @@
+"""无界面批处理模式
+
+    python main.py batch validate fixtures/ "data/**/*.json"
+    python main.py batch format src_dir -o out_dir --indent 2
+    python main.py batch convert src_dir -o out_dir --to yaml --report report.jsonl
+
+输入可以是目录（递归查找匹配 --pattern 的文件）、通配符或单个文件。文件按块
+分发到进程池中处理，每个文件的结果由工作进程直接写入输出目录（保持相对
+路径），主进程只收集状态；--report 给出时逐条写入 JSON Lines 报告。处理结束后
+打印吞吐量和出错文件汇总，有文件出错时退出码为 1。
+
+解析、格式化、压缩和转换复用 src.utils.json_ops，超过 STREAM_THRESHOLD 的
+文件改用 src.utils.json_stream 流式处理，错误信息与界面中显示的一致。
+"""
+import argparse
+import fnmatch
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from src.utils import json_backend, json_ops, json_stream, line_store
+
+OPERATIONS = ('validate', 'format', 'minify', 'convert')
+CONVERT_TARGETS = {'yaml': 'YAML', 'xml': 'XML', 'python': 'Python字典'}
+CONVERT_SUFFIXES = {'yaml': '.yaml', 'xml': '.xml', 'python': '.py'}
+
+# 超过该大小的文件用流式处理，避免工作进程一次性载入整份文档
+STREAM_THRESHOLD = 64 * 1024 * 1024
+# 每个工作进程一次领取的文件数上限，小文件多时摊薄进程间通信的开销
+MAX_CHUNKSIZE = 64
+# 进度输出间隔（秒）
+PROGRESS_INTERVAL = 2.0
+
+_MAGIC = '*?['
+
+
+def _split_glob(pattern):
+    """返回通配符中第一个含通配字符的部分之前的目录，作为相对路径的基准"""
+    parts = pattern.replace('\\', '/').split('/')
+    fixed = []
+    for part in parts:
+        if any(ch in part for ch in _MAGIC):
+            break
+        fixed.append(part)
+    return '/'.join(fixed) or '.'
+
+
+def collect_files(inputs, pattern='*.json'):
+    """展开输入参数，返回 [(文件路径, 相对路径基准目录)]，同一文件只出现一次"""
+    seen = set()
+    files = []
+
+    def add(path, base):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            files.append((path, base))
+
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, names in os.walk(item):
+                dirs.sort()
+                for name in sorted(names):
+                    if fnmatch.fnmatch(name, pattern):
+                        add(os.path.join(root, name), item)
+        elif any(ch in item for ch in _MAGIC):
+            base = _split_glob(item)
+            for path in sorted(glob.iglob(item, recursive=True)):
+                if os.path.isfile(path):
+                    add(path, base)
+        elif os.path.isfile(item):
+            add(item, os.path.dirname(item) or '.')
+        else:
+            raise FileNotFoundError(item)
+    return files
+
+
+def output_path(path, base, output_dir, operation, target=None):
+    """输入文件在输出目录中对应的路径，保持相对 base 的目录结构"""
+    relative = os.path.relpath(path, base)
+    if operation == 'convert':
+        relative = os.path.splitext(relative)[0] + CONVERT_SUFFIXES[target]
+    return os.path.join(output_dir, relative)
+
+
+def _describe_error(error):
+    if isinstance(error, json.JSONDecodeError):
+        return f'{error.msg}: 第 {error.lineno} 行第 {error.colno} 列(位置 {error.pos})'
+    if isinstance(error, UnicodeDecodeError):
+        return f'不是有效的UTF-8文本(字节位置 {error.start})'
+    return f'{type(error).__name__}: {error}'
+
+
+# 工作进程的配置，由进程池初始化函数设置
+_options = {}
+
+
+def _init_worker(options):
+    _options.update(options)
+
+
+def _process(task):
+    """处理单个文件，返回 (路径, 字节数, 错误描述或 None)"""
+    path, destination = task
+    operation = _options['operation']
+    indent = _options['indent']
+    size = 0
+    try:
+        size = os.path.getsize(path)
+        if destination is not None:
+            os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        if size > STREAM_THRESHOLD and operation != 'convert':
+            indent = indent if operation == 'format' else None
+            if destination is None:
+                json_stream.validate_file(path)
+            else:
+                json_stream.process_file(path, indent, output_path=destination)
+            return path, size, None
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            text = f.read()
+        if operation == 'validate':
+            json_backend.loads(text)
+            return path, size, None
+        data, portable = json_ops.parse_json_portable(text)
+        try:
+            with open(destination, 'w', encoding='utf-8', errors=line_store.ERRORS, newline='') as out:
+                if operation == 'format':
+                    json_ops.format_data(data, indent, sink=out, size_hint=len(text), portable=portable)
+                elif operation == 'minify':
+                    json_ops.minify_data(data, sink=out, size_hint=len(text), portable=portable)
+                else:
+                    json_ops.convert_data(data, CONVERT_TARGETS[_options['target']], sink=out)
+        except BaseException:
+            os.remove(destination)
+            raise
+        return path, size, None
+    except (ValueError, OSError, TypeError, RecursionError, ImportError) as e:
+        return path, size, _describe_error(e)
+
+
+def _chunksize(count, workers):
+    return max(1, min(MAX_CHUNKSIZE, count // (workers * 16)))
+
+
+def _format_rate(count, size, seconds):
+    seconds = max(seconds, 1e-9)
+    return f'{count / seconds:,.1f} 文件/秒, {size / seconds / 1024 / 1024:,.2f} MB/秒'
+
+
+def run(tasks, options, workers, report=None, out=sys.stdout):
+    """执行批处理，返回 (成功数, [(路径, 错误描述)], 总字节数, 耗时)"""
+    start = time.perf_counter()
+    errors = []
+    done = total_size = 0
+    last_progress = start
+
+    def consume(results):
+        nonlocal done, total_size, last_progress
+        for path, size, error in results:
+            done += 1
+            total_size += size
+            if error is not None:
+                errors.append((path, error))
+            if report is not None:
+                report.write(json.dumps({'path': path, 'size': size, 'ok': error is None, 'error': error},
+                                        ensure_ascii=False) + '\n')
+            now = time.perf_counter()
+            if now - last_progress >= PROGRESS_INTERVAL:
+                last_progress = now
+                print(f'  已处理 {done:,}/{len(tasks):,}（{_format_rate(done, total_size, now - start)}）',
+                      file=out, flush=True)
+
+    if workers <= 1 or len(tasks) <= 1:
+        _init_worker(options)
+        consume(map(_process, tasks))
+    else:
+        with multiprocessing.Pool(workers, _init_worker, (options,)) as pool:
+            consume(pool.imap_unordered(_process, tasks, _chunksize(len(tasks), workers)))
+    return done - len(errors), errors, total_size, time.perf_counter() - start
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='main.py batch', description='无界面批量处理JSON文件')
+    parser.add_argument('operation', choices=OPERATIONS, help='校验、格式化、压缩或转换')
+    parser.add_argument('inputs', nargs='+', help='文件、目录或通配符（支持 **）')
+    parser.add_argument('-o', '--output', help='输出目录（validate 以外的操作必填）')
+    parser.add_argument('--to', choices=sorted(CONVERT_TARGETS), help='convert 的目标格式')
+    parser.add_argument('--indent', type=int, default=json_ops.INDENT, help='format 的缩进空格数')
+    parser.add_argument('--pattern', default='*.json', help='目录中要处理的文件名模式')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='工作进程数')
+    parser.add_argument('--report', help='逐文件结果报告（JSON Lines）')
+    parser.add_argument('--max-errors', type=int, default=50, help='汇总中最多列出的出错文件数')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.operation != 'validate' and not args.output:
+        parser.error(f'{args.operation} 需要用 -o/--output 指定输出目录')
+    if args.operation == 'convert' and not args.to:
+        parser.error('convert 需要用 --to 指定目标格式')
+
+    try:
+        files = collect_files(args.inputs, args.pattern)
+    except FileNotFoundError as e:
+        parser.error(f'找不到输入: {e}')
+    if args.output:
+        output_root = os.path.abspath(args.output)
+        files = [(path, base) for path, base in files
+                 if not os.path.abspath(path).startswith(output_root + os.sep)]
+        tasks = [(path, output_path(path, base, args.output, args.operation, args.to))
+                 for path, base in files]
+    else:
+        tasks = [(path, None) for path, _ in files]
+    if not tasks:
+        print('没有找到要处理的文件')
+        return 0
+
+    workers = max(1, min(args.jobs, len(tasks)))
+    print(f'{args.operation}: {len(tasks):,} 个文件，{workers} 个工作进程')
+    options = {'operation': args.operation, 'indent': args.indent, 'target': args.to}
+    report = open(args.report, 'w', encoding='utf-8') if args.report else None
+    try:
+        succeeded, errors, total_size, elapsed = run(tasks, options, workers, report)
+    finally:
+        if report is not None:
+            report.close()
+
+    print(f'完成: {succeeded:,} 个成功，{len(errors):,} 个失败，'
+          f'{total_size / 1024 / 1024:,.1f} MB，用时 {elapsed:.2f} 秒'
+          f'（{_format_rate(succeeded + len(errors), total_size, elapsed)}）')
+    if errors:
+        errors.sort()
+        print('出错的文件:')
+        for path, error in errors[:args.max_errors]:
+            print(f'  {path}: {error}')
+        if len(errors) > args.max_errors:
+            print(f'  …… 另有 {len(errors) - args.max_errors:,} 个文件出错，详见 --report')
+        return 1
+    return 0
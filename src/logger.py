@@ -29,6 +29,18 @@ def setup_logger():
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
     )
     
+    # 性能记录（src.utils.perf）另存为结构化的 JSON Lines，便于统计分析
+    logger.add(
+        str(log_dir / f"perf_{datetime.now().strftime('%Y%m%d')}.jsonl"),
+        level="DEBUG",
+        rotation="00:00",
+        retention="7 days",
+        enqueue=True,
+        encoding="utf-8",
+        serialize=True,
+        filter=lambda record: "perf" in record["extra"]
+    )
+    
     # 添加控制台处理器
     logger.add(
         sys.stdout,
@@ -0,0 +1,273 @@
+"""工具插件管理
+
+工具以插件形式放在 src/tools/ 下（包或单个模块），用 register_plugin 注册
+ToolPlugin 子类。插件模块应保持轻量：页面类以 "模块:类名" 字符串声明，打开
+页面时才导入。
+
+- 发现：扫描 src/tools/ 时只比较源文件的修改时间，未变化的插件直接使用磁盘上
+  的清单索引（名称、图标、入口、修改时间等），启动时不导入任何插件模块；
+  新增或修改过的插件才导入一次以读取清单并更新索引。
+- 加载：用户第一次打开某个工具时才导入插件、实例化并创建页面；插件声明的后台
+  任务随插件加载启动（autostart 的任务在启动时即运行）。
+- 卸载：销毁页面、停止后台任务，并从 sys.modules 中移除插件自身的模块，
+  下次打开时重新加载。
+"""
+import gc
+import importlib
+import json
+import sys
+import threading
+from pathlib import Path
+
+from loguru import logger
+
+TOOLS_PACKAGE = 'src.tools'
+TOOLS_DIR = Path(__file__).resolve().parent / 'tools'
+# 插件清单索引，与日志目录一样相对于工作目录保存
+INDEX_PATH = Path('cache') / 'plugin_index.json'
+INDEX_VERSION = 2
+
+# 后台任务停止时等待线程退出的时间（秒）
+WORKER_JOIN_TIMEOUT = 2.0
+
+_registered = []
+
+
+def register_plugin(cls):
+    """类装饰器：把 ToolPlugin 子类注册为插件"""
+    _registered.append(cls)
+    return cls
+
+
+def _in_module(name, module):
+    return name == module or name.startswith(module + '.')
+
+
+def _resolve(entry_point):
+    module_name, _, attr = entry_point.partition(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class Worker:
+    """插件声明的后台任务
+
+    target 为 "模块:函数"，函数接收一个 threading.Event，被置位时应尽快返回。
+    autostart 为 True 时在应用启动时运行，否则在插件加载时运行。
+    """
+
+    def __init__(self, name, target, autostart=False):
+        self.name = name
+        self.target = target
+        self.autostart = autostart
+
+    def to_dict(self):
+        return {'name': self.name, 'target': self.target, 'autostart': self.autostart}
+
+
+class ToolPlugin:
+    """工具插件基类"""
+    name = '插件名称'
+    version = '1.0.0'
+    icon = ''
+    # 菜单中的排列顺序，越小越靠前
+    order = 100
+    # 页面类，"模块:类名"，打开工具时才导入
+    page = ''
+    # 页面提供 open_file(path=None) 时为 True，“文件 > 打开文件”交给该工具处理
+    opens_files = False
+    workers = []
+
+    def initialize(self):
+        """插件加载后调用"""
+        pass
+
+    def execute(self, *args, **kwargs):
+        """插件执行"""
+        pass
+
+    def page_class(self):
+        return _resolve(self.page)
+
+    def create_page(self):
+        return self.page_class()()
+
+    def unload(self):
+        """插件卸载前调用，用于释放插件持有的资源"""
+        pass
+
+    @classmethod
+    def manifest(cls, module, mtime):
+        return {
+            'name': cls.name,
+            'version': cls.version,
+            'icon': cls.icon,
+            'order': cls.order,
+            'opens_files': cls.opens_files,
+            'entry_point': f'{cls.__module__}:{cls.__qualname__}',
+            'module': module,
+            'mtime': mtime,
+            'workers': [worker.to_dict() for worker in cls.workers],
+        }
+
+
+class PluginManifest:
+    """索引中的插件清单，不需要导入插件模块即可显示"""
+
+    def __init__(self, data):
+        self.name = data['name']
+        self.version = data.get('version', '')
+        self.icon = data.get('icon', '')
+        self.order = data.get('order', 100)
+        self.opens_files = data.get('opens_files', False)
+        self.entry_point = data['entry_point']
+        self.module = data['module']
+        self.mtime = data['mtime']
+        self.workers = [Worker(**worker) for worker in data.get('workers', [])]
+
+
+class _RunningWorker:
+    def __init__(self, worker):
+        self.worker = worker
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f'plugin-worker-{worker.name}', daemon=True)
+
+    def _run(self):
+        try:
+            _resolve(self.worker.target)(self.stop_event)
+        except Exception as e:
+            logger.error(f"后台任务“{self.worker.name}”出错: {e}")
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(WORKER_JOIN_TIMEOUT)
+
+
+class PluginManager:
+    """发现、加载和卸载 src/tools/ 下的插件"""
+
+    def __init__(self, tools_dir=TOOLS_DIR, package=TOOLS_PACKAGE, index_path=INDEX_PATH):
+        self.tools_dir = Path(tools_dir)
+        self.package = package
+        self.index_path = Path(index_path)
+        self.manifests = []
+        self._plugins = {}
+        self._workers = {}
+
+    # ---- 发现 ----
+    def _sources(self):
+        """返回 [(模块名, 修改时间)]；包的修改时间取包内 .py 文件的最大值"""
+        sources = []
+        if not self.tools_dir.is_dir():
+            return sources
+        for path in sorted(self.tools_dir.iterdir()):
+            if path.name.startswith(('_', '.')):
+                continue
+            if path.is_dir() and (path / '__init__.py').exists():
+                mtime = max(p.stat().st_mtime_ns for p in path.glob('*.py'))
+                sources.append((f'{self.package}.{path.name}', mtime))
+            elif path.suffix == '.py':
+                sources.append((f'{self.package}.{path.stem}', path.stat().st_mtime_ns))
+        return sources
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index.get('plugins', {}) if index.get('version') == INDEX_VERSION else {}
+
+    def _save_index(self, entries):
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'plugins': entries}, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.warning(f"插件索引写入失败: {e}")
+
+    def _scan(self, module, mtime):
+        """导入插件模块，读取其中注册的插件清单"""
+        start = len(_registered)
+        importlib.import_module(module)
+        found = [cls for cls in _registered[start:] if _in_module(cls.__module__, module)]
+        if not found:
+            # 模块此前已被导入过，注册记录在更早的位置
+            found = [cls for cls in _registered if _in_module(cls.__module__, module)]
+        return [cls.manifest(module, mtime) for cls in found]
+
+    def discover(self):
+        """扫描插件目录，返回按 order 排序的清单列表"""
+        index = self._load_index()
+        entries = {}
+        changed = False
+        for module, mtime in self._sources():
+            cached = index.get(module)
+            if cached is not None and cached['mtime'] == mtime:
+                entries[module] = cached
+                continue
+            try:
+                entries[module] = {'mtime': mtime, 'manifests': self._scan(module, mtime)}
+                changed = True
+                logger.info(f"已更新插件清单: {module}")
+            except Exception as e:
+                logger.error(f"插件 {module} 加载失败: {e}")
+        if changed or entries.keys() != index.keys():
+            self._save_index(entries)
+        manifests = [PluginManifest(data) for entry in entries.values() for data in entry['manifests']]
+        self.manifests = sorted(manifests, key=lambda manifest: (manifest.order, manifest.name))
+        return self.manifests
+
+    # ---- 加载与卸载 ----
+    def is_loaded(self, manifest):
+        return manifest.entry_point in self._plugins
+
+    def load(self, manifest):
+        """导入并实例化插件，启动其非 autostart 的后台任务；已加载时直接返回"""
+        plugin = self._plugins.get(manifest.entry_point)
+        if plugin is None:
+            plugin = _resolve(manifest.entry_point)()
+            plugin.initialize()
+            self._plugins[manifest.entry_point] = plugin
+            self._start_workers(manifest, [w for w in manifest.workers if not w.autostart])
+        return plugin
+
+    def unload(self, manifest):
+        """卸载插件：停止后台任务、调用插件的 unload，并移除插件自身的模块"""
+        plugin = self._plugins.pop(manifest.entry_point, None)
+        self._stop_workers(manifest, autostart=False)
+        if plugin is not None:
+            plugin.unload()
+        for name in [name for name in sys.modules if _in_module(name, manifest.module)]:
+            del sys.modules[name]
+        _registered[:] = [cls for cls in _registered if not _in_module(cls.__module__, manifest.module)]
+        gc.collect()
+        logger.info(f"插件“{manifest.name}”已卸载")
+
+    # ---- 后台任务 ----
+    def start_autostart_workers(self):
+        """启动所有插件中 autostart 的后台任务，不导入插件模块"""
+        for manifest in self.manifests:
+            self._start_workers(manifest, [w for w in manifest.workers if w.autostart])
+
+    def _start_workers(self, manifest, workers):
+        for worker in workers:
+            key = (manifest.entry_point, worker.name)
+            if key in self._workers:
+                continue
+            running = _RunningWorker(worker)
+            self._workers[key] = running
+            running.start()
+            logger.debug(f"后台任务已启动: {manifest.name}/{worker.name}")
+
+    def _stop_workers(self, manifest, autostart=None):
+        for key in [key for key in self._workers if key[0] == manifest.entry_point]:
+            if autostart is None or self._workers[key].worker.autostart == autostart:
+                self._workers.pop(key).stop()
+
+    def shutdown(self):
+        """停止全部后台任务"""
+        for manifest in self.manifests:
+            self._stop_workers(manifest)
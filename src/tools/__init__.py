@@ -0,0 +1 @@
+"""工具插件目录，插件的写法见 src.plugin_manager"""
@@ -0,0 +1,9 @@
+from src.plugin_manager import ToolPlugin, register_plugin
+
+
+@register_plugin
+class HomeTool(ToolPlugin):
+    name = '首页'
+    icon = 'go-home'
+    order = 0
+    page = 'src.ui.home_page:HomePage'
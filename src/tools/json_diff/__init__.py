@@ -0,0 +1,9 @@
+from src.plugin_manager import ToolPlugin, register_plugin
+
+
+@register_plugin
+class JsonDiffTool(ToolPlugin):
+    name = 'JSON对比'
+    icon = 'edit-find-replace'
+    order = 20
+    page = 'src.ui.json_diff_page:JsonDiffPage'
@@ -0,0 +1,14 @@
+from src.plugin_manager import ToolPlugin, Worker, register_plugin
+
+
+@register_plugin
+class JsonFormatterTool(ToolPlugin):
+    name = 'JSON格式化'
+    icon = 'text-x-generic'
+    order = 10
+    page = 'src.ui.json_formatter:JsonFormatterPage'
+    opens_files = True
+    workers = [
+        # 在本机上测量已安装的JSON后端，按负载大小选出最快的一个
+        Worker('JSON后端测速', 'src.utils.json_backend:benchmark_worker'),
+    ]
@@ -0,0 +1,9 @@
+from src.plugin_manager import ToolPlugin, register_plugin
+
+
+@register_plugin
+class PerformanceTool(ToolPlugin):
+    name = '性能'
+    icon = 'utilities-system-monitor'
+    order = 90
+    page = 'src.ui.performance_page:PerformancePage'
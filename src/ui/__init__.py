@@ -1,4 +1,16 @@
-from .home_page import HomePage
-from .json_formatter import JsonFormatterPage
- 
-__all__ = ['HomePage', JsonFormatterPage,  'main_window']
\ No newline at end of file
+import importlib
+
+# 页面类在首次访问时才导入，启动时不加载全部工具页
+_PAGES = {
+    'HomePage': '.home_page',
+    'JsonFormatterPage': '.json_formatter',
+}
+
+
+def __getattr__(name):
+    if name in _PAGES:
+        return getattr(importlib.import_module(_PAGES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ['HomePage', 'JsonFormatterPage', 'main_window']
@@ -0,0 +1,593 @@
+from bisect import bisect_right
+
+from PyQt5.QtWidgets import QAbstractScrollArea, QApplication
+from PyQt5.QtGui import QPainter, QColor, QFont, QFontMetrics, QKeySequence
+from PyQt5.QtCore import Qt, QPoint, QByteArray, QMimeData, pyqtSignal
+
+from src.utils.line_store import LineStore, LONG_LINE
+
+
+class StoreMimeData(QMimeData):
+    """按需提供 LineStore 全文的剪贴板数据
+
+    复制时只登记格式，其他程序粘贴（或本程序读取剪贴板）时才从存储逐块拷出
+    UTF-8 字节，不经过 Python 字符串；每次读取都重新生成，不在内存中长期保留副本。
+    """
+    FORMATS = ['text/plain']
+
+    def __init__(self, store):
+        super().__init__()
+        self._store = store
+
+    def formats(self):
+        return list(self.FORMATS)
+
+    def hasFormat(self, mime_type):
+        return mime_type in self.FORMATS
+
+    def retrieveData(self, mime_type, preferred_type):
+        if mime_type not in self.FORMATS:
+            return super().retrieveData(mime_type, preferred_type)
+        data = QByteArray()
+        data.reserve(self._store.nbytes)
+        for chunk in self._store.iter_bytes():
+            data.append(chunk)
+        return data
+
+
+class ChunkedTextViewer(QAbstractScrollArea):
+    """基于 LineStore 的只读虚拟化文本查看器
+
+    文本保存在按行索引的 LineStore 中，绘制时只取可见窗口内的行，
+    布局和绘制开销只与视口大小有关，与文档总行数无关。
+
+    设置结构索引（StructureIndex）后支持代码折叠和括号匹配。折叠区间合并为
+    有序列表，滚动条按“可见行”计数，可见行与文档行号之间的换算都是二分查找。
+    set_line_marks() 为若干行区间设置整行背景色（如对比结果），绘制时同样二分查找。
+    """
+    BACKGROUND = QColor('#252526')
+    FOREGROUND = QColor('#9CDCFE')
+    SELECTION = QColor('#264F78')
+    BRACKET_MATCH = QColor('#888888')
+    FOLD_MARKER = QColor('#808080')
+    PADDING = 4
+    # 可见区域之上额外分词的行数，用于推导首个可见行的词法状态
+    HIGHLIGHT_MARGIN = 50
+    # 语法格式缓存的最大行数
+    FORMAT_CACHE_SIZE = 4096
+
+    selection_changed = pyqtSignal()
+    store_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._store = LineStore.from_text('')
+        self._highlighter = None
+        self._format_cache = {}
+        self._gutter = None
+        self._structure = None
+        self._folded = set()
+        # 合并后的隐藏区间：第 i 段隐藏 [_hidden_starts[i], _hidden_ends[i]] 行，
+        # _hidden_before[i] 为前 i 段共隐藏的行数，_row_keys[i] 为第 i 段之后首个可见行的行序
+        self._hidden_starts = []
+        self._hidden_ends = []
+        self._hidden_before = [0]
+        self._row_keys = []
+        # 整行背景：有序且互不重叠的 (起始行, 结束行, 颜色)
+        self._line_marks = []
+        self._mark_starts = []
+        self._anchor = (0, 0)
+        self._cursor = (0, 0)
+        self.setFont(QFont("Consolas", 10))
+        self.viewport().setCursor(Qt.IBeamCursor)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        self.horizontalScrollBar().valueChanged.connect(self._on_scrolled)
+
+    # ---- 内容 ----
+    def store(self):
+        return self._store
+
+    def set_store(self, store):
+        """替换显示内容
+
+        存储可能同时被结果缓存引用，这里不主动关闭旧存储，由最后一个引用释放。
+        """
+        self._store = store
+        self._format_cache = {}
+        self._structure = None
+        self._folded = set()
+        self._rebuild_folds()
+        self._line_marks = []
+        self._mark_starts = []
+        self._anchor = self._cursor = (0, 0)
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self._update_scrollbars()
+        self._refresh()
+        self.store_changed.emit()
+
+    def setPlainText(self, text):
+        self.set_store(LineStore.from_text(text))
+
+    def clear(self):
+        self.setPlainText('')
+
+    def toPlainText(self):
+        """返回全文，会完整解码存储内容，大文档应使用 store().iter_text_chunks()"""
+        return self._store.text()
+
+    def is_empty(self):
+        return self._store.nbytes == 0
+
+    def line_count(self):
+        return self._store.line_count
+
+    def set_line_marks(self, marks):
+        """设置整行背景，marks 为有序且互不重叠的 (起始行, 结束行, QColor)，内容替换时自动清除"""
+        self._line_marks = list(marks)
+        self._mark_starts = [first for first, _, _ in self._line_marks]
+        self.viewport().update()
+
+    def _line_mark(self, line):
+        i = bisect_right(self._mark_starts, line) - 1
+        if i >= 0 and line <= self._line_marks[i][1]:
+            return self._line_marks[i][2]
+        return None
+
+    # ---- 结构与折叠 ----
+    def structure(self):
+        return self._structure
+
+    def set_structure(self, structure):
+        """设置当前内容的结构索引，内容替换时自动清除"""
+        self._structure = structure
+        self._folded = set()
+        self._rebuild_folds()
+        self._refresh()
+
+    def fold_range(self, line):
+        """返回以 line 行开始的可折叠范围 (起始行, 结束行)，不可折叠时返回 None"""
+        if self._structure is None:
+            return None
+        return self._structure.fold_range(line)
+
+    def is_folded(self, line):
+        return line in self._folded
+
+    def toggle_fold(self, line):
+        fold = self.fold_range(line)
+        if fold is None:
+            return
+        if line in self._folded:
+            self._folded.discard(line)
+        else:
+            self._folded.add(line)
+        self._rebuild_folds()
+        cursor_line = self._cursor[0]
+        if self._is_hidden(cursor_line):
+            self._anchor = self._cursor = (line, self._store.line_length(line))
+        self._refresh()
+
+    def unfold_all(self):
+        self._folded = set()
+        self._rebuild_folds()
+        self._refresh()
+
+    def _rebuild_folds(self):
+        """把折叠的起始行合并为互不重叠的隐藏区间（被外层折叠包含的内层折叠忽略）"""
+        self._hidden_starts, self._hidden_ends = [], []
+        self._hidden_before, self._row_keys = [0], []
+        for start in sorted(self._folded):
+            end = self._structure.end_line[self._structure.opening_at(start)]
+            if self._hidden_ends and start <= self._hidden_ends[-1]:
+                continue
+            self._row_keys.append(start + 1 - self._hidden_before[-1])
+            self._hidden_starts.append(start + 1)
+            self._hidden_ends.append(end)
+            self._hidden_before.append(self._hidden_before[-1] + end - start)
+        self._update_scrollbars()
+
+    def _fold_containing(self, line):
+        """返回隐藏 line 行的区间序号，line 可见时返回 -1"""
+        i = bisect_right(self._hidden_starts, line) - 1
+        return i if i >= 0 and line <= self._hidden_ends[i] else -1
+
+    def _is_hidden(self, line):
+        return self._fold_containing(line) >= 0
+
+    def row_count(self):
+        return self._store.line_count - self._hidden_before[-1]
+
+    def row_of_line(self, line):
+        """文档行号 -> 可见行序；被折叠的行映射到其折叠起始行"""
+        i = bisect_right(self._hidden_starts, line) - 1
+        if i < 0:
+            return line
+        if line <= self._hidden_ends[i]:
+            return self._hidden_starts[i] - 1 - self._hidden_before[i]
+        return line - self._hidden_before[i + 1]
+
+    def line_of_row(self, row):
+        """可见行序 -> 文档行号"""
+        i = bisect_right(self._row_keys, row) - 1
+        return row + self._hidden_before[i + 1] if i >= 0 else row
+
+    def _unfold_to(self, line):
+        """展开所有包含 line 行的折叠"""
+        if not self._is_hidden(line):
+            return
+        self._folded = {start for start in self._folded
+                        if not start < line <= self._structure.end_line[self._structure.opening_at(start)]}
+        self._rebuild_folds()
+
+    def bracket_match(self):
+        """返回光标所在行括号及其配对括号的 [(行, 列)]，无匹配时返回空列表"""
+        if self._structure is None:
+            return []
+        line = self._cursor[0]
+        other = self._structure.matching_line(line)
+        if other < 0:
+            return []
+        return [(target, self._bracket_column(target)) for target in (line, other)]
+
+    def _bracket_column(self, line):
+        # 开括号在行尾，闭括号在缩进之后
+        text = self._store.line(line)
+        if self._structure.opening_at(line) >= 0:
+            return len(text) - 1
+        return len(text) - len(text.lstrip())
+
+    def set_highlighter(self, highlighter):
+        """设置高亮器
+
+        highlighter 需提供 tokenize(text, state) -> (formats, state)、
+        search_formats(text) -> formats 和 search_changed 信号。
+        """
+        if self._highlighter is not None:
+            self._highlighter.search_changed.disconnect(self.viewport().update)
+        self._highlighter = highlighter
+        self._format_cache = {}
+        highlighter.search_changed.connect(self.viewport().update)
+        self.viewport().update()
+
+    def set_gutter(self, gutter):
+        """设置左侧行号栏，gutter 需提供 width() 并随滚动重绘"""
+        self._gutter = gutter
+        gutter.setParent(self)
+        self._layout_gutter()
+        gutter.show()
+
+    def setReadOnly(self, read_only):
+        # 查看器始终只读，保留该方法以兼容 QPlainTextEdit 的用法
+        pass
+
+    # ---- 几何 ----
+    def line_height(self):
+        return QFontMetrics(self.font()).height()
+
+    def char_width(self):
+        return max(1, QFontMetrics(self.font()).horizontalAdvance('0'))
+
+    def visible_line_capacity(self):
+        return max(1, self.viewport().height() // self.line_height())
+
+    def first_visible_line(self):
+        return self.line_of_row(self.verticalScrollBar().value())
+
+    def visible_lines(self):
+        """返回可见行的 (行号, 相对视口顶部的y坐标)"""
+        first = self.verticalScrollBar().value()
+        last = min(self.row_count(), first + self.visible_line_capacity() + 1)
+        height = self.line_height()
+        if not self._hidden_starts:
+            return [(row, (row - first) * height) for row in range(first, last)]
+        return [(self.line_of_row(row), (row - first) * height) for row in range(first, last)]
+
+    def _visible_columns(self):
+        return self.viewport().width() // self.char_width() + 2
+
+    def _update_scrollbars(self):
+        capacity = self.visible_line_capacity()
+        vbar = self.verticalScrollBar()
+        vbar.setRange(0, max(0, self.row_count() - capacity))
+        vbar.setPageStep(capacity)
+        vbar.setSingleStep(1)
+
+        columns = self._visible_columns()
+        hbar = self.horizontalScrollBar()
+        hbar.setRange(0, max(0, self._store.max_line_bytes - columns + 2))
+        hbar.setPageStep(columns)
+        hbar.setSingleStep(1)
+
+    def _layout_gutter(self):
+        if self._gutter is None:
+            return
+        width = self._gutter.width()
+        self.setViewportMargins(width, 0, 0, 0)
+        rect = self.contentsRect()
+        self._gutter.setGeometry(rect.left(), rect.top(), width, self.viewport().height())
+
+    def _refresh(self):
+        self.viewport().update()
+        if self._gutter is not None:
+            self._layout_gutter()
+            self._gutter.update()
+
+    def _on_scrolled(self, _value):
+        self._refresh()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+        self._layout_gutter()
+
+    # ---- 绘制 ----
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.BACKGROUND)
+        metrics = QFontMetrics(self.font())
+        bold_font = QFont(self.font())
+        bold_font.setBold(True)
+        first_col = self.horizontalScrollBar().value()
+        columns = self._visible_columns()
+        selection = self._ordered_selection()
+
+        visible = self.visible_lines()
+        syntax = {}
+        for first, last in self._line_runs([line for line, _ in visible]):
+            syntax.update(self._syntax_formats(first, last))
+        brackets = dict(self.bracket_match())
+        for line, top in visible:
+            if self._line_marks:
+                color = self._line_mark(line)
+                if color is not None:
+                    painter.fillRect(0, top, self.viewport().width(), metrics.height(), color)
+            text, window_start = self._line_text(line, first_col, columns)
+            formats = syntax.get(line, [])
+            if self._highlighter is not None:
+                formats = formats + self._highlighter.search_formats(text)
+            text, formats = self._clip(text, formats, first_col - window_start, columns)
+            if selection is not None:
+                self._paint_selection(painter, metrics, line, top, text, first_col, selection)
+            baseline = top + metrics.ascent()
+            x = self.PADDING
+            for segment, fmt in self._segments(text, formats):
+                if fmt is not None and fmt.background().style() != Qt.NoBrush:
+                    painter.fillRect(x, top, metrics.horizontalAdvance(segment), metrics.height(),
+                                     fmt.background())
+                if fmt is not None and fmt.foreground().style() != Qt.NoBrush:
+                    painter.setPen(fmt.foreground().color())
+                else:
+                    painter.setPen(self.FOREGROUND)
+                painter.setFont(bold_font if fmt is not None and fmt.fontWeight() >= QFont.Bold
+                                else self.font())
+                painter.drawText(QPoint(x, baseline), segment)
+                x += metrics.horizontalAdvance(segment)
+            if line in brackets:
+                col = brackets[line] - first_col
+                if 0 <= col < len(text):
+                    painter.setPen(self.BRACKET_MATCH)
+                    painter.drawRect(self.PADDING + metrics.horizontalAdvance(text[:col]), top,
+                                     metrics.horizontalAdvance(text[col]) - 1, metrics.height() - 1)
+            if line in self._folded:
+                self._paint_fold_marker(painter, metrics, line, x, top, baseline)
+
+    def _paint_fold_marker(self, painter, metrics, line, x, top, baseline):
+        """在折叠行末尾绘制 … 和对应的闭括号"""
+        closer = self._store.line(self._structure.end_line[self._structure.opening_at(line)]).strip()
+        label = f' … {closer}'
+        x += metrics.horizontalAdvance(' ')
+        painter.setPen(self.FOLD_MARKER)
+        painter.drawRect(x, top, metrics.horizontalAdvance(label), metrics.height() - 1)
+        painter.drawText(QPoint(x, baseline), label)
+
+    @staticmethod
+    def _line_runs(lines):
+        """把有序行号列表拆成连续区间 [(first, last)]"""
+        runs = []
+        for line in lines:
+            if runs and runs[-1][1] == line:
+                runs[-1][1] = line + 1
+            else:
+                runs.append([line, line + 1])
+        return runs
+
+    def _line_text(self, line, first_col, columns):
+        """返回用于分词的行文本及其起始列；普通行取整行，超长行只取可见窗口"""
+        if self._store.line_length(line) <= LONG_LINE:
+            return self._store.line(line), 0
+        return self._store.line_window(line, first_col, columns), first_col
+
+    def _syntax_formats(self, first, last):
+        """返回 [first, last) 行的语法格式
+
+        只对可见行及其上方 HIGHLIGHT_MARGIN 行分词，结果按行缓存，
+        滚动和重绘时已分词的行不会重复计算。
+        """
+        if self._highlighter is None:
+            return {}
+        cache = self._format_cache
+        if len(cache) > self.FORMAT_CACHE_SIZE:
+            cache.clear()
+        result = {}
+        state = 0
+        for line in range(max(0, first - self.HIGHLIGHT_MARGIN), last):
+            cached = cache.get(line)
+            if cached is not None and cached[0] == state:
+                formats, state = cached[1], cached[2]
+            elif line < first:
+                # 边距行只用于推导状态，不含引号的行不会改变状态
+                if '"' not in self._store.line_window(line, 0, LONG_LINE):
+                    continue
+                formats, next_state = self._highlighter.tokenize(
+                    self._line_text(line, 0, LONG_LINE)[0], state)
+                cache[line] = (state, formats, next_state)
+                state = next_state
+            else:
+                text = self._line_text(line, self.horizontalScrollBar().value(),
+                                       self._visible_columns())[0]
+                formats, next_state = self._highlighter.tokenize(text, state)
+                if self._store.line_length(line) <= LONG_LINE:
+                    cache[line] = (state, formats, next_state)
+                state = next_state
+            if line >= first:
+                result[line] = formats
+        return result
+
+    @staticmethod
+    def _clip(text, formats, offset, columns):
+        """把整行文本和格式裁剪到可见列窗口"""
+        if offset == 0 and len(text) <= columns:
+            return text, formats
+        clipped = []
+        for start, length, fmt in formats:
+            start -= offset
+            end = min(columns, start + length)
+            start = max(0, start)
+            if end > start:
+                clipped.append((start, end - start, fmt))
+        return text[offset:offset + columns], clipped
+
+    @staticmethod
+    def _segments(text, formats):
+        """把一行拆成 (文本, 格式) 片段，后应用的格式覆盖先前的格式"""
+        if not text:
+            return []
+        if not formats:
+            return [(text, None)]
+        line_formats = [None] * len(text)
+        for start, length, fmt in formats:
+            end = min(len(text), start + length)
+            line_formats[start:end] = [fmt] * (end - start)
+        segments = []
+        run_start = 0
+        for i in range(1, len(text) + 1):
+            if i == len(text) or line_formats[i] is not line_formats[run_start]:
+                segments.append((text[run_start:i], line_formats[run_start]))
+                run_start = i
+        return segments
+
+    def _paint_selection(self, painter, metrics, line, top, text, first_col, selection):
+        (start_line, start_col), (end_line, end_col) = selection
+        if not start_line <= line <= end_line:
+            return
+        sel_start = start_col - first_col if line == start_line else 0
+        sel_end = end_col - first_col if line == end_line else len(text) + 1
+        sel_start = max(0, sel_start)
+        if sel_end <= sel_start:
+            return
+        x = self.PADDING + metrics.horizontalAdvance(text[:sel_start])
+        width = metrics.horizontalAdvance(text[sel_start:sel_end]) or self.char_width()
+        if line != end_line and sel_end > len(text):
+            width += self.char_width()
+        painter.fillRect(x, top, width, metrics.height(), self.SELECTION)
+
+    # ---- 选择与导航 ----
+    def _ordered_selection(self):
+        if self._anchor == self._cursor:
+            return None
+        return tuple(sorted((self._anchor, self._cursor)))
+
+    def has_selection(self):
+        return self._anchor != self._cursor
+
+    def select_range(self, line, col, length):
+        """选中单行内的一段文本并滚动到可见位置"""
+        self._anchor = (line, col)
+        self._cursor = (line, col + length)
+        self.ensure_visible(line, col)
+        self.viewport().update()
+        self.selection_changed.emit()
+
+    def select_all(self):
+        self._anchor, self._cursor = self._whole_document()
+        self.viewport().update()
+        self.selection_changed.emit()
+
+    def cursor_position(self):
+        return self._cursor
+
+    def ensure_visible(self, line, col=0):
+        self._unfold_to(line)
+        row = self.row_of_line(line)
+        vbar = self.verticalScrollBar()
+        capacity = self.visible_line_capacity()
+        if row < vbar.value() or row >= vbar.value() + capacity:
+            vbar.setValue(max(0, row - capacity // 2))
+        hbar = self.horizontalScrollBar()
+        columns = self._visible_columns()
+        if col < hbar.value() or col >= hbar.value() + columns - 2:
+            hbar.setValue(max(0, col - columns // 4))
+
+    def selected_text(self):
+        selection = self._ordered_selection()
+        if selection is None:
+            return ''
+        (start_line, start_col), (end_line, end_col) = selection
+        lines = self._store.lines(start_line, end_line + 1)
+        if len(lines) == 1:
+            return lines[0][start_col:end_col]
+        lines[0] = lines[0][start_col:]
+        lines[-1] = lines[-1][:end_col]
+        return '\n'.join(lines)
+
+    def copy(self):
+        if self._ordered_selection() == self._whole_document():
+            self.copy_all()
+        elif self.has_selection():
+            QApplication.clipboard().setText(self.selected_text())
+
+    def copy_all(self):
+        """把全文放入剪贴板，内容在粘贴时才生成"""
+        QApplication.clipboard().setMimeData(StoreMimeData(self._store))
+
+    def _whole_document(self):
+        last = self._store.line_count - 1
+        return (0, 0), (last, self._store.line_length(last))
+
+    def _position_at(self, point):
+        row = self.verticalScrollBar().value() + max(0, point.y()) // self.line_height()
+        line = self.line_of_row(min(row, self.row_count() - 1))
+        col = self.horizontalScrollBar().value() + max(0, point.x() - self.PADDING + self.char_width() // 2) // self.char_width()
+        return line, min(col, self._store.line_length(line))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            position = self._position_at(event.pos())
+            self._cursor = position
+            if not event.modifiers() & Qt.ShiftModifier:
+                self._anchor = position
+            self.viewport().update()
+            self.selection_changed.emit()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.LeftButton:
+            self._cursor = self._position_at(event.pos())
+            self.ensure_visible(*self._cursor)
+            self.viewport().update()
+            self.selection_changed.emit()
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            self.copy()
+            return
+        if event.matches(QKeySequence.SelectAll):
+            self.select_all()
+            return
+        vbar = self.verticalScrollBar()
+        if event.matches(QKeySequence.MoveToStartOfDocument):
+            vbar.setValue(0)
+        elif event.matches(QKeySequence.MoveToEndOfDocument):
+            vbar.setValue(vbar.maximum())
+        elif event.key() == Qt.Key_PageDown:
+            vbar.setValue(vbar.value() + vbar.pageStep())
+        elif event.key() == Qt.Key_PageUp:
+            vbar.setValue(vbar.value() - vbar.pageStep())
+        elif event.key() == Qt.Key_Down:
+            vbar.setValue(vbar.value() + 1)
+        elif event.key() == Qt.Key_Up:
+            vbar.setValue(vbar.value() - 1)
+        else:
+            super().keyPressEvent(event)
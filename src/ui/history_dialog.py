@@ -0,0 +1,127 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QComboBox,
+                             QDoubleSpinBox, QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+import time
+
+from src.utils import perf
+from src.utils.job_runner import JobRunner
+
+
+class HistoryDialog(QDialog):
+    """按时间、大小和内容检索历史记录，双击或“打开”在新文档中打开"""
+
+    open_requested = pyqtSignal(object)
+
+    HEADERS = ['最近使用', '首次记录', '大小', '已缓存结果', '内容']
+    # 时间范围：(名称, 秒数)
+    PERIODS = [('全部', None), ('最近一天', 86400), ('最近 7 天', 7 * 86400), ('最近 30 天', 30 * 86400)]
+    SEARCH_DELAY = 300
+    FORMAT_LABELS = {'format': '格式化', 'minify': '压缩'}
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.entries = []
+        self.setWindowTitle('历史记录')
+        self.resize(900, 500)
+        self.runner = JobRunner(self)
+        self.runner.finished.connect(self._on_searched)
+        self.runner.failed.connect(lambda name, error: self.summary_label.setText(f'读取历史失败: {error}'))
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.refresh)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        filters = QHBoxLayout()
+        self.text_input = QLineEdit()
+        self.text_input.setPlaceholderText('按开头内容筛选')
+        self.text_input.textChanged.connect(self.search_timer.start)
+        self.period_combo = QComboBox()
+        self.period_combo.addItems([name for name, _ in self.PERIODS])
+        self.period_combo.currentIndexChanged.connect(self.refresh)
+        self.min_size = self._size_box('最小')
+        self.max_size = self._size_box('最大')
+        filters.addWidget(self.text_input, 1)
+        filters.addWidget(self.period_combo)
+        filters.addWidget(QLabel('大小 (MB):'))
+        filters.addWidget(self.min_size)
+        filters.addWidget(QLabel('~'))
+        filters.addWidget(self.max_size)
+        layout.addLayout(filters)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.table.cellDoubleClicked.connect(lambda row, column: self.open_selected())
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.summary_label = QLabel()
+        open_btn = QPushButton('打开')
+        open_btn.clicked.connect(self.open_selected)
+        close_btn = QPushButton('关闭')
+        close_btn.clicked.connect(self.close)
+        buttons.addWidget(self.summary_label, 1)
+        buttons.addWidget(open_btn)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+    def _size_box(self, label):
+        box = QDoubleSpinBox()
+        box.setRange(0, 1024 * 1024)
+        box.setDecimals(1)
+        box.setSpecialValueText('不限')
+        box.setToolTip(f'{label}输入大小，0 为不限')
+        box.valueChanged.connect(self.search_timer.start)
+        return box
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        """在后台按当前条件检索"""
+        seconds = self.PERIODS[self.period_combo.currentIndex()][1]
+        since = time.time() - seconds if seconds is not None else None
+        min_size = int(self.min_size.value() * 1024 * 1024) or None
+        max_size = int(self.max_size.value() * 1024 * 1024) or None
+        self.runner.submit('history', self._search, self.history, self.text_input.text().strip(),
+                           since, min_size, max_size)
+
+    @staticmethod
+    def _search(history, text, since, min_size, max_size, job=None):
+        return history.search(text, since, min_size, max_size), history.usage()
+
+    def _on_searched(self, name, result):
+        self.entries, (blobs, stored) = result
+        self.table.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries):
+            values = [
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.used)),
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.created)),
+                perf.format_size(entry.size),
+                '、'.join(self.FORMAT_LABELS.get(name, name) for name in entry.formats),
+                entry.preview,
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self.summary_label.setText(f'{len(self.entries)} 条记录，历史共占用 {perf.format_size(stored)}'
+                                   f'（上限 {perf.format_size(self.history.limit)}）')
+
+    def open_selected(self):
+        row = self.table.currentRow()
+        if 0 <= row < len(self.entries):
+            self.open_requested.emit(self.entries[row])
+            self.accept()
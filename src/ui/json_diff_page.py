@@ -0,0 +1,348 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QGroupBox,
+                             QSplitter, QComboBox, QLineEdit, QLabel, QListWidget, QFileDialog)
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont
+import os
+from loguru import logger
+
+from src.ui.chunked_viewer import ChunkedTextViewer
+from src.ui.json_formatter import JsonHighlighter, LineNumberWidget
+from src.utils import json_diff, perf
+from src.utils.job_runner import JobRunner
+from src.utils.line_store import LineStore
+
+
+class JsonDiffPage(QWidget):
+    """两份JSON的结构对比
+
+    输入可以粘贴，也可以直接选择文件（在后台读取，不经过输入框）。对比结果在
+    左右两个虚拟化查看器中标出新增、删除和修改的行，两侧按变化位置对应滚动；
+    下方列出每处变化的路径，点击后两侧同时跳转。
+    """
+    progress_changed = pyqtSignal(int, str)
+    status_message = pyqtSignal(str)
+    busy_changed = pyqtSignal(bool)
+
+    # 变化列表中显示的最大条数
+    LIST_LIMIT = 10000
+    MARK_COLORS = {
+        json_diff.ADDED: QColor('#2E4A2E'),
+        json_diff.REMOVED: QColor('#5A2D2D'),
+        json_diff.CHANGED: QColor('#4D4424'),
+    }
+    BUTTON_STYLE = """
+        QPushButton {
+            padding: 6px 12px;
+            border-radius: 6px;
+            font-size: 12px;
+            min-height: 32px;
+            font-weight: 500;
+            background-color: #f0f0f0;
+            border: none;
+        }
+        QPushButton:hover {
+            background-color: #e0e0e0;
+        }
+        QPushButton:pressed {
+            background-color: #d0d0d0;
+        }
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.setStyleSheet("""
+            QWidget {
+                font-family: 'Segoe UI';
+                font-size: 14px;
+                background-color: #f5f5f5;
+                color: #333333;
+            }
+            QGroupBox {
+                border: 1px solid #d0d0d0;
+                border-radius: 6px;
+                margin-top: 10px;
+                padding-top: 15px;
+                font-size: 14px;
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                left: 10px;
+                padding: 0 3px;
+                font-size: 14px;
+            }
+            QPlainTextEdit, QListWidget {
+                background-color: white;
+                border: 1px solid #ccc;
+                border-radius: 6px;
+                font-size: 13px;
+            }
+        """)
+        # 两侧选择的文件，选择后输入框只显示文件名
+        self._files = {'old': None, 'new': None}
+        self._comparison = None
+        # 同步滚动时正在被动调整的一侧，防止两侧互相触发
+        self._syncing = False
+        self._job_action = None
+        self.job_runner = JobRunner(self)
+        self.job_runner.started.connect(self._on_started)
+        self.job_runner.progress.connect(self._on_progress)
+        self.job_runner.finished.connect(self._on_compared)
+        self.job_runner.failed.connect(self._on_failed)
+        self.job_runner.cancelled.connect(self._on_cancelled)
+        self.job_runner.busy_changed.connect(self.busy_changed)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        toolbar = QHBoxLayout()
+        self.compare_btn = QPushButton('对比')
+        self.compare_btn.clicked.connect(self.compare)
+        self.cancel_btn = QPushButton('取消')
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.job_runner.cancel)
+        self.job_runner.busy_changed.connect(self.cancel_btn.setEnabled)
+        self.align_combo = QComboBox()
+        for align in (json_diff.ALIGN_AUTO, json_diff.ALIGN_KEY, json_diff.ALIGN_LCS, json_diff.ALIGN_INDEX):
+            self.align_combo.addItem(f'数组对齐：{json_diff.ALIGN_LABELS[align]}', align)
+        self.align_combo.setToolTip('自动：元素有唯一的 id/key/name 等标识键时按键对齐，否则按最长公共子序列对齐')
+        self.key_input = QLineEdit()
+        self.key_input.setPlaceholderText('标识键，如 id')
+        self.key_input.setMaximumWidth(140)
+        self.prev_btn = QPushButton('上一处')
+        self.prev_btn.clicked.connect(lambda: self.step_change(-1))
+        self.next_btn = QPushButton('下一处')
+        self.next_btn.clicked.connect(lambda: self.step_change(1))
+        for btn in (self.compare_btn, self.cancel_btn, self.prev_btn, self.next_btn):
+            btn.setStyleSheet(self.BUTTON_STYLE)
+        self.summary_label = QLabel('')
+        self.summary_label.setStyleSheet('font-size: 12px;')
+        toolbar.addWidget(self.compare_btn)
+        toolbar.addWidget(self.cancel_btn)
+        toolbar.addWidget(self.align_combo)
+        toolbar.addWidget(self.key_input)
+        toolbar.addWidget(self.prev_btn)
+        toolbar.addWidget(self.next_btn)
+        toolbar.addWidget(self.summary_label, 1)
+        layout.addLayout(toolbar)
+
+        splitter = QSplitter(Qt.Vertical)
+
+        # 输入区：左旧右新
+        inputs = QWidget()
+        inputs_layout = QHBoxLayout(inputs)
+        inputs_layout.setContentsMargins(0, 0, 0, 0)
+        self.inputs = {}
+        for side in ('old', 'new'):
+            group = QGroupBox(json_diff.SIDE_LABELS[side])
+            group_layout = QVBoxLayout(group)
+            edit = QPlainTextEdit()
+            edit.setPlaceholderText('粘贴JSON，或选择文件')
+            edit.textChanged.connect(lambda side=side: self._on_input_edited(side))
+            open_btn = QPushButton('打开文件…')
+            open_btn.setStyleSheet(self.BUTTON_STYLE)
+            open_btn.clicked.connect(lambda _=False, side=side: self.open_file(side))
+            group_layout.addWidget(edit)
+            group_layout.addWidget(open_btn, 0, Qt.AlignRight)
+            inputs_layout.addWidget(group)
+            self.inputs[side] = edit
+        splitter.addWidget(inputs)
+
+        # 结果区：两侧虚拟化查看器，按变化位置对应滚动
+        viewers = QSplitter(Qt.Horizontal)
+        self.viewers = {}
+        font = QFont("Consolas", 10)
+        font.setPixelSize(12)
+        for side in ('old', 'new'):
+            viewer = ChunkedTextViewer()
+            viewer.setFont(font)
+            viewer.setStyleSheet("""
+                QAbstractScrollArea {
+                    background-color: #252526;
+                    border: 1px solid #3C3C3C;
+                }
+            """)
+            viewer.set_gutter(LineNumberWidget(viewer))
+            viewer.set_highlighter(JsonHighlighter())
+            viewer.verticalScrollBar().valueChanged.connect(lambda _, side=side: self._sync_scroll(side))
+            viewer.horizontalScrollBar().valueChanged.connect(lambda value, side=side: self._sync_columns(side, value))
+            viewers.addWidget(viewer)
+            self.viewers[side] = viewer
+        splitter.addWidget(viewers)
+
+        self.change_list = QListWidget()
+        self.change_list.setUniformItemSizes(True)
+        self.change_list.currentRowChanged.connect(self.show_change)
+        splitter.addWidget(self.change_list)
+        splitter.setSizes([200, 500, 150])
+        layout.addWidget(splitter)
+
+    # ---- 输入 ----
+    def open_file(self, side):
+        path, _ = QFileDialog.getOpenFileName(
+            self, f"打开{json_diff.SIDE_LABELS[side]}", "", "JSON Files (*.json);;All Files (*)")
+        if not path:
+            return
+        edit = self.inputs[side]
+        edit.blockSignals(True)
+        edit.setPlainText(f'文件：{path}（{perf.format_size(os.path.getsize(path))}，对比时读取）')
+        edit.blockSignals(False)
+        self._files[side] = path
+        logger.info(f"{json_diff.SIDE_LABELS[side]}文件: {path}")
+
+    def _on_input_edited(self, side):
+        """输入框被编辑后改用输入框的内容"""
+        self._files[side] = None
+
+    def _source(self, side):
+        """返回 (文本或文件路径, 是否为文件, 大小)"""
+        path = self._files[side]
+        if path is not None:
+            return path, True, os.path.getsize(path)
+        text = self.inputs[side].toPlainText()
+        return text, False, len(text)
+
+    @staticmethod
+    def _compare_sources(old, new, align, key, job=None):
+        texts = []
+        for source, is_file in (old, new):
+            if is_file:
+                with open(source, encoding='utf-8-sig') as f:
+                    source = f.read()
+                job.check_cancelled()
+            texts.append(source)
+        return json_diff.compare(texts[0], texts[1], align, key, job)
+
+    # ---- 对比 ----
+    def compare(self):
+        old, old_is_file, old_size = self._source('old')
+        new, new_is_file, new_size = self._source('new')
+        if not old_size or not new_size:
+            self.status_message.emit('请输入或选择两份JSON')
+            return
+        if self._job_action is not None:
+            self._job_action.finish(perf.CANCELLED)
+        self._job_action = perf.begin('JSON对比', old_size + new_size)
+        key = self.key_input.text().strip() or None
+        self.job_runner.submit('diff', perf.bind(self._job_action, self._compare_sources),
+                               (old, old_is_file), (new, new_is_file), self.align_combo.currentData(), key)
+
+    def _on_started(self, name):
+        self.progress_changed.emit(0, '对比中...')
+
+    def _on_progress(self, name, percent, message):
+        self.progress_changed.emit(percent, message)
+
+    def _finish_action(self, status=perf.OK):
+        if self._job_action is not None:
+            self._job_action.finish(status)
+            self._job_action = None
+
+    def _on_compared(self, name, comparison):
+        action = self._job_action
+        with perf.activate(action):
+            with perf.span('显示'):
+                self._show_comparison(comparison)
+            if action is not None:
+                with perf.span('绘制'):
+                    for viewer in self.viewers.values():
+                        viewer.viewport().repaint()
+        self._finish_action()
+        summary = comparison.result.summary()
+        logger.info(f"JSON对比完成：{summary}")
+        self.status_message.emit(summary)
+
+    def _show_comparison(self, comparison):
+        self._comparison = comparison
+        layout = comparison.layout
+        for side, store, structure, marks in (
+                ('old', comparison.old_store, comparison.old_structure, layout.old_marks),
+                ('new', comparison.new_store, comparison.new_structure, layout.new_marks)):
+            viewer = self.viewers[side]
+            self._syncing = True
+            viewer.set_store(store)
+            viewer.set_structure(structure)
+            self._syncing = False
+            viewer.set_line_marks([(first, last, self.MARK_COLORS[kind]) for first, last, kind in marks])
+        result = comparison.result
+        self.change_list.blockSignals(True)
+        self.change_list.clear()
+        self.change_list.addItems([change.describe() for change in result.changes[:self.LIST_LIMIT]])
+        self.change_list.blockSignals(False)
+        summary = result.summary()
+        if len(result.changes) > self.LIST_LIMIT:
+            summary += f'，列表只显示前 {self.LIST_LIMIT:,} 处'
+        self.summary_label.setText(summary)
+
+    def _on_failed(self, name, error):
+        self._finish_action(perf.FAILED)
+        if isinstance(error, json_diff.DiffInputError):
+            self._show_error(error.describe())
+            logger.error(str(error))
+            self.status_message.emit(str(error))
+        else:
+            message = f'JSON对比失败: {error}'
+            self._show_error(message)
+            logger.error(message)
+            self.status_message.emit(message)
+
+    def _show_error(self, message):
+        self._comparison = None
+        self.change_list.clear()
+        self.summary_label.setText('')
+        self.viewers['old'].set_store(LineStore.from_text(message))
+        self.viewers['new'].clear()
+
+    def _on_cancelled(self, name):
+        self._finish_action(perf.CANCELLED)
+        self.status_message.emit('JSON对比已取消')
+
+    def shutdown(self):
+        """页面被卸载前调用：取消对比任务"""
+        self.job_runner.cancel()
+        self._finish_action(perf.CANCELLED)
+
+    # ---- 导航与同步滚动 ----
+    def step_change(self, step):
+        count = self.change_list.count()
+        if not count:
+            return
+        self.change_list.setCurrentRow((self.change_list.currentRow() + step) % count)
+
+    def show_change(self, row):
+        """两侧同时跳转到第 row 处变化"""
+        if self._comparison is None or row < 0:
+            return
+        lines = self._comparison.layout.lines[row]
+        self._syncing = True
+        try:
+            for side, line in zip(('old', 'new'), lines):
+                viewer = self.viewers[side]
+                text = viewer.store().line(line)
+                col = len(text) - len(text.lstrip())
+                viewer.select_range(line, col, len(text.strip()))
+        finally:
+            self._syncing = False
+
+    def _sync_scroll(self, side):
+        """一侧滚动后，按对应行把另一侧滚动到相同的位置"""
+        if self._syncing or self._comparison is None:
+            return
+        source = self.viewers[side]
+        target = self.viewers['new' if side == 'old' else 'old']
+        line = self._comparison.layout.map_line(source.first_visible_line(), to_new=side == 'old')
+        line = max(0, min(line, target.line_count() - 1))
+        self._syncing = True
+        try:
+            target.verticalScrollBar().setValue(target.row_of_line(line))
+        finally:
+            self._syncing = False
+
+    def _sync_columns(self, side, value):
+        if self._syncing:
+            return
+        self._syncing = True
+        try:
+            self.viewers['new' if side == 'old' else 'old'].horizontalScrollBar().setValue(value)
+        finally:
+            self._syncing = False
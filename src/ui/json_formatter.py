@@ -1,126 +1,352 @@
 from PyQt5.QtWidgets import (QWidget, QPushButton, QVBoxLayout, QHBoxLayout,
                             QSplitter, QLabel, QComboBox, QStyledItemDelegate,
                             QGroupBox, QStyle, QPlainTextEdit, QAbstractScrollArea,
-                            QFileDialog)
+                            QFileDialog, QCheckBox, QTabWidget, QTreeView, QLineEdit,
+                            QMenu, QTextEdit, QTabBar, QStackedWidget)
 from PyQt5.QtGui import (QStandardItemModel, QStandardItem, QFontMetrics,
                         QPainter, QPen, QBrush, QPixmap, QSyntaxHighlighter,
                         QTextCharFormat, QColor, QFont, QKeySequence)
 from PyQt5.QtWidgets import QShortcut
-from PyQt5.QtCore import Qt, QTimer, QRect, QRegularExpression, QSize
+from PyQt5.QtCore import Qt, QTimer, QRect, QRegularExpression, QSize, pyqtSignal
 from PyQt5.QtGui import QTextCursor
 from PyQt5.QtWidgets import QAbstractScrollArea
 
 import json
-import pprint
+import os
+import re
 from loguru import logger
-import yaml
-from dicttoxml import dicttoxml
 from PyQt5.QtGui import QFont
 
+from src.ui.chunked_viewer import ChunkedTextViewer
+from src.ui.history_dialog import HistoryDialog
+from src.ui.json_tree_model import JsonTreeModel
+from src.utils import (document_cache, file_loader, history, json_lexer, json_ops, json_query, json_repair,
+                       json_stream, live_validation, ndjson, output_export, perf, relaxed_json, search_index,
+                       workspace)
+from src.utils.job_runner import JobRunner
+from src.utils.line_store import LineStore
+from src.utils.structure_index import StructureIndex
+
 
 class LineNumberWidget(QWidget):
+    FOLD_WIDTH = 14
+
+    ERROR_COLOR = QColor("#C0392B")
+
     def __init__(self, editor):
         super().__init__(editor)
         self.editor = editor
         self.setFont(editor.font())
+        # 出错的行（从 0 开始）及错误消息，行号显示为红底
+        self.error_lines = {}
+
+    def set_error_lines(self, error_lines):
+        self.error_lines = dict(error_lines)
+        self.setToolTip('\n'.join(f'第 {line + 1} 行: {message}'
+                                   for line, message in sorted(self.error_lines.items())))
+        self.update()
 
     def sizeHint(self):
         return QSize(self.width(), 0)
 
     def width(self):
-        return 30  # Adjust as needed
+        # 按最大行号的位数调整宽度，百万行文档也能完整显示行号
+        digits = len(str(self._line_count()))
+        width = max(30, QFontMetrics(self.font()).horizontalAdvance('9' * digits) + 8)
+        return width + self.FOLD_WIDTH if self._can_fold() else width
+
+    def _can_fold(self):
+        return not isinstance(self.editor, QPlainTextEdit) and self.editor.structure() is not None
 
     def update_number(self, rect):
         self.update()
 
+    def _line_count(self):
+        if isinstance(self.editor, QPlainTextEdit):
+            return self.editor.blockCount()
+        return self.editor.line_count()
+
+    def _visible_lines(self):
+        """返回可见行的 (行号, 顶部y坐标)"""
+        if not isinstance(self.editor, QPlainTextEdit):
+            return self.editor.visible_lines()
+        lines = []
+        bottom = self.height()
+        current_block = self.editor.firstVisibleBlock()
+        block_number = current_block.blockNumber()
+        block_top = self.editor.blockBoundingGeometry(current_block).translated(self.editor.contentOffset()).top()
+        while current_block.isValid() and block_top <= bottom:
+            lines.append((block_number, block_top))
+            current_block = current_block.next()
+            block_number += 1
+            block_top = self.editor.blockBoundingGeometry(current_block).translated(self.editor.contentOffset()).top()
+        return lines
+
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.fillRect(event.rect(), QColor("#333333"))  # Line number area background color
 
         font_metrics = QFontMetrics(self.font())
-        current_block = self.editor.firstVisibleBlock()
-        block_number = current_block.blockNumber()
-        block_top = self.editor.blockBoundingGeometry(current_block).translated(self.editor.contentOffset()).top()
         bottom = event.rect().bottom()
+        painter.setPen(QColor("#D4D4D4"))  # Line number color
+        can_fold = self._can_fold()
+        number_width = self.width() - (self.FOLD_WIDTH if can_fold else 0) - 4
 
-        while current_block.isValid() and block_top <= bottom:
+        for block_number, block_top in self._visible_lines():
+            if block_top > bottom:
+                break
             number = str(block_number + 1)
-            painter.setPen(QColor("#D4D4D4"))  # Line number color
-            painter.drawText(0, round(block_top + font_metrics.ascent()), self.width(), font_metrics.height(),
-                             Qt.AlignRight, number)
+            if block_number in self.error_lines:
+                painter.fillRect(0, round(block_top), self.width(), font_metrics.height(), self.ERROR_COLOR)
+                painter.setPen(QColor("#FFFFFF"))
+                painter.drawText(0, round(block_top), number_width, font_metrics.height(),
+                                 Qt.AlignRight, number)
+                painter.setPen(QColor("#D4D4D4"))
+            else:
+                painter.drawText(0, round(block_top), number_width, font_metrics.height(),
+                                 Qt.AlignRight, number)
+            # 可折叠行显示折叠标记，已折叠为 ▸，展开为 ▾
+            if can_fold and self.editor.fold_range(block_number) is not None:
+                marker = '▸' if self.editor.is_folded(block_number) else '▾'
+                painter.drawText(number_width + 4, round(block_top), self.FOLD_WIDTH,
+                                 font_metrics.height(), Qt.AlignCenter, marker)
 
-            current_block = current_block.next()
-            block_number += 1
-            block_top = self.editor.blockBoundingGeometry(current_block).translated(self.editor.contentOffset()).top()
+    def mousePressEvent(self, event):
+        """点击折叠标记切换折叠状态"""
+        if event.button() == Qt.LeftButton and self._can_fold():
+            height = QFontMetrics(self.font()).height()
+            for line, top in self._visible_lines():
+                if top <= event.pos().y() < top + height:
+                    self.editor.toggle_fold(line)
+                    break
+        super().mousePressEvent(event)
+
+
+class InputEditor(QPlainTextEdit):
+    """带行号栏的输入框，行号栏可显示校验错误标记"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.line_numbers = LineNumberWidget(self)
+        self.blockCountChanged.connect(self._update_margins)
+        self.updateRequest.connect(self._on_update_request)
+        self._update_margins()
+
+    def _update_margins(self, _count=0):
+        self.setViewportMargins(self.line_numbers.width(), 0, 0, 0)
+
+    def _on_update_request(self, rect, dy):
+        if dy:
+            self.line_numbers.scroll(0, dy)
+        else:
+            self.line_numbers.update(0, rect.y(), self.line_numbers.width(), rect.height())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        rect = self.contentsRect()
+        self.line_numbers.setGeometry(rect.left(), rect.top(), self.line_numbers.width(), rect.height())
+
+    def mark_error(self, position):
+        """用红底标出 position 处的字符；position 为 None 时清除"""
+        if position is None:
+            self.setExtraSelections([])
+            return
+        selection = QTextEdit.ExtraSelection()
+        selection.format.setBackground(QColor(255, 0, 0))
+        cursor = QTextCursor(self.document())
+        # 文末的错误（如缺少右括号）标在最后一个字符上
+        position = min(position, max(0, self.document().characterCount() - 2))
+        cursor.setPosition(position)
+        cursor.movePosition(QTextCursor.NextCharacter, QTextCursor.KeepAnchor)
+        selection.cursor = cursor
+        self.setExtraSelections([selection])
+
+    def text_from(self, position):
+        """返回从 position 到文末的文本，只读取这一段"""
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(position)
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        return cursor.selectedText().replace('\u2029', '\n')
 
 
 class JsonHighlighter(QSyntaxHighlighter):
+    """基于逐行词法分析的JSON语法高亮
+
+    每行只做一次线性分词，行尾状态通过 blockState 传递，跨行的未闭合字符串也能
+    正确着色。既可作为 QSyntaxHighlighter 挂到文档上，也可由 ChunkedTextViewer
+    通过 tokenize()/search_formats() 只对可见行取格式。
+    """
+    search_changed = pyqtSignal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.highlight_rules = []
         self.search_format = QTextCharFormat()
         self.search_format.setBackground(QColor(255, 255, 0))  # 黄色背景
         self.search_text = ""
+        self._search_query = None
+        # 错误位置（文档中的字符位置），在 highlightBlock 中着色
+        self.error_format = QTextCharFormat()
+        self.error_format.setBackground(QColor(255, 0, 0))
+        self.error_position = None
 
         # 关键字格式
         keyword_format = QTextCharFormat()
         keyword_format.setForeground(QColor('#569CD6'))
         keyword_format.setFontWeight(QFont.Bold)
-        keywords = ['true', 'false', 'null']
-        for word in keywords:
-            pattern = fr'\b{word}\b'
-            self.highlight_rules.append((QRegularExpression(pattern), keyword_format))
 
-        # 字符串格式
+        # 字符串格式（键名与字符串值同色）
         string_format = QTextCharFormat()
         string_format.setForeground(QColor('#CE9178'))
-        self.highlight_rules.append((QRegularExpression(r'"[^"\\]*(\\.[^"\\]*)*"'), string_format))
 
         # 数字格式
         number_format = QTextCharFormat()
         number_format.setForeground(QColor('#B5CEA8'))
-        self.highlight_rules.append((QRegularExpression(r'\b[0-9]+\b'), number_format))
 
         # 标点符号格式
         punctuation_format = QTextCharFormat()
         punctuation_format.setForeground(QColor('#D4D4D4'))
-        self.highlight_rules.append((QRegularExpression(r'[{}[\],:]'), punctuation_format))
+
+        self.token_formats = {
+            json_lexer.KEY: string_format,
+            json_lexer.STRING: string_format,
+            json_lexer.NUMBER: number_format,
+            json_lexer.KEYWORD: keyword_format,
+            json_lexer.PUNCTUATION: punctuation_format,
+        }
 
     def highlightBlock(self, text):
-        # 先执行原有的语法高亮
-        for pattern, fmt in self.highlight_rules:
-            expression = QRegularExpression(pattern)
-            match_iterator = expression.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
-        
-        # 执行搜索高亮
-        if self.search_text:
-            expression = QRegularExpression(QRegularExpression.escape(self.search_text),
-                                          QRegularExpression.CaseInsensitiveOption)
-            match_iterator = expression.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), self.search_format)
+        formats, state = self.tokenize(text, max(json_lexer.STATE_NORMAL, self.previousBlockState()))
+        for start, length, fmt in formats:
+            self.setFormat(start, length, fmt)
+        for start, length, fmt in self.search_formats(text):
+            self.setFormat(start, length, fmt)
+        if self.error_position is not None:
+            offset = self.error_position - self.currentBlock().position()
+            if 0 <= offset <= len(text):
+                self.setFormat(min(offset, max(0, len(text) - 1)), 1, self.error_format)
+        self.setCurrentBlockState(state)
+
+    def tokenize(self, text, state=json_lexer.STATE_NORMAL):
+        """计算一行的语法格式，返回 ([(起始位置, 长度, 格式)], 行尾状态)"""
+        tokens, state = json_lexer.tokenize_line(text, state)
+        token_formats = self.token_formats
+        return [(start, length, token_formats[kind]) for start, length, kind in tokens], state
+
+    def search_formats(self, text):
+        """计算一行中搜索匹配的格式"""
+        if self._search_query is None:
+            return []
+        return [(col, length, self.search_format)
+                for col, length in self._search_query.find_in_line(text)]
+
+    def line_formats(self, text, state=json_lexer.STATE_NORMAL):
+        """计算单行文本的语法和搜索格式"""
+        return self.tokenize(text, state)[0] + self.search_formats(text)
 
     def highlight_error(self, pos):
-        error_format = QTextCharFormat()
-        error_format.setBackground(QColor(255, 0, 0))  # 红色背景
-        self.setFormat(pos, 1, error_format)  # 高亮错误位置
+        """标出错误位置；格式只能在 highlightBlock 中设置，这里记录位置后重新着色所在块"""
+        previous, self.error_position = self.error_position, pos
+        document = self.document()
+        if document is None:
+            return
+        for position in {previous, pos} - {None}:
+            block = document.findBlock(position)
+            if block.isValid():
+                self.rehighlightBlock(block)
 
     def set_search_text(self, text):
-        """设置搜索文本并重新高亮"""
-        self.search_text = text
-        self.rehighlight()
+        """按普通文本设置搜索词"""
+        self.set_search_query(search_index.SearchQuery(text) if text else None)
+
+    def set_search_query(self, query):
+        """设置搜索条件，只重新着色包含新旧匹配的文本块"""
+        old_query = self._search_query
+        self._search_query = query
+        self.search_text = query.text if query is not None else ""
+        self._rehighlight_matching([q for q in (old_query, query) if q is not None])
+        self.search_changed.emit()
 
     def clear_highlight(self):
         """清除所有高亮"""
-        self.search_text = ""
-        self.rehighlight()
+        self.set_search_query(None)
+
+    def _rehighlight_matching(self, queries):
+        document = self.document()
+        if document is None or not queries:
+            return
+        block = document.firstBlock()
+        while block.isValid():
+            text = block.text()
+            if any(query.pattern.search(text) for query in queries):
+                self.rehighlightBlock(block)
+            block = block.next()
 
 
 class JsonFormatterPage(QWidget):
+    # 后台任务进度（百分比，-1 表示未知）与状态栏消息
+    progress_changed = pyqtSignal(int, str)
+    status_message = pyqtSignal(str)
+    busy_changed = pyqtSignal(bool)
+
+    JOB_LABELS = {
+        'format': '格式化',
+        'minify': '压缩',
+        'YAML': '转换YAML',
+        'XML': '转换XML',
+        'Python字典': '转换Python字典',
+        'stream_format': '流式格式化',
+        'stream_minify': '流式压缩',
+        'ndjson_validate': 'NDJSON校验',
+        'ndjson_format': 'NDJSON格式化',
+        'ndjson_minify': 'NDJSON压缩',
+        'ndjson_record': '读取记录',
+        'repair': '修复JSON',
+        'query': '查询',
+        'query_file': '流式查询',
+        'load_document': '读回文档',
+        'load_history': '打开历史记录',
+        'save': '保存',
+        'open_file': '打开文件',
+    }
+    JOB_SUCCESS_MESSAGES = {
+        'format': 'JSON格式化成功',
+        'minify': 'JSON已压缩',
+        'YAML': '转换为YAML格式',
+        'XML': '转换为XML格式',
+        'Python字典': '转换为Python字典格式',
+        'stream_format': '文件格式化完成',
+        'stream_minify': '文件压缩完成',
+        'ndjson_validate': 'NDJSON校验完成',
+        'ndjson_format': 'NDJSON格式化完成',
+        'ndjson_minify': 'NDJSON压缩完成',
+        'ndjson_record': '已显示记录',
+        'repair': 'JSON已修复',
+        'query': '查询完成',
+        'query_file': '文件查询完成',
+        'load_document': '文档已读回',
+        'load_history': '已打开历史记录',
+        'save': '文件已保存',
+        'open_file': '文件已打开',
+    }
+    SEARCH_SCOPES = [
+        ('全部', search_index.SCOPE_ALL),
+        ('仅键', search_index.SCOPE_KEYS),
+        ('仅值', search_index.SCOPE_VALUES),
+    ]
+    # 修复后写入日志的修改条数上限
+    FIX_LOG_LIMIT = 200
+
+    # 刷新工作区内存占用显示的间隔（毫秒）
+    WORKSPACE_REFRESH = 2000
+
+    # 实时校验的防抖间隔（毫秒），以及直接在界面线程中校验的最大字符数
+    LIVE_DELAY = 300
+    LIVE_SYNC_CHARS = 256 * 1024
+
+    IMPORT_HINTS = {
+        'YAML': '需要安装PyYAML库才能转换为YAML格式',
+    }
+
     BUTTON_STYLE = """
         QPushButton {
             padding: 6px 12px;
@@ -188,92 +414,523 @@ class JsonFormatterPage(QWidget):
             }
         """)
 
+        # 后台任务：解析、格式化和转换都在线程池中执行
+        self._job_input = None
+        self._job_document = None
+        # 当前任务的性能记录（见 src.utils.perf），结果显示后结束
+        self._job_action = None
+        self.job_runner = JobRunner(self)
+        self.job_runner.started.connect(self._on_job_started)
+        self.job_runner.progress.connect(self._on_job_progress)
+        self.job_runner.finished.connect(self._on_job_finished)
+        self.job_runner.failed.connect(self._on_job_failed)
+        self.job_runner.cancelled.connect(self._on_job_cancelled)
+        self.job_runner.busy_changed.connect(self._on_busy_changed)
+        # 保存结果使用独立的通道：其他操作和切换文档都不会取代或取消保存，只有取消按钮和页面卸载会取消
+        self._save_action = None
+        self.save_runner = JobRunner(self)
+        self.save_runner.started.connect(self._on_job_started)
+        self.save_runner.progress.connect(self._on_job_progress)
+        self.save_runner.finished.connect(self._on_save_finished)
+        self.save_runner.failed.connect(self._on_save_failed)
+        self.save_runner.cancelled.connect(self._on_save_cancelled)
+        self.save_runner.busy_changed.connect(self._on_busy_changed)
+
+        # 文档缓存：同一输入只解析一次，各格式的渲染结果按内容哈希缓存
+        self.document_cache = document_cache.DocumentCache()
+        # NDJSON：最近一次处理的来源（输入框内容或文件）及其行索引，查看单条记录时复用
+        self._ndjson_index = None
+        self._ndjson_key = None
+
+        # 搜索：索引和查询各自在独立的后台通道中执行，互不取代
+        self.search_index = None
+        self.matches = None
+        self.current_match = -1
+        self.index_runner = JobRunner(self)
+        self.index_runner.finished.connect(self._on_index_built)
+        self.search_runner = JobRunner(self)
+        self.search_runner.progress.connect(self._on_search_progress)
+        self.search_runner.finished.connect(self._on_search_finished)
+        self.search_runner.failed.connect(self._on_search_failed)
+
+        # 实时校验：输入停顿后从修改位置之前的检查点继续校验，大段文本在后台执行
+        self.live_validator = live_validation.LiveValidator()
+        self._live_generation = 0
+        # 上次显示的校验结果 (错误, 方言)，结果不变时不重复刷新
+        self._live_state = None
+        self.live_runner = JobRunner(self)
+        self.live_runner.finished.connect(self._on_live_validated)
+
+        # 树形视图：输入变化后标记为过期，下次切换到树形标签时重新解析
+        self._tree_dirty = True
+        self.tree_runner = JobRunner(self)
+        self.tree_runner.finished.connect(self._on_tree_parsed)
+        self.tree_runner.failed.connect(self._on_tree_failed)
+
+        # 打开的文件（file_loader.LoadedFile）：内容不放入输入框，输入区显示只读预览
+        self._input_file = None
+
+        # 多文档工作区：每个子标签一份输入和结果，超出内存预算时旧文档溢出到磁盘
+        self.workspace = workspace.Workspace()
+        # 历史记录：渲染结果在后台写入本地历史，重新打开时直接读回
+        self.history = history.History()
+        self._history_dialog = None
+
         self.init_ui()
+        self.new_document()
 
     def _create_editor(self):
         return QPlainTextEdit()
 
+    def _current_document(self):
+        """返回当前输入对应的文档，输入框未修改时不重新读取文本；打开文件时为文件的文档"""
+        loaded = self._input_file
+        if loaded is not None:
+            # 打开文件时当前文档总是文件的文档（见 _on_file_opened），只在切换JSON5时换用新文档
+            current = self.document_cache.current
+            return self.document_cache.document(lambda: current.text, loaded.revision,
+                                                relaxed=self.relaxed_check.isChecked())
+        return self.document_cache.document(self.input_edit.toPlainText,
+                                            self.input_edit.document().revision(),
+                                            relaxed=self.relaxed_check.isChecked())
+
+    def _render(self, name):
+        """显示当前文档的某种输出
+
+        同一内容的结果已缓存时直接显示；否则在后台渲染，重复点击时旧任务会被取代。
+        结果直接写入新的 LineStore，编码和建立行索引都在工作线程完成；解析结果
+        在文档上共享，格式化后再转换不会重复解析。
+        """
+        document = self._current_document()
+        cached = self.document_cache.output(document, name)
+        if cached is not None:
+            self.job_runner.cancel()
+            self._job_action = perf.begin(f'{self.JOB_LABELS[name]}（缓存）', len(document.text))
+            self._show_dialect(document.dialect)
+            self._show_result(name, cached)
+            return
+        self._job_input = document.text
+        self._job_document = document
+        self._submit(name, document_cache.render, document, name, size=len(document.text), sink=LineStore())
+
+    def _submit(self, name, fn, *args, size=0, **kwargs):
+        """提交后台任务并开始性能记录；被取代的任务记为取消"""
+        self._finish_action(perf.CANCELLED)
+        self._job_action = perf.begin(self.JOB_LABELS[name], size)
+        self.job_runner.submit(name, perf.bind(self._job_action, fn), *args, **kwargs)
+
+    def _finish_action(self, status=perf.OK):
+        if self._job_action is not None:
+            self._job_action.finish(status)
+            self._job_action = None
+
     def format_json(self):
-        text = self.input_edit.toPlainText()
-        try:
-            data = json.loads(text)
-            formatted = json.dumps(data, indent=4, ensure_ascii=False)
-            self.output_edit.setPlainText(formatted)
-            logger.success('JSON格式化成功')
-        except json.JSONDecodeError as e:
-            pos = e.pos
-            start = max(0, pos - 20)
-            end = min(len(text), pos + 20)
-            context = text[start:end]
-            error_msg = f"JSON 格式错误(位置 {pos}):\n{e.msg}\n上下文:\n{context}"
-            self.output_edit.setPlainText(error_msg)  # 显示错误信息
-            self.highlighter.highlight_error(e.pos)  # 高亮错误部分
-            logger.error(f"JSON格式错误：{e.msg}")
-        except Exception as e:
-            logger.error(f'格式化失败: {e}')
+        if self.ndjson_check.isChecked():
+            self.run_ndjson(json_ops.INDENT)
+            return
+        # 格式化时一并建立结构索引，用于折叠、括号匹配、面包屑和路径跳转
+        self._render('format')
+
+    # ---- NDJSON ----
+    def _ndjson_input_index(self):
+        """输入框内容对应的行索引，内容未变时复用"""
+        document = self._current_document()
+        if self._ndjson_key != document.key:
+            self._ndjson_index = ndjson.RecordIndex.from_text(document.text)
+            self._ndjson_key = document.key
+        return self._ndjson_index
 
+    def run_ndjson(self, mode, index=None):
+        """按 NDJSON 校验、格式化或压缩输入框内容（或给定的文件索引）"""
+        if index is None:
+            index = self._ndjson_input_index()
+        self._job_input = self._job_document = None
+        if mode == ndjson.VALIDATE:
+            self._submit('ndjson_validate', ndjson.validate_report, index, size=index.size, sink=LineStore())
+        else:
+            name = 'ndjson_minify' if mode is None else 'ndjson_format'
+            self._submit(name, ndjson.process, index, mode, size=index.size, sink=LineStore())
+
+    def stream_ndjson(self, mode):
+        """以 mmap 方式打开 NDJSON 文件处理，不经过输入框"""
+        source, _ = QFileDialog.getOpenFileName(
+            self, "打开NDJSON文件", "", "JSON Lines (*.jsonl *.ndjson *.log *.json);;All Files (*)")
+        if not source:
+            return
+        self._ndjson_index = ndjson.RecordIndex.open(source)
+        self._ndjson_key = ('file', source)
+        self.ndjson_check.setChecked(True)
+        logger.info(f"NDJSON文件: {source}")
+        self.run_ndjson(mode, self._ndjson_index)
+
+    def show_ndjson_record(self):
+        """格式化显示第 N 行的记录，只解析这一行"""
+        try:
+            line_number = int(self.record_input.text().replace(',', '').strip())
+        except ValueError:
+            self.status_message.emit("请输入记录所在的行号")
+            return
+        is_file = isinstance(self._ndjson_key, tuple)
+        index = self._ndjson_index if is_file else self._ndjson_input_index()
+        self._job_input = self._job_document = None
+        self._submit('ndjson_record', ndjson.show_record, index, line_number, sink=LineStore())
 
     def convert_format(self, target_format):
         selected_format = self.convert_combo.currentText()
-        if selected_format == 'JSON':
+        self._render('format' if selected_format == 'JSON' else selected_format)
+
+    def cancel_job(self):
+        """取消按钮：取消当前任务和正在进行的保存，保存的不完整文件由 save_store 删除"""
+        self.job_runner.cancel()
+        self.save_runner.cancel()
+
+    def _cancel_runners(self):
+        for runner in (self.job_runner, self.index_runner, self.search_runner, self.tree_runner,
+                       self.live_runner):
+            runner.cancel()
+
+    def shutdown(self):
+        """页面被卸载或程序退出前调用：取消所有后台任务（包括保存），释放 NDJSON 索引，
+        删除工作区的溢出文件，并等待排队的历史记录写完
+
+        历史记录在 finally 中显式写完，前面的步骤出错时也不依赖解释器退出时对线程池的隐式等待。
+        """
+        try:
+            self._cancel_runners()
+            self.save_runner.cancel()
+            self._finish_action(perf.CANCELLED)
+            if self._ndjson_index is not None:
+                self._ndjson_index.close()
+                self._ndjson_index = None
+            self.workspace_timer.stop()
+            self.workspace.shutdown()
+        finally:
+            self.history.flush()
+
+    def _on_busy_changed(self, busy):
+        self.busy_changed.emit(self.job_runner.is_busy() or self.save_runner.is_busy())
+
+    def _on_job_started(self, name):
+        self.progress_changed.emit(0, f"{self.JOB_LABELS[name]}中...")
+
+    def _on_job_progress(self, name, percent, message):
+        self.progress_changed.emit(percent, message)
+
+    def stream_file(self, minify=False, to_file=False):
+        """流式处理磁盘上的JSON文件
+
+        输入以 mmap 方式读取，不经过输入框；结果写入结果区或直接写入目标文件，
+        超过内存大小的文件也能处理。
+        """
+        source, _ = QFileDialog.getOpenFileName(
+            self, "打开JSON文件", "", "JSON Files (*.json);;All Files (*)")
+        if not source:
             return
-        elif selected_format == 'Python字典':
-            try:
-                import ast
-                json_data = json.loads(self.input_edit.toPlainText())
-                dict_str = f"# Python字典\n{pprint.pformat(json_data, indent=4, width=80)}"
-                self.output_edit.setPlainText(dict_str)
-                logger.info("转换为Python字典格式")
-            except json.JSONDecodeError as e:
-                error_msg = f"JSON 格式错误：{e}"
-                self.output_edit.setPlainText(error_msg)
-                logger.error(f"JSON格式错误：{e.msg}")
-        elif selected_format == 'YAML':
-            try:
-                import yaml
-                json_data = json.loads(self.input_edit.toPlainText())
-                yaml_data = yaml.dump(json_data, indent=4, allow_unicode=True)
-                self.output_edit.setPlainText(yaml_data)
-                logger.info("转换为YAML格式")
-            except ImportError:
-                error_msg = "需要安装PyYAML库才能转换为YAML格式"
-                self.output_edit.setPlainText(error_msg)
-                logger.error(error_msg)
-            except json.JSONDecodeError as e:
-                error_msg = f"JSON 格式错误：{e}"
-                self.output_edit.setPlainText(error_msg)
-                logger.error(f"JSON格式错误：{e.msg}")
-        elif selected_format == 'XML':
-            try:
-                from dicttoxml import dicttoxml
-                json_data = json.loads(self.input_edit.toPlainText())
-                xml_data = dicttoxml(json_data, attr_type=False).decode('utf-8')
-                self.output_edit.setPlainText(xml_data)
-                logger.info("转换为XML格式")
-            except ImportError:
-                error_msg = "需要安装dicttoxml库才能转换为XML格式"
-                self.output_edit.setPlainText(error_msg)
-                logger.error(error_msg)
-            except json.JSONDecodeError as e:
-                error_msg = f"JSON 格式错误：{e}"
-                self.output_edit.setPlainText(error_msg)
-                logger.error(f"JSON格式错误：{e.msg}")
+        name = 'stream_minify' if minify else 'stream_format'
+        fn = json_stream.minify_file if minify else json_stream.format_file
+        if to_file:
+            stem, _ = os.path.splitext(source)
+            target, _ = QFileDialog.getSaveFileName(
+                self, "保存文件", stem + ('.min.json' if minify else '.formatted.json'),
+                "JSON Files (*.json);;All Files (*)")
+            if not target:
+                return
+            if os.path.abspath(target) == os.path.abspath(source):
+                self.status_message.emit("输出文件不能与输入文件相同")
+                return
+            self._job_input, self._job_document = source, None
+            self._submit(name, fn, source, size=os.path.getsize(source), output_path=target)
+        else:
+            self._job_input, self._job_document = source, None
+            self._submit(name, fn, source, size=os.path.getsize(source), sink=LineStore())
+        logger.info(f"{self.JOB_LABELS[name]}: {source}")
+
+    def _on_job_finished(self, name, result):
+        if name == 'load_document':
+            self._on_document_loaded(result)
+            return
+        if name == 'load_history':
+            self._on_history_loaded(result)
+            return
+        if name == 'open_file':
+            self._on_file_opened(*result)
+            return
+        if isinstance(result, str):
+            # 流式处理直接写入了目标文件
+            self._job_input = None
+            self._finish_action()
+            message = f"{self.JOB_SUCCESS_MESSAGES[name]}: {result}"
+            logger.success(message)
+            self.status_message.emit(message)
+            return
+        fixes = count = None
+        if name == 'repair':
+            result, fixes = result
+        elif name in ('query', 'query_file'):
+            result, count = result
+        if self._job_document is not None:
+            self.document_cache.put(self._job_document, name, result)
+            self.history.record(self._job_document, name, result)
+            self._show_dialect(self._job_document.dialect)
+        self._job_input = self._job_document = None
+        self._show_result(name, result)
+        if fixes is not None:
+            self._report_fixes(fixes)
+        if count is not None:
+            self.status_message.emit(f"{self.JOB_SUCCESS_MESSAGES[name]}，共 {count:,} 条结果")
 
+    def _show_result(self, name, result):
+        action = self._job_action
+        with perf.activate(action):
+            with perf.span('显示'):
+                if isinstance(result, tuple):
+                    store, structure = result
+                    self.output_edit.set_store(store)
+                    self.output_edit.set_structure(structure)
+                    self._update_breadcrumb()
+                else:
+                    self.output_edit.set_store(result.finish())
+            if action is not None:
+                # 立即绘制首屏，把版面计算和语法高亮计入本次操作
+                with perf.span('绘制'):
+                    self.output_edit.viewport().repaint()
+        self._finish_action()
+        message = self.JOB_SUCCESS_MESSAGES[name]
+        if name == 'format':
+            logger.success(message)
+        else:
+            logger.info(message)
+        self.status_message.emit(message)
+
+    def _on_job_failed(self, name, error):
+        text = self._job_input
+        self._job_input = self._job_document = None
+        self._finish_action(perf.FAILED)
+        if isinstance(error, ndjson.NdjsonError):
+            # 一次列出所有出错行
+            self.output_edit.set_store(LineStore.from_text(error.describe()))
+            logger.error(f"NDJSON格式错误：{error}")
+            self.status_message.emit(f"NDJSON格式错误：{error}")
+        elif isinstance(error, json_stream.StreamDecodeError):
+            self.output_edit.setPlainText(error.describe())
+            logger.error(f"JSON格式错误：{error}")
+            self.status_message.emit(f"JSON格式错误：{error}")
+        elif isinstance(error, json.JSONDecodeError):
+            if name == 'format':
+                self.output_edit.setPlainText(json_ops.describe_decode_error(text, error))  # 显示错误信息
+                if self._input_file is None:
+                    # 在输入框中标出错误（文档位置按 UTF-16 计算）
+                    position = len(text[:error.pos].encode('utf-16-le')) // 2
+                    self._live_state = ((position, error.msg), None)
+                    self._show_input_error(position, error.msg)
+            else:
+                self.output_edit.setPlainText(f"JSON 格式错误：{error}")
+            logger.error(f"JSON格式错误：{error.msg}")
+            if error.msg == 'Extra data':
+                hint = "（每行一条记录的数据请勾选 NDJSON）"
+            else:
+                hint = "（可点击“修复JSON”尝试自动修复）" if name == 'format' else ""
+            self.status_message.emit(f"JSON格式错误：{error.msg}{hint}")
+        elif isinstance(error, ImportError) and name in self.IMPORT_HINTS:
+            error_msg = self.IMPORT_HINTS[name]
+            self.output_edit.setPlainText(error_msg)
+            logger.error(error_msg)
+            self.status_message.emit(error_msg)
+        else:
+            logger.error(f'{self.JOB_LABELS[name]}失败: {error}')
+            self.status_message.emit(f'{self.JOB_LABELS[name]}失败: {error}')
+
+    def _on_job_cancelled(self, name):
+        self._job_input = self._job_document = None
+        self._finish_action(perf.CANCELLED)
+        self.status_message.emit(f"{self.JOB_LABELS[name]}已取消")
+
+    def _finish_save(self, status):
+        if self._save_action is not None:
+            self._save_action.finish(status)
+            self._save_action = None
+
+    def _on_save_finished(self, name, path):
+        self._finish_save(perf.OK)
+        message = f"{self.JOB_SUCCESS_MESSAGES[name]}: {path}"
+        logger.success(message)
+        self.status_message.emit(message)
+
+    def _on_save_failed(self, name, error):
+        self._finish_save(perf.FAILED)
+        logger.error(f'{self.JOB_LABELS[name]}失败: {error}')
+        self.status_message.emit(f'{self.JOB_LABELS[name]}失败: {error}')
+
+    def _on_save_cancelled(self, name):
+        self._finish_save(perf.CANCELLED)
+        self.status_message.emit(f"{self.JOB_LABELS[name]}已取消")
 
     def clear_content(self):
+        self._show_input_file(None)
         self.input_edit.clear()
         self.output_edit.clear()
         logger.info('已清空所有输入输出内容')
 
     def copy_result(self):
+        """复制全部结果；剪贴板只登记格式，粘贴时才从结果存储生成文本"""
+        if self.output_edit.is_empty():
+            logger.warning("没有可复制的内容")
+            return
+        self.output_edit.copy_all()
         logger.info("结果已复制到剪贴板")
+        self.status_message.emit(f"结果已复制到剪贴板（{perf.format_size(self.output_edit.store().nbytes)}）")
 
     def validate_structure(self):
+        """立即校验输入（不等待防抖），同样只从最后一个有效检查点继续"""
+        self.live_timer.stop()
+        self.run_live_validation(force=True)
+
+    # ---- 实时校验 ----
+    def _on_input_contents_change(self, position, removed, added):
+        self.live_validator.invalidate(position)
+        self._live_generation += 1
+        if self._live_enabled():
+            self.live_timer.start()
+
+    def _live_enabled(self):
+        # NDJSON 模式下每行是一条独立记录，整体不是一个 JSON 值，由“校验”按钮处理
+        return self.live_check.isChecked() and not self.ndjson_check.isChecked()
+
+    def _on_relaxed_toggled(self):
+        self._show_dialect(None)
+        self.run_live_validation()
+
+    def _on_live_toggled(self):
+        if self._live_enabled():
+            self.run_live_validation()
+        else:
+            self.live_timer.stop()
+            self.live_runner.cancel()
+            self._live_state = None
+            self._clear_input_error()
+
+    def run_live_validation(self, force=False):
+        """校验从最后一个有效检查点到文末的文本；较短时直接在界面线程完成"""
+        if self.ndjson_check.isChecked() or not (force or self.live_check.isChecked()):
+            return
+        if self._input_file is not None:
+            # 打开的文件不在输入框中：整篇在后台校验
+            self.live_runner.submit('file', self._validate_document, self._current_document(),
+                                    self._live_generation, force)
+            return
+        start = self.live_validator.resume_point()
+        text = self.input_edit.text_from(start.position)
+        generation = self._live_generation
+        if len(text) <= self.LIVE_SYNC_CHARS:
+            self.live_runner.cancel()
+            self._apply_live_result(generation, start, live_validation.validate(text, start), force)
+        else:
+            self.live_runner.submit('live', self._validate_in_background, text, start, generation, force)
+
+    @staticmethod
+    def _validate_in_background(text, start, generation, force, job=None):
+        return generation, start, live_validation.validate(text, start, job), force
+
+    @staticmethod
+    def _validate_document(document, generation, force, job=None):
+        """校验打开的文件，错误为 (行, 列, 消息)；标准JSON只扫描不建对象树"""
+        text = document.text
+        result = live_validation.validate(text, None, job)
+        if result.error is None:
+            return generation, None, None if result.empty else relaxed_json.JSON, force
+        if document.relaxed:
+            try:
+                document.parse(job)
+                return generation, None, document.dialect, force
+            except json.JSONDecodeError as e:
+                return generation, (e.lineno, e.colno, e.msg), None, force
+        position, message = result.error
+        index = live_validation.text_index(text, position)
+        line = text.count('\n', 0, index) + 1
+        column = index - text.rfind('\n', 0, index)
+        return generation, (line, column, message), None, force
+
+    @staticmethod
+    def _validate_relaxed(text, generation, force, job=None):
         try:
-            json.loads(self.input_edit.toPlainText())
-            logger.info("JSON验证通过")
+            relaxed_json.parse(text, job)
+            error = None
         except json.JSONDecodeError as e:
-            logger.error(f"JSON格式错误：{e.msg}")
+            error = (len(text[:e.pos].encode('utf-16-le')) // 2, e.msg)
+        return generation, error, force
+
+    def _on_live_validated(self, name, result):
+        if name == 'relaxed':
+            self._apply_relaxed_result(*result)
+        elif name == 'file':
+            self._apply_file_result(*result)
+        else:
+            self._apply_live_result(*result)
+
+    def _apply_live_result(self, generation, start, result, force=False):
+        """应用校验结果；错误没有变化时不重复刷新（手动校验时总是提示）"""
+        if generation != self._live_generation:
+            return  # 校验期间输入又有修改，等待下一次校验
+        self.live_validator.commit(start, result)
+        if result.error is not None and self.relaxed_check.isChecked():
+            # 不是标准JSON：整篇按JSON5再校验一次
+            self.live_runner.submit('relaxed', self._validate_relaxed, self.input_edit.toPlainText(),
+                                    generation, force)
+            return
+        dialect = None if result.empty else relaxed_json.JSON
+        self._set_live_state(result.error, dialect, force)
+
+    def _apply_relaxed_result(self, generation, error, force):
+        if generation == self._live_generation:
+            self._set_live_state(error, relaxed_json.JSON5, force)
+
+    def _apply_file_result(self, generation, error, dialect, force):
+        if generation != self._live_generation or self._input_file is None:
+            return
+        state = (error, dialect)
+        if state == self._live_state and not force:
+            return
+        self._live_state = state
+        if error is not None:
+            line, column, message = error
+            self._show_dialect(None)
+            self.status_message.emit(f"JSON格式错误：第 {line} 行第 {column} 列: {message}")
+        else:
+            self._show_dialect(dialect)
+            if dialect:
+                self.status_message.emit(f"{dialect}格式正确")
+
+    def _set_live_state(self, error, dialect, force):
+        state = (error, dialect)
+        if state == self._live_state and not force:
+            return
+        self._live_state = state
+        if error is not None:
+            self._show_input_error(*error)
+            self._show_dialect(None)
+        else:
+            self._clear_input_error(f"{dialect}格式正确" if dialect else None)
+            self._show_dialect(dialect)
+
+    def _show_dialect(self, dialect):
+        self.dialect_label.setText(f"方言: {dialect}" if dialect else "")
+
+    def _show_input_error(self, position, message):
+        """在输入框和行号栏标出错误，并在状态栏显示位置"""
+        block = self.input_edit.document().findBlock(position)
+        if not block.isValid():
+            block = self.input_edit.document().lastBlock()
+        line = block.blockNumber()
+        column = position - block.position() + 1
+        self.input_edit.mark_error(position)
+        self.input_edit.line_numbers.set_error_lines({line: message})
+        self.status_message.emit(f"JSON格式错误：第 {line + 1} 行第 {column} 列: {message}")
+
+    def _clear_input_error(self, message=None):
+        self.input_edit.mark_error(None)
+        self.input_edit.line_numbers.set_error_lines({})
+        if message:
+            self.status_message.emit(message)
 
     def minify_content(self):
         pass
@@ -296,9 +953,12 @@ class JsonFormatterPage(QWidget):
 
     def download_content(self):
         """下载格式化后的JSON内容到文件"""
-        if not self.output_edit.toPlainText():
+        if self.output_edit.is_empty():
             logger.warning("没有可下载的内容")
             return
+        if self.save_runner.is_busy():
+            self.status_message.emit("正在保存文件，请等待当前保存完成")
+            return
             
         # 获取默认文件名
         default_name = "formatted.json"
@@ -309,34 +969,53 @@ class JsonFormatterPage(QWidget):
         elif self.convert_combo.currentText() == "Python字典":
             default_name = "converted.py"
             
-        # 打开文件保存对话框
+        # 打开文件保存对话框；扩展名为 .gz/.bz2/.xz 时压缩保存
         file_path, _ = QFileDialog.getSaveFileName(
             self, "保存文件", default_name,
-            "All Files (*);;JSON Files (*.json);;YAML Files (*.yaml);;XML Files (*.xml);;Python Files (*.py)")
-            
+            "All Files (*);;JSON Files (*.json);;YAML Files (*.yaml);;XML Files (*.xml);;Python Files (*.py);;"
+            "Compressed Files (*.gz *.bz2 *.xz)")
+
         if file_path:
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(self.output_edit.toPlainText())
-                logger.success(f"文件已保存到: {file_path}")
-            except Exception as e:
-                logger.error(f"保存文件失败: {e}")
+            # 在后台按块写入，界面不阻塞；结果存储不会被修改，直接交给后台读取
+            store = self.output_edit.store()
+            self._save_action = perf.begin(self.JOB_LABELS['save'], store.nbytes)
+            self.save_runner.submit('save', perf.bind(self._save_action, output_export.save_store),
+                                    store, file_path)
 
     def minify_json(self):
-        try:
-            data = json.loads(self.input_edit.toPlainText())
-            minified = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
-            self.output_edit.setPlainText(minified)
-            logger.info("JSON已压缩")
-        except json.JSONDecodeError as e:
-            error_msg = f"JSON 格式错误：{e}"
-            self.output_edit.setPlainText(error_msg)
-            logger.error(f"JSON格式错误：{e.msg}")
+        if self.ndjson_check.isChecked():
+            self.run_ndjson(None)
+            return
+        self._render('minify')
 
     def init_ui(self):
         # 主布局
         main_layout = QVBoxLayout(self)
 
+        # 文档标签：每个标签一份独立的输入和结果
+        documents_layout = QHBoxLayout()
+        self.document_tabs = QTabBar()
+        self.document_tabs.setTabsClosable(True)
+        self.document_tabs.setMovable(True)
+        self.document_tabs.setExpanding(False)
+        self.document_tabs.currentChanged.connect(self._on_document_tab_changed)
+        self.document_tabs.tabCloseRequested.connect(self.close_document)
+        new_document_btn = QPushButton('+')
+        new_document_btn.setToolTip('新建文档')
+        new_document_btn.clicked.connect(lambda: self.new_document())
+        self.workspace_label = QLabel()
+        self.workspace_label.setStyleSheet("font-size: 12px; font-weight: normal; color: #666666;")
+        documents_layout.addWidget(self.document_tabs)
+        documents_layout.addWidget(new_document_btn)
+        documents_layout.addStretch()
+        documents_layout.addWidget(self.workspace_label)
+        main_layout.addLayout(documents_layout)
+        # 溢出在后台完成，定时刷新内存占用
+        self.workspace_timer = QTimer(self)
+        self.workspace_timer.setInterval(self.WORKSPACE_REFRESH)
+        self.workspace_timer.timeout.connect(self._update_workspace_label)
+        self.workspace_timer.start()
+
         # 创建分割器
         splitter = QSplitter(Qt.Horizontal)
 
@@ -350,7 +1029,8 @@ class JsonFormatterPage(QWidget):
             ('格式化', self.format_json),
             ('清空', self.clear_content),
             ('复制结果', self.copy_result),
-            ('压缩JSON', self.minify_json)
+            ('压缩JSON', self.minify_json),
+            ('修复JSON', lambda: self.test_fix_json()),
         ]
 
         for text, slot in buttons:
@@ -359,6 +1039,34 @@ class JsonFormatterPage(QWidget):
             btn.clicked.connect(slot)
             btn_layout.addWidget(btn)
 
+        # 取消按钮，仅在后台任务运行时可用
+        self.cancel_btn = QPushButton('取消')
+        self.cancel_btn.setStyleSheet(self.BUTTON_STYLE)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_job)
+        self.busy_changed.connect(self.cancel_btn.setEnabled)
+        btn_layout.addWidget(self.cancel_btn)
+
+        # 打开文件：大文件不经过输入框，直接流式处理
+        self.open_file_btn = QPushButton('打开文件…')
+        self.open_file_btn.setStyleSheet(self.BUTTON_STYLE)
+        open_menu = QMenu(self.open_file_btn)
+        open_menu.addAction('格式化到结果区', lambda: self.stream_file())
+        open_menu.addAction('压缩到结果区', lambda: self.stream_file(minify=True))
+        open_menu.addSeparator()
+        open_menu.addAction('格式化到文件…', lambda: self.stream_file(to_file=True))
+        open_menu.addAction('压缩到文件…', lambda: self.stream_file(minify=True, to_file=True))
+        open_menu.addSeparator()
+        open_menu.addAction('NDJSON 校验…', lambda: self.stream_ndjson(ndjson.VALIDATE))
+        open_menu.addAction('NDJSON 格式化到结果区…', lambda: self.stream_ndjson(json_ops.INDENT))
+        self.open_file_btn.setMenu(open_menu)
+        btn_layout.addWidget(self.open_file_btn)
+
+        history_btn = QPushButton('历史…')
+        history_btn.setStyleSheet(self.BUTTON_STYLE)
+        history_btn.clicked.connect(self.show_history)
+        btn_layout.addWidget(history_btn)
+
         # 格式转换下拉框
         self.convert_combo = QComboBox()
         self.convert_combo.addItems(['JSON', 'YAML', 'XML', 'Python字典'])
@@ -367,11 +1075,75 @@ class JsonFormatterPage(QWidget):
 
         input_layout.addLayout(btn_layout)
 
+        # NDJSON 模式：每行一条记录，格式化/压缩按记录处理，可按行号查看单条记录
+        ndjson_layout = QHBoxLayout()
+        self.ndjson_check = QCheckBox("NDJSON")
+        self.ndjson_check.setToolTip("按 JSON Lines 处理输入：每行一条记录，一次列出所有出错行")
+        self.ndjson_validate_btn = QPushButton('校验')
+        self.ndjson_validate_btn.clicked.connect(lambda: self.run_ndjson(ndjson.VALIDATE))
+        self.record_input = QLineEdit()
+        self.record_input.setPlaceholderText("行号")
+        self.record_input.setMaximumWidth(120)
+        self.record_input.returnPressed.connect(self.show_ndjson_record)
+        self.record_btn = QPushButton('查看记录')
+        self.record_btn.clicked.connect(self.show_ndjson_record)
+        for widget in (self.ndjson_validate_btn, self.record_input, self.record_btn):
+            widget.setEnabled(False)
+            self.ndjson_check.toggled.connect(widget.setEnabled)
+        # 实时校验：停止输入 LIVE_DELAY 毫秒后校验，错误标在输入框和行号栏
+        self.live_check = QCheckBox("实时校验")
+        self.live_check.setChecked(True)
+        self.live_check.toggled.connect(self._on_live_toggled)
+        self.ndjson_check.toggled.connect(self._on_live_toggled)
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(self.LIVE_DELAY)
+        self.live_timer.timeout.connect(self.run_live_validation)
+        # JSON5：标准解析失败后再按JSON5解析，标签显示检测出的方言
+        self.relaxed_check = QCheckBox("JSON5")
+        self.relaxed_check.setToolTip("接受宽松语法：注释、末尾逗号、单引号、未加引号的键名、十六进制数字等")
+        self.relaxed_check.toggled.connect(self._on_relaxed_toggled)
+        self.dialect_label = QLabel()
+        ndjson_layout.addWidget(self.live_check)
+        ndjson_layout.addWidget(self.relaxed_check)
+        ndjson_layout.addWidget(self.dialect_label)
+        ndjson_layout.addWidget(self.ndjson_check)
+        ndjson_layout.addWidget(self.ndjson_validate_btn)
+        ndjson_layout.addStretch()
+        ndjson_layout.addWidget(self.record_input)
+        ndjson_layout.addWidget(self.record_btn)
+        input_layout.addLayout(ndjson_layout)
+
         # 输入区域
         input_group = QGroupBox("输入JSON")
         group_layout = QVBoxLayout(input_group)
-        self.input_edit = QPlainTextEdit()
-        group_layout.addWidget(self.input_edit)
+        self.input_edit = InputEditor()
+        self.input_edit.textChanged.connect(self._on_input_changed)
+        self.input_edit.document().contentsChange.connect(self._on_input_contents_change)
+        # 打开文件后换成只读预览：文件统计 + 开头一段内容
+        file_panel = QWidget()
+        file_layout = QVBoxLayout(file_panel)
+        file_layout.setContentsMargins(0, 0, 0, 0)
+        file_bar = QHBoxLayout()
+        self.file_label = QLabel()
+        self.file_label.setStyleSheet("font-size: 12px; font-weight: normal;")
+        self.file_label.setWordWrap(True)
+        edit_file_btn = QPushButton('在输入框中编辑')
+        edit_file_btn.setToolTip('把全部内容放入输入框（大文件会很慢）')
+        edit_file_btn.clicked.connect(self.edit_file_in_editor)
+        close_file_btn = QPushButton('关闭文件')
+        close_file_btn.clicked.connect(self.clear_content)
+        file_bar.addWidget(self.file_label, 1)
+        file_bar.addWidget(edit_file_btn)
+        file_bar.addWidget(close_file_btn)
+        file_layout.addLayout(file_bar)
+        self.file_preview = ChunkedTextViewer()
+        self.file_preview.set_highlighter(JsonHighlighter())
+        file_layout.addWidget(self.file_preview)
+        self.input_stack = QStackedWidget()
+        self.input_stack.addWidget(self.input_edit)
+        self.input_stack.addWidget(file_panel)
+        group_layout.addWidget(self.input_stack)
         input_layout.addWidget(input_group)
 
         # 输出面板
@@ -385,35 +1157,89 @@ class JsonFormatterPage(QWidget):
         self.search_button = QPushButton("搜索")
         self.prev_button = QPushButton("上一个")
         self.next_button = QPushButton("下一个")
+        self.regex_check = QCheckBox("正则")
+        self.whole_word_check = QCheckBox("全词")
+        self.scope_combo = QComboBox()
+        for label, scope in self.SEARCH_SCOPES:
+            self.scope_combo.addItem(label, scope)
+        self.match_label = QLabel("")
+        self.match_label.setStyleSheet("font-size: 12px; font-weight: normal;")
+        self.match_label.setMinimumWidth(110)
         self.search_button.clicked.connect(self.search_text)
         self.prev_button.clicked.connect(self.prev_match)
         self.next_button.clicked.connect(self.next_match)
         search_layout.addWidget(QLabel("搜索:"))
         search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.regex_check)
+        search_layout.addWidget(self.whole_word_check)
+        search_layout.addWidget(self.scope_combo)
         search_layout.addWidget(self.search_button)
         search_layout.addWidget(self.prev_button)
         search_layout.addWidget(self.next_button)
+        search_layout.addWidget(self.match_label)
         output_layout.addLayout(search_layout)
 
+        # 输入时防抖后自动搜索
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.search_text)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.regex_check.toggled.connect(self.search_timer.start)
+        self.whole_word_check.toggled.connect(self.search_timer.start)
+        self.scope_combo.currentIndexChanged.connect(self.search_timer.start)
+
         # 输出区域
         output_group = QGroupBox("格式化结果")
         group_layout = QVBoxLayout(output_group)
 
-        # 输出控件 - 使用QPlainTextEdit显示JSON
-        self.output_edit = QPlainTextEdit()
-        self.output_edit.setReadOnly(True)
+        # 输出控件 - 虚拟化查看器，只绘制可见行
+        self.output_edit = ChunkedTextViewer()
         font = QFont("Consolas", 10)
+        font.setPixelSize(12)
         self.output_edit.setFont(font)
         self.output_edit.setStyleSheet("""
-            QPlainTextEdit {
+            QAbstractScrollArea {
                 background-color: #252526;
-                color: #9CDCFE;
                 border: 1px solid #3C3C3C;
-                font-family: Consolas;
-                font-size: 12px;
             }
         """)
-        self.highlighter = JsonHighlighter(self.output_edit.document())
+        self.output_line_numbers = LineNumberWidget(self.output_edit)
+        self.output_edit.set_gutter(self.output_line_numbers)
+        self.highlighter = JsonHighlighter()
+        self.output_edit.set_highlighter(self.highlighter)
+        self.output_edit.store_changed.connect(self._on_output_changed)
+        self.output_edit.selection_changed.connect(self._update_breadcrumb)
+
+        # 面包屑与路径跳转：依赖格式化时建立的结构索引
+        path_layout = QHBoxLayout()
+        self.breadcrumb_label = QLabel("$")
+        self.breadcrumb_label.setStyleSheet("font-size: 12px; font-weight: normal;")
+        self.breadcrumb_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.path_input = QLineEdit()
+        self.path_input.setPlaceholderText("$.data.items[0].id")
+        self.path_input.setMaximumWidth(260)
+        self.path_input.returnPressed.connect(self.goto_path)
+        self.goto_button = QPushButton("跳转")
+        self.goto_button.clicked.connect(self.goto_path)
+        path_layout.addWidget(self.breadcrumb_label, 1)
+        path_layout.addWidget(self.path_input)
+        path_layout.addWidget(self.goto_button)
+
+        # 查询：$ 开头为 JSONPath，其余按 jq 解析，结果以JSON数组显示在结果区
+        query_layout = QHBoxLayout()
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("$..errorCode 或 .items[] | select(.id > 10) | {id, name}")
+        self.query_input.returnPressed.connect(self.run_query)
+        self.query_button = QPushButton("查询")
+        self.query_button.clicked.connect(self.run_query)
+        self.query_file_button = QPushButton("查询文件…")
+        self.query_file_button.setToolTip("对磁盘上的JSON文件查询；简单路径（如 $..errorCode）流式求值，不解析整个文件")
+        self.query_file_button.clicked.connect(self.query_file)
+        query_layout.addWidget(QLabel("查询:"))
+        query_layout.addWidget(self.query_input, 1)
+        query_layout.addWidget(self.query_button)
+        query_layout.addWidget(self.query_file_button)
 
         output_btn_layout = QHBoxLayout()
         self.download_btn = QPushButton('下载')
@@ -421,7 +1247,20 @@ class JsonFormatterPage(QWidget):
         output_btn_layout.addStretch()
         output_btn_layout.addWidget(self.download_btn)
 
-        group_layout.addWidget(self.output_edit)
+        # 树形视图：切换到该标签时才在后台解析并按需加载节点
+        self.tree_view = QTreeView()
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.setAlternatingRowColors(True)
+        self.tree_view.setStyleSheet("QTreeView { background-color: white; font-size: 13px; }")
+
+        self.output_tabs = QTabWidget()
+        self.output_tabs.addTab(self.output_edit, '文本')
+        self.output_tabs.addTab(self.tree_view, '树形')
+        self.output_tabs.currentChanged.connect(self._on_output_tab_changed)
+
+        group_layout.addLayout(query_layout)
+        group_layout.addLayout(path_layout)
+        group_layout.addWidget(self.output_tabs)
         group_layout.addLayout(output_btn_layout)
         output_layout.addWidget(output_group)
 
@@ -434,48 +1273,480 @@ class JsonFormatterPage(QWidget):
 
         # 添加Ctrl+F快捷键
         self.shortcut_search = QShortcut(QKeySequence("Ctrl+F"), self)
-        self.shortcut_search.activated.connect(self.search_text)
+        self.shortcut_search.activated.connect(self.focus_search)
+
+    def _update_breadcrumb(self):
+        structure = self.output_edit.structure()
+        if structure is None:
+            self.breadcrumb_label.setText("")
+            return
+        self.breadcrumb_label.setText(structure.path_at_line(self.output_edit.cursor_position()[0]))
+
+    def goto_path(self):
+        """跳转到 $.a.b[3] 形式的路径，需先格式化以建立结构索引"""
+        path = self.path_input.text().strip()
+        if not path:
+            return
+        structure = self.output_edit.structure()
+        if structure is None:
+            self.status_message.emit("请先格式化JSON后再按路径跳转")
+            return
+        try:
+            line = structure.resolve(path)
+        except ValueError as e:
+            self.status_message.emit(str(e))
+            return
+        except KeyError as e:
+            self.status_message.emit(f"路径不存在: {e.args[0]}")
+            return
+        text = self.output_edit.store().line(line)
+        col = len(text) - len(text.lstrip())
+        self.output_tabs.setCurrentWidget(self.output_edit)
+        self.output_edit.select_range(line, col, len(text.strip()))
+        self.output_edit.setFocus()
+
+    def _on_input_changed(self):
+        self._tree_dirty = True
+
+    def _on_output_tab_changed(self, index):
+        if self.output_tabs.widget(index) is self.tree_view:
+            self.refresh_tree()
+
+    def refresh_tree(self):
+        """输入有变化时在后台重新解析并重建树模型"""
+        if not self._tree_dirty or self.tree_runner.is_busy():
+            return
+        document = self._current_document()
+        if not document.text.strip():
+            self.tree_view.setModel(None)
+            return
+        self.status_message.emit('正在解析树形视图...')
+        self.tree_runner.submit('tree', document.parse)
+
+    def _on_tree_parsed(self, name, data):
+        model = JsonTreeModel(data, self.tree_view)
+        old_model = self.tree_view.model()
+        self.tree_view.setModel(model)
+        if old_model is not None:
+            old_model.deleteLater()
+        self.tree_view.selectionModel().currentChanged.connect(self._on_tree_current_changed)
+        self.tree_view.expand(model.index(0, 0))
+        self.tree_view.setColumnWidth(0, 220)
+        self._tree_dirty = False
+        self.status_message.emit('树形视图已更新')
+
+    def _on_tree_failed(self, name, error):
+        if isinstance(error, json.JSONDecodeError):
+            self.status_message.emit(f"JSON格式错误：{error.msg}")
+        logger.error(f"树形视图解析失败: {error}")
+
+    def _on_tree_current_changed(self, current, previous):
+        if current.isValid():
+            self.status_message.emit(self.tree_view.model().path(current))
+
+    def focus_search(self):
+        self.search_input.setFocus()
+        self.search_input.selectAll()
+        self.search_text()
+
+    def _on_output_changed(self):
+        """输出内容变化后重置搜索状态，并在后台为新文档建立索引"""
+        self.search_runner.cancel()
+        self.index_runner.cancel()
+        self.search_index = None
+        self.matches = None
+        self.current_match = -1
+        self.match_label.setText("")
+        self._update_breadcrumb()
+        store = self.output_edit.store()
+        if store.nbytes:
+            self.index_runner.submit('index', search_index.NgramIndex(store).build)
+            if self.search_input.toPlainText():
+                self.search_timer.start()
+
+    def _on_index_built(self, name, index):
+        if index.store is self.output_edit.store():
+            self.search_index = index
+            logger.debug(f"搜索索引已建立，共 {len(index.masks)} 块")
 
     def search_text(self):
-        """执行搜索并高亮匹配文本"""
+        """在后台执行搜索，匹配计数和导航在完成后更新"""
+        self.search_timer.stop()
         search_text = self.search_input.toPlainText()
-        if hasattr(self, 'highlighter') and search_text:
-            self.highlighter.set_search_text(search_text)
-            
-            # 查找所有匹配位置
-            document = self.output_edit.document()
-            text = document.toPlainText().lower()
-            search_text_lower = search_text.lower()
-            self.matches = []
-            index = text.find(search_text_lower)
-            while index >= 0:
-                self.matches.append(index)
-                index = text.find(search_text_lower, index + len(search_text_lower))
-            
-            self.current_match = 0 if self.matches else -1
-            self.navigate_to_match()
-    
+        if not search_text:
+            self.search_runner.cancel()
+            self.highlighter.clear_highlight()
+            self.matches = None
+            self.current_match = -1
+            self.match_label.setText("")
+            return
+        try:
+            query = search_index.SearchQuery(
+                search_text,
+                regex=self.regex_check.isChecked(),
+                whole_word=self.whole_word_check.isChecked(),
+                scope=self.scope_combo.currentData())
+        except re.error as e:
+            self.match_label.setText("正则错误")
+            logger.warning(f"搜索正则错误: {e}")
+            return
+        self.highlighter.set_search_query(query)
+        self.match_label.setText("搜索中...")
+        self.search_runner.submit('search', search_index.search, self.output_edit.store(), query,
+                                  index=self.search_index, previous=self.matches)
+
+    def _on_search_progress(self, name, percent, message):
+        self.match_label.setText(message)
+
+    def _on_search_finished(self, name, result):
+        self.matches = result
+        if len(result):
+            self.current_match = result.index_at_or_after(self.output_edit.first_visible_line())
+        else:
+            self.current_match = -1
+        self._update_match_label()
+        self.navigate_to_match()
+
+    def _on_search_failed(self, name, error):
+        self.match_label.setText("搜索失败")
+        logger.error(f"搜索失败: {error}")
+
+    def _update_match_label(self):
+        if not self.matches:
+            self.match_label.setText("无匹配")
+        else:
+            self.match_label.setText(f"{self.current_match + 1:,} / {len(self.matches):,}")
+
     def navigate_to_match(self):
         """导航到当前匹配项"""
-        if hasattr(self, 'matches') and 0 <= self.current_match < len(self.matches):
-            cursor = self.output_edit.textCursor()
-            cursor.setPosition(self.matches[self.current_match])
-            cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor,
-                              len(self.search_input.toPlainText()))
-            self.output_edit.setTextCursor(cursor)
-            self.output_edit.setFocus()
-    
+        if self.matches and 0 <= self.current_match < len(self.matches):
+            line, col, length = self.matches[self.current_match]
+            self.output_edit.select_range(line, col, length)
+            self._update_match_label()
+
     def prev_match(self):
         """导航到上一个匹配项"""
-        if hasattr(self, 'matches') and len(self.matches) > 0:
+        if self.matches:
             self.current_match = (self.current_match - 1) % len(self.matches)
             self.navigate_to_match()
-    
+
     def next_match(self):
         """导航到下一个匹配项"""
-        if hasattr(self, 'matches') and len(self.matches) > 0:
+        if self.matches:
             self.current_match = (self.current_match + 1) % len(self.matches)
             self.navigate_to_match()
 
-    def test_fix_json(self, json_string):
-        pass
+    # ---- 多文档 ----
+    def new_document(self, title=None):
+        document = self.workspace.new(title)
+        index = self.document_tabs.addTab(document.title)
+        self.document_tabs.setTabData(index, document)
+        if self.document_tabs.currentIndex() == index:
+            # 第一个标签加入时已触发 currentChanged，此时还没有关联文档
+            self._switch_document(document)
+        else:
+            self.document_tabs.setCurrentIndex(index)
+        return document
+
+    def close_document(self, index):
+        document = self.document_tabs.tabData(index)
+        if self.document_tabs.count() == 1:
+            self.clear_content()
+            return
+        if document.document is not None:
+            self.document_cache.discard_document(document.document.key)
+        # 先从工作区移除，切换到相邻标签时不再保存它的状态
+        self.workspace.close(document)
+        self.document_tabs.removeTab(index)
+        self._update_workspace_label()
+        logger.info(f"已关闭{document.title}")
+
+    def _on_document_tab_changed(self, index):
+        document = self.document_tabs.tabData(index) if index >= 0 else None
+        if document is not None and document is not self.workspace.active:
+            self._switch_document(document)
+
+    def _switch_document(self, document):
+        """保存当前文档的内容和视图状态，显示另一份文档；已溢出的文档在后台读回"""
+        previous = self.workspace.active
+        if previous is not None and not previous.spilled:
+            self._save_document_state(previous)
+        self._cancel_runners()
+        self.workspace.activate(document)
+        if document.spilled:
+            self._show_document(None)
+            self._submit('load_document', self.workspace.read, document, size=document.spill_size)
+        else:
+            self._show_document(document)
+        self.workspace.enforce(self.document_cache)
+        self._update_workspace_label()
+
+    def _save_document_state(self, document):
+        document.document = self._current_document()
+        store = self.output_edit.store()
+        structure = self.output_edit.structure()
+        if structure is not None:
+            document.output = (store, structure)
+        else:
+            document.output = store if store.nbytes else None
+        index = self.search_index
+        document.search_index = index if index is not None and index.store is store else None
+        document.view = {
+            'cursor': self.input_edit.textCursor().position(),
+            'scroll': self.input_edit.verticalScrollBar().value(),
+            'output_scroll': (self.output_edit.verticalScrollBar().value(),
+                              self.output_edit.horizontalScrollBar().value()),
+            'output_tab': self.output_tabs.currentIndex(),
+            'live': self.live_validator,
+            'file': self._input_file,
+        }
+
+    def _show_document(self, document):
+        """把文档的内容和视图状态放回输入框和结果区；document 为 None 时清空并只读（读回中）"""
+        source = document.document if document is not None else None
+        view = document.view if document is not None else {}
+        # 替换文本会使校验检查点失效：先换上新的校验器，替换后再恢复该文档的检查点
+        self.live_timer.stop()
+        self.live_validator = live_validation.LiveValidator()
+        loaded = view.get('file') if source is not None else None
+        self._show_input_file(loaded)
+        self.input_edit.setPlainText(source.text if source is not None and loaded is None else '')
+        self.input_edit.setReadOnly(document is None)
+        if source is not None:
+            revision = loaded.revision if loaded is not None else self.input_edit.document().revision()
+            self.document_cache.set_current(source, revision)
+        output = document.output if document is not None else None
+        if output is None:
+            self.output_edit.clear()
+        elif isinstance(output, tuple):
+            self.output_edit.set_store(output[0])
+            self.output_edit.set_structure(output[1])
+        else:
+            self.output_edit.set_store(output)
+        if document is not None and document.search_index is not None:
+            self.index_runner.cancel()
+            self.search_index = document.search_index
+
+        old_model = self.tree_view.model()
+        self.tree_view.setModel(None)
+        if old_model is not None:
+            old_model.deleteLater()
+        self._tree_dirty = True
+
+        cursor = self.input_edit.textCursor()
+        cursor.setPosition(min(view.get('cursor', 0), self.input_edit.document().characterCount() - 1))
+        self.input_edit.setTextCursor(cursor)
+        self.input_edit.verticalScrollBar().setValue(view.get('scroll', 0))
+        vertical, horizontal = view.get('output_scroll', (0, 0))
+        self.output_edit.verticalScrollBar().setValue(vertical)
+        self.output_edit.horizontalScrollBar().setValue(horizontal)
+        self.output_tabs.setCurrentIndex(view.get('output_tab', 0))
+
+        self._live_state = None
+        self._clear_input_error()
+        self._show_dialect(source.dialect if source is not None else None)
+        if source is not None:
+            self.live_timer.stop()
+            self.live_validator = view.get('live', self.live_validator)
+            self.run_live_validation()
+
+    def _on_document_loaded(self, loaded):
+        self._finish_action()
+        document = self.workspace.active
+        if document is None or not self.workspace.restore(document, loaded):
+            return
+        self._show_document(document)
+        self._update_workspace_label()
+        self.status_message.emit(f"{self.JOB_SUCCESS_MESSAGES['load_document']}: {document.title}")
+
+    def _update_workspace_label(self):
+        used = self.workspace.used_bytes()
+        text = f"工作区内存 {perf.format_size(used)} / {perf.format_size(self.workspace.budget)}"
+        spilled = self.workspace.spilled_count()
+        if spilled:
+            text += f"，{spilled} 个文档已溢出到磁盘"
+        self.workspace_label.setText(text)
+
+    # ---- 打开文件 ----
+    def open_file(self, path=None):
+        """在后台打开磁盘上的文件（可为 gzip/bz2/xz 压缩，UTF-8/16/32 编码）作为输入"""
+        if path is None:
+            path, _ = QFileDialog.getOpenFileName(
+                self, "打开文件", "",
+                "JSON Files (*.json *.json.gz *.json.bz2 *.json.xz);;"
+                "Compressed Files (*.gz *.bz2 *.xz);;All Files (*)")
+            if not path:
+                return
+        self._job_input = self._job_document = None
+        self._submit('open_file', file_loader.load, path, size=os.path.getsize(path))
+        logger.info(f"打开文件: {path}")
+
+    def _on_file_opened(self, loaded, text):
+        """在新文档中显示文件；当前文档为空时直接使用当前文档"""
+        self._finish_action()
+        current = self.workspace.active
+        if current is not None and self._input_file is None and self.input_edit.document().isEmpty() \
+                and self.output_edit.is_empty():
+            current.title = loaded.name
+            self.document_tabs.setTabText(self.document_tabs.currentIndex(), loaded.name)
+        else:
+            self.new_document(loaded.name)
+        self._show_input_file(loaded)
+        self.input_edit.clear()
+        self.live_timer.stop()
+        document = document_cache.Document(text, loaded.revision, loaded.key, self.relaxed_check.isChecked())
+        self.document_cache.set_current(document, loaded.revision)
+        self._tree_dirty = True
+        self._live_state = None
+        self._show_dialect(None)
+        self._update_workspace_label()
+        message = f"{self.JOB_SUCCESS_MESSAGES['open_file']}: {loaded.name}，{loaded.describe()}"
+        logger.success(message)
+        self.status_message.emit(message)
+        self.run_live_validation()
+
+    def _show_input_file(self, loaded):
+        """切换输入区：loaded 为 None 时显示输入框，否则显示文件的只读预览"""
+        self._input_file = loaded
+        if loaded is None:
+            self.input_stack.setCurrentIndex(0)
+            self.file_preview.clear()
+            return
+        shown = f"，预览前 {loaded.preview_lines:,} 行" if loaded.preview_lines < loaded.line_count else ""
+        self.file_label.setText(f"{loaded.path}\n{loaded.describe()}{shown}")
+        self.file_preview.set_store(loaded.preview)
+        self.input_stack.setCurrentIndex(1)
+
+    def edit_file_in_editor(self):
+        """把打开的文件内容放入输入框，之后按普通输入处理"""
+        if self._input_file is None:
+            return
+        document = self._current_document()
+        self._show_input_file(None)
+        self.input_edit.setPlainText(document.text)
+        # 内容未变，修订号换成输入框的，解析结果和已缓存的输出继续有效
+        self.document_cache.set_current(document, self.input_edit.document().revision())
+
+    # ---- 历史 ----
+    def show_history(self):
+        if self._history_dialog is None:
+            self._history_dialog = HistoryDialog(self.history, self)
+            self._history_dialog.open_requested.connect(self.open_history_entry)
+        self._history_dialog.show()
+        self._history_dialog.raise_()
+
+    def open_history_entry(self, entry):
+        """在后台读回历史条目的输入和全部结果"""
+        self._job_input = self._job_document = None
+        self._submit('load_history', self.history.load, entry, size=entry.size)
+
+    def _on_history_loaded(self, item):
+        """在新文档中打开历史条目；已缓存的结果放入渲染缓存，格式化等操作直接命中"""
+        self._finish_action()
+        self.new_document(item.entry.preview[:12] or None)
+        self.input_edit.setPlainText(item.text)
+        document = self._current_document()
+        shown = None
+        for (name, options), result in item.outputs.items():
+            dialect = json.loads(options)['dialect']
+            document.dialect = dialect
+            self.document_cache.put(document, name, result)
+            if shown is None or name == 'format':
+                shown = (dialect, result)
+        if shown is not None:
+            document.dialect, result = shown
+            if isinstance(result, tuple):
+                self.output_edit.set_store(result[0])
+                self.output_edit.set_structure(result[1])
+            else:
+                self.output_edit.set_store(result)
+            self._show_dialect(document.dialect)
+        self.history.touch(item.entry.hash)
+        names = '、'.join(self.JOB_LABELS.get(name, name) for name, _ in item.outputs)
+        message = f"{self.JOB_SUCCESS_MESSAGES['load_history']}（{perf.format_size(item.entry.size)}）"
+        self.status_message.emit(f"{message}，{names}结果取自缓存" if names else message)
+        logger.info(message)
+
+    # ---- 查询 ----
+    def _compile_query(self):
+        text = self.query_input.text().strip()
+        if not text:
+            self.status_message.emit("请输入 JSONPath 或 jq 查询")
+            return None
+        try:
+            return json_query.compile_query(text)
+        except json_query.QueryError as e:
+            self.status_message.emit(f"查询语法错误：{e}")
+            return None
+
+    def run_query(self):
+        """对输入框内容执行查询，解析结果在文档上共享"""
+        query = self._compile_query()
+        if query is None:
+            return
+        document = self._current_document()
+        self._job_input = self._job_document = None
+        self._submit('query', self._query_document, document, query, size=len(document.text), sink=LineStore())
+        logger.info(f"{query.language} 查询: {query.text}")
+
+    def query_file(self):
+        """对磁盘上的JSON文件执行查询，不经过输入框"""
+        query = self._compile_query()
+        if query is None:
+            return
+        source, _ = QFileDialog.getOpenFileName(
+            self, "打开JSON文件", "", "JSON Files (*.json);;All Files (*)")
+        if not source:
+            return
+        self._job_input = self._job_document = None
+        self._submit('query_file', self._query_file, source, query, size=os.path.getsize(source), sink=LineStore())
+        mode = '流式' if query.streamable else '完整解析后'
+        logger.info(f"{query.language} 查询（{mode}）: {query.text} @ {source}")
+
+    @staticmethod
+    def _query_document(document, query, job=None, sink=None):
+        data = document.parse(job)
+        return JsonFormatterPage._write_query_results(query.values(data, job), job, sink)
+
+    @staticmethod
+    def _query_file(path, query, job=None, sink=None):
+        if query.streamable:
+            values = query.stream_file(path, job)
+        else:
+            with perf.span('解析', os.path.getsize(path)):
+                with open(path, encoding='utf-8-sig') as f:
+                    values = query.values(json.load(f), job)
+        return JsonFormatterPage._write_query_results(values, job, sink)
+
+    @staticmethod
+    def _write_query_results(values, job, sink):
+        """结果写成JSON数组并建立结构索引，返回 ((LineStore, StructureIndex), 结果条数)"""
+        with perf.span('查询') as stage:
+            count = json_query.write_results(values, sink, job)
+            sink.finish()
+            stage.size = sink.nbytes
+        return (sink, StructureIndex.build(sink, job)), count
+
+    # ---- 修复 ----
+    def test_fix_json(self, json_string=None):
+        """修复 json_string（默认为输入框内容）中的常见错误，格式化显示结果并列出每处修改"""
+        text = self._current_document().text if json_string is None else json_string
+        self._job_input, self._job_document = text, None
+        self._submit('repair', self._repair_and_format, text, size=len(text), sink=LineStore())
+
+    @staticmethod
+    def _repair_and_format(text, job=None, sink=None):
+        with perf.span('修复', len(text)):
+            repaired = json_repair.repair(text, job)
+        document = document_cache.Document(repaired.text)
+        return document_cache.render(document, 'format', job, sink), repaired.fixes
+
+    def _report_fixes(self, fixes):
+        if not fixes:
+            self.status_message.emit("输入是合法的JSON，无需修复")
+            return
+        for fix in fixes[:self.FIX_LOG_LIMIT]:
+            logger.info(f"修复 {fix}")
+        if len(fixes) > self.FIX_LOG_LIMIT:
+            logger.info(f"……另有 {len(fixes) - self.FIX_LOG_LIMIT:,} 处修改未列出")
+        self.status_message.emit(f"已修复 {len(fixes):,} 处问题，首处 {fixes[0]}（详见日志）")
@@ -0,0 +1,158 @@
+import json
+
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, Qt
+from PyQt5.QtGui import QColor
+
+from src.utils import structure_index
+
+
+class _Node:
+    """树节点，只有在父节点展开并分页加载后才会创建"""
+    __slots__ = ('parent', 'row', 'key', 'value', 'children', 'pending')
+
+    def __init__(self, parent, row, key, value):
+        self.parent = parent
+        self.row = row
+        self.key = key
+        self.value = value
+        self.children = []
+        self.pending = None  # 尚未加载的子项迭代器，首次加载时创建
+
+    def is_container(self):
+        return isinstance(self.value, (dict, list)) and len(self.value) > 0
+
+    def has_more(self):
+        return self.is_container() and len(self.children) < len(self.value)
+
+
+class JsonTreeModel(QAbstractItemModel):
+    """按需加载的JSON树模型
+
+    子节点在 fetchMore 中按页创建，大数组每次只加载 PAGE_SIZE 行；
+    容器的摘要只用 len() 计算，不遍历子项。内存随展开的节点数增长，
+    与文档总大小无关。
+    """
+    PAGE_SIZE = 2000
+    HEADERS = ['键', '值', '类型']
+    VALUE_PREVIEW = 200
+
+    TYPE_NAMES = {
+        dict: 'object',
+        list: 'array',
+        str: 'string',
+        bool: 'boolean',
+        int: 'number',
+        float: 'number',
+        type(None): 'null',
+    }
+    TYPE_COLORS = {
+        'string': QColor('#A31515'),
+        'number': QColor('#098658'),
+        'boolean': QColor('#0000FF'),
+        'null': QColor('#0000FF'),
+    }
+
+    def __init__(self, data, parent=None):
+        super().__init__(parent)
+        self._root = _Node(None, 0, None, [data])
+        self.fetchMore(QModelIndex())
+
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self._root
+
+    # ---- 结构 ----
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if 0 <= row < len(node.children) and 0 <= column < len(self.HEADERS):
+            return self.createIndex(row, column, node.children[row])
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self._root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        return self._node(parent).is_container()
+
+    # ---- 分页加载 ----
+    def canFetchMore(self, parent):
+        return self._node(parent).has_more()
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if not node.has_more():
+            return
+        if node.pending is None:
+            value = node.value
+            node.pending = iter(value.items()) if isinstance(value, dict) else enumerate(value)
+        first = len(node.children)
+        count = min(self.PAGE_SIZE, len(node.value) - first)
+        self.beginInsertRows(parent, first, first + count - 1)
+        for row in range(first, first + count):
+            key, value = next(node.pending)
+            node.children.append(_Node(node, row, key, value))
+        if not node.has_more():
+            node.pending = None
+        self.endInsertRows()
+
+    # ---- 显示 ----
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        column = index.column()
+        type_name = self.TYPE_NAMES.get(type(node.value), type(node.value).__name__)
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return self._key_text(node)
+            if column == 1:
+                return self._summary(node.value)
+            return type_name
+        if role == Qt.ForegroundRole and column == 1:
+            return self.TYPE_COLORS.get(type_name)
+        if role == Qt.ToolTipRole and column == 1 and isinstance(node.value, str):
+            return node.value[:4000]
+        return None
+
+    @staticmethod
+    def _key_text(node):
+        if node.parent is None or node.parent.parent is None:
+            return '$'
+        if isinstance(node.parent.value, list):
+            return f'[{node.key}]'
+        return str(node.key)
+
+    def _summary(self, value):
+        if isinstance(value, dict):
+            return f'{{…}} {len(value):,} 个键'
+        if isinstance(value, list):
+            return f'[…] {len(value):,} 项'
+        if isinstance(value, str) and len(value) > self.VALUE_PREVIEW:
+            value = value[:self.VALUE_PREVIEW] + '…'
+        return json.dumps(value, ensure_ascii=False)
+
+    def path(self, index):
+        """返回节点的JSONPath，如 $.data.items[3].id；含 .、空格、括号或引号的键名加引号，如 $["a.b"]"""
+        parts = []
+        node = self._node(index)
+        while node.parent is not None and node.parent.parent is not None:
+            parts.append(node.key)
+            node = node.parent
+        return structure_index.format_path(reversed(parts))
@@ -1,9 +1,56 @@
-from PyQt5.QtWidgets import (QSplitter, QListWidget, QTabWidget, QHBoxLayout, QMenuBar, QMenu, QAction)
+from PyQt5.QtWidgets import (QSplitter, QListWidget, QTabWidget, QHBoxLayout, QMenuBar, QMenu, QAction,
+                             QProgressBar, QWidget, QVBoxLayout, QListWidgetItem, QApplication)
 from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QIcon, QKeySequence
 from loguru import logger
-from . import json_formatter
+import os
 import weakref
-import src.ui.home_page as home_page
+
+from src import plugin_manager
+from src.utils import perf, startup
+
+
+class LazyTab(QWidget):
+    """标签页占位容器，第一次选中时才加载插件并构建页面，可卸载以释放内存"""
+
+    def __init__(self, manager, manifest, on_created=None):
+        super().__init__()
+        self.manager = manager
+        self.manifest = manifest
+        self.page = None
+        self._on_created = on_created
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    def ensure_page(self):
+        if self.page is None:
+            with perf.track(f'打开{self.manifest.name}'):
+                with perf.span('导入') as import_stage:
+                    page_class = self.manager.load(self.manifest).page_class()
+                with perf.span('构建') as build_stage:
+                    self.page = page_class()
+            import_time, build_time = import_stage.seconds, build_stage.seconds
+            self.layout().addWidget(self.page)
+            logger.info(f"工具页“{self.manifest.name}”已加载：导入 {import_time * 1000:.1f} ms，"
+                        f"构建 {build_time * 1000:.1f} ms")
+            if not startup.is_reported():
+                startup.record(f'{self.manifest.name} 模块', import_time, startup.IMPORT)
+                startup.record(f'{self.manifest.name} 页面', build_time, startup.BUILD)
+            if self._on_created is not None:
+                self._on_created(self.page)
+        return self.page
+
+    def unload_page(self):
+        """销毁页面并卸载插件，下次选中时重新加载"""
+        if self.page is None:
+            return
+        if hasattr(self.page, 'shutdown'):
+            self.page.shutdown()
+        self.layout().removeWidget(self.page)
+        self.page.deleteLater()
+        self.page = None
+        self.manager.unload(self.manifest)
+
 
 def setup_main_window(main_window, tabs):
     # 设置全局样式
@@ -72,11 +119,57 @@ def setup_main_window(main_window, tabs):
             background-color: #e0e0e0; /* 鼠标悬停时的浅灰色背景 */
         }
     """)
-    menu_list.addItems(['首页', 'JSON格式化'])
+    # 插件清单来自磁盘索引，列出工具时不导入插件模块
+    manager = plugin_manager.PluginManager()
+    with startup.measure('插件清单'):
+        manifests = manager.discover()
+    for manifest in manifests:
+        item = QListWidgetItem(manifest.name)
+        if manifest.icon:
+            icon = QIcon(manifest.icon) if os.path.exists(manifest.icon) else QIcon.fromTheme(manifest.icon)
+            item.setIcon(icon)
+        menu_list.addItem(item)
+
+    # 添加状态栏
+    status_bar = main_window.statusBar()
+    status_bar.showMessage('就绪')
+
+    # 后台任务进度条，仅在任务运行时显示
+    progress_bar = QProgressBar()
+    progress_bar.setMaximumWidth(200)
+    progress_bar.setTextVisible(False)
+    progress_bar.hide()
+    status_bar.addPermanentWidget(progress_bar)
+
+    def on_job_progress(percent, message):
+        if percent < 0:
+            progress_bar.setRange(0, 0)  # 进度未知时显示忙碌动画
+        else:
+            progress_bar.setRange(0, 100)
+            progress_bar.setValue(percent)
+        if message:
+            status_bar.showMessage(message)
+
+    def on_page_created(page):
+        # 有后台任务的页面把进度和状态消息接到状态栏
+        if hasattr(page, 'progress_changed'):
+            page.progress_changed.connect(on_job_progress)
+        if hasattr(page, 'status_message'):
+            page.status_message.connect(status_bar.showMessage)
+        if hasattr(page, 'busy_changed'):
+            page.busy_changed.connect(progress_bar.setVisible)
 
-    # 右侧内容标签窗口
-    tabs.addTab(home_page.HomePage(), '首页')
-    tabs.addTab(json_formatter.JsonFormatterPage(), 'JSON格式化')
+    main_window._progress_bar = progress_bar
+
+    # 右侧内容标签窗口：只放占位容器，页面在首次选中时构建
+    for manifest in manifests:
+        tabs.addTab(LazyTab(manager, manifest, on_page_created), manifest.name)
+    manager.start_autostart_workers()
+
+    def ensure_tab(index):
+        widget = tabs.widget(index)
+        if isinstance(widget, LazyTab):
+            widget.ensure_page()
 
     # 将菜单列表和标签页添加到分割器中
     splitter.addWidget(menu_list)
@@ -122,6 +215,7 @@ def setup_main_window(main_window, tabs):
             
             # 确保索引有效
             if 0 <= index < menu_list.count():
+                ensure_tab(index)
                 menu_list.setCurrentRow(index)
             else:
                 logger.warning(f"无效的菜单索引: {index}")
@@ -149,6 +243,7 @@ def setup_main_window(main_window, tabs):
             
             # 确保索引有效
             if 0 <= index < tabs.count():
+                ensure_tab(index)
                 tabs.setCurrentIndex(index)
             else:
                 logger.warning(f"无效的标签页索引: {index}")
@@ -163,34 +258,84 @@ def setup_main_window(main_window, tabs):
     # 设置默认选中项
     menu_list.setCurrentRow(0)
     tabs.setCurrentIndex(0)
+    if tabs.count():
+        ensure_tab(0)
     logger.debug("currentRowChanged信号连接后")
 
     # 保存引用以防止提前销毁
     main_window._menu_list = menu_list
     main_window._tabs = tabs
     main_window._splitter = splitter
+    main_window._plugin_manager = manager
+
+    # 右键菜单：卸载已加载的工具页以释放内存（当前显示的页面不可卸载）
+    def on_menu_context(pos):
+        index = menu_list.indexAt(pos).row()
+        widget = tabs.widget(index) if index >= 0 else None
+        if not isinstance(widget, LazyTab):
+            return
+        context_menu = QMenu(menu_list)
+        unload_action = context_menu.addAction('卸载')
+        unload_action.setEnabled(widget.page is not None and index != tabs.currentIndex())
+        if context_menu.exec_(menu_list.mapToGlobal(pos)) is unload_action:
+            widget.unload_page()
+            status_bar.showMessage(f"已卸载：{widget.manifest.name}")
+
+    menu_list.setContextMenuPolicy(Qt.CustomContextMenu)
+    menu_list.customContextMenuRequested.connect(on_menu_context)
     
     # 添加清理方法
+    cleaned = False
+
     def cleanup():
+        nonlocal cleaned
+        if cleaned:
+            return
+        cleaned = True
         logger.debug("执行清理操作")
         try:
             tabs = tabs_ref()
             if tabs is not None:
                 tabs.currentChanged.disconnect(on_tab_changed)
+                # 卸载已加载的页面：取消后台任务、写完排队的历史记录并删除工作区的溢出文件
+                for i in range(tabs.count()):
+                    widget = tabs.widget(i)
+                    if isinstance(widget, LazyTab):
+                        try:
+                            widget.unload_page()
+                        except Exception as e:
+                            logger.error(f"卸载工具页“{widget.manifest.name}”时发生错误: {e}")
             menu_list = menu_list_ref()
             if menu_list is not None:
                 menu_list.currentRowChanged.disconnect(on_menu_changed)
+            manager.shutdown()
         except Exception as e:
             logger.error(f"清理过程中发生错误: {e}")
-    
-    # 将清理方法与窗口关闭事件关联
+
+    # 退出事件循环时清理；主窗口不一定在解释器退出前被销毁，destroyed 只作为补充
+    QApplication.instance().aboutToQuit.connect(cleanup)
     main_window.destroyed.connect(cleanup)
 
     # 添加菜单栏
     menubar = main_window.menuBar()
     file_menu = menubar.addMenu('文件')
+
+    def on_open_file():
+        # 当前页面能打开文件时交给它，否则切换到第一个声明 opens_files 的工具
+        widget = tabs.currentWidget()
+        if not (isinstance(widget, LazyTab) and hasattr(widget.page, 'open_file')):
+            index = next((i for i in range(tabs.count())
+                          if isinstance(tabs.widget(i), LazyTab) and tabs.widget(i).manifest.opens_files), None)
+            if index is None:
+                status_bar.showMessage('没有可以打开文件的工具')
+                return
+            tabs.setCurrentIndex(index)
+            widget = tabs.widget(index)
+        widget.ensure_page().open_file()
+
+    open_action = QAction('打开文件', main_window)
+    open_action.setShortcut(QKeySequence.Open)
+    open_action.triggered.connect(on_open_file)
+    file_menu.addAction(open_action)
     help_menu = menubar.addMenu('帮助')
 
-    # 添加状态栏
-    status_bar = main_window.statusBar()
-    status_bar.showMessage('就绪')
@@ -0,0 +1,142 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QPlainTextEdit, QSplitter)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFont
+import time
+
+from src.utils import perf
+
+
+class PerformancePage(QWidget):
+    """最近操作的耗时明细、p50/p95 统计和 cProfile 分析结果"""
+
+    # 页面可见时检查新记录的间隔（毫秒）
+    REFRESH_INTERVAL = 1000
+    # 最近操作表中显示的条数
+    RECENT_ROWS = 100
+
+    SUMMARY_HEADERS = ['操作', '次数', 'p50 (ms)', 'p95 (ms)', '最近 (ms)']
+    RECENT_HEADERS = ['时间', '操作', '状态', '总耗时 (ms)', '各阶段', '数据量', '内存峰值']
+
+    def __init__(self):
+        super().__init__()
+        self._revision = None
+        self.init_ui()
+        self.setStyleSheet("""
+            QWidget {
+                font-family: 'Segoe UI', 'Microsoft YaHei', sans-serif;
+                font-size: 14px;
+                background-color: #f5f7fa;
+                color: #333333;
+            }
+            QTableWidget, QPlainTextEdit {
+                background-color: white;
+                border: 1px solid #ccc;
+                border-radius: 6px;
+            }
+        """)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start(self.REFRESH_INTERVAL)
+        self.refresh()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        options = QHBoxLayout()
+        self.profile_check = QCheckBox('用 cProfile 分析下一次操作')
+        self.profile_check.toggled.connect(perf.request_profile)
+        self.memory_check = QCheckBox('测量内存峰值（tracemalloc，会拖慢操作）')
+        self.memory_check.setChecked(perf.memory_tracing())
+        self.memory_check.toggled.connect(perf.set_memory_tracing)
+        clear_btn = QPushButton('清空记录')
+        clear_btn.clicked.connect(perf.clear)
+        options.addWidget(self.profile_check)
+        options.addWidget(self.memory_check)
+        options.addStretch()
+        options.addWidget(clear_btn)
+        layout.addLayout(options)
+
+        splitter = QSplitter(Qt.Vertical)
+        self.summary_table = self._create_table(self.SUMMARY_HEADERS)
+        self.recent_table = self._create_table(self.RECENT_HEADERS)
+        self.recent_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.profile_label = QLabel('cProfile：尚无分析结果')
+        self.profile_view = QPlainTextEdit()
+        self.profile_view.setReadOnly(True)
+        self.profile_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.profile_view.setFont(QFont('Consolas', 10))
+        profile_panel = QWidget()
+        profile_layout = QVBoxLayout(profile_panel)
+        profile_layout.setContentsMargins(0, 0, 0, 0)
+        profile_layout.addWidget(self.profile_label)
+        profile_layout.addWidget(self.profile_view)
+        for widget in (self.summary_table, self.recent_table, profile_panel):
+            splitter.addWidget(widget)
+        splitter.setSizes([150, 300, 250])
+        layout.addWidget(splitter)
+
+    @staticmethod
+    def _create_table(headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setSelectionBehavior(QTableWidget.SelectRows)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        return table
+
+    @staticmethod
+    def _set_row(table, row, values):
+        for column, value in enumerate(values):
+            item = QTableWidgetItem(value)
+            if column and value[:1].isdigit():
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            table.setItem(row, column, item)
+
+    def refresh(self):
+        """有新记录且页面可见时刷新表格"""
+        if self.profile_check.isChecked() and not perf.profile_pending():
+            self.profile_check.blockSignals(True)
+            self.profile_check.setChecked(False)
+            self.profile_check.blockSignals(False)
+        revision = perf.revision()
+        if revision == self._revision or not self.isVisible():
+            return
+        self._revision = revision
+
+        summary = sorted(perf.summary().items())
+        self.summary_table.setRowCount(len(summary))
+        for row, (name, (count, p50, p95, last)) in enumerate(summary):
+            self._set_row(self.summary_table, row,
+                          [name, f'{count}', f'{p50 * 1000:.1f}', f'{p95 * 1000:.1f}', f'{last * 1000:.1f}'])
+
+        recent = perf.history()[-self.RECENT_ROWS:][::-1]
+        self.recent_table.setRowCount(len(recent))
+        for row, action in enumerate(recent):
+            stages = ', '.join(f'{stage.name} {stage.seconds * 1000:.1f}' for stage in action.stages)
+            self._set_row(self.recent_table, row, [
+                time.strftime('%H:%M:%S', time.localtime(action.wall_time)),
+                action.name,
+                action.status,
+                f'{action.duration * 1000:.1f}',
+                stages,
+                perf.format_size(action.size) if action.size else '-',
+                perf.format_size(action.peak_memory) if action.peak_memory is not None else '-',
+            ])
+
+        profiled = perf.last_profiled()
+        if profiled is None:
+            self.profile_label.setText('cProfile：尚无分析结果')
+            self.profile_view.clear()
+        else:
+            stamp = time.strftime('%H:%M:%S', time.localtime(profiled.wall_time))
+            self.profile_label.setText(f'cProfile：{profiled.name}（{stamp}，{profiled.duration * 1000:.1f} ms）')
+            self.profile_view.setPlainText(profiled.profile)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def shutdown(self):
+        self._timer.stop()
@@ -0,0 +1,435 @@
+"""YAML、XML 和 Python 字典格式的流式转换
+
+三种输出都由写入器逐块写到 sink（LineStore 或打开的文件），不拼接完整字符串，
+输出与原先的实现逐字节相同：
+
+- YAML：yaml.dump，装有 libyaml 时使用 C 实现的 CDumper。少数字符串 libyaml 的
+  输出与纯 Python 的 Dumper 不同，数据中有这样的字符串时仍用 Dumper；
+- XML：与 dicttoxml(data, attr_type=False) 相同的输出，由非递归的写入器生成。
+  dicttoxml 在每一层都对整棵子树做日志格式化，在 Python 3.10 以后也无法导入；
+- Python字典：与 pprint.pformat(data, indent=4, width=80) 相同的输出。pprint
+  在每一层都计算整棵子树的 repr 来判断能否放进一行，耗时与数据量乘以嵌套深度
+  成正比；这里计算 repr 时超过行宽立即停止，总耗时与数据量成正比。
+
+XML 和 Python字典的写入器用显式栈代替递归，嵌套再深也不会超出递归深度限制。
+"""
+import re
+
+# 写入 sink 的块大小（字符数）
+CHUNK_SIZE = 256 * 1024
+
+PYTHON_HEADER = '# Python字典\n'
+# 与 pprint.pformat(data, indent=4, width=80) 相同
+PYTHON_INDENT = 4
+PYTHON_WIDTH = 80
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" ?>'
+XML_ROOT = 'root'
+XML_ITEM = 'item'
+# 键名合法性检查结果的缓存上限
+_NAME_CACHE_LIMIT = 64 * 1024
+
+
+class ChunkWriter:
+    """把小片段攒成 CHUNK_SIZE 大小的块写入 sink，每写一块检查一次取消并上报进度
+
+    进度按已输出长度与 size_hint 之比估算。
+    """
+
+    def __init__(self, sink, job=None, size_hint=0, start=40, end=95):
+        self.sink = sink
+        self.job = job
+        self.size_hint = max(1, size_hint)
+        self.start = start
+        self.end = end
+        self.emitted = 0
+        self._parts = []
+        self._size = 0
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.sink.write(''.join(self._parts))
+            self.emitted += self._size
+            self._parts = []
+            self._size = 0
+        if self.job is not None:
+            self.job.check_cancelled()
+            self.job.report(min(self.end, self.start + (self.end - self.start) * self.emitted // self.size_hint))
+
+    def close(self):
+        self.flush()
+        return self.sink
+
+
+class _StringSink:
+    def __init__(self):
+        self.parts = []
+        self.write = self.parts.append
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+
+def to_string(writer, data, **options):
+    """调用写入器并返回完整字符串"""
+    sink = _StringSink()
+    writer(data, sink, **options)
+    return sink.getvalue()
+
+
+# ---------------------------------------------------------------- YAML
+
+# libyaml 的输出在以下情况与纯 Python 的 Dumper 不同：非 BMP 字符（libyaml 会
+# 转义）、回车等换行字符、空键名和含特殊字符的键名（libyaml 改用 ? 复杂键），
+# 以及需要折行的双引号字符串（两者折行的位置不同）；单独的代理项 libyaml 无法编码
+_YAML_SPECIAL_RE = re.compile('[^\x20-\x7e\xa0-\ud7ff\ue000-\ufefe\uff00-\ufffd]')
+_YAML_DIVERGENT_RE = re.compile('[\r\x85\u2028\u2029\ud800-\udfff\U00010000-\U0010ffff]')
+# 一个转义序列最多占的列数（如 \uFEFF）
+_YAML_ESCAPE_WIDTH = 6
+_YAML_WIDTH = 80
+
+
+def _yaml_string_compatible(text, depth, key_length):
+    if _YAML_DIVERGENT_RE.search(text):
+        return False
+    # 含特殊字符的字符串以双引号输出，按最宽的转义估算，保证不会到达折行宽度
+    return (_YAML_SPECIAL_RE.search(text) is None
+            or 4 * depth + _YAML_ESCAPE_WIDTH * (len(text) + key_length) + 8 <= _YAML_WIDTH)
+
+
+def libyaml_compatible(data):
+    """data 用 CDumper 输出是否与 Dumper 完全相同（保守判断，不确定时返回 False）"""
+    if not isinstance(data, (dict, list)):
+        # 顶层标量时 Dumper 会多写一个文档结束标记
+        return False
+    stack = [(data, 1)]
+    while stack:
+        value, depth = stack.pop()
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if not key or _YAML_SPECIAL_RE.search(key):
+                    return False
+                if type(item) is str:
+                    if not _yaml_string_compatible(item, depth, len(key)):
+                        return False
+                elif isinstance(item, (dict, list)):
+                    stack.append((item, depth + 1))
+        else:
+            for item in value:
+                if type(item) is str:
+                    if not _yaml_string_compatible(item, depth, 0):
+                        return False
+                elif isinstance(item, (dict, list)):
+                    stack.append((item, depth + 1))
+    return True
+
+
+def yaml_dumper(data):
+    """libyaml 可用且输出与纯 Python 实现相同时返回 CDumper，否则返回 Dumper"""
+    import yaml
+    if yaml.__with_libyaml__ and libyaml_compatible(data):
+        return yaml.CDumper
+    return yaml.Dumper
+
+
+def write_yaml(data, sink, job=None, size_hint=0):
+    """写出与 yaml.dump(data, indent=4, allow_unicode=True) 相同的 YAML"""
+    import yaml
+    out = ChunkWriter(sink, job, size_hint)
+    yaml.dump(data, out, Dumper=yaml_dumper(data), indent=4, allow_unicode=True)
+    return out.close()
+
+
+# ---------------------------------------------------------------- XML
+
+# 一定合法的元素名；其他名称（包括以 xml 开头的）交给 XML 解析器判断
+_SIMPLE_NAME_RE = re.compile(r'(?!(?i:xml))[A-Za-z_][A-Za-z0-9_.\-]*\Z')
+_name_cache = {}
+
+
+def _escape_xml(text):
+    return (text.replace('&', '&amp;').replace('"', '&quot;').replace("'", '&apos;')
+            .replace('<', '&lt;').replace('>', '&gt;'))
+
+
+def _is_valid_name(name):
+    """与 dicttoxml 相同的判断：能否作为元素名被 minidom 解析"""
+    if _SIMPLE_NAME_RE.match(name):
+        return True
+    from xml.dom.minidom import parseString
+    try:
+        parseString(f'{XML_DECLARATION}<{name}>foo</{name}>')
+        return True
+    except Exception:
+        return False
+
+
+def _valid_name(key):
+    """与 dicttoxml 的 make_valid_xml_name 相同：返回 (元素名, name 属性或 None)
+
+    先转义；不合法时，纯数字前加 n，空格换成下划线后合法则替换，否则元素名为
+    key，原名放进 name 属性。
+    """
+    result = _name_cache.get(key)
+    if result is None:
+        name = _escape_xml(key)
+        if _is_valid_name(name):
+            result = (name, None)
+        elif name.isdigit():
+            result = ('n' + name, None)
+        elif _is_valid_name(name.replace(' ', '_')):
+            result = (name.replace(' ', '_'), None)
+        else:
+            result = ('key', name)
+        if len(_name_cache) >= _NAME_CACHE_LIMIT:
+            _name_cache.clear()
+        _name_cache[key] = result
+    return result
+
+
+def _xml_type(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, dict):
+        return 'dict'
+    if isinstance(value, list):
+        return 'list'
+    return type(value).__name__
+
+
+def _attrs(name_attr, value, attr_type):
+    text = f' name="{name_attr}"' if name_attr is not None else ''
+    if attr_type:
+        text += f' type="{_xml_type(value)}"'
+    return text
+
+
+def _scalar_element(key, value, attr_type, name_attr=None):
+    """标量元素；元素名再经过一次 _valid_name（dicttoxml 的 convert_kv 也是如此）"""
+    name, attr = _valid_name(key)
+    if attr is None:
+        attr = name_attr
+    if value is None:
+        text = ''
+    elif type(value) is str:
+        text = _escape_xml(value)
+    else:
+        text = str(value)
+    return f'<{name}{_attrs(attr, value, attr_type)}>{text}</{name}>'
+
+
+def write_xml(data, sink, job=None, size_hint=0, root=XML_ROOT, item_name=XML_ITEM, attr_type=False):
+    """写出与 dicttoxml(data, custom_root=root, attr_type=attr_type) 相同的 XML
+
+    item_name 为数组元素的元素名，也可以是函数：参数为父元素名，返回元素名。
+    attr_type 为 True 时每个元素带 type 属性（str、int、float、bool、null、dict、list）。
+    顶层为标量时 dicttoxml 会报错，这里输出为根元素下的一个数组元素。
+    """
+    out = ChunkWriter(sink, job, size_hint)
+    write = out.write
+    item_for = item_name if callable(item_name) else (lambda parent: item_name)
+    write(f'{XML_DECLARATION}<{root}>')
+
+    # 栈中每一项为 (元素迭代器, 是否为对象, 父元素名, 数组元素名, 结束标签)
+    stack = []
+
+    def push(value, parent, closing):
+        if isinstance(value, dict):
+            stack.append((iter(value.items()), True, parent, None, closing))
+        else:
+            stack.append((iter(value), False, parent, item_for(parent), closing))
+
+    if isinstance(data, (dict, list)):
+        push(data, root, '')
+    else:
+        write(_scalar_element(item_for(root), data, attr_type))
+
+    end = object()
+    while stack:
+        items, is_dict, parent, item, closing = stack[-1]
+        entry = next(items, end)
+        if entry is end:
+            stack.pop()
+            write(closing)
+            continue
+        if is_dict:
+            key, value = entry
+            name, attr = _valid_name(key)
+            if isinstance(value, (dict, list)):
+                write(f'<{name}{_attrs(attr, value, attr_type)}>')
+                push(value, name, f'</{name}>')
+            else:
+                write(_scalar_element(name, value, attr_type, attr))
+        elif isinstance(entry, dict):
+            write(f'<{item} type="dict">' if attr_type else f'<{item}>')
+            # 数组中的对象沿用数组的父元素名
+            stack.append((iter(entry.items()), True, parent, None, f'</{item}>'))
+        elif isinstance(entry, list):
+            write(f'<{item} type="list">' if attr_type else f'<{item} >')
+            push(entry, item, f'</{item}>')
+        else:
+            write(_scalar_element(item, entry, attr_type))
+    write(f'</{root}>')
+    return out.close()
+
+
+# ---------------------------------------------------------------- Python字典
+
+def _short_repr(value, limit):
+    """与 pprint 相同的 repr（对象的键排序），长度超过 limit 时返回 None
+
+    容器逐个元素累加长度，超过 limit 立即停止，不会生成整棵子树的 repr。
+    """
+    if type(value) is str:
+        if len(value) + 2 > limit:
+            return None
+        text = repr(value)
+    elif isinstance(value, dict):
+        if not value:
+            return '{}' if limit >= 2 else None
+        parts = []
+        used = 1
+        for key in sorted(value):
+            if parts:
+                used += 2
+            # 每一步的上限都为右括号留出一个字符
+            key_text = _short_repr(key, limit - used - 1)
+            if key_text is None:
+                return None
+            used += len(key_text) + 2
+            value_text = _short_repr(value[key], limit - used - 1)
+            if value_text is None:
+                return None
+            used += len(value_text)
+            parts.append(f'{key_text}: {value_text}')
+        text = '{' + ', '.join(parts) + '}'
+    elif isinstance(value, list):
+        if not value:
+            return '[]' if limit >= 2 else None
+        parts = []
+        used = 1
+        for element in value:
+            if parts:
+                used += 2
+            element_text = _short_repr(element, limit - used - 1)
+            if element_text is None:
+                return None
+            used += len(element_text)
+            parts.append(element_text)
+        text = '[' + ', '.join(parts) + ']'
+    else:
+        text = repr(value)
+    return text if len(text) <= limit else None
+
+
+def _pprint_str(value, indent, allowance, level):
+    """与 PrettyPrinter._pprint_str 相同：按行、再按单词把长字符串拆成相邻的多个字面量"""
+    chunks = []
+    lines = value.splitlines(True)
+    if level == 1:
+        indent += 1
+        allowance += 1
+    max_width1 = max_width = PYTHON_WIDTH - indent
+    rep = ''
+    for i, line in enumerate(lines):
+        rep = repr(line)
+        if i == len(lines) - 1:
+            max_width1 -= allowance
+        if len(rep) <= max_width1:
+            chunks.append(rep)
+        else:
+            parts = re.findall(r'\S*\s*', line)
+            parts.pop()
+            max_width2 = max_width
+            current = ''
+            for j, part in enumerate(parts):
+                candidate = current + part
+                if j == len(parts) - 1 and i == len(lines) - 1:
+                    max_width2 -= allowance
+                if len(repr(candidate)) > max_width2:
+                    if current:
+                        chunks.append(repr(current))
+                    current = part
+                else:
+                    current = candidate
+            if current:
+                chunks.append(repr(current))
+    if len(chunks) == 1:
+        return rep
+    text = ('\n' + ' ' * indent).join(chunks)
+    return f'({text})' if level == 1 else text
+
+
+def _dict_items(value, indent, allowance, level):
+    """PrettyPrinter._pprint_dict：依次产生要写出的文本和待格式化的值"""
+    yield '{' + ' ' * (PYTHON_INDENT - 1)
+    indent += PYTHON_INDENT
+    allowance += 1
+    delimiter = ',\n' + ' ' * indent
+    last = len(value) - 1
+    for i, key in enumerate(sorted(value)):
+        key_text = repr(key)
+        yield key_text + ': '
+        yield (value[key], indent + len(key_text) + 2, allowance if i == last else 1, level)
+        if i != last:
+            yield delimiter
+    yield '}'
+
+
+def _list_items(value, indent, allowance, level):
+    """PrettyPrinter._pprint_list 和 _format_items"""
+    yield '[' + ' ' * (PYTHON_INDENT - 1)
+    indent += PYTHON_INDENT
+    allowance += 1
+    delimiter = ',\n' + ' ' * indent
+    last = len(value) - 1
+    for i, element in enumerate(value):
+        if i:
+            yield delimiter
+        yield (element, indent, allowance if i == last else 1, level)
+    yield ']'
+
+
+def write_python(data, sink, job=None, size_hint=0):
+    """写出与 '# Python字典\\n' + pprint.pformat(data, indent=4, width=80) 相同的文本"""
+    out = ChunkWriter(sink, job, size_hint)
+    write = out.write
+    write(PYTHON_HEADER)
+    # 栈中每一项是一个容器的生成器；单独的元组为顶层的值
+    stack = [iter([(data, 0, 0, 0)])]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        if type(entry) is str:
+            write(entry)
+            continue
+        value, indent, allowance, level = entry
+        max_width = PYTHON_WIDTH - indent - allowance
+        text = _short_repr(value, max_width)
+        if text is not None:
+            write(text)
+        elif isinstance(value, dict):
+            stack.append(_dict_items(value, indent, allowance, level + 1))
+        elif isinstance(value, list):
+            stack.append(_list_items(value, indent, allowance, level + 1))
+        elif type(value) is str:
+            write(_pprint_str(value, indent, allowance, level + 1) if value else "''")
+        else:
+            # 数字等没有专门排版的类型，超出行宽也原样写出
+            write(repr(value))
+    return out.close()
+
+
+WRITERS = {
+    'Python字典': write_python,
+    'YAML': write_yaml,
+    'XML': write_xml,
+}
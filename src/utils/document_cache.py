@@ -0,0 +1,189 @@
+"""解析一次、多处复用的文档缓存
+
+- Document: 一份输入内容，按内容哈希标识，JSON只在第一次需要时解析一次，
+  格式化、压缩、转换、校验和树形视图共用解析结果（解析错误同样只产生一次）。
+  relaxed 为 True 时标准JSON解析失败后再按JSON5解析，dialect 记录检测出的方言。
+- DocumentCache: 记录当前文档及其编辑器修订号。修订号未变时不重新读取文本；
+  修订号变了但内容哈希相同（如撤销回原内容）时沿用原文档。各格式的渲染结果
+  按 (内容哈希, 格式) 存入有内存预算的 LRU，切换格式或重复操作直接命中。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from src.utils import json_ops, perf, relaxed_json, structure_index
+from src.utils.line_store import LineStore
+
+# 渲染各阶段在性能记录中的名称，其余格式记为“转换”
+STAGES = {'format': '格式化', 'minify': '压缩'}
+
+# 渲染结果缓存的默认内存预算（按常驻内存计算，已溢出到临时文件的内容不计）
+OUTPUT_BUDGET = 256 * 1024 * 1024
+
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class Document:
+    """一份输入内容及其按需解析的数据"""
+
+    def __init__(self, text, revision=None, key=None, relaxed=False):
+        self.text = text
+        self.key = key if key is not None else content_hash(text)
+        self.revision = revision
+        self.relaxed = relaxed
+        self.dialect = None
+        self._lock = threading.Lock()
+        self._parsed = False
+        self._data = None
+        self._error = None
+        # 数据能否交给快速JSON后端序列化，见 json_backend.parse
+        self.portable = False
+
+    @property
+    def is_parsed(self):
+        return self._parsed
+
+    def parse(self, job=None):
+        """返回解析结果，多个线程同时请求时只解析一次；解析失败时重复抛出同一错误"""
+        with self._lock:
+            if not self._parsed and self._error is None:
+                if job is not None:
+                    job.report(5, '正在解析JSON')
+                try:
+                    with perf.span('解析', len(self.text)):
+                        if self.relaxed:
+                            self._data, self.portable, self.dialect = json_ops.parse_relaxed(self.text)
+                        else:
+                            self._data, self.portable = json_ops.parse_json_portable(self.text)
+                            self.dialect = relaxed_json.JSON
+                    self._parsed = True
+                except ValueError as e:
+                    self._error = e
+        if job is not None:
+            job.check_cancelled()
+        if self._error is not None:
+            raise self._error
+        return self._data
+
+
+def render(document, name, job=None, sink=None):
+    """在后台渲染文档的某种输出
+
+    name 为 'format'、'minify' 或 json_ops.CONVERTERS 中的格式名。格式化返回
+    (LineStore, StructureIndex)，其余返回 LineStore。
+    """
+    data = document.parse(job)
+    sink = sink if sink is not None else LineStore()
+    size = len(document.text)
+    with perf.span(STAGES.get(name, '转换')) as stage:
+        if name == 'format':
+            result = structure_index.format_indexed(data, job=job, sink=sink, size_hint=size,
+                                                    portable=document.portable)
+        elif name == 'minify':
+            result = json_ops.minify_data(data, job, sink, size, document.portable).finish()
+        else:
+            result = json_ops.convert_data(data, name, job, sink, size).finish()
+        stage.size = sink.nbytes
+    return result
+
+
+def _cache_key(key, name, dialect):
+    return (key, name) if dialect != relaxed_json.JSON5 else (key, name, dialect)
+
+
+def resident_size(result):
+    """渲染结果常驻内存的大致字节数"""
+    store, structure = result if isinstance(result, tuple) else (result, None)
+    size = store.resident_bytes
+    if structure is not None:
+        size += structure.resident_bytes
+    return size
+
+
+class DocumentCache:
+    """当前文档与渲染结果的LRU缓存"""
+
+    def __init__(self, budget=OUTPUT_BUDGET):
+        self.budget = budget
+        self.current = None
+        self._outputs = OrderedDict()
+        self._sizes = {}
+        self._used = 0
+
+    def document(self, read_text, revision, relaxed=False):
+        """返回与编辑器修订号对应的文档；read_text 只在修订号变化时调用
+
+        切换是否接受JSON5时换用新文档（解析结果和错误都可能不同）；标准JSON
+        文档在两种模式下的渲染结果相同，按内容哈希缓存的输出仍可共用。
+        """
+        current = self.current
+        if current is not None and current.relaxed != relaxed:
+            if current.revision == revision:
+                self.current = Document(current.text, revision, current.key, relaxed)
+                return self.current
+            current = None
+        if current is not None and current.revision == revision:
+            return current
+        text = read_text()
+        key = content_hash(text)
+        if current is not None and current.key == key:
+            current.revision = revision
+            return current
+        self.current = Document(text, revision, key, relaxed)
+        return self.current
+
+    def output(self, document, name):
+        """返回已缓存的渲染结果，没有则返回 None
+
+        按JSON5解析得到的结果单独缓存，只在接受JSON5的文档上命中；命中时
+        同时得知文档的方言。
+        """
+        dialects = (relaxed_json.JSON, relaxed_json.JSON5) if document.relaxed else (relaxed_json.JSON,)
+        for dialect in dialects:
+            cache_key = _cache_key(document.key, name, dialect)
+            result = self._outputs.get(cache_key)
+            if result is not None:
+                self._outputs.move_to_end(cache_key)
+                document.dialect = dialect
+                return result
+        return None
+
+    def put(self, document, name, result):
+        """缓存渲染结果，超出预算时淘汰最久未使用的结果"""
+        cache_key = _cache_key(document.key, name, document.dialect)
+        size = resident_size(result)
+        if size > self.budget:
+            return
+        self.discard(cache_key)
+        self._outputs[cache_key] = result
+        self._sizes[cache_key] = size
+        self._used += size
+        while self._used > self.budget:
+            self.discard(next(iter(self._outputs)))
+
+    def set_current(self, document, revision):
+        """换用另一份已有的文档（多文档工作区切换标签时），沿用其解析结果"""
+        document.revision = revision
+        self.current = document
+
+    def discard_document(self, key):
+        """丢弃某份内容的全部渲染结果"""
+        for cache_key in [cache_key for cache_key in self._outputs if cache_key[0] == key]:
+            self.discard(cache_key)
+
+    def discard(self, cache_key):
+        if cache_key in self._outputs:
+            del self._outputs[cache_key]
+            self._used -= self._sizes.pop(cache_key)
+
+    def clear(self):
+        self.current = None
+        self._outputs.clear()
+        self._sizes.clear()
+        self._used = 0
+
+    @property
+    def used_bytes(self):
+        return self._used
@@ -0,0 +1,175 @@
+"""从磁盘打开大文件作为输入
+
+文件以只读 mmap 方式映射，不先读入 Python 字节串：
+- 按开头的魔数识别 gzip、bz2、xz 压缩，在后台解压到临时文件后同样映射读取
+- 按 BOM 识别 UTF-8/16/32 编码；没有 BOM 时按 JSON 开头两个 ASCII 字符中
+  零字节的位置区分 UTF-16/32 的字节序（与 json.detect_encoding 相同），否则为 UTF-8
+- 直接从映射的内存解码为文本，交给格式化等流程；内容不放入输入框
+  （QPlainTextEdit 对几十 MB 以上的文本排版很慢），输入区只显示开头一段的只读预览
+- 字符数和行数在解码后的文本上各用一次 C 层的 len / count 得到，不逐行遍历
+"""
+import bz2
+import codecs
+import gzip
+import hashlib
+import lzma
+import mmap
+import os
+import tempfile
+
+from src.utils import perf
+from src.utils.line_store import LineStore
+
+# 魔数 → (以已打开的文件创建解压流, 名称)
+COMPRESSED = [
+    (b'\x1f\x8b', lambda f: gzip.GzipFile(fileobj=f), 'gzip'),
+    (b'BZh', bz2.BZ2File, 'bz2'),
+    (b'\xfd7zXZ\x00', lzma.LZMAFile, 'xz'),
+]
+# 先比较较长的 BOM：UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+# 输入区预览的行数和字符数上限
+PREVIEW_LINES = 2000
+PREVIEW_CHARS = 1024 * 1024
+_CHUNK = 4 * 1024 * 1024
+
+
+def sniff_encoding(head):
+    """按开头的字节返回 (编码, BOM 字节数)"""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    if len(head) >= 4:
+        if not head[0] and not head[1] and not head[2]:
+            return 'utf-32-be', 0
+        if not head[1] and not head[2] and not head[3]:
+            return 'utf-32-le', 0
+    if len(head) >= 2:
+        if not head[0]:
+            return 'utf-16-be', 0
+        if not head[1]:
+            return 'utf-16-le', 0
+    return 'utf-8', 0
+
+
+class LoadedFile:
+    """打开的文件：内容哈希、统计信息和预览
+
+    不保存文本本身：文本只由对应的 Document 持有，工作区溢出文档时才能真正释放。
+    """
+
+    def __init__(self, path, size, compression, encoding, bom, text, key, preview):
+        self.path = path
+        self.size = size
+        self.compression = compression
+        self.encoding = encoding
+        self.bom = bom
+        self.key = key
+        self.preview = preview
+        self.chars = len(text)
+        self.line_count = text.count('\n') + 1 if text else 0
+        # 作为文档修订号，与编辑器的整数修订号区分
+        self.revision = ('file', path, key)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def preview_lines(self):
+        return self.preview.line_count
+
+    def describe(self):
+        """统计信息，如“12.5 MB（gzip），UTF-16-LE 带 BOM，6,543,210 字符，123,456 行”"""
+        size = perf.format_size(self.size)
+        if self.compression is not None:
+            size += f'（{self.compression}）'
+        encoding = self.encoding.upper() + (' 带 BOM' if self.bom else '')
+        return f'{size}，{encoding}，{self.chars:,} 字符，{self.line_count:,} 行'
+
+
+def load(path, job=None):
+    """在后台打开文件，返回 (LoadedFile, 文本)；无法按识别出的编码解码时抛出 ValueError"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as handle:
+        magic = handle.read(8)
+        handle.seek(0)
+        for prefix, opener, compression in COMPRESSED:
+            if magic.startswith(prefix):
+                with tempfile.TemporaryFile(prefix='testtoolbox_open_') as temp:
+                    with perf.span('解压', size):
+                        _decompress(opener(handle), handle, size, temp, job, compression)
+                    return _load_mapped(path, size, compression, temp, job)
+        return _load_mapped(path, size, None, handle, job)
+
+
+def _decompress(source, raw, size, target, job, compression):
+    with source:
+        while True:
+            chunk = source.read(_CHUNK)
+            if not chunk:
+                break
+            target.write(chunk)
+            if job is not None:
+                job.check_cancelled()
+                job.report(raw.tell() * 50 // max(1, size), f'正在解压（{compression}）')
+    target.flush()
+
+
+def _load_mapped(path, size, compression, handle, job):
+    if os.fstat(handle.fileno()).st_size == 0:
+        return LoadedFile(path, size, compression, 'utf-8', 0, '', _bytes_key(b''), LineStore.from_text('')), ''
+    data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        encoding, bom = sniff_encoding(data[:4])
+        if job is not None:
+            job.report(50 if compression else 0, '正在解码')
+        with perf.span('解码', len(data)):
+            with memoryview(data)[bom:] as content:
+                try:
+                    text = str(content, encoding)
+                except UnicodeDecodeError as e:
+                    raise ValueError(f'无法按 {encoding.upper()} 解码：字节偏移 {e.start + bom} 处'
+                                     f'的内容无效') from None
+                if job is not None:
+                    job.check_cancelled()
+                    job.report(80, '正在计算内容哈希')
+                # UTF-8 原文就是文本的UTF-8编码，直接对映射的字节求哈希，不再编码一遍
+                key = _bytes_key(content) if encoding == 'utf-8' else _text_key(text)
+    finally:
+        data.close()
+    if job is not None:
+        job.check_cancelled()
+    return LoadedFile(path, size, compression, encoding, bom, text, key, _preview(text)), text
+
+
+def _bytes_key(data):
+    """与 document_cache.content_hash 相同的哈希，按块计算"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for start in range(0, len(data), _CHUNK):
+        hasher.update(data[start:start + _CHUNK])
+    return hasher.hexdigest()
+
+
+def _text_key(text):
+    hasher = hashlib.blake2b(digest_size=16)
+    for start in range(0, len(text), _CHUNK):
+        hasher.update(text[start:start + _CHUNK].encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def _preview(text):
+    """开头 PREVIEW_LINES 行（最多 PREVIEW_CHARS 个字符）的只读预览"""
+    end = -1
+    for _ in range(PREVIEW_LINES):
+        end = text.find('\n', end + 1, PREVIEW_CHARS)
+        if end < 0:
+            end = min(len(text), PREVIEW_CHARS)
+            break
+    return LineStore.from_text(text[:end])
@@ -0,0 +1,320 @@
+"""输入与结果的持久化历史
+
+格式化、压缩或转换成功后，输入和结果在后台写入本地历史（cache/history/）：
+- 内容按 blake2b 哈希寻址，以 zlib 压缩保存在 blobs/ 下，相同内容只存一份；
+  输入的哈希即 document_cache 中的内容哈希
+- SQLite 数据库记录每份输入（大小、首次与最近使用时间、开头的预览），以及它按
+  (格式, 选项) 得到的结果；同一输入在同一选项下的结果只写一次
+
+重新打开历史条目时直接读回缓存的结果，不再格式化。压缩后的总大小超过上限时
+按最近使用时间淘汰最旧的条目。写入在单独的后台线程中排队执行，不增加格式化
+本身的耗时；查询和读回由调用方放在后台任务中执行，每个线程使用自己的连接。
+"""
+import codecs
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from loguru import logger
+
+from src.utils import json_ops, line_store, perf
+from src.utils.line_store import LineStore
+from src.utils.structure_index import StructureIndex
+
+HISTORY_DIR = Path('cache') / 'history'
+# 压缩后总大小的上限
+HISTORY_LIMIT = 2 * 1024 * 1024 * 1024
+COMPRESS_LEVEL = 6
+PREVIEW_CHARS = 120
+_CHUNK = 4 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    preview TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inputs_used ON inputs (used);
+CREATE INDEX IF NOT EXISTS inputs_size ON inputs (size);
+CREATE TABLE IF NOT EXISTS outputs (
+    input TEXT NOT NULL REFERENCES inputs (hash) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    options TEXT NOT NULL,
+    blob TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (input, name, options)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored INTEGER NOT NULL
+);
+"""
+
+
+def options_key(name, dialect):
+    """结果的选项键：输入的方言，格式化时还有缩进"""
+    options = {'dialect': dialect}
+    if name == 'format':
+        options['indent'] = json_ops.INDENT
+    return json.dumps(options, sort_keys=True, ensure_ascii=False)
+
+
+def _text_chunks(text):
+    for start in range(0, len(text), _CHUNK):
+        yield text[start:start + _CHUNK].encode('utf-8')
+
+
+class HistoryEntry:
+    """一条历史记录：一份输入及其已缓存结果的格式名"""
+    __slots__ = ('hash', 'size', 'preview', 'created', 'used', 'formats')
+
+    def __init__(self, hash, size, preview, created, used, formats):
+        self.hash = hash
+        self.size = size
+        self.preview = preview
+        self.created = created
+        self.used = used
+        self.formats = formats
+
+
+class HistoryItem:
+    """读回的历史条目：输入文本，以及 {(格式名, 选项): 结果}"""
+
+    def __init__(self, entry, text, outputs):
+        self.entry = entry
+        self.text = text
+        self.outputs = outputs
+
+
+class History:
+    """本地历史存储"""
+
+    def __init__(self, directory=HISTORY_DIR, limit=HISTORY_LIMIT):
+        self.directory = Path(directory)
+        self.limit = limit
+        self._executor = None
+        self._lock = threading.Lock()
+        self._ready = False
+
+    # ---- 存储 ----
+    def _connect(self):
+        with self._lock:
+            if not self._ready:
+                (self.directory / 'blobs').mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.directory / 'history.sqlite3', timeout=30)
+        connection.execute('PRAGMA foreign_keys = ON')
+        with self._lock:
+            if not self._ready:
+                connection.execute('PRAGMA journal_mode = WAL')
+                connection.executescript(_SCHEMA)
+                self._ready = True
+        return connection
+
+    def _blob_path(self, digest):
+        return self.directory / 'blobs' / digest[:2] / f'{digest[2:]}.z'
+
+    def _write_blob(self, connection, chunks, digest=None):
+        """把字节块压缩写入内容寻址的 blob，返回其哈希；已知哈希且已存在时不再写入"""
+        if digest is not None and connection.execute('SELECT 1 FROM blobs WHERE hash = ?', (digest,)).fetchone():
+            return digest
+        hasher = hashlib.blake2b(digest_size=16)
+        compressor = zlib.compressobj(COMPRESS_LEVEL)
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.directory / 'blobs', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    f.write(compressor.compress(chunk))
+                f.write(compressor.flush())
+                stored = f.tell()
+            digest = hasher.hexdigest()
+            path = self._blob_path(digest)
+            if path.exists():
+                os.remove(temp_path)
+            else:
+                path.parent.mkdir(exist_ok=True)
+                os.replace(temp_path, path)
+        except BaseException:
+            _remove(temp_path)
+            raise
+        connection.execute('INSERT OR IGNORE INTO blobs (hash, size, stored) VALUES (?, ?, ?)',
+                           (digest, size, stored))
+        return digest
+
+    def _read_blob(self, digest, job=None):
+        """逐块解压 blob，产出原始字节"""
+        decompressor = zlib.decompressobj()
+        with open(self._blob_path(digest), 'rb') as f:
+            while True:
+                chunk = f.read(_CHUNK)
+                if not chunk:
+                    break
+                yield decompressor.decompress(chunk)
+                if job is not None:
+                    job.check_cancelled()
+        yield decompressor.flush()
+
+    # ---- 写入（后台线程） ----
+    def record(self, document, name, result):
+        """在后台记录输入和一种结果，立即返回"""
+        if not document.text:
+            return
+        store = result[0] if isinstance(result, tuple) else result
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history')
+        options = options_key(name, document.dialect)
+        self._executor.submit(self._record, document.key, document.text, name, options, store)
+
+    def _record(self, key, text, name, options, store):
+        try:
+            with perf.track('写入历史', len(text)):
+                connection = self._connect()
+                try:
+                    with connection:
+                        self._store(connection, key, text, name, options, store)
+                    self._prune(connection)
+                finally:
+                    connection.close()
+        except Exception as e:
+            logger.error(f"写入历史失败: {e}")
+
+    def _store(self, connection, key, text, name, options, store):
+        now = time.time()
+        if connection.execute('SELECT 1 FROM inputs WHERE hash = ?', (key,)).fetchone():
+            connection.execute('UPDATE inputs SET used = ? WHERE hash = ?', (now, key))
+        else:
+            digest = self._write_blob(connection, _text_chunks(text), key)
+            if digest != key:
+                raise ValueError(f'输入哈希不一致: {digest} != {key}')
+            connection.execute('INSERT INTO inputs (hash, size, preview, created, used) VALUES (?, ?, ?, ?, ?)',
+                               (key, len(text), _preview(text), now, now))
+        exists = connection.execute('SELECT 1 FROM outputs WHERE input = ? AND name = ? AND options = ?',
+                                    (key, name, options)).fetchone()
+        if not exists:
+            digest = self._write_blob(connection, store.iter_bytes(_CHUNK))
+            connection.execute('INSERT INTO outputs (input, name, options, blob, size, created) '
+                               'VALUES (?, ?, ?, ?, ?, ?)', (key, name, options, digest, store.nbytes, now))
+
+    def _prune(self, connection):
+        """总大小超过上限时删除最久未使用的条目，再删除不再被引用的 blob"""
+        total = connection.execute('SELECT COALESCE(SUM(stored), 0) FROM blobs').fetchone()[0]
+        if total <= self.limit:
+            return
+        with connection:
+            for (key,) in connection.execute('SELECT hash FROM inputs ORDER BY used').fetchall():
+                connection.execute('DELETE FROM inputs WHERE hash = ?', (key,))
+                total -= self._delete_unreferenced(connection)
+                if total <= self.limit:
+                    break
+        logger.info(f"历史已清理到 {perf.format_size(total)}")
+
+    def _delete_unreferenced(self, connection):
+        rows = connection.execute(
+            'SELECT hash, stored FROM blobs WHERE hash NOT IN (SELECT hash FROM inputs) '
+            'AND hash NOT IN (SELECT blob FROM outputs)').fetchall()
+        for digest, _ in rows:
+            connection.execute('DELETE FROM blobs WHERE hash = ?', (digest,))
+            _remove(self._blob_path(digest))
+        return sum(stored for _, stored in rows)
+
+    def touch(self, key):
+        """在后台更新条目的最近使用时间"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history')
+        self._executor.submit(self._touch, key)
+
+    def _touch(self, key):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute('UPDATE inputs SET used = ? WHERE hash = ?', (time.time(), key))
+        finally:
+            connection.close()
+
+    def flush(self):
+        """等待排队的写入完成"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    # ---- 查询与读回（调用方的后台任务中） ----
+    def search(self, text='', since=None, min_size=None, max_size=None, limit=500, job=None):
+        """按最近使用时间倒序列出条目；text 匹配预览，since 为时间戳，大小按输入字符数"""
+        conditions, params = [], []
+        if text:
+            conditions.append("preview LIKE ? ESCAPE '\\'")
+            escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        if since is not None:
+            conditions.append('used >= ?')
+            params.append(since)
+        if min_size is not None:
+            conditions.append('size >= ?')
+            params.append(min_size)
+        if max_size is not None:
+            conditions.append('size <= ?')
+            params.append(max_size)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                f'SELECT hash, size, preview, created, used, '
+                f'(SELECT GROUP_CONCAT(name, ",") FROM outputs WHERE input = hash) '
+                f'FROM inputs {where} ORDER BY used DESC LIMIT ?', (*params, limit)).fetchall()
+        finally:
+            connection.close()
+        return [HistoryEntry(key, size, preview, created, used, sorted(set((formats or '').split(',')) - {''}))
+                for key, size, preview, created, used, formats in rows]
+
+    def usage(self):
+        """返回 (blob 数, 压缩后总字节数)"""
+        connection = self._connect()
+        try:
+            return connection.execute('SELECT COUNT(*), COALESCE(SUM(stored), 0) FROM blobs').fetchone()
+        finally:
+            connection.close()
+
+    def load(self, entry, job=None):
+        """读回输入和它的全部结果，返回 HistoryItem；格式化结果连同重建的结构索引"""
+        connection = self._connect()
+        try:
+            outputs = connection.execute('SELECT name, options, blob FROM outputs WHERE input = ?',
+                                         (entry.hash,)).fetchall()
+        finally:
+            connection.close()
+        with perf.span('读取历史', entry.size):
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            text = ''.join(decoder.decode(chunk) for chunk in self._read_blob(entry.hash, job))
+            results = {}
+            for name, options, digest in outputs:
+                decoder = codecs.getincrementaldecoder('utf-8')(line_store.ERRORS)
+                store = LineStore()
+                for chunk in self._read_blob(digest, job):
+                    store.write(decoder.decode(chunk))
+                store.finish()
+                results[(name, options)] = (store, StructureIndex.build(store, job)) if name == 'format' else store
+        return HistoryItem(entry, text, results)
+
+
+def _preview(text):
+    return ' '.join(text[:PREVIEW_CHARS * 2].split())[:PREVIEW_CHARS]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,162 @@
+"""后台任务调度
+
+基于 QThreadPool/QRunnable 的任务引擎，用于把耗时的解析、格式化和转换
+移出GUI线程。每个 JobRunner 只关心最新提交的任务：再次提交时上一个任务会被
+标记为取消，其结果和进度都会被丢弃。
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from loguru import logger
+
+
+class JobCancelled(Exception):
+    """任务已被取消或被新任务取代"""
+
+
+class JobContext:
+    """传递给任务函数的上下文，用于上报进度和检查取消"""
+
+    def __init__(self, job_id, signals):
+        self.job_id = job_id
+        self._signals = signals
+        self._cancel_event = threading.Event()
+        self._last_percent = None
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        """任务函数应在各阶段之间调用，已取消时抛出 JobCancelled"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def report(self, percent, message=''):
+        """上报进度，percent 为 -1 表示进度未知"""
+        if self.cancelled or (percent == self._last_percent and not message):
+            return
+        self._last_percent = percent
+        self._signals.progress.emit(self.job_id, percent, message)
+
+
+class JobSignals(QObject):
+    """工作线程向GUI线程回传结果的信号"""
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+    cancelled = pyqtSignal(int)
+
+
+class _JobRunnable(QRunnable):
+    def __init__(self, context, signals, fn, args, kwargs):
+        super().__init__()
+        self.context = context
+        self.signals = signals
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        job_id = self.context.job_id
+        try:
+            result = self.fn(*self.args, job=self.context, **self.kwargs)
+            self.context.check_cancelled()
+        except JobCancelled:
+            self.signals.cancelled.emit(job_id)
+        except Exception as e:
+            self.signals.failed.emit(job_id, e)
+        else:
+            self.signals.finished.emit(job_id, result)
+
+
+class JobRunner(QObject):
+    """单通道后台任务调度器
+
+    任务函数以关键字参数 ``job`` 接收 JobContext。提交新任务时旧任务会被取消，
+    旧任务迟到的进度和结果不会再发出信号。
+    """
+    started = pyqtSignal(str)
+    progress = pyqtSignal(str, int, str)
+    finished = pyqtSignal(str, object)
+    failed = pyqtSignal(str, object)
+    cancelled = pyqtSignal(str)
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self._pool = pool or QThreadPool.globalInstance()
+        self._signals = JobSignals()
+        self._signals.progress.connect(self._on_progress)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._signals.cancelled.connect(self._on_cancelled)
+        self._next_id = 0
+        self._current = None  # (job_id, name, context)
+
+    def is_busy(self):
+        return self._current is not None
+
+    def current_name(self):
+        return self._current[1] if self._current else None
+
+    def submit(self, name, fn, *args, **kwargs):
+        """提交任务，返回任务编号；正在运行的旧任务会被取代"""
+        if self._current is not None:
+            logger.debug(f"任务 {self._current[1]} 被新任务 {name} 取代")
+            self._drop_current()
+
+        self._next_id += 1
+        context = JobContext(self._next_id, self._signals)
+        self._current = (self._next_id, name, context)
+        self._pool.start(_JobRunnable(context, self._signals, fn, args, kwargs))
+
+        self.started.emit(name)
+        self.busy_changed.emit(True)
+        return self._next_id
+
+    def cancel(self):
+        """取消当前任务"""
+        if self._current is None:
+            return
+        name = self._current[1]
+        self._drop_current()
+        logger.info(f"任务已取消: {name}")
+        self.cancelled.emit(name)
+        self.busy_changed.emit(False)
+
+    def _drop_current(self):
+        self._current[2].cancel()
+        self._current = None
+
+    def _take_if_current(self, job_id):
+        """若 job_id 是当前任务则将其出队并返回任务名"""
+        if self._current is None or self._current[0] != job_id:
+            return None
+        name = self._current[1]
+        self._current = None
+        self.busy_changed.emit(False)
+        return name
+
+    def _on_progress(self, job_id, percent, message):
+        if self._current is not None and self._current[0] == job_id:
+            self.progress.emit(self._current[1], percent, message)
+
+    def _on_finished(self, job_id, result):
+        name = self._take_if_current(job_id)
+        if name is not None:
+            self.finished.emit(name, result)
+
+    def _on_failed(self, job_id, error):
+        name = self._take_if_current(job_id)
+        if name is not None:
+            self.failed.emit(name, error)
+
+    def _on_cancelled(self, job_id):
+        # 主动取消时已经发出过 cancelled 信号，这里只处理任务自行放弃的情况
+        name = self._take_if_current(job_id)
+        if name is not None:
+            self.cancelled.emit(name)
@@ -0,0 +1,362 @@
+"""可插拔的JSON解析/序列化后端
+
+- 标准库 json 始终可用，也是错误信息的唯一来源：快速后端解析失败时一律用
+  json.loads 重新解析一次，抛出的 JSONDecodeError（消息、位置、行列号）与
+  原来完全相同，界面的错误定位和红色高亮不受影响。
+- 安装了 orjson、ujson 或 simdjson（pysimdjson）时作为快速后端。orjson 同时
+  提供序列化；ujson/simdjson 的数字和转义写法与标准库不同，只用于解析。
+- 快速后端与标准库存在差异的输入（NaN/Infinity、超出64位的整数、溢出的指数）
+  在解析前用一次字节扫描识别，这类文档解析和序列化都走标准库（见 parse）。
+  orjson 的浮点数写法（1e16、0.00001）与标准库不同，输出中出现这类数字时
+  改用标准库重新生成，保证输出逐字节一致。
+- benchmark() 在本机上按负载大小测量各后端，select() 据此为每个大小区间选出
+  最快的后端并写入日志（由JSON格式化插件的后台任务执行）；未测量前默认优先
+  使用快速后端。
+  也可以运行 ``python -m src.utils.json_backend`` 查看测量结果。
+"""
+import json
+import re
+import threading
+import time
+
+from loguru import logger
+
+# 负载大小区间的上界（字节），以及测量时各区间使用的样本大小
+SIZE_BUCKETS = (64 * 1024, 1024 * 1024, float('inf'))
+BENCH_SIZES = (16 * 1024, 256 * 1024, 2 * 1024 * 1024)
+
+OPERATIONS = ('loads', 'dumps', 'dumps_indent')
+
+# 出现这些内容的文档交给标准库处理，快速后端会静默改变其数值
+_NON_PORTABLE_TOKENS = (b'NaN', b'Infinity')
+_DIGITS_TO_ZERO = bytes.maketrans(b'123456789E', b'000000000e')
+# 19位以上的数字可能超出64位整数；三位数指数可能溢出为 inf
+_NON_PORTABLE_RUNS = (b'0' * 19, b'e000', b'e+000')
+_EXPONENT_RE = re.compile(rb'e-?[0-9]')
+_DIGITS = frozenset(b'0123456789')
+
+
+class Unsupported(Exception):
+    """后端无法生成与标准库一致的结果，调用方应改用标准库"""
+
+
+class StdlibBackend:
+    name = 'json'
+    can_dump = True
+
+    def loads(self, text):
+        return json.loads(text)
+
+    def dumps(self, data, indent=None):
+        if indent is None:
+            return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        return json.dumps(data, indent=indent, ensure_ascii=False)
+
+
+class OrjsonBackend:
+    name = 'orjson'
+    can_dump = True
+
+    def __init__(self, module):
+        self.orjson = module
+
+    def loads(self, text):
+        return self.orjson.loads(text)
+
+    def dumps(self, data, indent=None):
+        orjson = self.orjson
+        try:
+            if indent is None:
+                output = orjson.dumps(data)
+            elif isinstance(indent, int) and indent >= 2:
+                output = _reindent(orjson.dumps(data, option=orjson.OPT_INDENT_2), indent)
+            else:
+                raise Unsupported('indent')
+        except TypeError as e:
+            # 超出64位的整数、非字符串键、孤立代理字符等
+            raise Unsupported(str(e)) from e
+        if not _floats_match_stdlib(output):
+            raise Unsupported('float format')
+        return output.decode('utf-8')
+
+
+class LoadsOnlyBackend:
+    """只用于解析的快速后端（ujson、simdjson）"""
+    can_dump = False
+
+    def __init__(self, name, loads):
+        self.name = name
+        self.loads = loads
+
+    def dumps(self, data, indent=None):
+        raise Unsupported(self.name)
+
+
+def _reindent(output, indent):
+    """把 orjson 的两空格缩进改为 indent 个空格
+
+    JSON字符串内的换行总是被转义，输出中的换行只出现在结构位置。第 k 轮把深度
+    不小于 k 的行再缩进 indent - 2 个空格：此时这些行至少有 indent*(k-1)+2 个
+    前导空格，而深度为 k-1 的行只有 indent*(k-1) 个，逐层替换不会误伤。
+    """
+    if indent == 2:
+        return output
+    extra = b' ' * (indent - 2)
+    level = 1
+    while True:
+        pattern = b'\n' + b' ' * (indent * (level - 1) + 2)
+        length = len(output)
+        output = output.replace(pattern, pattern + extra)
+        if len(output) == length:
+            return output
+        level += 1
+
+
+def _floats_match_stdlib(output):
+    """输出中没有 orjson 特有的浮点数写法（指数形式、0.0000x）"""
+    if b'0.0000' in output:
+        return False
+    for match in _EXPONENT_RE.finditer(output):
+        start = match.start()
+        if start and output[start - 1] in _DIGITS:
+            return False
+    return True
+
+
+def is_portable(raw):
+    """粗略判断文档能否交给快速后端；可能误判为否，但不会误判为是"""
+    if any(token in raw for token in _NON_PORTABLE_TOKENS):
+        return False
+    digits = raw.translate(_DIGITS_TO_ZERO)
+    return not any(run in digits for run in _NON_PORTABLE_RUNS)
+
+
+def _discover():
+    """返回已安装的快速后端"""
+    backends = []
+    try:
+        import orjson
+        backends.append(OrjsonBackend(orjson))
+    except ImportError:
+        pass
+    try:
+        import ujson
+        backends.append(LoadsOnlyBackend('ujson', ujson.loads))
+    except ImportError:
+        pass
+    try:
+        import simdjson
+        backends.append(LoadsOnlyBackend('simdjson', simdjson.loads))
+    except ImportError:
+        pass
+    return backends
+
+
+STDLIB = StdlibBackend()
+BACKENDS = {STDLIB.name: STDLIB}
+BACKENDS.update((backend.name, backend) for backend in _discover())
+
+
+def _default_choice(operation):
+    candidates = [b for b in BACKENDS.values() if operation == 'loads' or b.can_dump]
+    fast = [b for b in candidates if b is not STDLIB]
+    return (fast or candidates)[0].name
+
+
+# operation -> 每个大小区间选用的后端名
+_selection = {op: [_default_choice(op)] * len(SIZE_BUCKETS) for op in OPERATIONS}
+_selection_lock = threading.Lock()
+_selected = False
+
+
+def _bucket(size):
+    for i, limit in enumerate(SIZE_BUCKETS):
+        if size <= limit:
+            return i
+    return len(SIZE_BUCKETS) - 1
+
+
+def backend_for(operation, size):
+    """返回某操作在该负载大小下选用的后端"""
+    return BACKENDS[_selection[operation][_bucket(size)]]
+
+
+def parse(text):
+    """解析JSON文本，返回 (data, portable)
+
+    portable 为 True 表示数据可以交给快速后端序列化（见 dumps）。解析失败时
+    抛出与 json.loads 完全相同的 json.JSONDecodeError。
+    """
+    return parse_with(backend_for('loads', len(text)), text)
+
+
+def loads(text):
+    """解析JSON文本，失败时抛出 json.JSONDecodeError"""
+    return parse(text)[0]
+
+
+def dumps(data, indent=None, size_hint=0, portable=False):
+    """用选定的后端序列化，indent 为 None 时输出紧凑格式
+
+    只有 portable 的数据才会交给快速后端；快速后端无法保证与标准库一致时返回
+    None，由调用方走标准库的分片编码（可上报进度、响应取消）。
+    """
+    backend = backend_for('dumps' if indent is None else 'dumps_indent', size_hint)
+    return dumps_with(backend, data, indent, portable)
+
+
+def parse_with(backend, text):
+    """用指定后端解析，规则同 parse"""
+    raw = text.encode('utf-8', 'surrogatepass')
+    portable = is_portable(raw)
+    if backend is STDLIB or not portable:
+        return STDLIB.loads(text), portable
+    try:
+        return backend.loads(raw), True
+    except ValueError:
+        # 由标准库给出原有的错误信息；若标准库反而能解析，说明是快速后端不支持的写法
+        return STDLIB.loads(text), False
+
+
+def dumps_with(backend, data, indent, portable):
+    """用指定后端序列化，规则同 dumps"""
+    if backend is STDLIB or not portable:
+        return None
+    try:
+        return backend.dumps(data, indent)
+    except Unsupported:
+        return None
+
+
+# ---- 测量与自动选择 ----
+_WORDS = ('id', 'name', 'value', 'items', 'enabled', 'description', '名称', '状态', 'tags', 'score')
+
+
+def sample_payload(size, seed=0):
+    """生成约 size 字节的测量用JSON文本，包含常见的对象、数组、字符串和数字"""
+    import random
+
+    rng = random.Random(seed)
+    records = []
+    total = 2
+    while total < size:
+        record = {
+            'id': rng.randrange(10 ** 9),
+            'name': ''.join(rng.choice('abcdefghij名称测试') for _ in range(rng.randrange(4, 24))),
+            'enabled': rng.random() < 0.5,
+            'score': round(rng.uniform(-1000, 1000), rng.randrange(1, 6)),
+            'note': None if rng.random() < 0.2 else 'line\n"quoted"\\ ' + rng.choice(_WORDS),
+            'tags': [rng.choice(_WORDS) for _ in range(rng.randrange(0, 6))],
+            'child': {rng.choice(_WORDS): rng.randrange(-100, 100) for _ in range(rng.randrange(0, 4))},
+        }
+        records.append(record)
+        total += len(json.dumps(record, ensure_ascii=False)) + 1
+    return json.dumps({'data': records}, ensure_ascii=False)
+
+
+# 校验用的边界样本：快速后端要么给出与标准库相同的结果，要么退回标准库
+_EDGE_CASES = (
+    '[0.1, -0.0, 1e22, 1e-05, 5e-324, 123.456, 1.5e+300, 0.00001234]',
+    '{"a": "\\u2028\\u001f\\u007f\\ud7ff", "b": [], "c": {}, "d": [[]], "e": "\\"\\\\/"}',
+    '[9223372036854775807, -9223372036854775808, 18446744073709551616, -0, 1E5]',
+    '{"a": NaN, "b": Infinity, "c": -Infinity, "d": 1e400}',
+    '{"a": 1, "a": 2, "\\ud800": "\\udfff"}',
+)
+
+
+def _verify(backend):
+    """后端在边界样本和测量样本上的结果是否与标准库一致"""
+    for text in _EDGE_CASES + (sample_payload(4096, seed=1),):
+        expected = json.loads(text)
+        data, portable = parse_with(backend, text)
+        if json.dumps(data) != json.dumps(expected):
+            return False
+        for indent in (None, 2, 4):
+            output = dumps_with(backend, data, indent, portable)
+            if output is not None and output != STDLIB.dumps(expected, indent):
+                return False
+    return True
+
+
+def _best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(sizes=BENCH_SIZES, repeat=3):
+    """测量各后端在不同负载大小下的耗时
+
+    返回 {operation: [{backend: 秒数}, ...]}，列表与 sizes 一一对应；
+    未通过一致性校验的后端不参与测量。
+    """
+    candidates = [backend for backend in BACKENDS.values() if backend is STDLIB or _verify(backend)]
+    results = {op: [] for op in OPERATIONS}
+    for size in sizes:
+        text = sample_payload(size)
+        data = json.loads(text)
+        rounds = repeat if size <= 256 * 1024 else 1
+        timings = {op: {} for op in OPERATIONS}
+        for backend in candidates:
+            timings['loads'][backend.name] = _best_time(lambda: parse_with(backend, text), rounds)
+            if not backend.can_dump:
+                continue
+            for op, indent in (('dumps', None), ('dumps_indent', 4)):
+                if backend is STDLIB:
+                    fn = lambda: STDLIB.dumps(data, indent)
+                else:
+                    fn = lambda: dumps_with(backend, data, indent, True)
+                timings[op][backend.name] = _best_time(fn, rounds)
+        for op in OPERATIONS:
+            results[op].append(timings[op])
+    return results
+
+
+def select(results=None):
+    """按测量结果为每个大小区间选出最快的后端并记录到日志，返回选择结果"""
+    global _selected
+    if results is None:
+        results = benchmark()
+    selection = {op: [min(timings, key=timings.get) for timings in results[op]] for op in OPERATIONS}
+    with _selection_lock:
+        _selection.update(selection)
+        _selected = True
+    logger.info(f"JSON后端选择: {describe_selection()}")
+    return selection
+
+
+def benchmark_worker(stop_event):
+    """插件后台任务入口：测量并选择后端，只执行一次（见 src.tools.json_formatter）"""
+    if _selected or len(BACKENDS) == 1 or stop_event.is_set():
+        return
+    select()
+
+
+def describe_selection():
+    labels = []
+    for limit in SIZE_BUCKETS:
+        labels.append('更大' if limit == float('inf') else f'≤{limit // 1024}KB')
+    return '; '.join(
+        f"{op}: " + ', '.join(f'{label}→{name}' for label, name in zip(labels, _selection[op]))
+        for op in OPERATIONS)
+
+
+def report(results, sizes=BENCH_SIZES):
+    """把测量结果格式化为文本表格"""
+    lines = [f"可用后端: {', '.join(BACKENDS)}"]
+    for op in OPERATIONS:
+        lines.append(f'[{op}]')
+        for size, timings in zip(sizes, results[op]):
+            row = '  '.join(f'{name}={seconds * 1000:.2f}ms' for name, seconds in sorted(timings.items()))
+            lines.append(f'  {size // 1024:>6}KB  {row}')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    measured = benchmark()
+    print(report(measured))
+    select(measured)
+    print(f'选择结果: {describe_selection()}')
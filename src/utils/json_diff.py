@@ -0,0 +1,563 @@
+"""JSON 结构对比
+
+比较两份已解析的 JSON，列出新增、删除和修改的路径：
+
+- 相同子树的跳过：两个子树先用 C 实现的相等比较判断（遇到第一处不同即返回），
+  相同的分支不再逐层深入，只有含差异的路径才会展开。Python 的相等比较不区分
+  true、1 和 1.0，判为相等的对象和数组再比较两侧的子树指纹，其中的类型变化
+  同样展开并记为修改。两份只有少数字段不同的大文档，耗时与文档大小乘以差异
+  所在的深度成正比，主要花在 C 代码中。
+- 数组对齐：元素都是对象且有唯一的标识键（id、key 等，或指定的键）时按键
+  对齐；否则去掉相同的前缀和后缀，长度相同且逐位不同的元素不多时按下标对齐，
+  其余情况在元素指纹（规范化序列化的 BLAKE2 摘要，按对象缓存）序列上求最长
+  公共子序列（Myers 差分）。对齐后仍不相同的元素两两配对后继续深入，其余记为
+  新增或删除。
+- 遍历使用显式栈，嵌套再深也不会超出递归深度限制；变化按文档顺序输出。
+
+layout() 把结果换算为两侧格式化文本中的行区间和用于同步滚动的对应行。
+"""
+import hashlib
+import json
+from bisect import bisect_right
+
+from src.utils import json_ops, perf, structure_index
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+KIND_LABELS = {ADDED: '新增', REMOVED: '删除', CHANGED: '修改'}
+
+SIDE_LABELS = {'old': '旧JSON', 'new': '新JSON'}
+
+# 数组对齐方式
+ALIGN_AUTO = 'auto'
+ALIGN_KEY = 'key'
+ALIGN_LCS = 'lcs'
+ALIGN_INDEX = 'index'
+ALIGN_LABELS = {ALIGN_AUTO: '自动', ALIGN_KEY: '按键', ALIGN_LCS: 'LCS', ALIGN_INDEX: '按下标'}
+# 自动对齐时依次尝试的标识键
+ALIGN_KEYS = ('id', '_id', 'key', 'uuid', 'name')
+
+# 最多记录的变化条数，超过后停止对比
+MAX_CHANGES = 100000
+# LCS 对齐的最大编辑距离，超过时其余部分按下标对齐
+MAX_EDIT_DISTANCE = 2000
+# 显示变化时值的最大字符数
+VALUE_PREVIEW = 80
+
+_CHECK_EVERY = 1024
+_PREVIEW_ENCODER = json.JSONEncoder(ensure_ascii=False)
+_CONTAINERS = (dict, list)
+
+
+class DiffInputError(ValueError):
+    """某一侧的输入不是有效的JSON，side 为 'old' 或 'new'"""
+
+    def __init__(self, side, text, error):
+        super().__init__(f'{SIDE_LABELS[side]}格式错误：{error}')
+        self.side = side
+        self.text = text
+        self.error = error
+
+    def describe(self):
+        if isinstance(self.error, json.JSONDecodeError):
+            return f'{SIDE_LABELS[self.side]}：' + json_ops.describe_decode_error(self.text, self.error)
+        return str(self)
+
+
+class Change:
+    """一处变化
+
+    old_path / new_path 为两侧的路径分段（数组对齐后两侧下标可能不同）。新增
+    时 old_path 为旧文档中所在的容器，删除时 new_path 为新文档中所在的容器。
+    """
+    __slots__ = ('kind', 'old_path', 'new_path', 'old', 'new')
+
+    def __init__(self, kind, old_path, new_path, old=None, new=None):
+        self.kind = kind
+        self.old_path = old_path
+        self.new_path = new_path
+        self.old = old
+        self.new = new
+
+    @property
+    def path(self):
+        return self.old_path if self.kind == REMOVED else self.new_path
+
+    def describe(self):
+        path = structure_index.format_path(self.path)
+        if self.kind == ADDED:
+            return f'新增 {path}: {preview(self.new)}'
+        if self.kind == REMOVED:
+            return f'删除 {path}: {preview(self.old)}'
+        return f'修改 {path}: {preview(self.old)} → {preview(self.new)}'
+
+
+def preview(value, limit=VALUE_PREVIEW):
+    """值的单行预览，超长时截断；容器逐块编码，够长即停，不序列化整个子树"""
+    text = ''
+    for chunk in _PREVIEW_ENCODER.iterencode(value):
+        text += chunk
+        if len(text) > limit:
+            return text[:limit - 1] + '…'
+    return text
+
+
+class DiffResult:
+    """对比结果：按文档顺序排列的变化，以及逐层展开比较的容器数"""
+
+    def __init__(self):
+        self.changes = []
+        self.truncated = False
+        self.compared = 0
+
+    def counts(self):
+        counts = {ADDED: 0, REMOVED: 0, CHANGED: 0}
+        for change in self.changes:
+            counts[change.kind] += 1
+        return counts
+
+    def summary(self):
+        if not self.changes:
+            return '两份JSON内容相同'
+        counts = self.counts()
+        text = '，'.join(f'{KIND_LABELS[kind]} {counts[kind]:,} 处' for kind in (ADDED, REMOVED, CHANGED))
+        if self.truncated:
+            text += f'（超过 {MAX_CHANGES:,} 处，已停止对比）'
+        return text
+
+
+def same(a, b, hasher=None):
+    """两个值是否相同：类型相同且相等（NaN 与 NaN 视为相同）
+
+    对象和数组相等时再比较两侧的指纹，其中的 true 与 1、1 与 1.0 也视为不同；
+    hasher 为对比期间共用的 SubtreeHasher，不给时临时创建。
+    """
+    if a is b:
+        return True
+    kind = type(a)
+    if kind is not type(b):
+        return False
+    if kind is dict or kind is list:
+        if a != b:
+            return False
+        hasher = hasher or SubtreeHasher()
+        return hasher.digest(a) == hasher.digest(b)
+    if a == b:
+        return True
+    return kind is float and repr(a) == repr(b)
+
+
+class SubtreeHasher:
+    """子树指纹，用于数组对齐和区分类型的相等判断，按对象身份（id）缓存
+
+    对象和数组的指纹是键排序的紧凑序列化的摘要，序列化保留 true、1 和 1.0 的
+    区别，同一子树只序列化一次；对比期间两份文档的数据都保持存活，id 不会被
+    复用。标量直接以 (类型, 值) 作为指纹。
+    """
+
+    def __init__(self):
+        self._digests = {}
+        # 已序列化的字符数
+        self.hashed = 0
+
+    def digest(self, value):
+        key = id(value)
+        digest = self._digests.get(key)
+        if digest is None:
+            text = json.dumps(value, sort_keys=True, separators=(',', ':'), check_circular=False)
+            self.hashed += len(text)
+            digest = hashlib.blake2b(text.encode('ascii'), digest_size=16).digest()
+            self._digests[key] = digest
+        return digest
+
+    def token(self, value):
+        kind = type(value)
+        if kind is dict or kind is list:
+            return self.digest(value)
+        if kind is float:
+            return (float, repr(value))
+        return (kind, value)
+
+
+def find_align_key(old, new, candidates=ALIGN_KEYS):
+    """两个数组的元素都是对象、且某个键在两侧都存在并且取值唯一时返回该键，否则返回 None"""
+    if not old or not new:
+        return None
+    for name in candidates:
+        if _key_values(old, name) is not None and _key_values(new, name) is not None:
+            return name
+    return None
+
+
+def _key_values(items, name):
+    """各元素的标识键取值；有元素不是对象、缺少该键、取值不是标量或有重复时返回 None
+
+    取值按 Python 的相等判断去重，1、1.0 和 true 视为重复，此时不按键对齐。
+    """
+    try:
+        values = [item[name] for item in items]
+        if len(set(values)) != len(values):
+            return None
+    except (TypeError, KeyError):
+        # 元素不是对象（数组下标不是字符串、标量不可下标）、缺少该键或取值不可哈希
+        return None
+    if any(type(item) is not dict for item in items):
+        return None
+    return values
+
+
+def _align_by_key(old, new, name, hasher):
+    """按标识键对齐，返回 [(旧下标或 None, 新下标或 None)]，按新数组的顺序排列"""
+    old_values = _key_values(old, name)
+    new_values = _key_values(new, name)
+    if old_values == new_values:
+        return _align_by_index(old, new, 0, len(old), 0, len(new), hasher)
+    old_index = {value: i for i, value in enumerate(old_values)}
+    pairs = []
+    matched = set()
+    for j, value in enumerate(new_values):
+        i = old_index.get(value)
+        if i is not None:
+            matched.add(i)
+        pairs.append((i, j))
+    removed = [(i, None) for i in range(len(old)) if i not in matched]
+    return _merge_removed(pairs, removed)
+
+
+def _merge_removed(pairs, removed):
+    """把删除的元素插到旧下标相邻的位置，使结果大致保持文档顺序"""
+    if not removed:
+        return pairs
+    result = []
+    k = 0
+    for i, j in pairs:
+        while k < len(removed) and i is not None and removed[k][0] < i:
+            result.append(removed[k])
+            k += 1
+        result.append((i, j))
+    result.extend(removed[k:])
+    return result
+
+
+def _align_by_index(old, new, old_start, old_end, new_start, new_end, hasher):
+    """按下标对齐 old[old_start:old_end] 和 new[new_start:new_end]
+
+    相同位置上一眼可知相同的元素（同一对象，或类型相同且相等，容器的指纹也相同）
+    不列出，逐个元素的判断在列表推导中完成，只有相等的容器才计算指纹；多出的
+    元素记为删除或新增。
+    """
+    common = min(old_end - old_start, new_end - new_start)
+    digest = hasher.digest
+    pairs = [(old_start + k, new_start + k)
+             for k, (x, y) in enumerate(zip(old[old_start:old_start + common], new[new_start:new_start + common]))
+             if x is not y and (type(x) is not type(y) or x != y
+                                or (type(x) in _CONTAINERS and digest(x) != digest(y)))]
+    pairs.extend((i, None) for i in range(old_start + common, old_end))
+    pairs.extend((None, j) for j in range(new_start + common, new_end))
+    return pairs
+
+
+def _myers(a, b, limit):
+    """Myers 差分，返回匹配的 [(i, j)]；编辑距离超过 limit 时返回 None"""
+    n, m = len(a), len(b)
+    max_d = min(n + m, limit)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+    for d in range(max_d + 1):
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace, x, y):
+    matches = []
+    for d in range(len(trace) - 1, -1, -1):
+        # trace[d] 保存第 d 步开始前 k ∈ [-d-1, d+1] 的 v
+        v = trace[d]
+        k = x - y
+        base = -d - 1
+        if d == 0:
+            prev_k = 0
+            prev_x = 0
+        else:
+            if k == -d or (k != d and v[k - 1 - base] < v[k + 1 - base]):
+                prev_k = k + 1
+            else:
+                prev_k = k - 1
+            prev_x = v[prev_k - base]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        if d:
+            x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
+
+
+def _align_lcs(old, new, hasher, job):
+    """按最长公共子序列对齐，返回 [(旧下标或 None, 新下标或 None)]
+
+    相同的前缀和后缀先去掉；长度相同、逐位不同的元素不到中间部分的一半且不超过
+    MAX_EDIT_DISTANCE 个（零散的修改，而非插入删除造成的错位）时直接按下标对齐，
+    否则对中间部分的元素指纹做 Myers 差分。匹配之间的空隙里，
+    删除和新增的元素按顺序两两配对。
+    """
+    start = 0
+    end_a, end_b = len(old), len(new)
+    while start < end_a and start < end_b and same(old[start], new[start], hasher):
+        start += 1
+    while end_a > start and end_b > start and same(old[end_a - 1], new[end_b - 1], hasher):
+        end_a -= 1
+        end_b -= 1
+    if start == end_a or start == end_b:
+        return _align_by_index(old, new, start, end_a, start, end_b, hasher)
+    if end_a == end_b:
+        pairs = _align_by_index(old, new, start, end_a, start, end_b, hasher)
+        if len(pairs) <= min(MAX_EDIT_DISTANCE, (end_a - start - 1) // 2):
+            return pairs
+    matches = _myers(_tokens(old[start:end_a], hasher, job), _tokens(new[start:end_b], hasher, job),
+                     MAX_EDIT_DISTANCE)
+    if matches is None:
+        return _align_by_index(old, new, start, end_a, start, end_b, hasher)
+    pairs = []
+    i = j = 0
+    for mi, mj in matches + [(end_a - start, end_b - start)]:
+        pairs.extend(_align_by_index(old, new, start + i, start + mi, start + j, start + mj, hasher))
+        i, j = mi + 1, mj + 1
+    return pairs
+
+
+def _tokens(items, hasher, job):
+    tokens = []
+    for count, item in enumerate(items, 1):
+        tokens.append(hasher.token(item))
+        if job is not None and count % _CHECK_EVERY == 0:
+            job.check_cancelled()
+    return tokens
+
+
+def diff(old, new, align=ALIGN_AUTO, key=None, job=None):
+    """对比两份数据，返回 DiffResult
+
+    align 为数组对齐方式；key 为按键对齐时使用的键，不给时从 ALIGN_KEYS 中自动
+    选择。进度按已处理的顶层成员数估算（10% ~ 40%）。
+    """
+    hasher = SubtreeHasher()
+    result = DiffResult()
+    changes = result.changes
+    candidates = (key,) if key else ALIGN_KEYS
+    # 栈中的项为待比较的 (旧值, 新值, 旧路径, 新路径) 或已确定的 Change，逆序压栈以保持文档顺序
+    stack = [(old, new, (), ())] if not same(old, new, hasher) else []
+    top_level = 0
+    done = 0
+    steps = 0
+    while stack:
+        item = stack.pop()
+        if type(item) is Change:
+            old_path, new_path = item.old_path, item.new_path
+        else:
+            old_path, new_path = item[2], item[3]
+        if max(len(old_path), len(new_path)) == 1:
+            done += 1
+        if type(item) is Change:
+            changes.append(item)
+            if len(changes) >= MAX_CHANGES:
+                result.truncated = True
+                break
+            continue
+        a, b = item[0], item[1]
+        result.compared += 1
+        steps += 1
+        if job is not None and steps % _CHECK_EVERY == 0:
+            job.check_cancelled()
+            job.report(10 + done * 30 // max(1, top_level), '正在对比')
+        items = []
+        if type(a) is dict and type(b) is dict:
+            for name, value in a.items():
+                if name in b:
+                    other = b[name]
+                    if value is other or (type(value) is type(other) and value == other
+                                          and (type(value) not in _CONTAINERS
+                                               or hasher.digest(value) == hasher.digest(other))):
+                        continue
+                    _compare(value, other, old_path + (name,), new_path + (name,), items, hasher)
+                else:
+                    items.append(Change(REMOVED, old_path + (name,), new_path, old=value))
+            for name, value in b.items():
+                if name not in a:
+                    items.append(Change(ADDED, old_path, new_path + (name,), new=value))
+        elif type(a) is list and type(b) is list:
+            name = None
+            if align in (ALIGN_AUTO, ALIGN_KEY):
+                name = find_align_key(a, b, candidates)
+            if name is not None:
+                pairs = _align_by_key(a, b, name, hasher)
+            elif align == ALIGN_INDEX:
+                pairs = _align_by_index(a, b, 0, len(a), 0, len(b), hasher)
+            else:
+                pairs = _align_lcs(a, b, hasher, job)
+            for i, j in pairs:
+                if j is None:
+                    items.append(Change(REMOVED, old_path + (i,), new_path, old=a[i]))
+                elif i is None:
+                    items.append(Change(ADDED, old_path, new_path + (j,), new=b[j]))
+                else:
+                    _compare(a[i], b[j], old_path + (i,), new_path + (j,), items, hasher)
+        else:
+            items.append(Change(CHANGED, old_path, new_path, old=a, new=b))
+        if not old_path and not new_path:
+            top_level = len(items)
+        stack.extend(reversed(items))
+    return result
+
+
+def _compare(a, b, old_path, new_path, items, hasher):
+    """比较一对成员：相同则跳过，同为对象或同为数组则待深入，否则记为修改"""
+    if same(a, b, hasher):
+        return
+    if (type(a) is dict and type(b) is dict) or (type(a) is list and type(b) is list):
+        items.append((a, b, old_path, new_path))
+    else:
+        items.append(Change(CHANGED, old_path, new_path, old=a, new=b))
+
+
+class DiffLayout:
+    """对比结果在两侧格式化文本中的位置
+
+    old_marks / new_marks 为 (起始行, 结束行, 变化类型) 的有序列表；lines[i] 为第
+    i 处变化在两侧的 (行, 行)；anchors 为两侧对应行的有序列表，用于同步滚动。
+    """
+
+    def __init__(self, old_marks, new_marks, lines, anchors):
+        self.old_marks = old_marks
+        self.new_marks = new_marks
+        self.lines = lines
+        self._old_anchor_lines = [old for old, _ in anchors]
+        self._new_anchor_lines = [new for _, new in anchors]
+
+    def map_line(self, line, to_new=True):
+        """把一侧的行换算为另一侧的对应行：在相邻的两个对应点之间按比例插值"""
+        source, target = ((self._old_anchor_lines, self._new_anchor_lines) if to_new
+                          else (self._new_anchor_lines, self._old_anchor_lines))
+        i = bisect_right(source, line) - 1
+        if i < 0:
+            return line
+        if i + 1 >= len(source):
+            return target[i] + line - source[i]
+        span = source[i + 1] - source[i]
+        if span <= 0:
+            return target[i]
+        return target[i] + (line - source[i]) * (target[i + 1] - target[i]) // span
+
+
+def _span(structure, path):
+    """路径在格式化文本中占的 (起始行, 结束行)，找不到时返回 None"""
+    try:
+        line = structure.resolve(list(path))
+    except KeyError:
+        return None
+    cid = structure.opening_at(line)
+    return (line, structure.end_line[cid]) if cid >= 0 else (line, line)
+
+
+def layout(result, old_structure, new_structure, job=None):
+    """把变化换算为两侧格式化文本中的行区间和同步滚动的对应点，返回 DiffLayout"""
+    old_marks = []
+    new_marks = []
+    lines = []
+    anchors = [(0, 0)]
+    for count, change in enumerate(result.changes, 1):
+        if job is not None and count % _CHECK_EVERY == 0:
+            job.check_cancelled()
+        old_span = _span(old_structure, change.old_path)
+        new_span = _span(new_structure, change.new_path)
+        if old_span is None or new_span is None:
+            lines.append((old_span[0] if old_span else 0, new_span[0] if new_span else 0))
+            continue
+        if change.kind == CHANGED:
+            old_marks.append((old_span[0], old_span[1], CHANGED))
+            new_marks.append((new_span[0], new_span[1], CHANGED))
+            lines.append((old_span[0], new_span[0]))
+            anchors.append((old_span[0], new_span[0]))
+            anchors.append((old_span[1] + 1, new_span[1] + 1))
+            continue
+        # 新增或删除：另一侧只有所在的容器，两侧的容器首尾互相对应
+        if change.kind == ADDED:
+            new_marks.append((new_span[0], new_span[1], ADDED))
+            lines.append((old_span[1], new_span[0]))
+            parents = (old_span, _span(new_structure, change.new_path[:-1]))
+        else:
+            old_marks.append((old_span[0], old_span[1], REMOVED))
+            lines.append((old_span[0], new_span[1]))
+            parents = (_span(old_structure, change.old_path[:-1]), new_span)
+        if None not in parents:
+            anchors.append((parents[0][0], parents[1][0]))
+            anchors.append((parents[0][1], parents[1][1]))
+    # 只保留两侧都递增的对应点
+    monotonic = []
+    for old, new in sorted(anchors):
+        if not monotonic or (old > monotonic[-1][0] and new > monotonic[-1][1]):
+            monotonic.append((old, new))
+    return DiffLayout(_merge_marks(old_marks), _merge_marks(new_marks), lines, monotonic)
+
+
+def _merge_marks(marks):
+    """按行排序（按键对齐时变化不按行的顺序出现），并去掉与前一个区间重叠的区间"""
+    merged = []
+    for first, last, kind in sorted(marks):
+        if merged and first <= merged[-1][1]:
+            continue
+        merged.append((first, last, kind))
+    return merged
+
+
+class Comparison:
+    """compare() 的结果：两侧的格式化文本、结构索引、对比结果及其位置"""
+
+    def __init__(self, old_store, old_structure, new_store, new_structure, result, layout):
+        self.old_store = old_store
+        self.old_structure = old_structure
+        self.new_store = new_store
+        self.new_structure = new_structure
+        self.result = result
+        self.layout = layout
+
+
+def compare(old_text, new_text, align=ALIGN_AUTO, key=None, job=None):
+    """解析并对比两份JSON文本，格式化两侧并定位变化，返回 Comparison
+
+    任一侧不是有效的JSON时抛出 DiffInputError。
+    """
+    parsed = []
+    for side, text in (('old', old_text), ('new', new_text)):
+        try:
+            with perf.span('解析', len(text)):
+                parsed.append(json_ops.parse_json_portable(text, job))
+        except ValueError as e:
+            raise DiffInputError(side, text, e) from e
+    (old, old_portable), (new, new_portable) = parsed
+    with perf.span('对比', len(old_text) + len(new_text)):
+        result = diff(old, new, align, key, job)
+    with perf.span('格式化') as stage:
+        old_store, old_structure = structure_index.format_indexed(
+            old, job=job, size_hint=len(old_text), portable=old_portable)
+        new_store, new_structure = structure_index.format_indexed(
+            new, job=job, size_hint=len(new_text), portable=new_portable)
+        stage.size = old_store.nbytes + new_store.nbytes
+    return Comparison(old_store, old_structure, new_store, new_structure, result,
+                      layout(result, old_structure, new_structure, job))
@@ -0,0 +1,84 @@
+"""逐行JSON词法分析
+
+单个预编译正则一次线性扫描完成一行的分词，并返回行尾状态，
+使跨行的未闭合字符串可以在下一行继续识别。供语法高亮、搜索过滤等复用。
+"""
+import re
+
+# 行尾状态
+STATE_NORMAL = 0
+STATE_IN_STRING = 1
+
+# 词法单元类型
+KEY = 'key'
+STRING = 'string'
+NUMBER = 'number'
+KEYWORD = 'keyword'
+PUNCTUATION = 'punctuation'
+
+_STRING_BODY = r'(?:[^"\\]|\\.)*'
+
+_TOKEN_RE = re.compile(
+    rf'(?P<key>"{_STRING_BODY}"(?=\s*:))'
+    rf'|(?P<string>"{_STRING_BODY}")'
+    rf'|(?P<open_string>"{_STRING_BODY}\\?$)'
+    r'|(?P<number>(?<![\w.])-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w.]))'
+    r'|(?P<keyword>\b(?:true|false|null)\b)'
+    r'|(?P<punctuation>[{}\[\],:])'
+)
+# 多行文本整体扫描用的变体：字符串不跨行，字符串后紧跟冒号即为键名。
+# 数字和关键字只可能出现在字符串之外，字符串会先被整体消耗，无需额外断言。
+_BLOCK_STRING = r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"(?P<colon>[ \t]*:)?'
+_BLOCK_STRING_RE = re.compile(_BLOCK_STRING)
+_BLOCK_VALUE_RE = re.compile(
+    _BLOCK_STRING
+    + r'|-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?'
+    + r'|true|false|null'
+)
+# 上一行留下未闭合字符串时，本行开头直到第一个未转义引号都属于该字符串
+_STRING_TAIL_RE = re.compile(rf'{_STRING_BODY}"')
+
+_KINDS = {
+    'key': KEY,
+    'string': STRING,
+    'open_string': STRING,
+    'number': NUMBER,
+    'keyword': KEYWORD,
+    'punctuation': PUNCTUATION,
+}
+
+
+def tokenize_line(text, state=STATE_NORMAL):
+    """对一行文本分词
+
+    Returns:
+        (tokens, state): tokens 为 (起始位置, 长度, 类型) 列表，state 为行尾状态
+    """
+    tokens = []
+    pos = 0
+    if state == STATE_IN_STRING:
+        tail = _STRING_TAIL_RE.match(text)
+        if tail is None:
+            return [(0, len(text), STRING)] if text else [], STATE_IN_STRING
+        pos = tail.end()
+        tokens.append((0, pos, STRING))
+
+    state = STATE_NORMAL
+    for match in _TOKEN_RE.finditer(text, pos):
+        kind = match.lastgroup
+        start = match.start()
+        tokens.append((start, match.end() - start, _KINDS[kind]))
+        if kind == 'open_string':
+            state = STATE_IN_STRING
+    return tokens, state
+
+
+def key_spans(text):
+    """一次扫描多行文本，返回全部键名的 (起始, 结束) 列表"""
+    return [(m.start(), m.start('colon')) for m in _BLOCK_STRING_RE.finditer(text)
+            if m.start('colon') >= 0]
+
+
+def value_spans(text):
+    """一次扫描多行文本，返回全部字符串值、数字和关键字的 (起始, 结束) 列表"""
+    return [m.span() for m in _BLOCK_VALUE_RE.finditer(text) if m.start('colon') < 0]
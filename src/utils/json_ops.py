@@ -0,0 +1,166 @@
+"""JSON处理核心逻辑
+
+与界面解耦的解析、格式化、压缩和格式转换函数，供界面后台任务和命令行复用。
+所有函数都接受可选的 ``job`` 参数（参见 ``src.utils.job_runner.JobContext``），
+用于上报进度和响应取消；不传时按普通同步函数执行。生成文本的函数还接受可选的
+``sink``（带 ``write`` 方法的对象，如 ``LineStore``），给出时结果直接写入 sink
+并返回 sink，不再拼接完整字符串。
+
+解析和序列化经由 ``src.utils.json_backend`` 选择的后端完成（装有 orjson 等
+快速库时使用），输出和错误信息与标准库 json 保持一致。
+"""
+import json
+
+from src.utils import converters, json_backend, relaxed_json
+
+INDENT = 4
+
+# 每产生多少个编码片段检查一次取消标记并上报进度
+_CHECK_EVERY = 4096
+
+
+def _report(job, percent, message=''):
+    if job is not None:
+        job.report(percent, message)
+
+
+def _check(job):
+    if job is not None:
+        job.check_cancelled()
+
+
+def parse_json(text, job=None):
+    """解析JSON文本，失败时抛出 json.JSONDecodeError"""
+    return parse_json_portable(text, job)[0]
+
+
+def parse_json_portable(text, job=None):
+    """解析JSON文本，返回 (data, portable)，portable 的含义见 json_backend.parse"""
+    _report(job, 5, '正在解析JSON')
+    result = json_backend.parse(text)
+    _check(job)
+    return result
+
+
+def parse_relaxed(text, job=None):
+    """先按标准JSON解析，失败时再按JSON5解析
+
+    返回 (data, portable, 方言)，方言为 relaxed_json.JSON 或 JSON5。标准JSON输入
+    只经过一次标准解析；两种解析都失败时抛出JSON5解析的错误。
+    """
+    try:
+        data, portable = parse_json_portable(text, job)
+        return data, portable, relaxed_json.JSON
+    except json.JSONDecodeError:
+        pass
+    _report(job, 10, '正在按JSON5解析')
+    data, portable = relaxed_json.parse(text, job)
+    _check(job)
+    return data, portable, relaxed_json.JSON5
+
+
+def _emit(result, sink):
+    if sink is None:
+        return result
+    sink.write(result)
+    return sink
+
+
+def encode_chunks(chunks, size_hint, job=None, start=40, end=95, sink=None):
+    """拼接编码片段，期间定期检查取消并按已输出长度估算进度"""
+    parts = []
+    write = parts.append if sink is None else sink.write
+    emitted = 0
+    size_hint = max(1, size_hint)
+    for count, chunk in enumerate(chunks, 1):
+        write(chunk)
+        emitted += len(chunk)
+        if count % _CHECK_EVERY == 0:
+            _check(job)
+            _report(job, min(end, start + (end - start) * emitted // size_hint))
+    _check(job)
+    return ''.join(parts) if sink is None else sink
+
+
+def format_text(text, indent=INDENT, job=None, sink=None):
+    """格式化JSON文本"""
+    data, portable = parse_json_portable(text, job)
+    return format_data(data, indent, job, sink, size_hint=len(text), portable=portable)
+
+
+def format_data(data, indent=INDENT, job=None, sink=None, size_hint=0, portable=False):
+    """格式化已解析的数据
+
+    size_hint 为原文长度，用于估算进度和选择后端；portable 为 True 时允许使用
+    快速后端一次生成（不可中途取消），否则用标准库分片编码。
+    """
+    _report(job, 40, '正在生成格式化文本')
+    formatted = json_backend.dumps(data, indent, size_hint, portable)
+    if formatted is not None:
+        _check(job)
+        return _emit(formatted, sink)
+    encoder = json.JSONEncoder(indent=indent, ensure_ascii=False)
+    return encode_chunks(encoder.iterencode(data), size_hint, job, sink=sink)
+
+
+def minify_text(text, job=None, sink=None):
+    """压缩JSON文本"""
+    data, portable = parse_json_portable(text, job)
+    return minify_data(data, job, sink, size_hint=len(text), portable=portable)
+
+
+def minify_data(data, job=None, sink=None, size_hint=0, portable=False):
+    """压缩已解析的数据，参数含义同 format_data"""
+    _report(job, 40, '正在压缩JSON')
+    minified = json_backend.dumps(data, None, size_hint, portable)
+    if minified is None:
+        # 紧凑输出可走标准库的C编码器，一次完成比逐片段拼接快得多
+        minified = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+    _check(job)
+    return _emit(minified, sink)
+
+
+def to_python(data):
+    return converters.to_string(converters.write_python, data)
+
+
+def to_yaml(data):
+    return converters.to_string(converters.write_yaml, data)
+
+
+def to_xml(data):
+    return converters.to_string(converters.write_xml, data)
+
+
+CONVERTERS = {
+    'Python字典': to_python,
+    'YAML': to_yaml,
+    'XML': to_xml,
+}
+
+
+def convert_text(text, target_format, job=None, sink=None):
+    """将JSON文本转换为目标格式（YAML、XML、Python字典）"""
+    return convert_data(parse_json(text, job), target_format, job, sink, size_hint=len(text))
+
+
+def convert_data(data, target_format, job=None, sink=None, size_hint=0):
+    """将已解析的数据转换为目标格式
+
+    由 converters 中的写入器逐块写入 sink，不拼接完整字符串；不给 sink 时返回
+    字符串。size_hint 为原文长度，用于估算进度。
+    """
+    writer = converters.WRITERS[target_format]
+    _report(job, 40, f'正在转换为{target_format}')
+    if sink is None:
+        return converters.to_string(writer, data, job=job, size_hint=size_hint)
+    return writer(data, sink, job, size_hint)
+
+
+def describe_decode_error(text, error, radius=20):
+    """生成带位置和上下文的JSON错误描述"""
+    pos = error.pos
+    start = max(0, pos - radius)
+    end = min(len(text), pos + radius)
+    context = text[start:end]
+    return f"JSON 格式错误(位置 {pos}):\n{error.msg}\n上下文:\n{context}"
@@ -0,0 +1,917 @@
+"""JSONPath / jq 查询
+
+以 $ 开头的查询按 JSONPath 解析，其余按 jq 的一个子集解析：
+
+- JSONPath：.name、['name']、[0]、[-1]、[*]、.*、[start:end:step]、[a,b] 并列、
+  ..（递归下降）、[?(@.price < 10 && @.tag == 'x')] 过滤（比较、&&、||、!、括号、
+  存在性判断）
+- jq：.a.b、."a b"、.[0]、.[]、.[1:3]、..、|、逗号、select(...)、map(...)、
+  {a, b: .x.y} 投影、[...] 收集、length、keys、not、type，以及比较和 and/or；
+  末尾加 ? 忽略类型错误
+
+编译结果按查询文本缓存在 LRU 中。求值都是惰性的生成器，逐个产出结果，不构建
+中间结果列表。
+
+只由键名、非负下标、通配符（可带递归下降）组成的 JSONPath 是“简单路径”，可以
+不解析整份文件而流式求值（stream_file）：
+- 以 $..name 开头且 name 只含 ASCII 字符时，在文件的原始字节中直接查找键名
+  "name"（C 实现的子串查找），只解析每处命中之后的值，其余内容不解码也不解析；
+  这种方式不校验文件其余部分的语法。键名可能用转义写出：非 ASCII 的键名常写作
+  Unicode 转义（json.dumps 的默认输出），ASCII 字符也可以写作 Unicode 转义，/ 可以
+  写作 \\/。字节查找找不到这些写法，因此 name 含非 ASCII 字符、或文件中出现 name
+  中某个字符的转义写法时，改用下面的方式
+- 其余简单路径交给 json_stream.stream_select，只有通往匹配位置的容器逐个词法
+  单元处理，其余子树由 C 扫描器跳过
+"""
+import json
+import mmap
+import re
+import threading
+from collections import OrderedDict
+from json.scanner import make_scanner
+
+from src.utils import json_stream
+
+JSONPATH = 'JSONPath'
+JQ = 'jq'
+
+# 编译缓存的条数
+CACHE_SIZE = 64
+# 流式查找命中后先解码的字节数，值更长时按 4 倍扩大
+_VALUE_WINDOW = 512
+_TAIL_SLACK = 64
+_CHECK_EVERY = 4096
+_FLUSH_SIZE = 1024 * 1024
+
+_TOKEN_RE = re.compile(r'''
+    \s*(?:
+      (?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)
+    | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    | (?P<ident>[A-Za-z_\u0080-\U0010ffff][A-Za-z0-9_\u0080-\U0010ffff]*)
+    | (?P<op>\.\.|==|!=|<=|>=|&&|\|\||[.\[\]{}()|,:?<>!$@*])
+    )''', re.VERBOSE)
+
+# 选择器
+_NAME, _INDEX, _WILD, _SLICE, _FILTER = range(5)
+
+_MISSING = object()
+
+
+class QueryError(ValueError):
+    """查询语法错误或求值错误"""
+
+
+class _Tokens:
+    """查询文本的词法单元序列，token 为 (类型, 文本, 位置)"""
+
+    def __init__(self, text):
+        self.text = text
+        self.items = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = _TOKEN_RE.match(text, pos)
+            if match is None or match.end() == pos:
+                raise QueryError(f'无法识别的字符（位置 {pos}）: {text[pos:pos + 10]}')
+            kind = match.lastgroup
+            self.items.append((kind, match.group(kind), match.start(kind)))
+            pos = match.end()
+        self.items.append(('end', '', len(text)))
+        self.pos = 0
+
+    def peek(self, offset=0):
+        return self.items[min(self.pos + offset, len(self.items) - 1)]
+
+    def next(self):
+        token = self.items[self.pos]
+        if token[0] != 'end':
+            self.pos += 1
+        return token
+
+    def accept(self, text):
+        if self.peek()[1] == text and self.peek()[0] in ('op', 'ident'):
+            return self.next()
+        return None
+
+    def expect(self, text):
+        token = self.accept(text)
+        if token is None:
+            raise self.error(f"应为 '{text}'")
+        return token
+
+    def error(self, message):
+        kind, text, pos = self.peek()
+        found = '查询结尾' if kind == 'end' else f"'{text}'"
+        return QueryError(f'{message}，遇到 {found}（位置 {pos}）')
+
+
+def _string_value(token_text):
+    """解析带单引号或双引号的字符串字面量"""
+    if token_text[0] == "'":
+        body = token_text[1:-1].replace('\\\'', "'").replace('"', '\\"')
+        token_text = f'"{body}"'
+    try:
+        return json.loads(token_text)
+    except ValueError as e:
+        raise QueryError(f'字符串字面量有误: {token_text}') from e
+
+
+def _number_value(token_text):
+    return json.loads(token_text)
+
+
+def _is_number(value):
+    return type(value) in (int, float)
+
+
+def _descendants(value, job=None):
+    """先序产出 value 及其全部后代"""
+    stack = [value]
+    count = 0
+    while stack:
+        node = stack.pop()
+        yield node
+        if type(node) is dict:
+            stack.extend(reversed(list(node.values())))
+        elif type(node) is list:
+            stack.extend(reversed(node))
+        count += 1
+        if job is not None and count % _CHECK_EVERY == 0:
+            job.check_cancelled()
+
+
+# ---- JSONPath ----
+def _parse_jsonpath(tokens):
+    """解析为段列表 [(是否递归下降, [选择器, ...])]，选择器为 (类型, 参数...)"""
+    tokens.expect('$')
+    segments = []
+    while tokens.peek()[0] != 'end':
+        if tokens.accept('..'):
+            descendant = True
+            if tokens.peek()[1] == '[':
+                tokens.next()
+                selectors = _parse_bracket(tokens)
+            else:
+                selectors = [_parse_dot_member(tokens)]
+        elif tokens.accept('.'):
+            descendant = False
+            selectors = [_parse_dot_member(tokens)]
+        elif tokens.accept('['):
+            descendant = False
+            selectors = _parse_bracket(tokens)
+        else:
+            raise tokens.error("应为 '.'、'..' 或 '['")
+        segments.append((descendant, selectors))
+    return segments
+
+
+def _parse_dot_member(tokens):
+    kind, text, _ = tokens.peek()
+    if kind == 'op' and text == '*':
+        tokens.next()
+        return (_WILD,)
+    if kind == 'ident':
+        tokens.next()
+        return (_NAME, text)
+    raise tokens.error('应为成员名或 *')
+
+
+def _parse_bracket(tokens):
+    """解析 [ 之后的选择器列表，直到 ]"""
+    selectors = []
+    while True:
+        kind, text, _ = tokens.peek()
+        if kind == 'string':
+            tokens.next()
+            selectors.append((_NAME, _string_value(text)))
+        elif kind == 'op' and text == '*':
+            tokens.next()
+            selectors.append((_WILD,))
+        elif kind == 'op' and text == '?':
+            tokens.next()
+            selectors.append((_FILTER, _parse_filter_or(tokens)))
+        elif kind == 'number' or (kind == 'op' and text == ':'):
+            selectors.append(_parse_index_or_slice(tokens))
+        else:
+            raise tokens.error('应为键名、下标、切片、* 或过滤条件')
+        if tokens.accept(']'):
+            return selectors
+        tokens.expect(',')
+
+
+def _parse_int(tokens):
+    kind, text, _ = tokens.peek()
+    if kind != 'number' or not re.fullmatch(r'-?[0-9]+', text):
+        raise tokens.error('应为整数')
+    tokens.next()
+    return int(text)
+
+
+def _parse_index_or_slice(tokens):
+    parts = [None, None, None]
+    if tokens.peek()[0] == 'number':
+        parts[0] = _parse_int(tokens)
+        if tokens.peek()[1] != ':':
+            return (_INDEX, parts[0])
+    for i in (1, 2):
+        if not tokens.accept(':'):
+            break
+        if tokens.peek()[0] == 'number':
+            parts[i] = _parse_int(tokens)
+    return (_SLICE, *parts)
+
+
+def _parse_filter_or(tokens):
+    left = _parse_filter_and(tokens)
+    while tokens.accept('||'):
+        right = _parse_filter_and(tokens)
+        left = (lambda a, b: lambda node, root: a(node, root) or b(node, root))(left, right)
+    return left
+
+
+def _parse_filter_and(tokens):
+    left = _parse_filter_not(tokens)
+    while tokens.accept('&&'):
+        right = _parse_filter_not(tokens)
+        left = (lambda a, b: lambda node, root: a(node, root) and b(node, root))(left, right)
+    return left
+
+
+def _parse_filter_not(tokens):
+    if tokens.accept('!'):
+        inner = _parse_filter_not(tokens)
+        return lambda node, root: not inner(node, root)
+    if tokens.accept('('):
+        inner = _parse_filter_or(tokens)
+        tokens.expect(')')
+        return inner
+    left = _parse_filter_operand(tokens)
+    op = tokens.peek()[1] if tokens.peek()[0] == 'op' else None
+    if op not in _COMPARISONS:
+        if not left[0]:
+            raise tokens.error('字面量不能单独作为条件')
+        path = left[1]
+        return lambda node, root: path(node, root) is not _MISSING
+    tokens.next()
+    right = _parse_filter_operand(tokens)
+    compare = _COMPARISONS[op]
+    get_left, get_right = left[1], right[1]
+    return lambda node, root: compare(get_left(node, root), get_right(node, root))
+
+
+def _parse_filter_operand(tokens):
+    """返回 (是否为路径, 取值函数)；路径不存在时取值为 _MISSING"""
+    kind, text, _ = tokens.peek()
+    if kind == 'op' and text in ('@', '$'):
+        tokens.next()
+        relative = text == '@'
+        steps = []
+        while True:
+            if tokens.peek()[1] == '.' and tokens.peek()[0] == 'op':
+                tokens.next()
+                member = _parse_dot_member(tokens)
+                if member[0] != _NAME:
+                    raise tokens.error('过滤条件中的路径只能取单个成员')
+                steps.append(member[1])
+            elif tokens.peek()[1] == '[' and tokens.peek()[0] == 'op':
+                tokens.next()
+                kind, text, _ = tokens.peek()
+                if kind == 'string':
+                    tokens.next()
+                    steps.append(_string_value(text))
+                else:
+                    steps.append(_parse_int(tokens))
+                tokens.expect(']')
+            else:
+                break
+
+        def get(node, root, steps=steps, relative=relative):
+            value = node if relative else root
+            for step in steps:
+                value = _singular_child(value, step)
+                if value is _MISSING:
+                    break
+            return value
+        return True, get
+    return False, (lambda value: lambda node, root: value)(_literal(tokens))
+
+
+def _literal(tokens):
+    kind, text, _ = tokens.next()
+    if kind == 'number':
+        return _number_value(text)
+    if kind == 'string':
+        return _string_value(text)
+    if kind == 'ident' and text in ('true', 'false', 'null'):
+        return {'true': True, 'false': False, 'null': None}[text]
+    tokens.pos -= 1
+    raise tokens.error('应为路径或字面量')
+
+
+def _singular_child(value, step):
+    if type(step) is str:
+        return value.get(step, _MISSING) if type(value) is dict else _MISSING
+    if type(value) is list and -len(value) <= step < len(value):
+        return value[step]
+    return _MISSING
+
+
+def _path_equal(a, b):
+    if a is _MISSING or b is _MISSING:
+        return a is b
+    if type(a) is bool or type(b) is bool:
+        return type(a) is type(b) and a == b
+    return a == b
+
+
+def _path_less(a, b):
+    if _is_number(a) and _is_number(b):
+        return a < b
+    if type(a) is str and type(b) is str:
+        return a < b
+    return False
+
+
+_COMPARISONS = {
+    '==': _path_equal,
+    '!=': lambda a, b: not _path_equal(a, b),
+    '<': _path_less,
+    '>': lambda a, b: _path_less(b, a),
+    '<=': lambda a, b: _path_less(a, b) or _path_equal(a, b),
+    '>=': lambda a, b: _path_less(b, a) or _path_equal(a, b),
+}
+
+
+def _select(selector, node, root):
+    """产出 node 中被 selector 选中的子节点"""
+    kind = selector[0]
+    if kind == _NAME:
+        if type(node) is dict and selector[1] in node:
+            yield node[selector[1]]
+    elif kind == _INDEX:
+        if type(node) is list:
+            index = selector[1]
+            if -len(node) <= index < len(node):
+                yield node[index]
+    elif kind == _WILD:
+        if type(node) is dict:
+            yield from node.values()
+        elif type(node) is list:
+            yield from node
+    elif kind == _SLICE:
+        if type(node) is list and selector[3] != 0:
+            yield from node[slice(*selector[1:])]
+    else:
+        test = selector[1]
+        children = node.values() if type(node) is dict else node if type(node) is list else ()
+        for child in children:
+            if test(child, root):
+                yield child
+
+
+def _segment(descendant, selectors, nodes, root, job):
+    for node in nodes:
+        for target in (_descendants(node, job) if descendant else (node,)):
+            for selector in selectors:
+                yield from _select(selector, target, root)
+
+
+class _PathMatcher:
+    """简单路径的状态机，供 json_stream.stream_select 和内存中的求值共用
+
+    状态为已匹配到第几段的有序元组；递归下降段在任何深度都保持活跃。
+    """
+
+    def __init__(self, steps):
+        # steps: [(是否递归下降, 选择器类型, 参数)]
+        self.steps = steps
+        self.final = len(steps)
+        self.root = (0,)
+
+    def child(self, state, key):
+        steps = self.steps
+        result = []
+        for s in state:
+            if s == self.final:
+                continue
+            descendant, kind, arg = steps[s]
+            if descendant:
+                result.append(s)
+            if kind == _WILD or (type(key) is str and kind == _NAME and key == arg) or (
+                    type(key) is int and kind == _INDEX and key == arg):
+                result.append(s + 1)
+        if not result:
+            return None
+        return tuple(sorted(set(result))) if len(result) > 1 else tuple(result)
+
+    def accepts(self, state):
+        return state[-1] == self.final
+
+    def select(self, state, value, job=None):
+        """先序产出 value（处于 state）及其后代中被选中的值"""
+        steps = self.steps
+        stack = [(state, value)]
+        count = 0
+        while stack:
+            state, value = stack.pop()
+            if state[-1] == self.final:
+                yield value
+            count += 1
+            if job is not None and count % _CHECK_EVERY == 0:
+                job.check_cancelled()
+            if type(value) is not dict and type(value) is not list:
+                continue
+            if len(state) == 1 and state[0] < self.final and not steps[state[0]][0]:
+                # 只剩一个非递归的段：直接取子节点，不遍历其余成员
+                _, kind, arg = steps[state[0]]
+                if kind == _NAME:
+                    if type(value) is dict and arg in value:
+                        stack.append(((state[0] + 1,), value[arg]))
+                    continue
+                if kind == _INDEX:
+                    if type(value) is list and arg < len(value):
+                        stack.append(((state[0] + 1,), value[arg]))
+                    continue
+            items = value.items() if type(value) is dict else enumerate(value)
+            children = []
+            for key, item in items:
+                next_state = self.child(state, key)
+                if next_state is not None:
+                    children.append((next_state, item))
+            stack.extend(reversed(children))
+
+
+class Query:
+    """编译后的查询，使用 compile_query() 获取"""
+
+    def __init__(self, text, language, segments=None, program=None):
+        self.text = text
+        self.language = language
+        self._segments = segments
+        self._program = program
+        self._matcher = None
+        if segments and all(
+                len(selectors) == 1 and (selectors[0][0] in (_NAME, _WILD) or (
+                    selectors[0][0] == _INDEX and selectors[0][1] >= 0))
+                for _, selectors in segments):
+            self._matcher = _PathMatcher([(descendant, *selectors[0], None)[:3] for descendant, selectors in segments])
+
+    @property
+    def streamable(self):
+        """是否为可以流式求值的简单路径"""
+        return self._matcher is not None
+
+    def values(self, data, job=None):
+        """对已解析的数据求值，逐个产出结果"""
+        if self._matcher is not None:
+            return self._matcher.select(self._matcher.root, data, job)
+        if self._segments is not None:
+            nodes = iter((data,))
+            for descendant, selectors in self._segments:
+                nodes = _segment(descendant, selectors, nodes, data, job)
+            return nodes
+        return self._program(data)
+
+    def stream_file(self, path, job=None):
+        """流式对文件求值（仅简单路径），逐个产出结果；文件不是合法JSON时抛出 StreamDecodeError"""
+        if self._matcher is None:
+            raise QueryError('只有由键名、下标和通配符组成的 JSONPath 才能流式查询')
+        handle, data = json_stream.open_source(path)
+        try:
+            steps = self._matcher.steps
+            descendant, kind, name = steps[0]
+            if (descendant and kind == _NAME and name.isascii() and not any(step[0] for step in steps[1:])
+                    and not _may_escape(data, name)):
+                yield from self._find_keys(data, name, _PathMatcher(steps[1:]), job)
+            else:
+                yield from json_stream.stream_select(data, self._matcher, job)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            handle.close()
+
+    @staticmethod
+    def _find_keys(data, name, rest, job):
+        """$..name：在原始字节中查找 "name" 键，只解析其后的值
+
+        合法的JSON中，未被转义的引号后紧跟 name"、再跟冒号，只可能是对象的键。
+        命中值内部的同名键会在后续查找中命中，因此 rest 中不含递归下降。
+        """
+        needle = json.dumps(name, ensure_ascii=False).encode('utf-8')
+        scan_once = make_scanner(json.JSONDecoder())
+        size = len(data)
+        pos = 0
+        count = 0
+        while True:
+            pos = data.find(needle, pos)
+            if pos < 0:
+                return
+            end = pos + len(needle)
+            colon = end
+            while colon < size and data[colon] in b' \t\r\n':
+                colon += 1
+            if colon < size and data[colon] == 0x3a and not _escaped(data, pos):
+                value = _value_at(data, colon + 1, scan_once)
+                yield from rest.select(rest.root, value)
+            pos = end
+            count += 1
+            if job is not None and count % 256 == 0:
+                job.check_cancelled()
+                job.report(pos * 100 // max(1, size), '正在流式查询')
+
+
+def _may_escape(data, name):
+    """文件中是否出现 name 中某个字符的转义写法（\\uXXXX，或 name 含 / 时的 \\/），一次正则扫描
+
+    只要出现就不用字节查找，宁可多走流式解析，也不漏掉用转义写出的键名。
+    """
+    spellings = [re.escape(f'\\u{ord(ch):04x}'.encode('ascii')) for ch in set(name)]
+    if '/' in name:
+        spellings.append(re.escape(b'\\/'))
+    return re.search(b'|'.join(spellings), data, re.IGNORECASE) is not None
+
+
+def _escaped(data, pos):
+    """pos 处的引号前是否有奇数个反斜杠"""
+    count = 0
+    while pos - count > 0 and data[pos - count - 1] == 0x5c:
+        count += 1
+    return count % 2 == 1
+
+
+def _value_at(data, pos, scan_once):
+    """解析从字节偏移 pos 开始的一个值，先解码一小段，不够时逐步扩大"""
+    size = len(data)
+    length = _VALUE_WINDOW
+    while True:
+        at_eof = pos + length >= size
+        text = data[pos:pos + length].decode('utf-8', 'ignore')
+        start = len(text) - len(text.lstrip(' \t\r\n'))
+        limit = len(text) if at_eof else len(text) - _TAIL_SLACK
+        try:
+            value, end = scan_once(text, start)
+        except StopIteration as e:
+            message, error_pos = 'Expecting value', e.value
+        except json.JSONDecodeError as e:
+            message, error_pos = e.msg, e.pos
+        else:
+            if end <= limit:
+                return value
+            message, error_pos = None, end
+        if at_eof or (message is not None and error_pos < limit and not message.startswith('Unterminated')):
+            raise QueryError(f'JSON格式错误：{message}（字节偏移 {pos + len(text[:error_pos].encode("utf-8"))} 附近）')
+        length *= 4
+
+
+# ---- jq ----
+def _truthy(value):
+    return value is not None and value is not False
+
+
+def _jq_type(value):
+    if value is None:
+        return 'null'
+    if type(value) is bool:
+        return 'boolean'
+    if _is_number(value):
+        return 'number'
+    if type(value) is str:
+        return 'string'
+    return 'array' if type(value) is list else 'object'
+
+
+_TYPE_ORDER = {'null': 0, 'boolean': 1, 'number': 2, 'string': 3, 'array': 4, 'object': 5}
+
+
+def _jq_key(value):
+    """jq 的排序规则：null < false < true < 数字 < 字符串 < 数组 < 对象"""
+    kind = _jq_type(value)
+    if kind == 'array':
+        return (4, [_jq_key(item) for item in value])
+    if kind == 'object':
+        names = sorted(value)
+        return (5, names, [_jq_key(value[name]) for name in names])
+    return (_TYPE_ORDER[kind], value if value is not None else 0)
+
+
+_JQ_COMPARISONS = {
+    '==': lambda a, b: _jq_key(a) == _jq_key(b),
+    '!=': lambda a, b: _jq_key(a) != _jq_key(b),
+    '<': lambda a, b: _jq_key(a) < _jq_key(b),
+    '<=': lambda a, b: _jq_key(a) <= _jq_key(b),
+    '>': lambda a, b: _jq_key(a) > _jq_key(b),
+    '>=': lambda a, b: _jq_key(a) >= _jq_key(b),
+}
+
+
+def _index(value, key, optional):
+    if type(key) is str:
+        if type(value) is dict:
+            return (value.get(key),)
+        if value is None:
+            return (None,)
+    elif type(key) is int:
+        if type(value) is list:
+            return (value[key] if -len(value) <= key < len(value) else None,)
+        if value is None:
+            return (None,)
+    if optional:
+        return ()
+    raise QueryError(f'无法用 {json.dumps(key, ensure_ascii=False)} 索引 {_jq_type(value)}')
+
+
+def _iterate(value, optional):
+    if type(value) is dict:
+        return value.values()
+    if type(value) is list:
+        return value
+    if optional:
+        return ()
+    raise QueryError(f'无法遍历 {_jq_type(value)}')
+
+
+def _slice(value, start, stop, optional):
+    if type(value) in (list, str):
+        return (value[start:stop],)
+    if value is None:
+        return (None,)
+    if optional:
+        return ()
+    raise QueryError(f'无法切片 {_jq_type(value)}')
+
+
+def _length(value):
+    if value is None:
+        return 0
+    if type(value) is bool:
+        raise QueryError('boolean 没有 length')
+    if _is_number(value):
+        return abs(value)
+    return len(value)
+
+
+def _keys(value):
+    if type(value) is dict:
+        return sorted(value)
+    if type(value) is list:
+        return list(range(len(value)))
+    raise QueryError(f'{_jq_type(value)} 没有 keys')
+
+
+def _parse_jq_pipe(tokens):
+    left = _parse_jq_comma(tokens)
+    while tokens.accept('|'):
+        right = _parse_jq_comma(tokens)
+        left = (lambda a, b: lambda value: (out for item in a(value) for out in b(item)))(left, right)
+    return left
+
+
+def _parse_jq_comma(tokens):
+    left = _parse_jq_or(tokens)
+    while tokens.accept(','):
+        right = _parse_jq_or(tokens)
+        left = (lambda a, b: lambda value: _chain(a(value), b, value))(left, right)
+    return left
+
+
+def _chain(first, second, value):
+    yield from first
+    yield from second(value)
+
+
+def _parse_jq_or(tokens):
+    left = _parse_jq_and(tokens)
+    while tokens.accept('or'):
+        right = _parse_jq_and(tokens)
+        left = (lambda a, b: lambda value: (
+            True if _truthy(x) else _truthy(y) for x in a(value) for y in ((True,) if _truthy(x) else b(value))
+        ))(left, right)
+    return left
+
+
+def _parse_jq_and(tokens):
+    left = _parse_jq_compare(tokens)
+    while tokens.accept('and'):
+        right = _parse_jq_compare(tokens)
+        left = (lambda a, b: lambda value: (
+            _truthy(x) and _truthy(y) for x in a(value) for y in (b(value) if _truthy(x) else (False,))
+        ))(left, right)
+    return left
+
+
+def _parse_jq_compare(tokens):
+    left = _parse_jq_postfix(tokens)
+    kind, text, _ = tokens.peek()
+    if kind == 'op' and text in _JQ_COMPARISONS:
+        tokens.next()
+        right = _parse_jq_postfix(tokens)
+        compare = _JQ_COMPARISONS[text]
+        return lambda value: (compare(x, y) for y in right(value) for x in left(value))
+    return left
+
+
+def _parse_jq_postfix(tokens):
+    term = _parse_jq_primary(tokens)
+    while True:
+        kind, text, _ = tokens.peek()
+        if kind != 'op':
+            return term
+        if text == '.' and tokens.peek(1)[0] in ('ident', 'string') and tokens.peek(1)[2] == tokens.peek()[2] + 1:
+            tokens.next()
+            term = _jq_then(term, _parse_jq_field(tokens))
+        elif text == '[':
+            term = _jq_then(term, _parse_jq_bracket(tokens))
+        elif text == '.' and tokens.peek(1)[1] == '[' and tokens.peek(1)[2] == tokens.peek()[2] + 1:
+            tokens.next()
+            term = _jq_then(term, _parse_jq_bracket(tokens))
+        else:
+            return term
+
+
+def _jq_then(first, second):
+    return lambda value: (out for item in first(value) for out in second(item))
+
+
+def _optional(tokens):
+    return tokens.accept('?') is not None
+
+
+def _parse_jq_field(tokens):
+    kind, text, _ = tokens.next()
+    key = text if kind == 'ident' else _string_value(text)
+    optional = _optional(tokens)
+    return lambda value: _index(value, key, optional)
+
+
+def _parse_jq_bracket(tokens):
+    tokens.expect('[')
+    if tokens.accept(']'):
+        optional = _optional(tokens)
+        return lambda value: _iterate(value, optional)
+    kind, text, _ = tokens.peek()
+    if kind == 'string':
+        tokens.next()
+        key = _string_value(text)
+        tokens.expect(']')
+        optional = _optional(tokens)
+        return lambda value: _index(value, key, optional)
+    start = stop = None
+    if kind == 'number':
+        start = _parse_int(tokens)
+        if tokens.accept(']'):
+            optional = _optional(tokens)
+            return lambda value: _index(value, start, optional)
+    tokens.expect(':')
+    if tokens.peek()[0] == 'number':
+        stop = _parse_int(tokens)
+    tokens.expect(']')
+    optional = _optional(tokens)
+    return lambda value: _slice(value, start, stop, optional)
+
+
+_JQ_FUNCTIONS = {
+    'length': lambda value: (_length(value),),
+    'keys': lambda value: (_keys(value),),
+    'not': lambda value: (not _truthy(value),),
+    'type': lambda value: (_jq_type(value),),
+    'empty': lambda value: (),
+}
+
+
+def _parse_jq_primary(tokens):
+    kind, text, _ = tokens.peek()
+    if kind == 'op' and text == '..':
+        tokens.next()
+        return lambda value: _descendants(value)
+    if kind == 'op' and text == '.':
+        tokens.next()
+        following = tokens.peek()
+        adjacent = following[2] == tokens.items[tokens.pos - 1][2] + 1
+        if following[0] in ('ident', 'string') and adjacent:
+            return _parse_jq_field(tokens)
+        if following[1] == '[' and adjacent:
+            return _parse_jq_bracket(tokens)
+        return lambda value: (value,)
+    if kind == 'op' and text == '(':
+        tokens.next()
+        inner = _parse_jq_pipe(tokens)
+        tokens.expect(')')
+        return inner
+    if kind == 'op' and text == '[':
+        tokens.next()
+        if tokens.accept(']'):
+            return lambda value: ([],)
+        inner = _parse_jq_pipe(tokens)
+        tokens.expect(']')
+        return lambda value: (list(inner(value)),)
+    if kind == 'op' and text == '{':
+        tokens.next()
+        return _parse_jq_object(tokens)
+    if kind in ('number', 'string') or (kind == 'ident' and text in ('true', 'false', 'null')):
+        literal = _literal(tokens)
+        return lambda value: (literal,)
+    if kind == 'ident':
+        tokens.next()
+        if text in ('select', 'map'):
+            tokens.expect('(')
+            inner = _parse_jq_pipe(tokens)
+            tokens.expect(')')
+            if text == 'select':
+                return lambda value: (value for result in inner(value) if _truthy(result))
+            return lambda value: ([out for item in _iterate(value, False) for out in inner(item)],)
+        if text in _JQ_FUNCTIONS:
+            return _JQ_FUNCTIONS[text]
+        tokens.pos -= 1
+        raise tokens.error('不支持的函数')
+    raise tokens.error('应为 .、..、字面量、(、[、{ 或函数')
+
+
+def _parse_jq_object(tokens):
+    """{a, "b": .x, c: .y.z}：成员产出多个结果时与 jq 相同，产出各结果的全部组合"""
+    fields = []
+    if not tokens.accept('}'):
+        while True:
+            kind, text, _ = tokens.next()
+            if kind == 'ident':
+                key = text
+            elif kind == 'string':
+                key = _string_value(text)
+            else:
+                tokens.pos -= 1
+                raise tokens.error('应为键名')
+            if tokens.accept(':'):
+                fields.append((key, _parse_jq_or(tokens)))
+            else:
+                fields.append((key, (lambda key: lambda value: _index(value, key, False))(key)))
+            if tokens.accept('}'):
+                break
+            tokens.expect(',')
+
+    def build(value):
+        results = [{}]
+        for key, getter in fields:
+            outputs = list(getter(value))
+            results = [dict(partial, **{key: out}) for partial in results for out in outputs]
+        return results
+    return build
+
+
+# ---- 编译与缓存 ----
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compile_query(text):
+    """编译查询，结果按查询文本缓存（LRU，CACHE_SIZE 条）；语法错误抛出 QueryError"""
+    text = text.strip()
+    with _cache_lock:
+        query = _cache.get(text)
+        if query is not None:
+            _cache.move_to_end(text)
+            return query
+    if not text:
+        raise QueryError('查询为空')
+    tokens = _Tokens(text)
+    if text.startswith('$'):
+        query = Query(text, JSONPATH, segments=_parse_jsonpath(tokens))
+    else:
+        program = _parse_jq_pipe(tokens)
+        if tokens.peek()[0] != 'end':
+            raise tokens.error('多余的内容')
+        query = Query(text, JQ, program=program)
+    with _cache_lock:
+        _cache[text] = query
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return query
+
+
+def write_results(values, sink, job=None):
+    """把结果写成格式化的 JSON 数组（与 json.dumps(list, indent=4) 相同），返回结果条数"""
+    encoder = json.JSONEncoder(indent=4, ensure_ascii=False)
+    scalar = json.JSONEncoder(ensure_ascii=False).encode
+    out = ['[']
+    size = 0
+    count = 0
+    for value in values:
+        out.append(',\n    ' if count else '\n    ')
+        if type(value) is dict or type(value) is list:
+            for chunk in encoder.iterencode(value):
+                chunk = chunk.replace('\n', '\n    ')
+                out.append(chunk)
+                size += len(chunk)
+        else:
+            # 标量走 C 编码器
+            chunk = scalar(value)
+            out.append(chunk)
+            size += len(chunk)
+        count += 1
+        if size >= _FLUSH_SIZE:
+            sink.write(''.join(out))
+            out = []
+            size = 0
+            if job is not None:
+                job.check_cancelled()
+    out.append('\n]' if count else ']')
+    sink.write(''.join(out))
+    return count
@@ -0,0 +1,477 @@
+"""容错的JSON修复
+
+把常见的“差一点就是JSON”的文本修复为合法JSON，并记录每一处修改及其位置：
+
+- 数组、对象末尾多余的逗号，连续的逗号，缺失的逗号和冒号
+- 单引号字符串、未加引号的键名和字符串值
+- Python/JavaScript 常量 True/False/None/undefined
+- 字符串中未转义的换行等控制字符、无效的转义
+- 非标准数字（+1、.5、1.、0x1F、前导零）
+- // 和 /* */ 注释、无法识别的字符、不匹配的右括号
+- 被截断的结尾：未闭合的字符串、缺失的值、未闭合的数组和对象
+
+修复在一次线性扫描中完成，每个位置只向后看一个词法单元，不会“修一处、
+重新解析、再修下一处”。外层状态机与 live_validation 相同；遇到数组或对象时
+先把一个窗口交给标准库的 C 扫描器，整个子树合法时直接跳过，因此大文档中
+合法的部分几乎不经过 Python 代码。输出由原文的未修改片段和修改处拼接而成。
+"""
+import json
+import re
+
+# 交给 C 扫描器的子树窗口的上下限
+MIN_WINDOW = 256
+MAX_WINDOW = 256 * 1024
+# 截断的窗口末尾这段长度内报告的错误可能只是词法单元被截断
+_TAIL_SLACK = 16
+# 每处理多少个词法单元检查一次取消标记并上报进度
+_CHECK_EVERY = 4096
+
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+_STRING_RE = re.compile(r'"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"')
+_NUMBER_RE = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?')
+# 宽松的数字：正号、前导零、.5、1.、不完整的指数，以及十六进制
+_LOOSE_NUMBER_RE = re.compile(r'[+-]?(?:0[xX][0-9a-fA-F]+|(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]*)?)')
+_IDENTIFIER_RE = re.compile(r'(?:[^\W\d]|\$)[\w$]*')
+# 字符串内可以原样保留的片段（双引号 / 单引号字符串）
+_PLAIN_RUNS = {
+    '"': re.compile(r'[^"\\\x00-\x1f]+'),
+    "'": re.compile(r'[^\'"\\\x00-\x1f]+'),
+}
+# 无法识别的字符：除空白、括号、引号、标点、数字和标识符之外的连续字符
+_GARBAGE_RE = re.compile(r'[^ \t\n\r\w\[\]{}"\',:/+\-.$]+|.', re.DOTALL)
+
+_CONSTANTS = {
+    'true': 'true', 'false': 'false', 'null': 'null',
+    'NaN': 'NaN', 'Infinity': 'Infinity',
+    'True': 'true', 'False': 'false', 'None': 'null',
+    'undefined': 'null', 'nil': 'null',
+}
+_ESCAPES = {'"': '\\"', '\\': '\\\\', '\n': '\\n', '\r': '\\r', '\t': '\\t', '\b': '\\b', '\f': '\\f'}
+_VALID_ESCAPES = set('"\\/bfnrtu')
+_CLOSERS = {'[': ']', '{': '}'}
+
+# 语法状态：期望值 / '[' 之后 / '{' 之后 / ',' 之后的键 / 冒号 / 值之后 / 顶层结束
+VALUE, FIRST_VALUE, FIRST_KEY, KEY, COLON, AFTER, DONE = range(7)
+
+_scan_once = json.JSONDecoder().scan_once
+
+
+class Fix:
+    """一处修改：原文中的位置（字符下标，行列号从 1 开始）和说明"""
+    __slots__ = ('position', 'message', 'line', 'column')
+
+    def __init__(self, position, message):
+        self.position = position
+        self.message = message
+        self.line = None
+        self.column = None
+
+    def __str__(self):
+        return f'第 {self.line} 行第 {self.column} 列: {self.message}'
+
+    def __repr__(self):
+        return f'Fix({self.position}, {self.message!r})'
+
+
+class RepairResult:
+    """修复结果：修复后的文本和按位置排列的修改列表"""
+
+    def __init__(self, text, fixes):
+        self.text = text
+        self.fixes = fixes
+
+    @property
+    def changed(self):
+        return bool(self.fixes)
+
+
+class _Repairer:
+    def __init__(self, text, job):
+        self.text = text
+        self.length = len(text)
+        self.job = job
+        self.parts = []
+        self.copied = 0
+        self.fixes = []
+        # 已知的下一个语法错误的位置：交给 C 扫描器的窗口截止于此，
+        # 不包含错误的子树仍能整体跳过，包含错误的子树很快失败
+        self.error_at = 0
+        # 第一次尝试整篇扫描，文本本身合法时只调用一次 C 扫描器
+        self.window = max(MIN_WINDOW, self.length)
+
+    # ---- 输出 ----
+    def replace(self, start, end, replacement, message, position=None):
+        """把原文 [start, end) 替换为 replacement 并记录一处修改"""
+        if start > self.copied:
+            self.parts.append(self.text[self.copied:start])
+        if replacement:
+            self.parts.append(replacement)
+        self.copied = max(self.copied, end)
+        self.fixes.append(Fix(start if position is None else position, message))
+
+    def insert(self, position, text, message):
+        self.replace(position, position, text, message)
+
+    def delete(self, start, end, message):
+        self.replace(start, end, '', message)
+
+    def keep(self, pos):
+        """单独输出 pos 处的一个字符，返回其在输出片段中的序号，之后可用 drop() 撤回"""
+        if pos > self.copied:
+            self.parts.append(self.text[self.copied:pos])
+        self.parts.append(self.text[pos])
+        self.copied = pos + 1
+        return len(self.parts) - 1
+
+    def insert_comma(self, position):
+        """补上缺失的逗号，返回可交给 drop() 撤回的 (位置, 片段序号, 修改记录)"""
+        self.insert(position, ',', '补上缺失的逗号')
+        return position, len(self.parts) - 1, self.fixes[-1]
+
+    def drop(self, kept, message):
+        """撤回 keep() 或 insert_comma() 输出的逗号"""
+        position, index, inserted = kept
+        self.parts[index] = ''
+        if inserted is not None:
+            # 补上的逗号之后没有值：连同补上它的修改记录一起去掉
+            self.fixes.remove(inserted)
+        else:
+            self.fixes.append(Fix(position, message))
+
+    def result(self):
+        if self.copied < self.length:
+            self.parts.append(self.text[self.copied:])
+        _locate(self.text, self.fixes)
+        return RepairResult(''.join(self.parts), self.fixes)
+
+    # ---- 词法 ----
+    def skip_space(self, pos):
+        """跳过空白和注释，注释从输出中删除"""
+        text = self.text
+        while True:
+            pos = _WHITESPACE_RE.match(text, pos).end()
+            if text.startswith('//', pos):
+                end = text.find('\n', pos)
+                end = self.length if end < 0 else end
+                self.delete(pos, end, '删除注释')
+                pos = end
+            elif text.startswith('/*', pos):
+                end = text.find('*/', pos + 2)
+                end = self.length if end < 0 else end + 2
+                self.delete(pos, end, '删除注释')
+                pos = end
+            else:
+                return pos
+
+    def fast_subtree(self, pos):
+        """用 C 扫描器跳过 pos 处合法的数组或对象，返回结束位置；不合法时返回 None"""
+        limit = self.error_at if self.error_at > pos else self.length
+        stop = min(pos + self.window, limit)
+        truncated = stop < self.length
+        chunk, begin, offset = (self.text[pos:stop], 0, pos) if truncated else (self.text, pos, 0)
+        try:
+            end = _scan_once(chunk, begin)[1] + offset
+        except StopIteration as e:
+            self._failed(pos, e.value + offset, stop, truncated, unterminated=False)
+            return None
+        except json.JSONDecodeError as e:
+            self._failed(pos, e.pos + offset, stop, truncated, e.msg.startswith('Unterminated string'))
+            return None
+        except RecursionError:
+            # 嵌套过深，交给外层状态机逐层处理
+            return None
+        self.window = max(MIN_WINDOW, min(MAX_WINDOW, (end - pos) * 4))
+        return end
+
+    def _failed(self, pos, error, stop, truncated, unterminated):
+        if truncated and stop != self.error_at and (unterminated or error >= stop - _TAIL_SLACK):
+            # 只是子树超出了窗口：逐个元素处理，并为下一次放大窗口
+            self.window = min(MAX_WINDOW, self.window * 2)
+            return
+        if not truncated or stop != self.error_at:
+            self.error_at = error
+        # 错误密集时缩小窗口，每次尝试只复制错误附近的一小段
+        self.window = max(MIN_WINDOW, min(self.window, (error - pos) * 4))
+
+    def string(self, pos, quote):
+        """修复 pos 处以 quote 开头的字符串，返回结束位置"""
+        text = self.text
+        if quote == '"':
+            match = _STRING_RE.match(text, pos)
+            if match is not None:
+                return match.end()
+        plain = _PLAIN_RUNS[quote]
+        out = ['"']
+        notes = []
+        i = pos + 1
+        length = self.length
+        while True:
+            match = plain.match(text, i)
+            if match is not None:
+                out.append(match.group())
+                i = match.end()
+            if i >= length:
+                out.append('"')
+                notes.append('补全被截断的字符串')
+                break
+            ch = text[i]
+            if ch == quote:
+                out.append('"')
+                i += 1
+                break
+            if ch == '\\':
+                following = text[i + 1:i + 2]
+                if following == "'":
+                    out.append("'")
+                    if quote == '"':
+                        notes.append('删除无效的转义 \\\'')
+                    i += 2
+                elif following in _VALID_ESCAPES and following and (
+                        following != 'u' or re.match(r'[0-9a-fA-F]{4}', text[i + 2:i + 6])):
+                    out.append(text[i:i + 2])
+                    i += 2
+                elif not following:
+                    # 文末的反斜杠
+                    i += 1
+                else:
+                    out.append('\\\\')
+                    notes.append('转义无效的反斜杠')
+                    i += 1
+            elif ch == '"':
+                out.append('\\"')
+                i += 1
+            else:
+                out.append(_ESCAPES.get(ch) or f'\\u{ord(ch):04x}')
+                notes.append('转义字符串中的控制字符')
+                i += 1
+        if quote == "'":
+            notes.insert(0, '单引号字符串改为双引号')
+        if notes:
+            self.replace(pos, i, ''.join(out), '；'.join(dict.fromkeys(notes)))
+        return i
+
+    def number(self, pos):
+        """pos 处的数字，非标准写法改为标准数字；返回结束位置，不是数字时返回 None"""
+        if self.text.startswith('-Infinity', pos):
+            return pos + 9
+        match = _LOOSE_NUMBER_RE.match(self.text, pos)
+        if match is None:
+            return None
+        end = match.end()
+        strict = _NUMBER_RE.match(self.text, pos)
+        if strict is None or strict.end() != end:
+            self.replace(pos, end, _normalize_number(match.group()), f'修正数字格式 {match.group()}')
+        return end
+
+    def bare_word(self, pos, as_key):
+        """pos 处的标识符：常量改为JSON常量，其余加上引号；返回结束位置，不是标识符时返回 None"""
+        match = _IDENTIFIER_RE.match(self.text, pos)
+        if match is None:
+            return None
+        word = match.group()
+        end = match.end()
+        if as_key:
+            self.replace(pos, end, json.dumps(word, ensure_ascii=False), f'键名 {word} 加上引号')
+            return end
+        constant = _CONSTANTS.get(word)
+        if constant is None and end == self.length:
+            constant = next((c for c in ('true', 'false', 'null') if c.startswith(word)), None)
+            if constant is not None:
+                self.replace(pos, end, constant, f'补全被截断的 {constant}')
+                return end
+        if constant is None:
+            self.replace(pos, end, json.dumps(word, ensure_ascii=False), f'未加引号的字符串 {word} 加上引号')
+        elif constant != word:
+            self.replace(pos, end, constant, f'{word} 改为 {constant}')
+        return end
+
+    def garbage(self, pos):
+        match = _GARBAGE_RE.match(self.text, pos)
+        self.delete(pos, match.end(), f'删除无法识别的字符 {match.group()[:20]!r}')
+        return match.end()
+
+    # ---- 语法 ----
+    def run(self):
+        text = self.text
+        length = self.length
+        stack = []
+        state = VALUE
+        # 引出当前 VALUE/KEY 状态的逗号（见 keep() 和 insert_comma()），直到输出键或值为止；
+        # 其间无法识别的字符被删除后遇到右括号或文末时，逗号随之删除
+        comma = None
+        pos = 0
+        count = 0
+        while True:
+            count += 1
+            if count % _CHECK_EVERY == 0 and self.job is not None:
+                self.job.check_cancelled()
+                self.job.report(pos * 100 // max(1, length), '正在修复JSON')
+            pos = self.skip_space(pos)
+            if pos >= length:
+                break
+            ch = text[pos]
+
+            if state == DONE:
+                if ch in ']}':
+                    pos = self.garbage_closer(pos, ch)
+                else:
+                    self.delete(pos, length, '删除顶层值之后的多余内容')
+                    pos = length
+                continue
+
+            if ch in ']}':
+                pos, state, comma = self.close(pos, ch, stack, state, comma)
+                continue
+
+            if ch == ',':
+                if state == AFTER:
+                    comma = (pos, self.keep(pos), None)
+                    state = VALUE if stack[-1] == '[' else KEY
+                elif state == COLON:
+                    self.insert(pos, ': null', '补上缺失的值 null')
+                    comma = (pos, self.keep(pos), None)
+                    state = KEY
+                else:
+                    self.delete(pos, pos + 1, '删除多余的逗号')
+                pos += 1
+                continue
+
+            if state == COLON:
+                if ch == ':':
+                    pos += 1
+                elif ch == '=':
+                    self.replace(pos, pos + 1, ':', '= 改为冒号')
+                    pos += 1
+                else:
+                    self.insert(pos, ':', '补上缺失的冒号')
+                state = VALUE
+                comma = None
+                continue
+
+            if ch == ':':
+                pos = self.garbage(pos)
+                continue
+
+            if state == AFTER:
+                # 对象中的数组或对象不可能是键名，按无法识别的字符处理
+                if _starts_value(ch) and (stack[-1] == '[' or ch not in '[{'):
+                    comma = self.insert_comma(pos)
+                    state = VALUE if stack[-1] == '[' else KEY
+                else:
+                    pos = self.garbage(pos)
+                continue
+
+            if state == FIRST_KEY or state == KEY:
+                if ch == '"' or ch == "'":
+                    pos = self.string(pos, ch)
+                else:
+                    end = self.bare_word(pos, as_key=True)
+                    if end is None:
+                        match = _LOOSE_NUMBER_RE.match(text, pos)
+                        if match is None:
+                            pos = self.garbage(pos)
+                            continue
+                        end = match.end()
+                        self.replace(pos, end, json.dumps(match.group()), f'键名 {match.group()} 加上引号')
+                    pos = end
+                state = COLON
+                comma = None
+                continue
+
+            # VALUE / FIRST_VALUE
+            if ch == '[' or ch == '{':
+                end = self.fast_subtree(pos)
+                if end is None:
+                    stack.append(ch)
+                    comma = None
+                    pos += 1
+                    state = FIRST_VALUE if ch == '[' else FIRST_KEY
+                    continue
+                pos = end
+            elif ch == '"' or ch == "'":
+                pos = self.string(pos, ch)
+            else:
+                end = self.number(pos)
+                if end is None:
+                    end = self.bare_word(pos, as_key=False)
+                if end is None:
+                    pos = self.garbage(pos)
+                    continue
+                pos = end
+            state = AFTER if stack else DONE
+            comma = None
+
+        # 文本结束：补全缺失的部分
+        if state == COLON:
+            self.insert(length, ': null', '补上缺失的值 null')
+        elif state == VALUE and stack and comma is None:
+            self.insert(length, 'null', '补上缺失的值 null')
+        elif comma is not None:
+            self.drop(comma, '删除末尾多余的逗号')
+        for opener in reversed(stack):
+            self.insert(length, _CLOSERS[opener], f'补全缺失的 {_CLOSERS[opener]}')
+        return self.result()
+
+    def close(self, pos, ch, stack, state, comma):
+        """处理右括号，返回 (新位置, 新状态, 逗号位置)"""
+        opener = '[' if ch == ']' else '{'
+        if opener not in stack:
+            return self.garbage_closer(pos, ch), state, comma
+        if state == COLON:
+            self.insert(pos, ': null', '补上缺失的值 null')
+        elif state == VALUE and comma is None and stack[-1] == '{':
+            self.insert(pos, 'null', '补上缺失的值 null')
+        elif comma is not None:
+            self.drop(comma, '删除末尾多余的逗号')
+        # 关闭中间未闭合的容器
+        while stack[-1] != opener:
+            closer = _CLOSERS[stack.pop()]
+            self.insert(pos, closer, f'补全缺失的 {closer}')
+        stack.pop()
+        return pos + 1, AFTER if stack else DONE, None
+
+    def garbage_closer(self, pos, ch):
+        self.delete(pos, pos + 1, f'删除多余的 {ch}')
+        return pos + 1
+
+
+def _starts_value(ch):
+    return ch in '[{"\'+-.' or ch.isdigit() or ch == '_' or ch == '$' or ch.isalpha()
+
+
+def _normalize_number(token):
+    """把宽松写法的数字改为标准JSON数字"""
+    sign = '-' if token.startswith('-') else ''
+    body = token.lstrip('+-')
+    if body[:2] in ('0x', '0X'):
+        return sign + str(int(body, 16))
+    mantissa, _, exponent = body.lower().partition('e')
+    integer, dot, fraction = mantissa.partition('.')
+    integer = integer.lstrip('0') or '0'
+    number = integer + ('.' + fraction if fraction else '')
+    if exponent.lstrip('+-'):
+        number += 'e' + exponent
+    return sign + number
+
+
+def _locate(text, fixes):
+    """按位置排序并填写行列号，一次顺序扫描完成"""
+    fixes.sort(key=lambda fix: fix.position)
+    line = 1
+    line_start = 0
+    scanned = 0
+    for fix in fixes:
+        position = fix.position
+        if position > scanned:
+            newlines = text.count('\n', scanned, position)
+            if newlines:
+                line += newlines
+                line_start = text.rfind('\n', scanned, position) + 1
+            scanned = position
+        fix.line = line
+        fix.column = position - line_start + 1
+
+
+def repair(text, job=None):
+    """修复 text，返回 RepairResult；text 本身合法时原样返回且没有修改记录"""
+    return _Repairer(text, job).run()
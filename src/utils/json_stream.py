@@ -0,0 +1,477 @@
+"""基于内存映射的流式格式化/压缩
+
+输入文件以 mmap 方式按窗口读取并增量解码，输出分块写入目标文件或 LineStore，
+全程不构建整份文档的对象树，也不拼出完整结果，内存占用只与窗口大小有关。
+
+处理分两级：
+- 外层“骨架”由逐词法单元的状态机处理，负责校验语法、维护嵌套栈和缩进；
+- 能完整落在当前窗口内的子树（数组元素、对象成员的值）直接交给标准库的
+  C 扫描器解析，再用 json 编码器输出，绝大部分数据走的是 C 实现。
+
+因此输出与 json_ops.format_text / minify_text 一致，语法错误的消息和位置
+（字符偏移、行列号）也与 json.loads 相同。
+
+stream_select() 用同样的两级处理按查询选取值（见 json_query），只有通往匹配
+位置的容器才逐个词法单元处理。
+"""
+import codecs
+import json
+import mmap
+import os
+import re
+from json.decoder import scanstring
+from json.encoder import encode_basestring
+from json.scanner import make_scanner
+
+from src.utils import line_store
+from src.utils.json_ops import INDENT
+
+# 每次从文件读取的字节数
+WINDOW_SIZE = 4 * 1024 * 1024
+# 输出缓冲攒够该长度后写入目标
+_FLUSH_SIZE = 1024 * 1024
+# 窗口末尾这段长度内的数字等词法单元可能被截断，移到下一窗口重新匹配
+_TAIL_SLACK = 64
+
+_WHITESPACE = ' \t\n\r'
+_STRING = r'"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"'
+_TOKEN_RE = re.compile(
+    r'[ \t\n\r]*(?:'
+    r'([\[{])|([\]}])|(,)|(:)|'
+    r'(' + _STRING + r')|'
+    r'(-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?|true|false|null|NaN|-?Infinity))')
+
+_OPEN, _CLOSE, _COMMA, _COLON, _STRING_TOKEN, _SCALAR = range(1, 7)
+
+# 语法状态：期望值 / '[' 之后 / '{' 之后 / ',' 之后的键 / 冒号 / 值之后 / 顶层结束
+_VALUE, _FIRST_VALUE, _FIRST_KEY, _KEY, _COLON_STATE, _AFTER, _DONE = range(7)
+
+_STATE_ERRORS = {
+    _VALUE: 'Expecting value',
+    _FIRST_VALUE: 'Expecting value',
+    _FIRST_KEY: 'Expecting property name enclosed in double quotes',
+    _KEY: 'Expecting property name enclosed in double quotes',
+    _COLON_STATE: "Expecting ':' delimiter",
+    _AFTER: "Expecting ',' delimiter",
+    _DONE: 'Extra data',
+}
+_UNTERMINATED = 'Unterminated string starting at'
+# C扫描器在字符串内部报告的错误（未闭合之外）：控制字符、非法转义、不完整的 \uXXXX
+_STRING_ERRORS = ('Invalid control character', 'Invalid \\')
+# 从字符串内部某处到闭合引号；没有匹配到引号说明字符串延续到窗口末尾
+_STRING_REST_RE = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*(")?', re.S)
+
+
+class StreamDecodeError(json.JSONDecodeError):
+    """流式处理中的语法错误
+
+    msg/pos/lineno/colno 与 json.JSONDecodeError 含义相同，但不保存整份文档，
+    只保留错误位置附近的上下文。
+    """
+
+    def __init__(self, msg, pos, lineno, colno, context=''):
+        ValueError.__init__(self, f'{msg}: line {lineno} column {colno} (char {pos})')
+        self.msg = msg
+        self.doc = ''
+        self.pos = pos
+        self.lineno = lineno
+        self.colno = colno
+        self.context = context
+
+    def __reduce__(self):
+        return self.__class__, (self.msg, self.pos, self.lineno, self.colno, self.context)
+
+    def describe(self):
+        """与 json_ops.describe_decode_error 相同格式的错误描述"""
+        return f"JSON 格式错误(位置 {self.pos}):\n{self.msg}\n上下文:\n{self.context}"
+
+
+class _Source:
+    """按窗口增量解码的输入，记录窗口之前的字符数和行号以便报告错误位置"""
+
+    def __init__(self, data):
+        self.data = data
+        self.size = len(data)
+        self.read_pos = 0
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.window = ''
+        self.at_eof = False
+        self.offset = 0          # 窗口起点之前的字符数
+        self.lines = 1           # 窗口起点所在行号
+        self.line_start = 0      # 窗口起点所在行的起始字符偏移
+
+    def advance(self, pos):
+        """丢弃窗口中 pos 之前的内容并读入下一块"""
+        window = self.window
+        newline = window.rfind('\n', 0, pos)
+        if newline >= 0:
+            self.lines += window.count('\n', 0, pos)
+            self.line_start = self.offset + newline + 1
+        self.offset += pos
+        chunk = self.data[self.read_pos:self.read_pos + WINDOW_SIZE]
+        self.read_pos += len(chunk)
+        self.at_eof = self.read_pos >= self.size
+        self.window = window[pos:] + self.decoder.decode(chunk, final=self.at_eof)
+
+    def error(self, msg, pos, radius=20):
+        """以窗口内偏移 pos 构造错误"""
+        window = self.window
+        newline = window.rfind('\n', 0, pos)
+        if newline >= 0:
+            lineno = self.lines + window.count('\n', 0, pos)
+            line_start = self.offset + newline + 1
+        else:
+            lineno, line_start = self.lines, self.line_start
+        absolute = self.offset + pos
+        context = window[max(0, pos - radius):pos + radius]
+        return StreamDecodeError(msg, absolute, lineno, absolute - line_start + 1, context)
+
+
+def _skip_whitespace(window, pos):
+    return len(window) - len(window[pos:].lstrip(_WHITESPACE))
+
+
+def _string_error(window, pos):
+    """返回从 pos 处引号开始的字符串的错误，字符串合法时返回 None"""
+    try:
+        scanstring(window, pos + 1)
+    except json.JSONDecodeError as e:
+        return e
+    return None
+
+
+def _truncated_error(window, msg, pos, limit):
+    """不在文件末尾时，判断扫描错误是否只是值被窗口截断所致
+
+    错误落在窗口末尾的一小段内，或者出错的字符串一直延续到窗口末尾（例如
+    \\uXXXX 转义被窗口边界切开），都在读入下一块后重试；真正的错误届时再报告。
+    """
+    if pos >= limit or msg == _UNTERMINATED:
+        return True
+    return msg.startswith(_STRING_ERRORS) and _STRING_REST_RE.match(window, pos).group(1) is None
+
+
+def _may_be_truncated(window, pos):
+    """窗口在 pos 处无法匹配时，判断是否只是词法单元被窗口截断"""
+    pos = _skip_whitespace(window, pos)
+    if pos >= len(window):
+        return True
+    if window[pos] == '"':
+        error = _string_error(window, pos)
+        return error is None or _truncated_error(window, error.msg, error.pos, len(window) - _TAIL_SLACK)
+    return len(window) - pos < _TAIL_SLACK
+
+
+def _token_error(source, state, pos):
+    """在无法识别词法单元的位置构造错误，字符串错误沿用C扫描器的消息"""
+    window = source.window
+    pos = _skip_whitespace(window, pos)
+    if pos < len(window) and window[pos] == '"' and state in (_VALUE, _FIRST_VALUE, _FIRST_KEY, _KEY):
+        error = _string_error(window, pos)
+        if error is not None:
+            return source.error(error.msg, error.pos)
+    return source.error(_STATE_ERRORS[state], pos)
+
+
+def stream_reformat(data, write, indent=INDENT, job=None, message='正在流式处理'):
+    """把 data（bytes 或 mmap，UTF-8 编码）中的JSON重新排版后分块交给 write(str)
+
+    indent 为 None 时输出紧凑格式。语法错误抛出 StreamDecodeError。
+    """
+    pretty = indent is not None
+    if pretty:
+        encode = json.JSONEncoder(indent=indent, ensure_ascii=False).encode
+        colon = ': '
+    else:
+        encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+        colon = ':'
+    indent_unit = ' ' * indent if pretty else ''
+    indents = ['\n' if pretty else '']
+    scan_once = make_scanner(json.JSONDecoder())
+    match_token = _TOKEN_RE.match
+
+    source = _Source(data)
+    source.advance(0)
+    out = []
+    out_size = 0
+    stack = []
+    state = _VALUE
+    prefix = ''
+
+    while True:
+        window = source.window
+        at_eof = source.at_eof
+        limit = len(window) + 1 if at_eof else len(window) - _TAIL_SLACK
+        pos = 0
+        while True:
+            match = match_token(window, pos)
+            if match is None:
+                break
+            kind = match.lastindex
+            start = match.start(kind)
+            if kind == _STRING_TOKEN and (state == _FIRST_KEY or state == _KEY):
+                # 键名重新编码，转义写法与 json.dumps 一致
+                out.append(prefix)
+                out.append(encode_basestring(scan_once(window, start)[0]))
+                state = _COLON_STATE
+                prefix = ''
+                pos = match.end()
+            elif kind == _OPEN or kind == _STRING_TOKEN or kind == _SCALAR:
+                if state != _VALUE and state != _FIRST_VALUE:
+                    raise source.error(_STATE_ERRORS[state], start)
+                try:
+                    value, end = scan_once(window, start)
+                except StopIteration as e:
+                    # 扫描器在起点处无法识别值（如窗口末尾被截断的关键字）
+                    error_msg, error_pos = _STATE_ERRORS[_VALUE], e.value
+                except json.JSONDecodeError as e:
+                    error_msg, error_pos = e.msg, e.pos
+                else:
+                    error_msg = None
+                if error_msg is not None:
+                    truncated = not at_eof and _truncated_error(window, error_msg, error_pos, limit)
+                    if not truncated:
+                        raise source.error(error_msg, error_pos)
+                    if kind != _OPEN:
+                        break  # 标量被窗口截断，读入下一块后重试
+                    # 子树超出窗口：只输出开括号，由状态机逐层处理其内容
+                    opener = match.group(kind)
+                    stack.append(opener)
+                    while len(indents) <= len(stack):
+                        indents.append(indents[-1] + indent_unit)
+                    out.append(prefix)
+                    out.append(opener)
+                    state = _FIRST_VALUE if opener == '[' else _FIRST_KEY
+                    prefix = indents[len(stack)]
+                    pos = match.end()
+                    continue
+                if kind == _SCALAR and end > limit:
+                    break
+                text = encode(value)
+                if pretty and kind == _OPEN and stack:
+                    text = text.replace('\n', indents[len(stack)])
+                out.append(prefix)
+                out.append(text)
+                out_size += len(text)
+                state = _AFTER if stack else _DONE
+                prefix = ''
+                pos = end
+            elif kind == _CLOSE:
+                closer = match.group(kind)
+                opener = '[' if closer == ']' else '{'
+                if not stack or stack[-1] != opener:
+                    raise source.error(_STATE_ERRORS[state], start)
+                if state == _AFTER:
+                    out.append(indents[len(stack) - 1])
+                elif state != (_FIRST_VALUE if opener == '[' else _FIRST_KEY):
+                    raise source.error(_STATE_ERRORS[state], start)
+                out.append(closer)  # 空容器直接闭合，不换行
+                stack.pop()
+                state = _AFTER if stack else _DONE
+                prefix = ''
+                pos = match.end()
+            elif kind == _COMMA:
+                if state != _AFTER:
+                    raise source.error(_STATE_ERRORS[state], start)
+                out.append(',')
+                state = _VALUE if stack[-1] == '[' else _KEY
+                prefix = indents[len(stack)]
+                pos = match.end()
+            else:
+                if state != _COLON_STATE:
+                    raise source.error(_STATE_ERRORS[state], start)
+                out.append(colon)
+                state = _VALUE
+                pos = match.end()
+            if out_size >= _FLUSH_SIZE or len(out) >= 65536:
+                write(''.join(out))
+                out = []
+                out_size = 0
+
+        if at_eof:
+            if _skip_whitespace(window, pos) < len(window):
+                raise _token_error(source, state, pos)
+            break
+        if match is None and not _may_be_truncated(window, pos):
+            raise _token_error(source, state, pos)
+        if job is not None:
+            job.check_cancelled()
+            job.report(source.read_pos * 100 // max(1, source.size), message)
+        source.advance(pos)
+
+    if state != _DONE:
+        raise source.error(_STATE_ERRORS[state], len(source.window))
+    write(''.join(out))
+
+
+def stream_select(data, matcher, job=None, message='正在流式查询'):
+    """流式遍历 data（bytes 或 mmap，UTF-8 编码）中的JSON，逐个产出 matcher 选中的值
+
+    matcher 用“状态”描述查询进行到哪一步，需提供：
+    - root: 根的状态
+    - child(state, key): 进入对象成员（key 为键名）或数组元素（key 为下标）后的
+      状态，None 表示其中不会再有匹配
+    - accepts(state): 该位置的值是否被选中
+    - select(state, value): 产出已解析的值中被选中的值（含其本身）
+
+    能完整落在窗口内的值交给C扫描器解析后由 select() 处理；超出窗口的容器逐个
+    词法单元处理，它本身被选中时抛出 ValueError（无法不构建整棵子树而产出）。
+    语法错误抛出 StreamDecodeError。
+    """
+    scan_once = make_scanner(json.JSONDecoder())
+    match_token = _TOKEN_RE.match
+    child = matcher.child
+    source = _Source(data)
+    source.advance(0)
+    # 各层容器：[开括号, 容器的查询状态, 下一个元素的下标]
+    stack = []
+    state = _VALUE
+    current = matcher.root
+
+    while True:
+        window = source.window
+        at_eof = source.at_eof
+        limit = len(window) + 1 if at_eof else len(window) - _TAIL_SLACK
+        pos = 0
+        while True:
+            match = match_token(window, pos)
+            if match is None:
+                break
+            kind = match.lastindex
+            start = match.start(kind)
+            if kind == _STRING_TOKEN and (state == _FIRST_KEY or state == _KEY):
+                container = stack[-1][1]
+                current = None if container is None else child(container, scan_once(window, start)[0])
+                state = _COLON_STATE
+                pos = match.end()
+            elif kind == _OPEN or kind == _STRING_TOKEN or kind == _SCALAR:
+                if state != _VALUE and state != _FIRST_VALUE:
+                    raise source.error(_STATE_ERRORS[state], start)
+                parent = stack[-1] if stack else None
+                if parent is not None and parent[0] == '[':
+                    current = None if parent[1] is None else child(parent[1], parent[2])
+                try:
+                    value, end = scan_once(window, start)
+                except StopIteration as e:
+                    error_msg, error_pos = _STATE_ERRORS[_VALUE], e.value
+                except json.JSONDecodeError as e:
+                    error_msg, error_pos = e.msg, e.pos
+                else:
+                    error_msg = None
+                if error_msg is not None:
+                    truncated = not at_eof and _truncated_error(window, error_msg, error_pos, limit)
+                    if not truncated:
+                        raise source.error(error_msg, error_pos)
+                    if kind != _OPEN:
+                        break
+                    # 子树超出窗口：逐层处理其内容
+                    if current is not None and matcher.accepts(current):
+                        raise ValueError(f'选中的值（位置 {source.offset + start}）超过 '
+                                         f'{WINDOW_SIZE // (1024 * 1024)} MB，无法流式产出，请选取其中的成员')
+                    if parent is not None:
+                        parent[2] += 1
+                    opener = match.group(kind)
+                    stack.append([opener, current, 0])
+                    state = _FIRST_VALUE if opener == '[' else _FIRST_KEY
+                    pos = match.end()
+                    continue
+                if kind == _SCALAR and end > limit:
+                    break
+                if parent is not None:
+                    parent[2] += 1
+                if current is not None:
+                    yield from matcher.select(current, value)
+                state = _AFTER if stack else _DONE
+                pos = end
+            elif kind == _CLOSE:
+                closer = match.group(kind)
+                opener = '[' if closer == ']' else '{'
+                if not stack or stack[-1][0] != opener:
+                    raise source.error(_STATE_ERRORS[state], start)
+                if state != _AFTER and state != (_FIRST_VALUE if opener == '[' else _FIRST_KEY):
+                    raise source.error(_STATE_ERRORS[state], start)
+                stack.pop()
+                state = _AFTER if stack else _DONE
+                pos = match.end()
+            elif kind == _COMMA:
+                if state != _AFTER:
+                    raise source.error(_STATE_ERRORS[state], start)
+                state = _VALUE if stack[-1][0] == '[' else _KEY
+                pos = match.end()
+            else:
+                if state != _COLON_STATE:
+                    raise source.error(_STATE_ERRORS[state], start)
+                state = _VALUE
+                pos = match.end()
+
+        if at_eof:
+            if _skip_whitespace(window, pos) < len(window):
+                raise _token_error(source, state, pos)
+            break
+        if match is None and not _may_be_truncated(window, pos):
+            raise _token_error(source, state, pos)
+        if job is not None:
+            job.check_cancelled()
+            job.report(source.read_pos * 100 // max(1, source.size), message)
+        source.advance(pos)
+
+    if state != _DONE:
+        raise source.error(_STATE_ERRORS[state], len(source.window))
+
+
+def open_source(path):
+    """以只读 mmap 打开文件，空文件返回空字节串"""
+    handle = open(path, 'rb')
+    if os.fstat(handle.fileno()).st_size == 0:
+        return handle, b''
+    return handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def process_file(path, indent=INDENT, job=None, sink=None, output_path=None):
+    """流式处理文件
+
+    Args:
+        path: 输入JSON文件（UTF-8，可带BOM）
+        indent: 缩进空格数，None 表示压缩
+        job: 可选的 JobContext
+        sink: 输出到带 write(str) 的对象（如 LineStore），返回 sink
+        output_path: 输出到文件（UTF-8，单独的代理项按 surrogatepass 写出），返回 output_path；
+            出错或取消时删除不完整的输出
+    """
+    message = '正在流式格式化' if indent is not None else '正在流式压缩'
+    handle, data = open_source(path)
+    try:
+        if output_path is None:
+            stream_reformat(data, sink.write, indent, job, message)
+            return sink
+        try:
+            with open(output_path, 'w', encoding='utf-8', errors=line_store.ERRORS, newline='') as out:
+                stream_reformat(data, out.write, indent, job, message)
+        except BaseException:
+            os.remove(output_path)
+            raise
+        return output_path
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+        handle.close()
+
+
+def format_file(path, indent=INDENT, job=None, sink=None, output_path=None):
+    """流式格式化文件"""
+    return process_file(path, indent, job, sink, output_path)
+
+
+def minify_file(path, job=None, sink=None, output_path=None):
+    """流式压缩文件"""
+    return process_file(path, None, job, sink, output_path)
+
+
+class _Discard:
+    def write(self, text):
+        pass
+
+
+def validate_file(path, job=None):
+    """流式校验文件，只检查语法、不保留输出；出错时抛出 StreamDecodeError"""
+    process_file(path, None, job, sink=_Discard())
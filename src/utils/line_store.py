@@ -0,0 +1,242 @@
+"""按行索引的文本存储
+
+格式化结果以UTF-8字节形式保存在紧凑缓冲区中（超过阈值后溢出到临时文件并以
+mmap方式读取），另用一个 array 记录每行的起始偏移。查看器只按需解码可见行，
+整份文档不必以 Python 字符串或 QTextDocument 的形式常驻内存。
+"""
+import mmap
+import tempfile
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, count
+from operator import add
+
+# 内存缓冲超过该大小后溢出到临时文件
+SPILL_THRESHOLD = 64 * 1024 * 1024
+# 写入时先在列表中累积小片段，攒够后再统一编码并建立行索引
+_FLUSH_SIZE = 1024 * 1024
+# 超过该字节数的行只解码可见窗口，避免整行解码
+LONG_LINE = 64 * 1024
+# JSON 允许 "\ud800" 这样的单独代理项，解析后无法按严格的 UTF-8 编码；
+# 编码和解码都用 surrogatepass，原样保存和还原
+ERRORS = 'surrogatepass'
+
+
+class LineStore:
+    """UTF-8 字节缓冲 + 行起始偏移数组"""
+
+    def __init__(self, spill_threshold=SPILL_THRESHOLD):
+        self._spill_threshold = spill_threshold
+        self._buffer = bytearray()
+        self._file = None
+        self._mmap = None
+        self._offsets = array('q', [0])
+        self._size = 0
+        self._max_line_bytes = 0
+        self._pending = []
+        self._pending_size = 0
+
+    @classmethod
+    def from_text(cls, text):
+        store = cls()
+        store.write(text)
+        store.finish()
+        return store
+
+    # ---- 写入 ----
+    def write(self, text):
+        """追加文本片段"""
+        if not text:
+            return
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= _FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        data = ''.join(self._pending).encode('utf-8', ERRORS)
+        self._pending = []
+        self._pending_size = 0
+
+        # 按换行切分后，用C层迭代器一次性算出每个新行的起始偏移
+        segments = data.split(b'\n')
+        if len(segments) > 1:
+            starts = map(add, accumulate(map(len, segments[:-1])), count(self._size + 1))
+            self._offsets.extend(starts)
+        self._max_line_bytes = max(self._max_line_bytes, max(map(len, segments)))
+
+        if self._file is None and len(self._buffer) + len(data) > self._spill_threshold:
+            self._file = tempfile.TemporaryFile(prefix='testtoolbox_')
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._buffer += data
+        self._size += len(data)
+
+    def finish(self):
+        """结束写入；溢出到文件的内容改为mmap读取"""
+        self._flush()
+        if self._file is not None and self._mmap is None and self._size:
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def header(self):
+        """不含内容字节的状态（行索引等），用于工作区溢出：内容另由 iter_bytes() 按块写出
+
+        与 from_header() 和 read_content() 配合，溢出和读回时都不复制整份内容。
+        """
+        self.finish()
+        return {
+            'size': self._size,
+            'offsets': self._offsets,
+            'max_line_bytes': self._max_line_bytes,
+            'spill_threshold': self._spill_threshold,
+        }
+
+    @classmethod
+    def from_header(cls, header):
+        """按 header() 创建尚无内容的存储，内容随后用 read_content() 读入"""
+        store = cls(header['spill_threshold'])
+        store._offsets = header['offsets']
+        store._max_line_bytes = header['max_line_bytes']
+        return store
+
+    def read_content(self, f, size, chunk_size=_FLUSH_SIZE):
+        """从 f 中按块读入 size 个内容字节，超过溢出阈值时直接写入临时文件"""
+        if size > self._spill_threshold:
+            self._file = tempfile.TemporaryFile(prefix='testtoolbox_')
+            append = self._file.write
+        else:
+            append = self._buffer.extend
+        remaining = size
+        while remaining:
+            chunk = f.read(min(remaining, chunk_size))
+            if not chunk:
+                raise EOFError(f'内容不完整：还差 {remaining} 字节')
+            append(chunk)
+            remaining -= len(chunk)
+        self._size = size
+        return self.finish()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._buffer = bytearray()
+
+    # ---- 读取 ----
+    @property
+    def _data(self):
+        if self._pending:
+            self._flush()
+        if self._file is not None:
+            if self._mmap is None:
+                self.finish()
+            return self._mmap
+        return self._buffer
+
+    @property
+    def nbytes(self):
+        return self._size + self._pending_size
+
+    @property
+    def resident_bytes(self):
+        """常驻内存的大致字节数（已溢出到临时文件的内容不计）"""
+        return len(self._buffer) + self._pending_size + self._offsets.itemsize * len(self._offsets)
+
+    @property
+    def max_line_bytes(self):
+        return self._max_line_bytes
+
+    def __len__(self):
+        return self.line_count
+
+    @property
+    def line_count(self):
+        if self._pending:
+            self._flush()
+        return len(self._offsets)
+
+    def line_offset(self, index):
+        """返回第 index 行起始的字节偏移"""
+        return self._offsets[index]
+
+    def line_at_offset(self, offset):
+        """返回包含给定字节偏移的行号"""
+        return bisect_right(self._offsets, offset) - 1
+
+    def line_span(self, index):
+        """返回第 index 行（不含换行符）的字节范围"""
+        data = self._data
+        start = self._offsets[index]
+        end = self._offsets[index + 1] - 1 if index + 1 < len(self._offsets) else len(data)
+        return start, end
+
+    def line_bytes(self, index):
+        start, end = self.line_span(index)
+        return bytes(self._data[start:end])
+
+    def line(self, index):
+        return self.line_bytes(index).decode('utf-8', ERRORS)
+
+    def line_length(self, index):
+        start, end = self.line_span(index)
+        return end - start
+
+    def line_window(self, index, start_col, max_cols):
+        """返回第 index 行从 start_col 开始最多 max_cols 个字符
+
+        超长行按字节近似定位窗口，只解码窗口内的字节。
+        """
+        start, end = self.line_span(index)
+        if end - start <= LONG_LINE:
+            return self.line(index)[start_col:start_col + max_cols]
+        data = self._data
+        window = bytes(data[start + start_col:min(end, start + start_col + max_cols * 4)])
+        return window.decode('utf-8', errors='ignore')[:max_cols]
+
+    def lines(self, first, last):
+        """返回 [first, last) 行的文本列表"""
+        last = min(last, self.line_count)
+        if first >= last:
+            return []
+        return self.text_range(first, last).split('\n')
+
+    def bytes_range(self, first, last):
+        """返回 [first, last) 行以换行连接的原始字节"""
+        last = min(last, self.line_count)
+        if first >= last:
+            return b''
+        start = self._offsets[first]
+        end = self.line_span(last - 1)[1]
+        return bytes(self._data[start:end])
+
+    def text_range(self, first, last):
+        """返回 [first, last) 行以换行连接的文本"""
+        return self.bytes_range(first, last).decode('utf-8', ERRORS)
+
+    def iter_text_chunks(self, chunk_lines=65536):
+        """按行块迭代全文，用于保存和复制等流式输出"""
+        total = self.line_count
+        for first in range(0, total, chunk_lines):
+            last = min(total, first + chunk_lines)
+            chunk = '\n'.join(self.lines(first, last))
+            yield chunk if last == total else chunk + '\n'
+
+    def iter_bytes(self, chunk_size=_FLUSH_SIZE):
+        """按固定大小迭代原始UTF-8字节，用于写入缓存等"""
+        data = self._data
+        for start in range(0, self._size, chunk_size):
+            yield bytes(data[start:min(self._size, start + chunk_size)])
+
+    def text(self):
+        """返回全文；仅在确实需要完整字符串时调用"""
+        return bytes(self._data[:self._size]).decode('utf-8', ERRORS)
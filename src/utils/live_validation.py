@@ -0,0 +1,247 @@
+"""输入框的增量语法校验
+
+边输入边校验时不必每次从头解析：校验器每隔 CHECKPOINT_CHARS 在元素边界
+（','、'['、'{' 之后）记录一个检查点，保存当时的嵌套栈和语法状态。文本在某个
+位置被修改后，修改位置之前的检查点仍然有效，下一次校验从其中最后一个继续，
+只需重新扫描修改位置附近到文末的部分。在大文档末尾修改一个字符只需处理最后
+一段文本。
+
+扫描由两级组成（与 json_stream 相同的思路）：外层“骨架”按词法单元维护嵌套栈；
+遇到数组或对象时先截取一个窗口交给标准库的 C 扫描器，整个子树能在窗口内解析完
+时直接跳过，超出窗口时才进入子树逐个元素处理。窗口大小按最近成功的子树自适应，
+小元素只复制很短的片段。错误消息和位置与 json.loads 相同。
+
+位置有两种：扫描用的是 Python 字符串下标，检查点和错误位置则换算成
+QTextDocument 的位置（UTF-16 码元，BMP 以外的字符占两个），与编辑器的
+contentsChange 信号一致。
+"""
+import json
+import re
+from bisect import bisect_left
+from json.decoder import scanstring
+
+# 检查点间隔（字符数）
+CHECKPOINT_CHARS = 64 * 1024
+# 交给 C 扫描器的子树窗口的上下限
+MIN_WINDOW = 256
+MAX_WINDOW = 256 * 1024
+
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+_SCALAR_RE = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?|true|false|null|NaN|-?Infinity')
+_ASTRAL_RE = re.compile('[\U00010000-\U0010ffff]')
+
+# 语法状态：期望值 / '[' 之后 / '{' 之后 / ',' 之后的键 / 冒号 / 值之后 / 顶层结束
+VALUE, FIRST_VALUE, FIRST_KEY, KEY, COLON, AFTER, DONE = range(7)
+
+_STATE_ERRORS = {
+    VALUE: 'Expecting value',
+    FIRST_VALUE: 'Expecting value',
+    FIRST_KEY: 'Expecting property name enclosed in double quotes',
+    KEY: 'Expecting property name enclosed in double quotes',
+    COLON: "Expecting ':' delimiter",
+    AFTER: "Expecting ',' delimiter",
+    DONE: 'Extra data',
+}
+_CLOSERS = {'[': ']', '{': '}'}
+
+_scan_once = json.JSONDecoder().scan_once
+
+
+class Checkpoint:
+    """可以从此处继续扫描的位置：文档位置、嵌套栈（'[' 与 '{' 组成的字符串）和语法状态"""
+    __slots__ = ('position', 'stack', 'state')
+
+    def __init__(self, position, stack='', state=VALUE):
+        self.position = position
+        self.stack = stack
+        self.state = state
+
+
+class ValidationResult:
+    """一次校验的结果
+
+    error 为 None 表示语法正确，否则为 (文档位置, 消息)；checkpoints 为本次扫描
+    新记录的检查点；empty 表示文本只有空白。
+    """
+
+    def __init__(self, error, checkpoints, empty=False):
+        self.error = error
+        self.checkpoints = checkpoints
+        self.empty = empty
+
+
+class _Positions:
+    """把扫描文本的下标换算为文档位置，只能按递增顺序查询"""
+
+    def __init__(self, text, base):
+        self.text = text
+        self.base = base
+        self.simple = _ASTRAL_RE.search(text) is None
+        self._index = 0
+        self._units = base
+
+    def at(self, index):
+        if self.simple:
+            return self.base + index
+        extra = len(_ASTRAL_RE.findall(self.text, self._index, index))
+        self._units += index - self._index + extra
+        self._index = index
+        return self._units
+
+
+def text_index(text, position):
+    """把文档位置（UTF-16 码元）换算回 text 的下标，与 _Positions 相反"""
+    extra = 0
+    for match in _ASTRAL_RE.finditer(text, 0, position):
+        if match.start() + extra >= position:
+            break
+        extra += 1
+    return position - extra
+
+
+class _Error(Exception):
+    def __init__(self, msg, pos):
+        super().__init__(msg)
+        self.msg = msg
+        self.pos = pos
+
+
+def validate(text, start=None, job=None):
+    """从检查点 start 开始校验 text（文档中 start.position 之后的全部文本）"""
+    start = start or Checkpoint(0)
+    positions = _Positions(text, start.position)
+    stack = list(start.stack)
+    state = start.state
+    checkpoints = []
+    length = len(text)
+    window = MIN_WINDOW
+    last_checkpoint = 0
+    pos = 0
+    try:
+        while True:
+            pos = _WHITESPACE_RE.match(text, pos).end()
+            if pos >= length:
+                if state != DONE:
+                    if state == VALUE and not stack:
+                        return ValidationResult(None, checkpoints, empty=True)
+                    raise _Error(_STATE_ERRORS[state], length)
+                return ValidationResult(None, checkpoints)
+            ch = text[pos]
+
+            if state == VALUE or state == FIRST_VALUE:
+                if ch == ']' and state == FIRST_VALUE:
+                    stack.pop()
+                    pos += 1
+                elif ch == '[' or ch == '{':
+                    end = _scan_subtree(text, pos, window)
+                    if end is None:
+                        # 子树超出窗口：进入子树逐个元素扫描，并为下一次放大窗口
+                        window = min(MAX_WINDOW, window * 2)
+                        stack.append(ch)
+                        pos += 1
+                        state = FIRST_VALUE if ch == '[' else FIRST_KEY
+                        if pos - last_checkpoint >= CHECKPOINT_CHARS:
+                            checkpoints.append(Checkpoint(positions.at(pos), ''.join(stack), state))
+                            last_checkpoint = pos
+                        continue
+                    window = max(MIN_WINDOW, min(MAX_WINDOW, (end - pos) * 4))
+                    pos = end
+                elif ch == '"':
+                    pos = _scan_string(text, pos)
+                else:
+                    match = _SCALAR_RE.match(text, pos)
+                    if match is None:
+                        raise _Error('Expecting value', pos)
+                    pos = match.end()
+                state = AFTER if stack else DONE
+
+            elif state == FIRST_KEY or state == KEY:
+                if ch == '}' and state == FIRST_KEY:
+                    stack.pop()
+                    pos += 1
+                    state = AFTER if stack else DONE
+                elif ch == '"':
+                    pos = _scan_string(text, pos)
+                    state = COLON
+                else:
+                    raise _Error(_STATE_ERRORS[state], pos)
+
+            elif state == COLON:
+                if ch != ':':
+                    raise _Error(_STATE_ERRORS[COLON], pos)
+                pos += 1
+                state = VALUE
+
+            elif state == AFTER:
+                top = stack[-1]
+                if ch == ',':
+                    pos += 1
+                    state = VALUE if top == '[' else KEY
+                    if pos - last_checkpoint >= CHECKPOINT_CHARS:
+                        checkpoints.append(Checkpoint(positions.at(pos), ''.join(stack), state))
+                        last_checkpoint = pos
+                        if job is not None:
+                            job.check_cancelled()
+                            job.report(pos * 100 // length, '正在校验')
+                elif ch == _CLOSERS[top]:
+                    stack.pop()
+                    pos += 1
+                    state = AFTER if stack else DONE
+                else:
+                    raise _Error(_STATE_ERRORS[AFTER], pos)
+
+            else:
+                raise _Error(_STATE_ERRORS[DONE], pos)
+    except _Error as e:
+        return ValidationResult((positions.at(e.pos), e.msg), checkpoints)
+
+
+def _scan_string(text, pos):
+    try:
+        return scanstring(text, pos + 1)[1]
+    except json.JSONDecodeError as e:
+        raise _Error(e.msg, e.pos)
+
+
+def _scan_subtree(text, pos, window):
+    """用 C 扫描器解析 pos 处的数组或对象，返回结束下标；超出窗口时返回 None"""
+    truncated = pos + window < len(text)
+    if truncated:
+        chunk, offset = text[pos:pos + window], pos
+        begin = 0
+    else:
+        chunk, offset = text, 0
+        begin = pos
+    try:
+        return _scan_once(chunk, begin)[1] + offset
+    except StopIteration as e:
+        if truncated:
+            return None
+        raise _Error('Expecting value', e.value)
+    except json.JSONDecodeError as e:
+        if truncated:
+            return None
+        raise _Error(e.msg, e.pos)
+    except RecursionError:
+        # 嵌套过深，交给骨架逐层处理
+        return None
+
+
+class LiveValidator:
+    """保存检查点；文本修改后只从修改位置之前的最后一个检查点重新校验"""
+
+    def __init__(self):
+        self.checkpoints = [Checkpoint(0)]
+
+    def invalidate(self, position):
+        """文档在 position 处被修改：丢弃该位置及之后的检查点"""
+        keep = bisect_left([checkpoint.position for checkpoint in self.checkpoints], position)
+        del self.checkpoints[max(1, keep):]
+
+    def resume_point(self):
+        return self.checkpoints[-1]
+
+    def commit(self, start, result):
+        """记录从 start 开始的一次校验新产生的检查点"""
+        if self.checkpoints[-1] is start:
+            self.checkpoints.extend(result.checkpoints)
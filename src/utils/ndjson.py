@@ -0,0 +1,270 @@
+"""JSON Lines / NDJSON 处理
+
+每行一条独立的JSON记录，空白行忽略。RecordIndex 在内存映射的文件（或输入框
+文本编码后的字节串）上记录每行的起始偏移，按行号取单条记录时只解码这一行，
+不必处理整份文件。
+
+校验、格式化和压缩按行边界把数据切成若干块，数据量较大时分发到多个进程并行
+处理：文件来源的块由工作进程自行 mmap 读取，只传递偏移。一次处理即可收集全部
+出错行，错误消息和列号与 json.loads 相同；格式化/压缩只在没有错误时输出结果，
+否则抛出汇总了所有出错行的 NdjsonError。
+"""
+import json
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, count
+from operator import add
+
+from src.utils import json_backend, json_ops, perf
+
+# 每个任务块的大致字节数
+CHUNK_BYTES = 4 * 1024 * 1024
+# 数据量超过该值时才启动进程池，小数据在当前进程内处理更快
+PARALLEL_THRESHOLD = 16 * 1024 * 1024
+# 建立行索引时每次切分的窗口大小
+_INDEX_WINDOW = 16 * 1024 * 1024
+
+# 处理模式：校验，或格式化时的缩进（None 表示压缩）
+VALIDATE = 'validate'
+
+
+class NdjsonError(ValueError):
+    """NDJSON 中存在出错的记录
+
+    errors 为按行号排列的 (行号, 列号, 消息) 列表，行号和列号从 1 开始。
+    """
+
+    def __init__(self, errors, records):
+        super().__init__(f'{len(errors):,} 行不是有效的JSON（共 {records:,} 条记录）')
+        self.errors = errors
+        self.records = records
+
+    def describe(self):
+        lines = [f'NDJSON 格式错误：共 {self.records:,} 条记录，{len(self.errors):,} 行有误']
+        lines.extend(f'第 {line} 行 第 {col} 列: {msg}' for line, col, msg in self.errors)
+        return '\n'.join(lines)
+
+
+class RecordIndex:
+    """NDJSON 数据的行偏移索引，需先调用 build()"""
+
+    def __init__(self, data, path=None, handle=None):
+        self.data = data
+        self.path = path
+        self._handle = handle
+        self.offsets = array('q', [0])
+        self.ready = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        """以只读 mmap 打开文件"""
+        handle = open(path, 'rb')
+        if os.fstat(handle.fileno()).st_size == 0:
+            return cls(b'', path, handle)
+        return cls(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ), path, handle)
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(text.encode('utf-8'))
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def build(self, job=None):
+        """按窗口切分数据，用C层迭代器算出每行的起始偏移"""
+        with self._lock:
+            if self.ready:
+                return self
+            data = self.data
+            size = len(data)
+            for start in range(0, size, _INDEX_WINDOW):
+                segments = data[start:start + _INDEX_WINDOW].split(b'\n')
+                if len(segments) > 1:
+                    self.offsets.extend(map(add, accumulate(map(len, segments[:-1])), count(start + 1)))
+                if job is not None:
+                    job.check_cancelled()
+                    job.report(min(start + _INDEX_WINDOW, size) * 10 // max(1, size), '正在建立行索引')
+            self.ready = True
+        return self
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @property
+    def line_count(self):
+        return len(self.offsets)
+
+    def line_bytes(self, index):
+        """返回第 index 行（从 0 开始，不含换行符）的字节"""
+        start = self.offsets[index]
+        end = self.offsets[index + 1] - 1 if index + 1 < len(self.offsets) else len(self.data)
+        line = self.data[start:end]
+        return line[:-1] if line.endswith(b'\r') else line
+
+    def format_record(self, line_number, indent=json_ops.INDENT):
+        """格式化第 line_number 行（从 1 开始）的记录，只解析这一行"""
+        if not 1 <= line_number <= self.line_count:
+            raise IndexError(f'行号超出范围（1 ~ {self.line_count:,}）')
+        text = self.line_bytes(line_number - 1).decode('utf-8')
+        if not text.strip():
+            raise ValueError(f'第 {line_number:,} 行是空行')
+        data, portable = json_backend.parse(text)
+        return json_ops.format_data(data, indent, size_hint=len(text), portable=portable)
+
+    def tasks(self, mode, chunk_bytes=CHUNK_BYTES):
+        """按行边界切块，返回工作进程的任务列表"""
+        offsets = self.offsets
+        tasks = []
+        first = 0
+        while first < len(offsets):
+            last = max(first + 1, bisect_left(offsets, offsets[first] + chunk_bytes))
+            start = offsets[first]
+            end = offsets[last] if last < len(offsets) else len(self.data)
+            source = self.path if isinstance(self.data, mmap.mmap) else self.data[start:end]
+            tasks.append((source, start, end, first + 1, mode))
+            first = last
+        return tasks
+
+
+def _chunk_bytes(source, start, end):
+    if isinstance(source, bytes):
+        return source
+    with open(source, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data[start:end]
+
+
+def _decode_error(line):
+    """用标准库重新解析出错的行，返回 (列号, 消息)；标准库能解析时返回 None"""
+    try:
+        json.loads(line.decode('utf-8'))
+    except UnicodeDecodeError as e:
+        return e.start + 1, '不是有效的UTF-8文本'
+    except json.JSONDecodeError as e:
+        return e.colno, e.msg
+    except RecursionError:
+        return 1, '嵌套层级过深'
+    return None
+
+
+def process_chunk(task):
+    """处理一个任务块，返回 (记录数, 错误列表, 输出文本)
+
+    快速后端能否使用按整块判断一次（见 json_backend.is_portable），逐行只做
+    解析和序列化；块内出现错误后不再生成输出，只继续校验。
+    """
+    source, start, end, first_line, mode = task
+    chunk = _chunk_bytes(source, start, end)
+    portable = json_backend.is_portable(chunk)
+    loads = json_backend.backend_for('loads', CHUNK_BYTES).loads if portable else json.loads
+    if mode != VALIDATE:
+        dumper = json_backend.backend_for('dumps' if mode is None else 'dumps_indent', CHUNK_BYTES)
+    errors = []
+    output = []
+    records = 0
+    for number, line in enumerate(chunk.split(b'\n'), first_line):
+        if line.endswith(b'\r'):
+            line = line[:-1]
+        if not line.strip():
+            continue
+        records += 1
+        try:
+            data = loads(line)
+            record_portable = portable
+        except ValueError:
+            error = _decode_error(line)
+            if error is not None:
+                errors.append((number, error[0], error[1]))
+                continue
+            # 标准库能解析而快速后端不能（如孤立的代理字符转义）
+            data = json.loads(line.decode('utf-8'))
+            record_portable = False
+        except RecursionError:
+            errors.append((number, 1, '嵌套层级过深'))
+            continue
+        if mode == VALIDATE or errors:
+            continue
+        text = json_backend.dumps_with(dumper, data, mode, record_portable)
+        output.append(text if text is not None else json_backend.STDLIB.dumps(data, mode))
+    return records, errors, '\n'.join(output)
+
+
+def process(index, mode=VALIDATE, job=None, sink=None, workers=None):
+    """校验、格式化或压缩整份 NDJSON
+
+    Args:
+        index: RecordIndex，未建立时先建立
+        mode: VALIDATE，或格式化的缩进（None 表示压缩为每行一条记录）
+        job: 可选的 JobContext
+        sink: 格式化/压缩结果写入的对象（如 LineStore），返回 sink；校验返回 (记录数, [])
+        workers: 进程数，默认为CPU核数；数据小于 PARALLEL_THRESHOLD 时不启动进程池
+
+    有出错的记录时抛出 NdjsonError，其中包含所有出错行。
+    """
+    with perf.span('建立行索引', index.size):
+        index.build(job)
+    tasks = index.tasks(mode)
+    workers = workers or os.cpu_count() or 1
+    records = 0
+    errors = []
+    pool = None
+    if workers > 1 and len(tasks) > 1 and index.size > PARALLEL_THRESHOLD:
+        import multiprocessing
+
+        # 界面进程中有多个线程，用 spawn 启动工作进程以免 fork 继承锁状态
+        pool = multiprocessing.get_context('spawn').Pool(min(workers, len(tasks)))
+        results = pool.imap(process_chunk, tasks)
+    else:
+        results = map(process_chunk, tasks)
+    label = '正在校验NDJSON' if mode == VALIDATE else '正在处理NDJSON'
+    try:
+        with perf.span('校验' if mode == VALIDATE else '格式化', index.size):
+            for done, (chunk_records, chunk_errors, output) in enumerate(results, 1):
+                records += chunk_records
+                errors.extend(chunk_errors)
+                if output and sink is not None and not errors:
+                    if done > 1 and records > chunk_records:
+                        sink.write('\n')
+                    sink.write(output)
+                if job is not None:
+                    job.check_cancelled()
+                    job.report(10 + done * 90 // len(tasks), f'{label}：{records:,} 条记录，{len(errors):,} 行有误')
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    if errors:
+        raise NdjsonError(errors, records)
+    return sink if sink is not None else (records, errors)
+
+
+def validate_report(index, job=None, sink=None):
+    """校验并生成文字报告写入 sink：全部有效时给出记录数，否则列出每个出错行"""
+    try:
+        records, _ = process(index, VALIDATE, job)
+        report = f'NDJSON 校验通过：共 {records:,} 条记录，{index.line_count:,} 行'
+    except NdjsonError as e:
+        report = e.describe()
+    if sink is None:
+        return report
+    sink.write(report)
+    return sink
+
+
+def show_record(index, line_number, indent=json_ops.INDENT, job=None, sink=None):
+    """格式化第 line_number 行的记录写入 sink；索引未建立时先建立（只需一次）"""
+    index.build(job)
+    text = index.format_record(line_number, indent)
+    if sink is None:
+        return text
+    sink.write(text)
+    return sink
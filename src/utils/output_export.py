@@ -0,0 +1,50 @@
+"""把结果区的内容保存到文件
+
+结果按块从 LineStore 读出原始UTF-8字节直接写入，不解码成完整字符串，峰值内存
+与结果大小无关。按扩展名选择压缩：.gz、.bz2、.xz，其余不压缩。内容先写入目标
+旁边的 .part 文件，完成后再替换目标；出错或取消时删除 .part 文件，已有的同名
+文件保持不变。
+"""
+import bz2
+import gzip
+import lzma
+import os
+
+from src.utils import perf
+
+# 扩展名 → (打开方式, 名称)；gzip 默认的 9 级对大文件太慢，用 6 级
+COMPRESSORS = {
+    '.gz': (lambda path: gzip.open(path, 'wb', compresslevel=6), 'gzip'),
+    '.bz2': (lambda path: bz2.open(path, 'wb'), 'bz2'),
+    '.xz': (lambda path: lzma.open(path, 'wb'), 'xz'),
+}
+_CHUNK = 4 * 1024 * 1024
+
+
+def save_store(store, path, job=None):
+    """在后台把 LineStore 的全部内容写入 path，返回 path"""
+    entry = COMPRESSORS.get(os.path.splitext(path)[1].lower())
+    message = f'正在压缩保存（{entry[1]}）' if entry is not None else '正在保存'
+    total = max(1, store.nbytes)
+    temp_path = f'{path}.part'
+    try:
+        with perf.span('保存', store.nbytes):
+            with (entry[0](temp_path) if entry is not None else open(temp_path, 'wb')) as f:
+                done = 0
+                for chunk in store.iter_bytes(_CHUNK):
+                    f.write(chunk)
+                    done += len(chunk)
+                    if job is not None:
+                        job.check_cancelled()
+                        job.report(done * 100 // total, message)
+        if job is not None:
+            # 写完最后一块到关闭文件之间被取消时同样不替换目标
+            job.check_cancelled()
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return path
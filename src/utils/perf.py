@@ -0,0 +1,286 @@
+"""操作耗时统计
+
+每次用户操作（格式化、转换、打开工具页等）对应一个 Action，操作过程中的各
+阶段用 span() 计时，并可附带处理的数据量：
+
+    action = perf.begin('格式化', size=len(text))
+    runner.submit(name, perf.bind(action, fn), ...)   # 工作线程中的阶段
+    with perf.activate(action):                       # GUI线程中的阶段
+        with perf.span('显示'):
+            ...
+    action.finish()
+
+只在一个线程中完成的操作可直接用 with perf.track(name, size)。
+span() 记到当前线程上激活的 Action 上，没有激活的 Action 时不计时，因此
+解析、序列化等公共代码可以直接调用。完成的操作保存在最近历史中，按名称统计
+p50/p95，并以结构化记录（extra 中的 perf 字段）写入日志，见 src.logger。
+
+内存峰值用 tracemalloc 测量：它会明显拖慢内存分配，默认关闭，由
+set_memory_tracing() 开启后每次操作开始时重置峰值、结束时读取（同时进行的
+操作共用同一个峰值）。request_profile() 之后的下一次操作会用 cProfile 分析，
+结果保存在该操作上。
+"""
+import cProfile
+import io
+import math
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+from loguru import logger
+
+# 保留的最近操作数，p50/p95 按其中同名的操作计算
+HISTORY_SIZE = 500
+# cProfile 结果中列出的函数数
+PROFILE_LINES = 40
+
+OK = '完成'
+FAILED = '失败'
+CANCELLED = '取消'
+
+_local = threading.local()
+_lock = threading.Lock()
+_history = deque(maxlen=HISTORY_SIZE)
+_revision = 0
+_memory_tracing = False
+_profile_requested = False
+_last_profiled = None
+
+
+class Stage:
+    """操作中的一个阶段；size 可在 with 块内补填（如输出的字节数）"""
+    __slots__ = ('name', 'seconds', 'size')
+
+    def __init__(self, name, size=None):
+        self.name = name
+        self.seconds = 0.0
+        self.size = size
+
+
+class Action:
+    """一次操作的计时记录"""
+
+    def __init__(self, name, size=0, trace_memory=False, profile=False):
+        self.name = name
+        self.size = size
+        self.wall_time = time.time()
+        self.stages = []
+        self.status = None
+        self.duration = None
+        self.peak_memory = None
+        self.profile = None
+        self._start = time.perf_counter()
+        # 峰值按操作开始时已占用的内存为基准，只计本次操作新增的部分
+        self._memory_base = None
+        if trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._memory_base = tracemalloc.get_traced_memory()[0]
+        self._profiler = cProfile.Profile() if profile else None
+
+    @contextmanager
+    def span(self, stage, size=None):
+        """记录一个阶段的耗时；size 为该阶段处理的数据量（字节或字符数）"""
+        record = Stage(stage, size)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - start
+            self.stages.append(record)
+
+    def finish(self, status=OK):
+        """结束计时并写入历史；重复调用无效"""
+        global _revision, _last_profiled
+        if self.status is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        self.status = status
+        if self._memory_base is not None and tracemalloc.is_tracing():
+            self.peak_memory = max(0, tracemalloc.get_traced_memory()[1] - self._memory_base)
+        if self._profiler is not None:
+            self.profile = _profile_text(self._profiler)
+            self._profiler = None
+        with _lock:
+            _history.append(self)
+            _revision += 1
+            if self.profile is not None:
+                _last_profiled = self
+        logger.bind(perf=self.to_dict()).debug(f"性能 {self.describe()}")
+
+    def to_dict(self):
+        return {
+            'action': self.name,
+            'status': self.status,
+            'time': self.wall_time,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'size': self.size,
+            'peak_memory': self.peak_memory,
+            'stages': [{'stage': stage.name, 'ms': round(stage.seconds * 1000, 3), 'size': stage.size}
+                       for stage in self.stages],
+        }
+
+    def describe(self):
+        """一行文字摘要：总耗时和各阶段耗时"""
+        total = f'{self.duration * 1000:.1f} ms' if self.duration is not None else '进行中'
+        parts = [f'{self.name}[{self.status or "进行中"}] {total}']
+        parts.extend(f'{stage.name} {stage.seconds * 1000:.1f} ms' for stage in self.stages)
+        if self.peak_memory is not None:
+            parts.append(f'内存峰值 {format_size(self.peak_memory)}')
+        return ' | '.join(parts)
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GB'
+
+
+def _profile_text(profiler):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_LINES)
+    return stream.getvalue()
+
+
+def begin(name, size=0):
+    """开始一次操作；有待执行的分析请求时启用 cProfile"""
+    global _profile_requested
+    with _lock:
+        profile, _profile_requested = _profile_requested, False
+    return Action(name, size, _memory_tracing, profile)
+
+
+@contextmanager
+def activate(action):
+    """在当前线程上激活操作，期间的 span() 记到该操作上；action 为 None 时不做任何事"""
+    if action is None:
+        yield action
+        return
+    previous = getattr(_local, 'action', None)
+    if previous is action:
+        yield action
+        return
+    _local.action = action
+    profiler = action._profiler
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield action
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _local.action = previous
+
+
+@contextmanager
+def track(name, size=0):
+    """在当前线程上完成的整次操作；出错时记为失败"""
+    current = begin(name, size)
+    try:
+        with activate(current):
+            yield current
+    except BaseException:
+        current.finish(FAILED)
+        raise
+    current.finish()
+
+
+def bind(action, fn):
+    """包装任务函数，使其在工作线程中执行时激活 action"""
+    def run(*args, **kwargs):
+        with activate(action):
+            return fn(*args, **kwargs)
+    return run
+
+
+def current():
+    return getattr(_local, 'action', None)
+
+
+@contextmanager
+def span(stage, size=None):
+    """记到当前线程激活的操作上；没有激活的操作时不计时"""
+    action = getattr(_local, 'action', None)
+    if action is None:
+        yield Stage(stage, size)
+        return
+    with action.span(stage, size) as record:
+        yield record
+
+
+# ---- 设置 ----
+def set_memory_tracing(enabled):
+    """开启或关闭内存峰值测量
+
+    关闭时只是不再记录峰值，tracemalloc 保持运行直到进程退出：在其他线程
+    同时分配内存时调用 tracemalloc.stop() 会使较早的 Python 版本崩溃。
+    """
+    global _memory_tracing
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _memory_tracing = enabled
+
+
+def memory_tracing():
+    return _memory_tracing
+
+
+def request_profile(enabled=True):
+    """用 cProfile 分析下一次操作"""
+    global _profile_requested
+    with _lock:
+        _profile_requested = enabled
+
+
+def profile_pending():
+    return _profile_requested
+
+
+# ---- 查询 ----
+def revision():
+    """历史每增加一条加一，界面据此判断是否需要刷新"""
+    return _revision
+
+
+def history():
+    """最近的操作，从旧到新"""
+    with _lock:
+        return list(_history)
+
+
+def last_profiled():
+    """最近一次带 cProfile 结果的操作"""
+    return _last_profiled
+
+
+def clear():
+    global _revision, _last_profiled
+    with _lock:
+        _history.clear()
+        _last_profiled = None
+        _revision += 1
+
+
+def percentile(values, fraction):
+    """最近秩法百分位数，values 须已排序"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summary():
+    """按操作名统计完成的操作：{名称: (次数, p50, p95, 最近一次)}，耗时单位为秒"""
+    durations = {}
+    for item in history():
+        if item.status == OK:
+            durations.setdefault(item.name, []).append(item.duration)
+    result = {}
+    for name, values in durations.items():
+        ordered = sorted(values)
+        result[name] = (len(values), percentile(ordered, 0.5), percentile(ordered, 0.95), values[-1])
+    return result
@@ -0,0 +1,166 @@
+"""JSON5（宽松语法）输入
+
+把 JSON5 文本转写为标准 JSON 后交给 json_backend 解析，解析本身仍由 C 实现
+完成。支持的 JSON5 语法：
+
+- // 和 /* */ 注释
+- 数组、对象末尾的逗号
+- 单引号字符串，\\x41、\\0、\\v、行接续等转义
+- 未加引号的键名
+- 十六进制、正号、.5、5. 写法的数字，Infinity、NaN（可带正负号）
+- \\v、\\f、不换行空格、BOM 等额外的空白字符
+
+转写由一个预编译正则的单次扫描完成：连续的标准 JSON 内容（空白、括号、
+标准字符串、数字和常量）在一次匹配中整段复制，只有 JSON5 特有的词法单元
+才进入 Python 代码转换，因此以标准 JSON 为主的文本几乎只有正则引擎的开销。
+
+转写后仍有语法错误时，错误位置换算回原文，行列号与原文对应。调用方应先
+用标准 JSON 解析，失败后才走这里（见 json_ops.parse_relaxed），标准 JSON
+输入不承担任何额外开销。
+"""
+import json
+import re
+from bisect import bisect_right
+
+from src.utils import json_backend
+
+# 检测出的输入方言
+JSON = 'JSON'
+JSON5 = 'JSON5'
+
+_STRICT_STRING = r'"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"'
+_STRICT_NUMBER = r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?(?![\w.$])'
+_COMMENT = r'//[^\n\r\u2028\u2029]*|/\*[\s\S]*?\*/'
+
+_TOKEN_RE = re.compile(
+    # 可原样复制的标准 JSON 片段；后面紧跟右括号（可能隔着注释）的逗号除外
+    r'(?P<plain>(?:[ \t\n\r\[\]{}:]+'
+    r'|,(?![ \t\n\r]*[\]}/])'
+    rf'|{_STRICT_STRING}'
+    rf'|{_STRICT_NUMBER}'
+    r'|(?:true|false|null)(?![\w$])(?![ \t\n\r]*:)'
+    r')+)'
+    rf'|(?P<comment>{_COMMENT})'
+    r'|(?P<comma>,)'
+    r'''|(?P<string>"(?:[^"\\]|\\[\s\S])*"|'(?:[^'\\]|\\[\s\S])*')'''
+    r'|(?P<identifier>(?:[^\W\d]|\$)[\w$]*)'
+    r'|(?P<number>[+-]?(?:0[xX][0-9a-fA-F]+|(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?'
+    r'|Infinity|NaN)(?![\w.$]))'
+    r'|(?P<space>[\s\ufeff]+)'
+    r'|(?P<invalid>[\s\S])'
+)
+# 逗号之后直到右括号只有空白和注释：末尾多余的逗号
+_TRAILING_COMMA_RE = re.compile(rf'(?:[\s\ufeff]+|{_COMMENT})*[\]}}]')
+_KEY_COLON_RE = re.compile(rf'(?:[\s\ufeff]+|{_COMMENT})*:')
+_ESCAPE_RE = re.compile(r'\\(?:x([0-9a-fA-F]{2})|(\r\n|[\n\r\u2028\u2029])|([\s\S]))|(")|([\x00-\x1f])')
+_JSON_ESCAPES = frozenset('"\\/bfnrtu')
+_SPECIAL_ESCAPES = {'0': '\\u0000', 'v': '\\u000b'}
+_CONSTANTS = frozenset(('true', 'false', 'null', 'Infinity', 'NaN'))
+
+
+def _escape(match):
+    hex_digits, newline, escaped, quote, control = match.groups()
+    if hex_digits is not None:
+        return '\\u00' + hex_digits
+    if newline is not None:
+        return ''  # 行接续
+    if escaped is not None:
+        if escaped in _JSON_ESCAPES:
+            return '\\' + escaped
+        if escaped in _SPECIAL_ESCAPES:
+            return _SPECIAL_ESCAPES[escaped]
+        # 其余字符的转义表示字符本身，如 \' 和 \a
+        return json.dumps(escaped, ensure_ascii=False)[1:-1]
+    if quote is not None:
+        return '\\"'
+    return f'\\u{ord(control):04x}'
+
+
+def _string(token):
+    return '"' + _ESCAPE_RE.sub(_escape, token[1:-1]) + '"'
+
+
+def _number(token):
+    sign = '-' if token[0] == '-' else ''
+    body = token.lstrip('+-')
+    if body == 'NaN':
+        return 'NaN'
+    if body == 'Infinity':
+        return sign + body
+    if body[:2] in ('0x', '0X'):
+        return sign + str(int(body, 16))
+    mantissa, e, exponent = body.partition('e') if 'e' in body else body.partition('E')
+    integer, _, fraction = mantissa.partition('.')
+    return sign + (integer.lstrip('0') or '0') + ('.' + fraction if fraction else '') + e + exponent
+
+
+class Translation:
+    """转写结果：标准 JSON 文本，以及把其中的位置换算回原文的映射"""
+
+    def __init__(self, text, out_starts, in_starts):
+        self.text = text
+        self._out_starts = out_starts
+        self._in_starts = in_starts
+
+    def source_position(self, position):
+        index = bisect_right(self._out_starts, position) - 1
+        if index < 0:
+            return position
+        return self._in_starts[index] + position - self._out_starts[index]
+
+
+def _error(msg, text, pos):
+    return json.JSONDecodeError(msg, text, pos)
+
+
+def translate(text, job=None):
+    """把 JSON5 文本转写为标准 JSON，返回 Translation；遇到非法字符时抛出 JSONDecodeError"""
+    parts = []
+    # 每次转换之后输出与原文的对应位置，用于换算错误位置
+    out_starts = []
+    in_starts = []
+    out_length = 0
+    for count, match in enumerate(_TOKEN_RE.finditer(text), 1):
+        kind = match.lastgroup
+        token = match.group()
+        if kind == 'plain':
+            parts.append(token)
+            out_length += len(token)
+            continue
+        if kind == 'comment' or kind == 'space':
+            replacement = ' '
+        elif kind == 'comma':
+            replacement = '' if _TRAILING_COMMA_RE.match(text, match.end()) else ','
+        elif kind == 'string':
+            replacement = _string(token)
+        elif kind == 'number':
+            replacement = _number(token)
+        elif kind == 'identifier':
+            if _KEY_COLON_RE.match(text, match.end()):
+                replacement = json.dumps(token, ensure_ascii=False)
+            elif token in _CONSTANTS:
+                replacement = token
+            else:
+                raise _error('Expecting value', text, match.start())
+        else:
+            raise _error('Expecting value', text, match.start())
+        parts.append(replacement)
+        out_length += len(replacement)
+        out_starts.append(out_length)
+        in_starts.append(match.end())
+        if job is not None and count % 4096 == 0:
+            job.check_cancelled()
+    return Translation(''.join(parts), out_starts, in_starts)
+
+
+def parse(text, job=None):
+    """按 JSON5 解析，返回 (data, portable)，portable 的含义见 json_backend.parse"""
+    translation = translate(text, job)
+    try:
+        return json_backend.parse(translation.text)
+    except json.JSONDecodeError as e:
+        raise _error(e.msg, text, translation.source_position(e.pos)) from None
+
+
+def loads(text):
+    return parse(text)[0]
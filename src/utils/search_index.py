@@ -0,0 +1,239 @@
+"""输出内容的索引化搜索
+
+- NgramIndex: 文档加载后在后台建立一次的分块二元组索引。文档按约 64KB 切成
+  行对齐的块，每块记录出现过的 ASCII 二元组位图，查询时只扫描包含全部查询
+  二元组的候选块。
+- SearchQuery: 字面量/正则、全词、大小写和“仅键/仅值”范围过滤。
+- search(): 在 LineStore 上执行查询；新查询是上一次字面量查询的延伸时，
+  只复查上一次命中的行（随输入逐步收窄）。
+"""
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from src.utils import json_lexer
+
+SCOPE_ALL = 'all'
+SCOPE_KEYS = 'keys'
+SCOPE_VALUES = 'values'
+
+_SCOPE_KINDS = {
+    SCOPE_KEYS: {json_lexer.KEY},
+    SCOPE_VALUES: {json_lexer.STRING, json_lexer.NUMBER, json_lexer.KEYWORD},
+}
+_SCOPE_SPANS = {
+    SCOPE_KEYS: json_lexer.key_spans,
+    SCOPE_VALUES: json_lexer.value_spans,
+}
+
+BLOCK_BYTES = 64 * 1024
+# 收窄搜索只在上次命中行数不多时使用，否则逐行复查反而比整块扫描慢
+NARROW_MAX_LINES = 100000
+
+
+def _bigram_mask(data):
+    """计算字节串中 ASCII 二元组的位图（16384 位）"""
+    data = data.lower()
+    values = set(array('H', data[:len(data) // 2 * 2]))
+    odd = data[1:]
+    values.update(array('H', odd[:len(odd) // 2 * 2]))
+    bitmap = bytearray(2048)
+    for value in values:
+        if not value & 0x8080:
+            bit = ((value & 0x7f) << 7) | (value >> 8)
+            bitmap[bit >> 3] |= 1 << (bit & 7)
+    return int.from_bytes(bitmap, 'little')
+
+
+class SearchQuery:
+    """编译后的搜索条件，非法正则在构造时抛出 re.error"""
+
+    def __init__(self, text, regex=False, whole_word=False, case_sensitive=False, scope=SCOPE_ALL):
+        self.text = text
+        self.regex = regex
+        self.whole_word = whole_word
+        self.case_sensitive = case_sensitive
+        self.scope = scope
+        pattern = text if regex else re.escape(text)
+        if whole_word:
+            pattern = rf'\b(?:{pattern})\b'
+        flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+        self.pattern = re.compile(pattern, flags)
+        # 字面量查询先在（小写化的）块文本上做子串预判，大部分块可直接跳过
+        self.needle = None if regex else (text if case_sensitive else text.lower())
+        self.needle_pattern = None if regex else re.compile(re.escape(self.needle))
+
+    def options(self):
+        return self.regex, self.whole_word, self.case_sensitive, self.scope
+
+    def narrows(self, previous):
+        """本查询的命中行是否一定包含在 previous 的命中行之内"""
+        if previous is None or self.regex or previous.regex or self.options() != previous.options():
+            return False
+        if self.whole_word:
+            return self.text == previous.text
+        if self.case_sensitive:
+            return previous.text in self.text
+        return previous.text.lower() in self.text.lower()
+
+    def bigram_mask(self):
+        """返回候选块必须包含的二元组位图，正则查询无法预筛时返回 0"""
+        if self.regex:
+            return 0
+        data = self.text.encode('utf-8')
+        # 只用纯ASCII二元组预筛，非ASCII字符的大小写变体不会造成漏检
+        return _bigram_mask(data) if len(data) > 1 else 0
+
+    def find_in_line(self, text, state=json_lexer.STATE_NORMAL):
+        """返回一行中的匹配 (列号, 长度) 列表"""
+        matches = [(m.start(), m.end() - m.start()) for m in self.pattern.finditer(text)
+                   if m.end() > m.start()]
+        if not matches or self.scope == SCOPE_ALL:
+            return matches
+        kinds = _SCOPE_KINDS[self.scope]
+        spans = [(start, start + length) for start, length, kind
+                 in json_lexer.tokenize_line(text, state)[0] if kind in kinds]
+        return [(col, length) for col, length in matches
+                if any(start <= col and col + length <= end for start, end in spans)]
+
+
+class NgramIndex:
+    """分块二元组索引，需先调用 build()"""
+
+    def __init__(self, store, block_bytes=BLOCK_BYTES):
+        self.store = store
+        self.block_bytes = block_bytes
+        self.block_starts = array('q')
+        self.masks = []
+        self.ready = False
+
+    def build(self, job=None):
+        store = self.store
+        total = store.line_count
+        first = 0
+        while first < total:
+            target = store.line_offset(first) + self.block_bytes
+            last = max(first + 1, min(total, store.line_at_offset(target) + 1))
+            self.block_starts.append(first)
+            self.masks.append(_bigram_mask(store.bytes_range(first, last)))
+            if job is not None:
+                job.check_cancelled()
+                job.report(last * 100 // total, '正在建立搜索索引')
+            first = last
+        self.ready = True
+        return self
+
+    def candidate_blocks(self, query):
+        """返回可能含有匹配的 (起始行, 结束行) 列表"""
+        total = self.store.line_count
+        ends = list(self.block_starts[1:]) + [total]
+        mask = query.bigram_mask()
+        return [(start, end) for start, end, block_mask in zip(self.block_starts, ends, self.masks)
+                if block_mask & mask == mask]
+
+
+class SearchResult:
+    """按行列顺序排列的匹配结果，以数组保存以控制内存"""
+
+    def __init__(self, query):
+        self.query = query
+        self.lines = array('q')
+        self.cols = array('l')
+        self.lengths = array('l')
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        return self.lines[index], self.cols[index], self.lengths[index]
+
+    def add(self, line, col, length):
+        self.lines.append(line)
+        self.cols.append(col)
+        self.lengths.append(length)
+
+    def matched_lines(self):
+        """返回去重后的命中行号"""
+        lines = self.lines
+        return [line for i, line in enumerate(lines) if i == 0 or lines[i - 1] != line]
+
+    def index_at_or_after(self, line):
+        """返回第一个位于 line 行及之后的匹配序号，没有则返回 0"""
+        index = bisect_left(self.lines, line)
+        return index if index < len(self.lines) else 0
+
+
+def _block_hits(query, text):
+    """返回块文本中的匹配 (起始, 结束) 列表"""
+    if query.needle is not None:
+        haystack = text if query.case_sensitive else text.lower()
+        if query.needle not in haystack:
+            return []
+        if not query.whole_word and len(haystack) == len(text):
+            step = len(query.needle)
+            return [(pos, pos + step) for pos in
+                    (m.start() for m in query.needle_pattern.finditer(haystack))]
+    return [m.span() for m in query.pattern.finditer(text) if m.end() > m.start()]
+
+
+def _scan_block(query, text, first, result):
+    hits = _block_hits(query, text)
+    if not hits:
+        return
+    if query.scope != SCOPE_ALL:
+        spans = _SCOPE_SPANS[query.scope](text)
+        span_starts = [start for start, _ in spans]
+        kept = []
+        for start, end in hits:
+            index = bisect_right(span_starts, start) - 1
+            if index >= 0 and spans[index][1] >= end:
+                kept.append((start, end))
+        hits = kept
+        if not hits:
+            return
+    # 把块内字符偏移映射到行号：line_starts[i] 为块内第 i 行的起始偏移
+    line_starts = [0]
+    line_starts.extend(accumulate(len(line) + 1 for line in text.split('\n')))
+    for start, end in hits:
+        index = bisect_right(line_starts, start) - 1
+        line_start = line_starts[index]
+        if index + 1 < len(line_starts) and end >= line_starts[index + 1]:
+            continue  # 跨行的正则匹配不计入
+        result.add(first + index, start - line_start, end - start)
+
+
+def search(store, query, index=None, previous=None, job=None):
+    """执行查询
+
+    Args:
+        store: 要搜索的 LineStore
+        query: SearchQuery
+        index: 已建立的 NgramIndex，用于跳过不可能命中的块
+        previous: 同一文档上一次的 SearchResult，可收窄时只复查其命中行
+        job: 可选的 JobContext
+    """
+    result = SearchResult(query)
+    if (previous is not None and query.narrows(previous.query)
+            and len(previous) <= NARROW_MAX_LINES):
+        lines = previous.matched_lines()
+        for i, line in enumerate(lines):
+            for col, length in query.find_in_line(store.line(line)):
+                result.add(line, col, length)
+            if job is not None and i % 4096 == 0:
+                job.check_cancelled()
+                job.report(i * 100 // max(1, len(lines)), f'已找到 {len(result):,} 个匹配')
+        return result
+
+    if index is not None and index.ready:
+        blocks = index.candidate_blocks(query)
+    else:
+        total = store.line_count
+        step = 4096
+        blocks = [(first, min(total, first + step)) for first in range(0, total, step)]
+    for i, (first, last) in enumerate(blocks):
+        _scan_block(query, store.text_range(first, last), first, result)
+        if job is not None:
+            job.check_cancelled()
+            job.report((i + 1) * 100 // len(blocks), f'已找到 {len(result):,} 个匹配')
+    return result
@@ -0,0 +1,65 @@
+"""启动耗时统计
+
+main.py 在最开始导入本模块，随后用 measure() 记录各阶段（导入、构建）的耗时；
+窗口显示并进入事件循环后调用 report()，把分阶段明细和总耗时写入日志，超过
+STARTUP_BUDGET 时记为警告。工具页在首次打开时构建，其导入和构建耗时由
+main_window 单独记录。
+"""
+import time
+from contextlib import contextmanager
+
+# 冷启动（从进程开始到窗口显示）的耗时预算（秒）
+STARTUP_BUDGET = 1.5
+
+IMPORT = '导入'
+BUILD = '构建'
+
+_started = time.perf_counter()
+_stages = []
+_reported = False
+
+
+def record(stage, seconds, kind=BUILD):
+    """记录一个已测得耗时的阶段，kind 为 IMPORT 或 BUILD"""
+    _stages.append((kind, stage, seconds))
+
+
+@contextmanager
+def measure(stage, kind=BUILD):
+    """测量 with 块内的耗时并记录"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, kind)
+
+
+def elapsed():
+    return time.perf_counter() - _started
+
+
+def is_reported():
+    """启动报告是否已写出；之后打开的工具页不再计入启动耗时"""
+    return _reported
+
+
+def report():
+    """把启动耗时明细写入日志，只执行一次"""
+    from loguru import logger
+
+    global _reported
+    if _reported:
+        return
+    _reported = True
+    total = elapsed()
+    lines = [f'启动耗时 {total * 1000:.0f} ms（预算 {STARTUP_BUDGET * 1000:.0f} ms）']
+    for kind in (IMPORT, BUILD):
+        entries = [(stage, seconds) for k, stage, seconds in _stages if k == kind]
+        subtotal = sum(seconds for _, seconds in entries)
+        lines.append(f'  {kind} {subtotal * 1000:.0f} ms')
+        lines.extend(f'    {stage}: {seconds * 1000:.1f} ms' for stage, seconds in entries)
+    message = '\n'.join(lines)
+    if total > STARTUP_BUDGET:
+        logger.warning(f'{message}\n启动超出预算')
+    else:
+        logger.info(message)
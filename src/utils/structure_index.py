@@ -0,0 +1,355 @@
+"""格式化结果的结构索引
+
+格式化输出中每个非空容器的开括号都位于行尾，闭括号都位于行首（缩进之后），
+因此一次多行正则扫描即可找到全部容器，无需逐个分析字符串。索引以列式数组保存：
+
+- start / end: 开、闭括号的字节偏移
+- start_line / end_line: 开、闭括号所在行
+- depth / parent: 嵌套深度与父容器编号（顶层为 -1）
+- key: 数组元素的下标；对象成员为 -1，键名按需从开括号所在行读取
+
+容器编号按开括号出现顺序分配，start_line 有序；闭括号按出现顺序另存一份
+end_line 有序的编号表，因此括号匹配、折叠范围和按行查找都是二分查找。
+"""
+import json
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+from src.utils import json_ops
+from src.utils.line_store import LineStore
+
+# 行尾的开括号、行首（缩进后）的闭括号；分成两个以换行为锚点的正则扫描更快
+_OPEN_RE = re.compile(rb'[\[{]\n')
+_CLOSE_RE = re.compile(rb'\n[ \t]*[\]}]')
+# 对象成员行开头的键名
+_KEY_RE = re.compile(r'\s*("(?:[^"\\]|\\.)*")\s*:')
+# 路径分段：.name、["name"]、[123]
+_PATH_RE = re.compile(r'''\.([^.\[\]]+)|\[(\d+)\]|\[("(?:[^"\\]|\\.)*")\]|\['((?:[^'\\]|\\.)*)'\]''')
+
+_SCAN_BLOCK = 4 * 1024 * 1024
+
+
+def parse_path(path):
+    """把 $.data.items[3].id 形式的路径解析为 ['data', 'items', 3, 'id']"""
+    path = path.strip()
+    if not path.startswith('$'):
+        raise ValueError(f"路径必须以 $ 开头: {path}")
+    parts = []
+    pos = 1
+    while pos < len(path):
+        match = _PATH_RE.match(path, pos)
+        if match is None:
+            raise ValueError(f"无法解析路径（位置 {pos}）: {path}")
+        name, number, double, single = match.groups()
+        if number is not None:
+            parts.append(int(number))
+        elif double is not None:
+            # 与 format_path 对应：双引号键名按JSON字符串解码
+            try:
+                parts.append(json.loads(double))
+            except ValueError:
+                raise ValueError(f"无法解析路径（位置 {pos}）: {path}") from None
+        else:
+            parts.append(name if name is not None else single.replace("\\'", "'"))
+        pos = match.end()
+    return parts
+
+
+def format_path(parts):
+    """把路径分段格式化为 $.a[0].b 形式"""
+    text = '$'
+    for part in parts:
+        if isinstance(part, int):
+            text += f'[{part}]'
+        elif re.fullmatch(r'[A-Za-z_$][\w$]*', part):
+            text += f'.{part}'
+        else:
+            text += '[' + json.dumps(part, ensure_ascii=False) + ']'
+    return text
+
+
+def format_indexed(data, indent=json_ops.INDENT, job=None, sink=None, size_hint=0, portable=False):
+    """格式化已解析的数据并建立结构索引，返回 (LineStore, StructureIndex)"""
+    store = json_ops.format_data(data, indent, job, sink if sink is not None else LineStore(),
+                                 size_hint, portable)
+    store.finish()
+    return store, StructureIndex.build(store, job)
+
+
+class StructureIndex:
+    """容器结构索引，使用 build() 构建"""
+
+    def __init__(self, store):
+        self.store = store
+        self.start = array('q')
+        self.end = array('q')
+        self.start_line = array('q')
+        self.end_line = array('q')
+        self.depth = array('l')
+        self.parent = array('q')
+        self.key = array('q')
+        self.is_array = bytearray()
+        # 闭括号顺序：close_order[i] 为第 i 个闭合的容器编号，其 end_line 递增
+        self.close_order = array('q')
+        self._close_lines = array('q')
+        # 子容器表（CSR）：children[child_start[c]:child_start[c + 1]] 为 c 的直接子容器
+        self.children = array('q')
+        self.child_start = array('q')
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def resident_bytes(self):
+        columns = (self.start, self.end, self.start_line, self.end_line, self.depth, self.parent,
+                   self.key, self.close_order, self._close_lines, self.children, self.child_start)
+        return len(self.is_array) + sum(column.itemsize * len(column) for column in columns)
+
+    @classmethod
+    def build(cls, store, job=None):
+        index = cls(store)
+        index._scan(job)
+        index._build_children()
+        return index
+
+    def _scan(self, job):
+        store = self.store
+        total = store.line_count
+        offsets = store._offsets
+        starts, ends = self.start, self.end
+        start_lines, end_lines = self.start_line, self.end_line
+        depths, parents, keys, is_array = self.depth, self.parent, self.key, self.is_array
+        stack = []
+        # 数组的子元素计数：[下一元素期望所在行, 已数元素数]
+        element_counts = {}
+        first = 0
+        while first < total:
+            target = offsets[first] + _SCAN_BLOCK
+            last = max(first + 1, min(total, bisect_right(offsets, target)))
+            base = offsets[first]
+            # 首尾补换行，使块首的闭括号和块尾的开括号也能匹配
+            data = b'\n' + store.bytes_range(first, last) + b'\n'
+            # 事件编码为 偏移*2+是否开括号，合并后按偏移排序
+            events = [m.start() * 2 + 1 for m in _OPEN_RE.finditer(data)]
+            events.extend(m.end() * 2 - 2 for m in _CLOSE_RE.finditer(data))
+            events.sort()
+            line = first
+            prev = 1
+            count_lines = data.count
+            for event in events:
+                end = event >> 1
+                pos = base + end - 1
+                # 事件按偏移递增，行号只需累加与上一事件之间的换行数
+                line += count_lines(b'\n', prev, end)
+                prev = end
+                char = data[end]
+                if event & 1:
+                    cid = len(starts)
+                    parent = stack[-1] if stack else -1
+                    key = -1
+                    if parent >= 0 and is_array[parent]:
+                        # 数组中标量元素各占一行，与上一个子容器之间的空隙行数即标量元素数
+                        counts = element_counts[parent]
+                        key = counts[1] + line - counts[0]
+                        counts[1] = key + 1
+                    starts.append(pos)
+                    ends.append(-1)
+                    start_lines.append(line)
+                    end_lines.append(-1)
+                    depths.append(len(stack))
+                    parents.append(parent)
+                    keys.append(key)
+                    if char == 0x5b:
+                        is_array.append(1)
+                        element_counts[cid] = [line + 1, 0]
+                    else:
+                        is_array.append(0)
+                    stack.append(cid)
+                elif stack:
+                    self._close(pos, line, stack, element_counts)
+            if job is not None:
+                job.check_cancelled()
+                job.report(96 + 3 * last // total, '正在建立结构索引')
+            first = last
+        # 截断的输出里未闭合的容器延伸到文末
+        while stack:
+            self._close(store.nbytes, total - 1, stack, element_counts)
+
+    def _close(self, pos, line, stack, element_counts):
+        cid = stack.pop()
+        self.end[cid] = pos
+        self.end_line[cid] = line
+        self.close_order.append(cid)
+        self._close_lines.append(line)
+        parent = self.parent[cid]
+        if self.is_array[cid]:
+            del element_counts[cid]
+        if parent >= 0 and self.is_array[parent]:
+            element_counts[parent][0] = line + 1
+
+    def _build_children(self):
+        count = len(self.start)
+        sizes = array('q', bytes(8 * (count + 1)))
+        for parent in self.parent:
+            if parent >= 0:
+                sizes[parent + 1] += 1
+        for i in range(count):
+            sizes[i + 1] += sizes[i]
+        self.child_start = sizes
+        self.children = array('q', bytes(8 * sizes[count]))
+        fill = array('q', sizes)
+        for cid, parent in enumerate(self.parent):
+            if parent >= 0:
+                self.children[fill[parent]] = cid
+                fill[parent] += 1
+
+    # ---- 查询 ----
+    def child_ids(self, cid):
+        return self.children[self.child_start[cid]:self.child_start[cid + 1]]
+
+    def opening_at(self, line):
+        """返回开括号位于 line 行的容器编号，没有则返回 -1"""
+        i = bisect_left(self.start_line, line)
+        return i if i < len(self.start_line) and self.start_line[i] == line else -1
+
+    def closing_at(self, line):
+        """返回闭括号位于 line 行的容器编号，没有则返回 -1"""
+        i = bisect_left(self._close_lines, line)
+        return self.close_order[i] if i < len(self._close_lines) and self._close_lines[i] == line else -1
+
+    def matching_line(self, line):
+        """括号匹配：返回与 line 行括号配对的行号，没有则返回 -1"""
+        cid = self.opening_at(line)
+        if cid >= 0:
+            return self.end_line[cid]
+        cid = self.closing_at(line)
+        return self.start_line[cid] if cid >= 0 else -1
+
+    def fold_range(self, line):
+        """返回以 line 行开括号起始的可折叠范围 (起始行, 结束行)，不可折叠时返回 None"""
+        cid = self.opening_at(line)
+        if cid < 0 or self.end_line[cid] <= line:
+            return None
+        return line, self.end_line[cid]
+
+    def container_at_line(self, line):
+        """返回包含 line 行的最内层容器编号"""
+        cid = bisect_right(self.start_line, line) - 1
+        while cid >= 0 and self.end_line[cid] < line:
+            cid = self.parent[cid]
+        return cid
+
+    def key_of(self, cid):
+        """返回容器在父容器中的键（对象键名或数组下标），顶层返回 None"""
+        if self.parent[cid] < 0:
+            return None
+        if self.key[cid] >= 0:
+            return self.key[cid]
+        return self._line_key(self.start_line[cid])
+
+    def _line_key(self, line):
+        match = _KEY_RE.match(self.store.line(line))
+        return json.loads(match.group(1)) if match else None
+
+    def path_parts(self, line):
+        """返回 line 行所在位置的路径分段"""
+        parts = []
+        cid = self.container_at_line(line)
+        if cid >= 0 and self.start_line[cid] < line < self.end_line[cid]:
+            member = self._member_at(cid, line)
+            if member is not None:
+                parts.append(member)
+        while cid >= 0 and self.parent[cid] >= 0:
+            parts.append(self.key_of(cid))
+            cid = self.parent[cid]
+        return list(reversed(parts))
+
+    def path_at_line(self, line):
+        """返回 line 行的面包屑路径，如 $.data.items[4031].id"""
+        return format_path(self.path_parts(line))
+
+    def _member_at(self, cid, line):
+        """容器内部某一行对应的直接成员键（仅处理标量成员所在行）"""
+        if self.is_array[cid]:
+            # 前一个子容器之后的空隙行数即为该标量的偏移
+            kids = self.child_ids(cid)
+            i = self._bisect_children(kids, line)
+            if i < 0:
+                return line - self.start_line[cid] - 1
+            prev = kids[i]
+            return self.key[prev] + (line - self.end_line[prev])
+        return self._line_key(line)
+
+    def _bisect_children(self, kids, line):
+        """返回起始行不晚于 line 的最后一个子容器在 kids 中的位置"""
+        lo, hi = 0, len(kids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.start_line[kids[mid]] <= line:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def resolve(self, path):
+        """按路径定位，返回目标所在行号，找不到时抛出 KeyError
+
+        数组下标在子容器的有序下标上二分查找；对象键名只检查该对象的直接成员行。
+        """
+        parts = parse_path(path) if isinstance(path, str) else list(path)
+        if not len(self.start):
+            raise KeyError(path)
+        cid = 0
+        line = self.start_line[0]
+        for depth, part in enumerate(parts):
+            if cid < 0:
+                raise KeyError(format_path(parts[:depth + 1]))
+            if self.is_array[cid]:
+                if not isinstance(part, int):
+                    raise KeyError(format_path(parts[:depth + 1]))
+                cid, line = self._array_child(cid, part)
+            else:
+                cid, line = self._object_child(cid, str(part))
+            if line < 0:
+                raise KeyError(format_path(parts[:depth + 1]))
+        return line
+
+    def _array_child(self, cid, position):
+        kids = self.child_ids(cid)
+        lo, hi = 0, len(kids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key[kids[mid]] < position:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(kids) and self.key[kids[lo]] == position:
+            child = kids[lo]
+            return child, self.start_line[child]
+        # 标量元素：从前一个子容器（或数组开头）按行偏移推算
+        if lo > 0:
+            prev = kids[lo - 1]
+            line = self.end_line[prev] + (position - self.key[prev])
+        else:
+            line = self.start_line[cid] + 1 + position
+        limit = self.start_line[kids[lo]] if lo < len(kids) else self.end_line[cid]
+        return -1, line if line < limit else -1
+
+    def _object_child(self, cid, name):
+        for child in self.child_ids(cid):
+            if self._line_key(self.start_line[child]) == name:
+                return child, self.start_line[child]
+        # 标量成员：逐行检查不属于子容器的直接成员行
+        kids = self.child_ids(cid)
+        line = self.start_line[cid] + 1
+        k = 0
+        while line < self.end_line[cid]:
+            if k < len(kids) and line == self.start_line[kids[k]]:
+                line = self.end_line[kids[k]] + 1
+                k += 1
+                continue
+            if self._line_key(line) == name:
+                return -1, line
+            line += 1
+        return -1, -1
@@ -0,0 +1,292 @@
+"""多文档工作区
+
+JSON格式化页面的每个子标签对应一份 WorkspaceDocument，保存输入内容（Document）、
+结果区显示的输出（LineStore，格式化时连同结构索引）、搜索索引和视图状态。
+
+所有文档共用一个内存预算。切换文档后若常驻内存超出预算，最久未使用的非当前
+文档在后台线程中整体写入临时目录（gzip 压缩的 pickle，溢出），随后释放内存；
+再次切换到该文档时读回。结果的 LineStore 在 pickle 中只记录行索引，内容字节
+紧随 pickle 之后按块写入和读回，溢出时不再复制一份完整的结果。解析得到的对象树不写入：对同一份数据，json 解析比
+反序列化对象树更快，读回后仍在需要时才解析。
+"""
+import gzip
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from src.utils import document_cache, perf
+from src.utils.line_store import LineStore
+
+# 全部文档常驻内存的预算
+WORKSPACE_BUDGET = 1024 * 1024 * 1024
+# 解析后对象树的大小按原文长度的倍数估算
+TREE_FACTOR = 5
+# 溢出文件的 gzip 压缩级别：以速度优先
+SPILL_LEVEL = 1
+# 读回时上报进度的粒度
+_READ_CHUNK = 4 * 1024 * 1024
+
+
+class WorkspaceDocument:
+    """工作区中的一份文档"""
+
+    def __init__(self, number, title):
+        self.number = number
+        self.title = title
+        self.document = None
+        # 结果区的内容：LineStore，或格式化结果 (LineStore, StructureIndex)
+        self.output = None
+        self.search_index = None
+        # 页面保存的视图状态（光标、滚动位置、校验检查点），溢出时保留
+        self.view = {}
+        # 溢出文件路径；写入中的溢出以 _token 标识，文档重新启用后作废
+        self.path = None
+        self.spill_size = 0
+        self._spilling = False
+        self._token = 0
+
+    @property
+    def spilled(self):
+        return self.path is not None
+
+    @property
+    def text_size(self):
+        return len(self.document.text) if self.document is not None else 0
+
+    @property
+    def resident_bytes(self):
+        """常驻内存的大致字节数"""
+        size = 0
+        document = self.document
+        if document is not None:
+            size += sys.getsizeof(document.text)
+            if document.is_parsed:
+                size += TREE_FACTOR * len(document.text)
+        if self.output is not None:
+            size += document_cache.resident_size(self.output)
+        return size
+
+
+class Workspace:
+    """按最近使用顺序管理文档，超出内存预算时把旧文档溢出到磁盘"""
+
+    def __init__(self, budget=WORKSPACE_BUDGET):
+        self.budget = budget
+        self.active = None
+        # 按最近使用排序，最久未使用的在前
+        self._documents = OrderedDict()
+        self._next_number = 1
+        self._lock = threading.Lock()
+        self._directory = None
+        self._executor = None
+
+    def __iter__(self):
+        return iter(list(self._documents.values()))
+
+    def __len__(self):
+        return len(self._documents)
+
+    def new(self, title=None):
+        number = self._next_number
+        self._next_number += 1
+        document = WorkspaceDocument(number, title or f'文档 {number}')
+        self._documents[number] = document
+        return document
+
+    def activate(self, document):
+        """设为当前文档；正在写入的溢出作废，内容仍在内存中"""
+        with self._lock:
+            document._token += 1
+            document._spilling = False
+        self._documents.move_to_end(document.number)
+        self.active = document
+
+    def close(self, document):
+        with self._lock:
+            document._token += 1
+            document._spilling = False
+            path, document.path = document.path, None
+        self._documents.pop(document.number, None)
+        if self.active is document:
+            self.active = None
+        if path is not None:
+            _remove(path)
+
+    def used_bytes(self):
+        with self._lock:
+            return sum(document.resident_bytes for document in self._documents.values())
+
+    def spilled_count(self):
+        return sum(1 for document in self._documents.values() if document.spilled)
+
+    # ---- 溢出 ----
+    def enforce(self, cache=None):
+        """超出预算时按最久未使用的顺序溢出非当前文档，返回开始溢出的文档
+
+        cache 为页面的 DocumentCache，其中这些文档的渲染结果一并丢弃，使内存真正释放。
+        """
+        used = self.used_bytes()
+        spilled = []
+        for document in list(self._documents.values()):
+            if used <= self.budget:
+                break
+            if document is self.active or document.spilled or document._spilling or document.document is None:
+                continue
+            used -= document.resident_bytes
+            if cache is not None:
+                cache.discard_document(document.document.key)
+            self._spill(document)
+            spilled.append(document)
+        return spilled
+
+    def _spill(self, document):
+        if self._executor is None:
+            self._directory = tempfile.mkdtemp(prefix='testtoolbox_workspace_')
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='workspace-spill')
+        with self._lock:
+            document._spilling = True
+            token = document._token
+        source = document.document
+        state = {'text': source.text, 'key': source.key, 'relaxed': source.relaxed, 'output': document.output}
+        # 搜索索引可以在后台快速重建，不写入
+        document.search_index = None
+        self._executor.submit(self._write, document, token, state)
+
+    def _write(self, document, token, state):
+        path = os.path.join(self._directory, f'{document.number}_{token}.pkl.gz')
+        size = len(state['text'])
+        try:
+            with perf.track('溢出文档', size):
+                with gzip.open(path, 'wb', compresslevel=SPILL_LEVEL) as f:
+                    pickler = _SpillPickler(f)
+                    pickler.dump(state)
+                    for store in pickler.stores:
+                        for chunk in store.iter_bytes(_READ_CHUNK):
+                            f.write(chunk)
+        except Exception as e:
+            logger.error(f"文档溢出失败: {document.title}: {e}")
+            _remove(path)
+            with self._lock:
+                document._spilling = False
+            return
+        with self._lock:
+            current = document._spilling and document._token == token and document.number in self._documents
+            if current:
+                document.path = path
+                document.spill_size = os.path.getsize(path)
+                document.document = None
+                document.output = None
+                document._spilling = False
+        if not current:
+            # 写入期间文档被重新启用或关闭
+            _remove(path)
+            return
+        logger.debug(f"文档已溢出: {document.title} {perf.format_size(size)} → "
+                     f"{perf.format_size(document.spill_size)}")
+
+    def read(self, document, job=None):
+        """在后台读回溢出的文档，返回 (溢出文件, 内容)，交给 restore() 在界面线程中启用"""
+        path = document.path
+        with perf.span('读回', document.spill_size):
+            with open(path, 'rb') as raw, gzip.GzipFile(fileobj=_Progress(raw, document.spill_size, job)) as f:
+                unpickler = _SpillUnpickler(f)
+                state = unpickler.load()
+                for store, size in unpickler.stores:
+                    store.read_content(f, size)
+        return path, state
+
+    def restore(self, document, loaded):
+        """启用 read() 读回的内容并删除溢出文件；文档已被关闭或再次溢出时返回 False"""
+        path, state = loaded
+        with self._lock:
+            if document.path != path or document.number not in self._documents:
+                return False
+            document.document = document_cache.Document(state['text'], key=state['key'], relaxed=state['relaxed'])
+            document.output = state['output']
+            document.path = None
+            document.spill_size = 0
+        _remove(path)
+        return True
+
+    def shutdown(self):
+        """等待正在进行的写入结束，并删除临时目录"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+        self._documents.clear()
+        self.active = None
+
+
+class _SpillPickler(pickle.Pickler):
+    """LineStore 在 pickle 中只记录 header()，内容由调用方在 pickle 之后按 stores 的顺序写入
+
+    结构索引也引用同一个 LineStore，按对象身份去重，只写入一次。
+    """
+
+    def __init__(self, f):
+        super().__init__(f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.stores = []
+        self._numbers = {}
+
+    def persistent_id(self, obj):
+        if type(obj) is not LineStore:
+            return None
+        number = self._numbers.get(id(obj))
+        if number is not None:
+            return number, None
+        number = self._numbers[id(obj)] = len(self.stores)
+        self.stores.append(obj)
+        return number, obj.header()
+
+
+class _SpillUnpickler(pickle.Unpickler):
+    """与 _SpillPickler 对应：stores 为 [(尚无内容的 LineStore, 内容字节数)]"""
+
+    def __init__(self, f):
+        super().__init__(f)
+        self.stores = []
+
+    def persistent_load(self, pid):
+        number, header = pid
+        if header is None:
+            return self.stores[number][0]
+        store = LineStore.from_header(header)
+        self.stores.append((store, header['size']))
+        return store
+
+
+class _Progress:
+    """读回溢出文件时按已读字节上报进度并检查取消"""
+
+    def __init__(self, raw, size, job):
+        self._raw = raw
+        self._size = max(1, size)
+        self._job = job
+        self._done = 0
+        self._next_report = _READ_CHUNK
+
+    def read(self, n=-1):
+        data = self._raw.read(n)
+        self._done += len(data)
+        if self._job is not None and self._done >= self._next_report:
+            self._next_report = self._done + _READ_CHUNK
+            self._job.check_cancelled()
+            self._job.report(self._done * 100 // self._size, '正在读回文档')
+        return data
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from src import batch
+from src.utils import json_stream
+
+DATA = [{'id': i, '名称': '测试数据' * 5, 'tags': ['ä']} for i in range(200)]
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    source = tmp_path / 'in'
+    (source / 'sub').mkdir(parents=True)
+    (source / 'escaped.json').write_text(json.dumps(DATA, ensure_ascii=True), encoding='utf-8')
+    (source / 'sub' / 'plain.json').write_text(json.dumps(DATA, ensure_ascii=False), encoding='utf-8')
+    return source
+
+
+@pytest.fixture(params=[False, True], ids=['in-memory', 'streamed'])
+def streamed(request, monkeypatch):
+    if request.param:
+        monkeypatch.setattr(batch, 'STREAM_THRESHOLD', 0)
+        monkeypatch.setattr(json_stream, 'WINDOW_SIZE', 97)
+    return request.param
+
+
+def test_validate_accepts_escaped_unicode(inputs, streamed, capsys):
+    assert batch.main(['validate', str(inputs), '-j', '1']) == 0
+    assert '2 个成功，0 个失败' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('operation, expected', [
+    ('format', json.dumps(DATA, indent=2, ensure_ascii=False)),
+    ('minify', json.dumps(DATA, separators=(',', ':'), ensure_ascii=False)),
+], ids=['format', 'minify'])
+def test_format_and_minify_keep_relative_paths(inputs, tmp_path, streamed, operation, expected):
+    out = tmp_path / 'out'
+    assert batch.main([operation, str(inputs), '-o', str(out), '--indent', '2', '-j', '1']) == 0
+    assert (out / 'escaped.json').read_text(encoding='utf-8') == expected
+    assert (out / 'sub' / 'plain.json').read_text(encoding='utf-8') == expected
+
+
+def test_invalid_file_is_reported(inputs, tmp_path, streamed, capsys):
+    (inputs / 'broken.json').write_text('[1, 2,]', encoding='utf-8')
+    report = tmp_path / 'report.jsonl'
+    assert batch.main(['validate', str(inputs), '-j', '1', '--report', str(report)]) == 1
+    records = [json.loads(line) for line in report.read_text(encoding='utf-8').splitlines()]
+    assert [record['ok'] for record in records] == [False, True, True]
+    assert records[0]['error'].endswith('第 1 行第 7 列(位置 6)')
+
+
+@pytest.mark.parametrize('arguments, suffix', [
+    (['format'], '.json'),
+    (['minify'], '.json'),
+    (['convert', '--to', 'yaml'], '.yaml'),
+    (['convert', '--to', 'xml'], '.xml'),
+    (['convert', '--to', 'python'], '.py'),
+], ids=['format', 'minify', 'yaml', 'xml', 'python'])
+def test_lone_surrogates_are_written(tmp_path, streamed, arguments, suffix, capsys):
+    source = tmp_path / 'in'
+    source.mkdir()
+    (source / 'surrogate.json').write_text('["\\ud800", {"k": "a\\udfffb"}]', encoding='utf-8')
+    out = tmp_path / 'out'
+    operation, *options = arguments
+    assert batch.main([operation, str(source), '-o', str(out), '-j', '1', *options]) == 0, capsys.readouterr().out
+    text = (out / ('surrogate' + suffix)).read_bytes().decode('utf-8', 'surrogatepass')
+    assert '\ud800' in text or '\\ud800' in text.lower()
+    if operation != 'convert':
+        assert json.loads(text) == ['\ud800', {'k': 'a\udfffb'}]
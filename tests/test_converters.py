@@ -0,0 +1,16 @@
+import pytest
+
+yaml = pytest.importorskip('yaml')
+
+from src.utils import converters  # noqa: E402
+
+
+@pytest.mark.parametrize('data', [
+    ['\ud800'],
+    {'k': 'a\udfff'},
+    {'plain': 'text', 'list': [1, 2.5, None, True], '中文': {'嵌套': []}},
+    ['line\rbreak', '\U0001f600', ''],
+])
+def test_yaml_round_trips(data):
+    expected = yaml.dump(data, Dumper=yaml.Dumper, allow_unicode=True, sort_keys=False)
+    assert yaml.safe_load(converters.to_string(converters.write_yaml, data)) == yaml.safe_load(expected)
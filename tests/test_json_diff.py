@@ -0,0 +1,128 @@
+import json
+import random
+
+import pytest
+
+from src.utils import json_diff
+
+
+def changes(old, new, **options):
+    result = json_diff.diff(old, new, **options)
+    return [(change.kind, change.path, change.old, change.new) for change in result.changes]
+
+
+@pytest.mark.parametrize('old, new, path', [
+    ({'ok': False}, {'ok': 0}, ('ok',)),
+    ({'data': {'flag': True}}, {'data': {'flag': 1}}, ('data', 'flag')),
+    ({'price': [10]}, {'price': [10.0]}, ('price', 0)),
+    ([{'id': 1, 'v': [1]}], [{'id': 1, 'v': [True]}], (0, 'v', 0)),
+    ([[1, 2], [3]], [[1, 2], [3.0]], (1, 0)),
+])
+@pytest.mark.parametrize('align', [json_diff.ALIGN_AUTO, json_diff.ALIGN_LCS, json_diff.ALIGN_INDEX])
+def test_number_type_changes_are_reported(old, new, path, align):
+    found = changes(old, new, align=align)
+    assert [(kind, change_path) for kind, change_path, _, _ in found] == [(json_diff.CHANGED, path)]
+
+
+def test_compare_reports_bool_to_int():
+    comparison = json_diff.compare('{"ok":false}', '{"ok":0}')
+    assert comparison.result.summary() != '两份JSON内容相同'
+    assert comparison.layout.lines == [(1, 1)]
+
+
+def test_same_is_type_strict():
+    assert json_diff.same({'a': [1, 2.5]}, {'a': [1, 2.5]})
+    assert not json_diff.same({'a': 1}, {'a': 1.0})
+    assert not json_diff.same([True], [1])
+
+
+def test_equal_documents_and_key_order():
+    assert changes({'a': 1, 'b': [1, {'c': None}]}, {'b': [1, {'c': None}], 'a': 1}) == []
+
+
+def test_added_removed_and_changed_in_document_order():
+    old = {'a': 1, 'b': 2, 'list': [1, 2, 3]}
+    new = {'a': 1, 'b': 3, 'c': 4, 'list': [1, 3]}
+    assert changes(old, new) == [
+        (json_diff.CHANGED, ('b',), 2, 3),
+        (json_diff.REMOVED, ('list', 1), 2, None),
+        (json_diff.ADDED, ('c',), None, 4),
+    ]
+
+
+def test_align_by_key_pairs_moved_objects():
+    old = [{'id': 1, 'v': 'a'}, {'id': 2, 'v': 'b'}]
+    new = [{'id': 2, 'v': 'b'}, {'id': 1, 'v': 'x'}]
+    assert changes(old, new) == [(json_diff.CHANGED, (1, 'v'), 'a', 'x')]
+
+
+def test_lcs_alignment_keeps_shifted_elements():
+    old = [{'n': i} for i in range(50)]
+    new = old[:10] + [{'n': 'new'}] + old[10:]
+    found = changes(old, new, align=json_diff.ALIGN_LCS)
+    assert found == [(json_diff.ADDED, (10,), None, {'n': 'new'})]
+
+
+def test_changes_apply_to_old_give_new():
+    old = {'users': [{'id': i, 'name': f'u{i}', 'tags': [i, i * 2]} for i in range(30)], 'v': 1}
+    new = json.loads(json.dumps(old))
+    new['users'][5]['name'] = 'renamed'
+    new['users'][7]['tags'].append(99)
+    del new['users'][12]
+    new['v'] = 1.0
+    kinds = {(kind, path) for kind, path, _, _ in changes(old, new)}
+    assert kinds == {
+        (json_diff.CHANGED, ('users', 5, 'name')),
+        (json_diff.ADDED, ('users', 7, 'tags', 2)),
+        (json_diff.REMOVED, ('users', 12)),
+        (json_diff.CHANGED, ('v',)),
+    }
+
+
+def random_document(rng, depth=0):
+    roll = rng.random()
+    if depth < 3 and roll < 0.3:
+        return {f'k{i}': random_document(rng, depth + 1) for i in range(rng.randint(0, 4))}
+    if depth < 3 and roll < 0.5:
+        return [random_document(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return rng.choice([None, True, False, 0, 1, 1.0, 2.5, '', 'x', '中文'])
+
+
+def leaf_paths(value, prefix=()):
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            yield from leaf_paths(item, prefix + (key,))
+    elif isinstance(value, list) and value:
+        for index, item in enumerate(value):
+            yield from leaf_paths(item, prefix + (index,))
+    else:
+        yield prefix
+
+
+def changed_value(value):
+    """类型或取值不同、但 Python 的 == 可能认为相等的替换值"""
+    if type(value) is bool:
+        return int(value)
+    if type(value) is int:
+        return float(value)
+    if type(value) is float:
+        return int(value) if value.is_integer() else value + 1
+    if type(value) is str:
+        return value + '!'
+    return None if value is not None else 0
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_single_leaf_change_is_reported_at_its_path(seed):
+    rng = random.Random(seed)
+    old = {'root': random_document(rng), 'other': random_document(rng)}
+    new = json.loads(json.dumps(old))
+    assert changes(old, new) == []
+    path = rng.choice(list(leaf_paths(old)))
+    target = new
+    for part in path[:-1]:
+        target = target[part]
+    target[path[-1]] = changed_value(target[path[-1]])
+    for align in (json_diff.ALIGN_AUTO, json_diff.ALIGN_INDEX):
+        assert [(kind, change_path) for kind, change_path, _, _ in changes(old, new, align=align)] == [
+            (json_diff.CHANGED, path)]
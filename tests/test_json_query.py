@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from src.utils import json_query, json_stream
+
+DATA = {'store': {'items': [{'id': 1, '名称': '苹果', 'price': 3.5},
+                            {'id': 2, '名称': '香蕉', 'price': 2},
+                            {'id': 3, 'meta': {'名称': '嵌套'}}]}}
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    def write(text):
+        path = tmp_path / 'data.json'
+        path.write_text(text, encoding='utf-8')
+        return str(path)
+    return write
+
+
+def values(query, data=DATA):
+    return list(json_query.compile_query(query).values(data))
+
+
+def test_non_ascii_dot_members():
+    assert values('$..名称') == ['苹果', '香蕉', '嵌套']
+    assert values('$.store.items[0].名称') == ['苹果']
+    assert values('.store.items[1].名称') == ['香蕉']
+
+
+def test_unrecognized_character_still_rejected():
+    with pytest.raises(json_query.QueryError):
+        json_query.compile_query('$.store#items')
+
+
+@pytest.mark.parametrize('query', ["$..['名称']", '$..名称', '$..id', '$.store.items[*].名称', '$..items[1]'])
+@pytest.mark.parametrize('ensure_ascii', [False, True])
+def test_stream_file_matches_values(data_file, query, ensure_ascii):
+    path = data_file(json.dumps(DATA, ensure_ascii=ensure_ascii, indent=1))
+    compiled = json_query.compile_query(query)
+    assert compiled.streamable
+    assert list(compiled.stream_file(path)) == values(query)
+
+
+@pytest.mark.parametrize('window', [97, 256, 1000])
+def test_stream_file_escaped_large_input_across_windows(data_file, monkeypatch, window):
+    monkeypatch.setattr(json_stream, 'WINDOW_SIZE', window)
+    data = [{'id': i, '名称': '测试数据' * 5} for i in range(200)]
+    path = data_file(json.dumps(data, ensure_ascii=True))
+    for query in ('$[*].名称', '$..名称', '$[150].id'):
+        compiled = json_query.compile_query(query)
+        assert list(compiled.stream_file(path)) == values(query, data)
+
+
+@pytest.mark.parametrize('text, query, expected', [
+    ('{"n\\u0061me": 1, "x": {"name": 2}}', '$..name', [1, 2]),
+    ('{"N\\u0041ME": 1, "x": {"NAME": 2}}', '$..NAME', [1, 2]),
+    ('{"a\\/b": 1, "x": {"a/b": 2}}', "$..['a/b']", [1, 2]),
+    ('{"name": {"v": 1}, "\\u00e9": {"name": {"v": 2}}}', '$..name.v', [1, 2]),
+])
+def test_stream_file_finds_escaped_keys(data_file, text, query, expected):
+    compiled = json_query.compile_query(query)
+    assert list(compiled.stream_file(data_file(text))) == expected
+    assert list(compiled.values(json.loads(text))) == expected
+
+
+def test_unrelated_escapes_keep_byte_search():
+    data = b'{"name": 1, "url": "http:\\/\\/x", "t": "\\u00e9\\n"}'
+    assert not json_query._may_escape(data, 'name')
+    assert json_query._may_escape(data, 'a/b')
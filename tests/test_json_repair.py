@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from src.utils import json_repair
+
+
+@pytest.mark.parametrize('text, expected, message', [
+    ('[1, 2, 3,]', [1, 2, 3], '删除末尾多余的逗号'),
+    ('{"a": 1,, "b": 2}', {'a': 1, 'b': 2}, '删除多余的逗号'),
+    ("{'a': 'b'}", {'a': 'b'}, '单引号字符串改为双引号'),
+    ('{a: 1, b: c}', {'a': 1, 'b': 'c'}, '键名 a 加上引号'),
+    ('[True, False, None, undefined]', [True, False, None, None], 'True 改为 true'),
+    ('{"a": "x\ny"}', {'a': 'x\ny'}, '转义字符串中的控制字符'),
+    ('{"a": "\\q"}', {'a': '\\q'}, '转义无效的反斜杠'),
+    ('[+1, .5, 1., 0x1F, 007]', [1, 0.5, 1, 31, 7], '修正数字格式 +1'),
+    ('// c\n{"a": /* x */ 1}', {'a': 1}, '删除注释'),
+    ('[1 2]', [1, 2], '补上缺失的逗号'),
+    ('{"a" 1}', {'a': 1}, '补上缺失的冒号'),
+    ('{"a": [1, 2', {'a': [1, 2]}, '补全缺失的 ]'),
+    ('{"a": "abc', {'a': 'abc'}, '补全被截断的字符串'),
+    ('{"a":', {'a': None}, '补上缺失的值 null'),
+    ('[1, 2]]', [1, 2], '删除多余的 ]'),
+    ('{"a": @#1}', {'a': 1}, "删除无法识别的字符 '@#'"),
+])
+def test_repairs(text, expected, message):
+    result = json_repair.repair(text)
+    assert result.changed
+    assert json.loads(result.text) == expected
+    assert message in [fix.message for fix in result.fixes]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('[1, 2, @]', [1, 2]),
+    ('{"a": 1, @}', {'a': 1}),
+    ('{"a": []-}', {'a': []}),
+    ('[1, 2, @, 3]', [1, 2, 3]),
+    ('{"a": 1 @', {'a': 1}),
+])
+def test_comma_before_deleted_garbage(text, expected):
+    result = json_repair.repair(text)
+    assert json.loads(result.text) == expected
+    assert '补上缺失的逗号' not in [fix.message for fix in result.fixes]
+
+
+def test_valid_text_is_unchanged():
+    text = json.dumps({'a': [1, 2.5, None, '中文'], 'b': {'c': True}}, ensure_ascii=False, indent=2)
+    result = json_repair.repair(text)
+    assert result.text == text
+    assert not result.changed
+
+
+def test_fix_positions_are_sorted_with_line_and_column():
+    result = json_repair.repair("{\n  'a': 1,\n  b: [1, 2,],\n}")
+    assert json.loads(result.text) == {'a': 1, 'b': [1, 2]}
+    positions = [fix.position for fix in result.fixes]
+    assert positions == sorted(positions)
+    assert [(fix.line, fix.column) for fix in result.fixes][:2] == [(2, 3), (3, 3)]
+
+
+@pytest.mark.parametrize('size', [10, 2000, 20000])
+def test_error_inside_large_valid_document(size):
+    data = [{'id': i, 'name': f'条目{i}', 'tags': ['x', 'y']} for i in range(size)]
+    text = json.dumps(data, ensure_ascii=False)
+    cut = text.index('"id": %d,' % (size // 2))
+    broken = text[:cut] + "'id'" + text[cut + 4:]
+    result = json_repair.repair(broken)
+    assert json.loads(result.text) == data
+    assert [fix.message for fix in result.fixes] == ['单引号字符串改为双引号']
+    assert result.fixes[0].position == cut
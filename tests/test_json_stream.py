@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from src.utils import json_stream
+
+
+class KeyMatcher:
+    """stream_select 的最小匹配器：选中任意深度上键名为 name 的值"""
+
+    root = ()
+
+    def __init__(self, name):
+        self.name = name
+
+    def child(self, state, key):
+        return (key == self.name,)
+
+    def accepts(self, state):
+        return bool(state) and state[0]
+
+    def select(self, state, value):
+        if self.accepts(state):
+            yield value
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                yield from self.select(self.child(state, key), item)
+        elif isinstance(value, list):
+            for item in value:
+                yield from self.select((False,), item)
+
+
+def reformat(text, indent=4):
+    out = []
+    json_stream.stream_reformat(text.encode('utf-8'), out.append, indent)
+    return ''.join(out)
+
+
+@pytest.fixture
+def small_window(monkeypatch):
+    def set_size(size):
+        monkeypatch.setattr(json_stream, 'WINDOW_SIZE', size)
+    return set_size
+
+
+ASCII_ESCAPED = json.dumps([{'id': i, '名称': '测试数据' * 5, 'tags': ['ä', 'ö']} for i in range(60)],
+                           ensure_ascii=True)
+
+
+@pytest.mark.parametrize('window', [97, 128, 256, 1000, 4096])
+def test_escaped_unicode_split_across_windows(small_window, window):
+    small_window(window)
+    expected = json.loads(ASCII_ESCAPED)
+    assert reformat(ASCII_ESCAPED) == json.dumps(expected, indent=4, ensure_ascii=False)
+    assert reformat(ASCII_ESCAPED, None) == json.dumps(expected, separators=(',', ':'), ensure_ascii=False)
+
+
+@pytest.mark.parametrize('window', [97, 128, 256, 1000])
+def test_select_with_escaped_keys_across_windows(small_window, window):
+    small_window(window)
+    values = list(json_stream.stream_select(ASCII_ESCAPED.encode('utf-8'), KeyMatcher('名称')))
+    assert values == ['测试数据' * 5] * 60
+
+
+@pytest.mark.parametrize('window', [64, 100, 333])
+def test_matches_json_dumps_on_small_windows(small_window, window):
+    small_window(window)
+    data = {'a': [1, 2.5, -3e10, True, False, None], 'b': {'c': 'x' * 300, 'd': []}, 'e': {},
+            '键': ['值\n\t"', {'深': [[[]]]}], 'long': list(range(200))}
+    text = json.dumps(data)
+    assert reformat(text) == json.dumps(data, indent=4, ensure_ascii=False)
+    assert reformat(text, 2) == json.dumps(data, indent=2, ensure_ascii=False)
+    assert reformat(text, None) == json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+@pytest.mark.parametrize('text', [
+    '[1, 2,, 3]',
+    '{"a" 1}',
+    '{"a": 1,}',
+    '[1, 2] 3',
+    '["abc\\u12zz"]',
+    '["a\\qb"]',
+    '[',
+])
+@pytest.mark.parametrize('window', [4, 64, 4096])
+def test_errors_match_json_loads(small_window, text, window):
+    small_window(window)
+    with pytest.raises(json.JSONDecodeError) as expected:
+        json.loads(text)
+    with pytest.raises(json_stream.StreamDecodeError) as error:
+        reformat(text)
+    assert (error.value.msg, error.value.pos) == (expected.value.msg, expected.value.pos)
+
+
+def test_invalid_escape_near_window_end_is_reported(small_window):
+    small_window(128)
+    text = '["' + 'x' * 100 + '\\u12zz", 1]' + ' ' * 200
+    with pytest.raises(json_stream.StreamDecodeError) as error:
+        reformat(text)
+    assert error.value.msg == 'Invalid \\uXXXX escape'
+
+
+@pytest.mark.parametrize('indent', [4, None])
+def test_process_file_writes_lone_surrogates(tmp_path, indent):
+    source = tmp_path / 'in.json'
+    source.write_text('["\\ud800", {"k": "a\\udfffb"}]', encoding='utf-8')
+    target = tmp_path / 'out.json'
+    assert json_stream.process_file(str(source), indent, output_path=str(target)) == str(target)
+    text = target.read_bytes().decode('utf-8', 'surrogatepass')
+    expected = ['\ud800', {'k': 'a\udfffb'}]
+    assert text == json.dumps(expected, indent=indent, separators=None if indent else (',', ':'),
+                              ensure_ascii=False)
@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from src.ui.json_tree_model import JsonTreeModel  # noqa: E402
+from src.utils import structure_index  # noqa: E402
+
+DATA = {'a.b': {'items': [{'x y': 1, '名称': 2, 'q"': 3, 'id': 4}]}}
+
+
+def child(model, parent, key):
+    model.fetchMore(parent)
+    for row in range(model.rowCount(parent)):
+        index = model.index(row, 0, parent)
+        if index.internalPointer().key == key:
+            return index
+    raise KeyError(key)
+
+
+@pytest.mark.parametrize('key, expected', [
+    ('x y', '$["a.b"].items[0]["x y"]'),
+    ('名称', '$["a.b"].items[0]["名称"]'),
+    ('q"', '$["a.b"].items[0]["q\\""]'),
+    ('id', '$["a.b"].items[0].id'),
+])
+def test_path_quotes_keys_and_resolves(key, expected):
+    model = JsonTreeModel(DATA)
+    root = model.index(0, 0)
+    index = child(model, child(model, child(model, child(model, root, 'a.b'), 'items'), 0), key)
+    path = model.path(index)
+    assert path == expected
+    store, structure = structure_index.format_indexed(DATA)
+    assert structure.path_at_line(structure.resolve(path)) == path
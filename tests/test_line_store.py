@@ -0,0 +1,39 @@
+from src.utils import document_cache, ndjson
+from src.utils.line_store import LineStore
+
+
+def test_lines_and_offsets():
+    store = LineStore.from_text('a\nbc\n\n中文')
+    assert store.line_count == 4
+    assert [store.line(i) for i in range(4)] == ['a', 'bc', '', '中文']
+    assert store.line_offset(3) == 6
+    assert store.line_at_offset(4) == 1
+    assert store.text_range(1, 3) == 'bc\n'
+    assert ''.join(store.iter_text_chunks(chunk_lines=2)) == store.text()
+
+
+def test_spill_to_file_keeps_content():
+    text = '\n'.join(f'line {i} 行' for i in range(5000))
+    store = LineStore(spill_threshold=1024)
+    for start in range(0, len(text), 777):
+        store.write(text[start:start + 777])
+    store.finish()
+    assert store.resident_bytes < len(text.encode('utf-8'))
+    assert store.text() == text
+    assert store.line(4999) == 'line 4999 行'
+    assert b''.join(store.iter_bytes(1000)) == text.encode('utf-8')
+
+
+def test_lone_surrogates_round_trip():
+    store = LineStore.from_text('["\ud800",\n"a\udfff"]')
+    assert store.line(0) == '["\ud800",'
+    assert store.text() == '["\ud800",\n"a\udfff"]'
+    assert store.lines(0, 2) == ['["\ud800",', '"a\udfff"]']
+
+
+def test_format_and_ndjson_with_lone_surrogate():
+    store, _ = document_cache.render(document_cache.Document('["\\ud800"]'), 'format')
+    assert store.text() == '[\n    "\ud800"\n]'
+    index = ndjson.RecordIndex.from_text('["\\ud800"]\n{"a": 1}\n')
+    output = ndjson.process(index, None, sink=LineStore()).finish()
+    assert output.text() == '["\ud800"]\n{"a":1}'
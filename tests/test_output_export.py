@@ -0,0 +1,47 @@
+import gzip
+
+import pytest
+
+from src.utils import output_export
+from src.utils.job_runner import JobCancelled
+from src.utils.line_store import LineStore
+
+
+class CancelAfter:
+    """第 n 次检查取消时抛出 JobCancelled 的任务上下文"""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def check_cancelled(self):
+        self.checks -= 1
+        if self.checks < 0:
+            raise JobCancelled()
+
+    def report(self, percent, message=''):
+        pass
+
+
+@pytest.fixture
+def store():
+    return LineStore.from_text('\n'.join(f'第 {i} 行' for i in range(20000)))
+
+
+@pytest.mark.parametrize('name', ['out.json', 'out.json.gz'])
+def test_save_writes_content(tmp_path, store, name):
+    path = str(tmp_path / name)
+    assert output_export.save_store(store, path) == path
+    data = gzip.open(path).read() if name.endswith('.gz') else open(path, 'rb').read()
+    assert data == store.text().encode('utf-8')
+
+
+@pytest.mark.parametrize('checks', [0, 3])
+@pytest.mark.parametrize('name', ['out.json', 'out.json.gz'])
+def test_cancelled_save_removes_part_file(tmp_path, monkeypatch, store, name, checks):
+    monkeypatch.setattr(output_export, '_CHUNK', 1024)
+    target = tmp_path / name
+    target.write_bytes(b'old')
+    with pytest.raises(JobCancelled):
+        output_export.save_store(store, str(target), CancelAfter(checks))
+    assert target.read_bytes() == b'old'
+    assert [p.name for p in tmp_path.iterdir()] == [name]
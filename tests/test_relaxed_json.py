@@ -0,0 +1,56 @@
+import json
+import math
+
+import pytest
+
+from src.utils import json_ops, relaxed_json
+
+
+@pytest.mark.parametrize('text', ['{"a": [1, 2.5, "x"]}', '[]', '"中文"', '[1e5, -0, null]'])
+def test_standard_json_is_detected_as_json(text):
+    data, _, dialect = json_ops.parse_relaxed(text)
+    assert dialect == relaxed_json.JSON
+    assert data == json.loads(text)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('{a: 1}', {'a': 1}),
+    ("['x',]", ['x']),
+    ('// 注释\n[1]', [1]),
+    ('/* a */ {"b": /* c */ 2,}', {'b': 2}),
+    ("{'a': '\\x41\\v\\0'}", {'a': 'A\x0b\x00'}),
+    ("'line \\\ncontinued'", 'line continued'),
+    ('[0x1F, +1, .5, 5.]', [31, 1, 0.5, 5.0]),
+    ('{$key_1: true, 名称: null}', {'$key_1': True, '名称': None}),
+    ('﻿ [1,\u000b2]', [1, 2]),
+    ('{"a": "b", c: "d",}', {'a': 'b', 'c': 'd'}),
+])
+def test_json5_syntax(text, expected):
+    data, _, dialect = json_ops.parse_relaxed(text)
+    assert dialect == relaxed_json.JSON5
+    assert data == expected
+
+
+def test_infinity_and_nan():
+    data, portable, dialect = json_ops.parse_relaxed('[+Infinity, -Infinity, NaN, +1]')
+    assert dialect == relaxed_json.JSON5
+    assert data[:2] == [math.inf, -math.inf] and math.isnan(data[2])
+    assert not portable
+
+
+def test_translation_keeps_strict_parts():
+    text = '{"a": [1, "x,]"], b: 2}'
+    assert relaxed_json.translate(text).text == '{"a": [1, "x,]"], "b": 2}'
+
+
+@pytest.mark.parametrize('text, position', [
+    ('[1, @]', 4),
+    ('// 注释\n{a: 1, /* x */ b: }', 24),
+    ("{'a': 1 'b': 2}", 8),
+    ('{a: undefinedValue}', 4),
+])
+def test_error_positions_refer_to_source(text, position):
+    with pytest.raises(json.JSONDecodeError) as info:
+        json_ops.parse_relaxed(text)
+    assert info.value.pos == position
+    assert info.value.doc == text
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from src.utils import structure_index
+
+DATA = {
+    'name': '示例',
+    'items': [
+        {'id': 1, 'tags': ['a', 'b'], 'meta': {}},
+        2,
+        [3, [4, 5]],
+        {'id': 6, 'a b': {'c': None}},
+        'tail',
+    ],
+    'empty': [],
+    'nested': {'x': {'y': {'z': [True, False]}}},
+}
+
+
+def paths(value, prefix=()):
+    yield prefix
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from paths(item, prefix + (key,))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from paths(item, prefix + (index,))
+
+
+@pytest.fixture(scope='module', params=[2, 4])
+def indexed(request):
+    return structure_index.format_indexed(DATA, indent=request.param)
+
+
+def test_every_path_resolves_and_round_trips(indexed):
+    store, structure = indexed
+    for path in paths(DATA):
+        line = structure.resolve(list(path))
+        assert structure.path_parts(line) == list(path)
+        assert structure.resolve(structure.path_at_line(line)) == line
+
+
+def test_brackets_match_and_fold(indexed):
+    store, structure = indexed
+    for cid in range(len(structure.start_line)):
+        start, end = structure.start_line[cid], structure.end_line[cid]
+        assert structure.matching_line(start) == end
+        assert structure.matching_line(end) == start
+        assert structure.container_at_line(start) == cid
+        if end > start:
+            assert structure.fold_range(start) == (start, end)
+            assert store.line(end).strip().rstrip(',') in (']', '}')
+
+
+def test_missing_paths_raise_key_error(indexed):
+    _, structure = indexed
+    for path in (['missing'], ['items', 9], ['items', 'id'], ['name', 0]):
+        with pytest.raises(KeyError):
+            structure.resolve(path)
+
+
+def test_path_format_and_parse():
+    parts = ['data', 'items', 3, 'a b', '名称', '$id']
+    text = structure_index.format_path(parts)
+    assert text == '$.data.items[3]["a b"]["名称"].$id'
+    assert structure_index.parse_path(text) == parts
+    with pytest.raises(ValueError):
+        structure_index.parse_path('data.items')
+
+
+@pytest.mark.parametrize('key', ['q"', 'a\\b', 'x]y', "it's", '\n', 'a.b'])
+def test_quoted_keys_round_trip(key):
+    parts = [key, 0, 'id']
+    assert structure_index.parse_path(structure_index.format_path(parts)) == parts
+    assert structure_index.parse_path("$['" + key.replace("'", "\\'") + "']") == [key]
+
+
+def test_index_matches_json_dumps_text():
+    store, _ = structure_index.format_indexed(DATA)
+    assert store.text() == json.dumps(DATA, indent=4, ensure_ascii=False)
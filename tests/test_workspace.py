@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from src.utils import document_cache, structure_index, workspace
+from src.utils.line_store import LineStore
+
+DATA = {'items': [{'id': i, '名称': f'条目{i}', 'raw': '\ud800'} for i in range(300)]}
+
+
+@pytest.fixture
+def space():
+    space = workspace.Workspace(budget=0)
+    yield space
+    space.shutdown()
+
+
+def spill_and_read(space, output):
+    first = space.new()
+    first.document = document_cache.Document(json.dumps(DATA))
+    first.output = output
+    space.activate(space.new())
+    assert space.enforce() == [first]
+    space._executor.submit(lambda: None).result()
+    assert first.spilled and first.output is None
+    loaded = space.read(first)
+    assert space.restore(first, loaded)
+    assert not first.spilled
+    return first
+
+
+def test_spill_keeps_formatted_output_and_structure(space):
+    store, structure = structure_index.format_indexed(DATA)
+    text = store.text()
+    restored = spill_and_read(space, (store, structure))
+    restored_store, restored_structure = restored.output
+    assert restored_structure.store is restored_store
+    assert restored_store.text() == text
+    assert restored_store.line(3) == store.line(3)
+    assert restored_structure.resolve(['items', 299, '名称']) == structure.resolve(['items', 299, '名称'])
+    assert restored.document.text == json.dumps(DATA)
+
+
+def test_spill_keeps_file_backed_store(space):
+    store = LineStore(spill_threshold=4096)
+    for i in range(2000):
+        store.write(f'第 {i} 行\n')
+    store.finish()
+    restored = spill_and_read(space, store).output
+    assert restored.resident_bytes < restored.nbytes
+    assert restored.line_count == store.line_count
+    assert restored.text() == store.text()